@@ -0,0 +1,45 @@
+-- ===================================================
+-- Agent Job Queue Migration SQL
+-- ===================================================
+-- Run these commands in your database to create the durable agent job queue
+-- (replaces the in-memory pending_discovery_requests dict)
+--
+-- 1. Create agent_jobs table
+CREATE TABLE IF NOT EXISTS agent_jobs (
+    id SERIAL PRIMARY KEY,
+    job_id VARCHAR NOT NULL UNIQUE,
+    agent_id INTEGER NOT NULL REFERENCES agents(id) ON DELETE CASCADE,
+    job_type VARCHAR NOT NULL,
+    payload JSON NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    dedup_key VARCHAR,
+    state VARCHAR NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    available_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    lease_expires_at TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    completed_at TIMESTAMP,
+    last_error TEXT
+);
+
+-- 2. Index used to lease an agent's next jobs
+CREATE INDEX IF NOT EXISTS ix_agent_jobs_ready ON agent_jobs (agent_id, state, priority, id);
+
+-- 3. At most one open job per agent and dedup key (identical status tests merge)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_agent_jobs_open_dedup ON agent_jobs (agent_id, dedup_key)
+    WHERE state IN ('queued', 'leased') AND dedup_key IS NOT NULL;
+
+-- ===================================================
+-- Verification Commands
+-- ===================================================
+-- Run these to verify the table was created:
+
+-- Check table structure
+\d agent_jobs;
+
+-- Check open jobs per agent
+SELECT agent_id, state, count(*)
+FROM agent_jobs
+WHERE state IN ('queued', 'leased')
+GROUP BY agent_id, state;
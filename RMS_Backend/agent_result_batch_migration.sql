@@ -0,0 +1,41 @@
+-- ===================================================
+-- Agent Result Batch Migration SQL
+-- ===================================================
+-- Run these commands in your database to persist the streamed discovery
+-- result batches that were ingested (replaces the per-worker in-memory dedup
+-- set and session device lists)
+--
+-- 1. Create agent_result_batches table; the unique constraint rejects a
+--    retried batch on any worker, also after a restart, and the batch's
+--    devices and errors are stored in the same row
+CREATE TABLE IF NOT EXISTS agent_result_batches (
+    id SERIAL PRIMARY KEY,
+    session_id VARCHAR NOT NULL,
+    agent_id INTEGER NOT NULL REFERENCES agents(id) ON DELETE CASCADE,
+    sequence INTEGER NOT NULL,
+    total_batches INTEGER,
+    discovered_devices JSON NOT NULL DEFAULT '[]',
+    errors JSON NOT NULL DEFAULT '[]',
+    received_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    CONSTRAINT uq_agent_result_batch UNIQUE (session_id, agent_id, sequence)
+);
+
+-- 2. Add the payload columns to a table created by an earlier version
+ALTER TABLE agent_result_batches ADD COLUMN IF NOT EXISTS discovered_devices JSON NOT NULL DEFAULT '[]';
+ALTER TABLE agent_result_batches ADD COLUMN IF NOT EXISTS errors JSON NOT NULL DEFAULT '[]';
+
+-- 3. Index for pruning batches past their retention period
+CREATE INDEX IF NOT EXISTS ix_agent_result_batches_received_at ON agent_result_batches (received_at);
+
+-- ===================================================
+-- Verification Commands
+-- ===================================================
+-- Run these to verify the table was created:
+
+-- Check table structure
+\d agent_result_batches;
+
+-- Check received batches per session and agent
+SELECT session_id, agent_id, count(*), max(total_batches)
+FROM agent_result_batches
+GROUP BY session_id, agent_id;
@@ -15,7 +15,7 @@ from fastapi import APIRouter
 from . import crud, discovery, authentication, tokens
 
 # Import global state from the new agents service
-from app.services.agents import pending_discovery_requests, discovery_sessions
+from app.services.agents import discovery_sessions
 
 # Create the main agents router (no prefix since it will be added by main API router)
 agents_router = APIRouter(tags=["agents"])
@@ -30,4 +30,4 @@ agents_router.include_router(tokens.router, prefix="")
 router = agents_router
 
 # Export the main router and global variables
-__all__ = ["agents_router", "router", "pending_discovery_requests", "discovery_sessions"] 
\ No newline at end of file
+__all__ = ["agents_router", "router", "discovery_sessions"] 
\ No newline at end of file
@@ -6,20 +6,24 @@ This module contains all discovery-related endpoints:
 - Discovery status tracking
 - Agent availability for networks
 - Discovery coordination
+- Job long poll and acknowledgement for agents without a websocket
 """
 
+import asyncio
 import logging
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from app.api.deps import get_current_user, get_db
+from app.core.database import SessionLocal
 from app.models.base import Agent, AgentNetworkAccess
-from app.schemas.agents.discovery import DiscoveryRequest, DiscoveryResponse
+from app.schemas.agents.discovery import DiscoveryRequest, DiscoveryResponse, AgentDiscoveryProgressUpdate, AgentDiscoveryResultBatch, AgentJobAck
 from app.services.agents.agent_discovery_service import AgentDiscoveryService
 from app.services.agents.agent_auth_service import AgentAuthService
+from app.services.agents.agent_job_dispatcher import agent_job_dispatcher, LONG_POLL_MAX_WAIT
 
 router = APIRouter()
 
@@ -169,6 +173,91 @@ async def get_discovery_status(
         raise HTTPException(status_code=500, detail=f"Error fetching discovery status: {str(e)}")
 
 
+@router.get("/{agent_id}/pending-discovery")
+async def get_pending_agent_jobs(
+    agent_id: int,
+    wait: float = Query(0, ge=0, le=LONG_POLL_MAX_WAIT),
+    agent_token: str = Header(..., alias="X-Agent-Token")
+):
+    """Lease an agent its due jobs, holding the request up to `wait` seconds until one arrives."""
+    # Validate on a short-lived session: parked polls must not hold pool connections
+    db = SessionLocal()
+    try:
+        agent_info = auth_service.validate_agent_token(agent_token, db)
+    finally:
+        db.close()
+    if not agent_info or agent_info["id"] != agent_id:
+        raise HTTPException(status_code=401, detail="Invalid agent token")
+    
+    return await agent_job_dispatcher.wait_for_jobs(agent_id, timeout=wait)
+
+
+@router.post("/{agent_id}/jobs/{job_id}/ack")
+async def acknowledge_agent_job(
+    agent_id: int,
+    job_id: str,
+    ack: AgentJobAck,
+    agent_token: str = Header(..., alias="X-Agent-Token"),
+    db: Session = Depends(get_db)
+):
+    """Complete a job the agent has taken; unacknowledged jobs are handed out again."""
+    agent_info = auth_service.validate_agent_token(agent_token, db)
+    if not agent_info or agent_info["id"] != agent_id:
+        raise HTTPException(status_code=401, detail="Invalid agent token")
+    
+    if not await asyncio.to_thread(agent_job_dispatcher.acknowledge, agent_id, job_id, ack.status, ack.error):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "status": ack.status}
+
+
+@router.post("/{agent_id}/discovery-progress")
+async def report_discovery_progress(
+    agent_id: int,
+    update: AgentDiscoveryProgressUpdate,
+    agent_token: str = Header(..., alias="X-Agent-Token"),
+    db: Session = Depends(get_db)
+):
+    """Accept an agent's coalesced discovery progress update."""
+    agent_info = auth_service.validate_agent_token(agent_token, db)
+    if not agent_info or agent_info["id"] != agent_id:
+        raise HTTPException(status_code=401, detail="Invalid agent token")
+    
+    await discovery_service.update_discovery_progress(
+        update.session_id,
+        update.progress,
+        agent_id=agent_id,
+        processed_ips=update.processed_ips,
+        total_ips=update.total_ips,
+        discovered_count=update.discovered_count,
+        coalesced_updates=update.coalesced_updates
+    )
+    session = await discovery_service.get_discovery_status(update.session_id, include_results=False)
+    return {"session_id": update.session_id, "progress": session["progress"], "status": session["status"]}
+
+
+@router.post("/{agent_id}/discovery-results/batch")
+async def report_discovery_result_batch(
+    agent_id: int,
+    batch: AgentDiscoveryResultBatch,
+    agent_token: str = Header(..., alias="X-Agent-Token"),
+    db: Session = Depends(get_db)
+):
+    """Ingest one sequenced batch of an agent's streamed discovery results (idempotent)."""
+    agent_info = auth_service.validate_agent_token(agent_token, db)
+    if not agent_info or agent_info["id"] != agent_id:
+        raise HTTPException(status_code=401, detail="Invalid agent token")
+    
+    return await discovery_service.ingest_result_batch(
+        batch.session_id,
+        agent_id,
+        batch.sequence,
+        discovered_devices=batch.discovered_devices,
+        errors=batch.errors,
+        final=batch.final,
+        total_batches=batch.total_batches
+    )
+
+
 @router.post("/discovery/{session_id}/cancel")
 async def cancel_discovery(
     session_id: str,
@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 
 from app.api import deps
 from app.core.snmp_poller import SNMPPoller
+from app.core.snmp_async_poller import async_snmp_poller
 from app.models.topology import DeviceTopology, InterfaceTopology, NeighborTopology
 from app.models.base import Device, Network, DeviceSNMP
 from app.schemas.topology import (
@@ -16,6 +17,8 @@ from app.schemas.topology import (
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
 from app.services.topology_cache import topology_cache
+from app.services.health_timeseries import health_timeseries, HEALTH_METRICS, RESOLUTIONS
+from app.core.snmp_metrics import snmp_metrics
 import logging
 
 # Import ping and SNMP check functions
@@ -25,6 +28,28 @@ router = APIRouter(
     tags=["topology"]
 )
 
+# Registered before /{network_id}, which would otherwise capture the path
+@router.get("/snmp-metrics", response_model=Dict[str, Any])
+async def get_snmp_metrics(
+    host: str = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Per-device SNMP timings (get, walk, bulk, fast-path, full discovery),
+    PDU counts, retries, timeouts and errors. Platform admins only.
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Only platform admins can view SNMP metrics")
+    try:
+        return {
+            "status": "success",
+            "metrics_info": snmp_metrics.get_info(),
+            "devices": snmp_metrics.device_summary(host)
+        }
+    except Exception as e:
+        logging.error(f"Error getting SNMP metrics: {e}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving SNMP metrics: {str(e)}")
+
 @router.get("/{network_id}", response_model=TopologyResponse)
 async def get_network_topology(
     network_id: int,
@@ -790,8 +815,8 @@ async def get_device_health(
             priv_password=snmp_config.priv_password if snmp_config.snmp_version == "3" else None
         )
 
-        # Test SNMP connection
-        if not poller.test_connection(device.ip):
+        # Test SNMP connection (blocking pysnmp call, keep it off the event loop)
+        if not await async_snmp_poller.run_blocking(device.ip, poller.test_connection, device.ip):
             raise HTTPException(status_code=503, detail="SNMP connection failed")
 
         # Log device information for debugging
@@ -799,7 +824,9 @@ async def get_device_health(
         logging.info(f"SNMP Config - Version: {snmp_config.snmp_version}, Community: {snmp_config.community}")
 
         # Get device health metrics with device_id for enhanced temperature monitoring
-        health_data = poller.get_device_health(device.ip, db, device.id)
+        health_data = await async_snmp_poller.run_blocking(
+            device.ip, poller.get_device_health, device.ip, db, device.id
+        )
         
         # Debug logging to see what health_data contains
         logging.info(f"Raw health_data keys: {list(health_data.keys())}")
@@ -1214,6 +1241,65 @@ async def get_device_health(
         logging.error(f"Error getting device health for {device.name}: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve device health information")
 
+def _history_to_json(history: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert range query arrays to JSON lists (NaN averages become None)."""
+    result = {"resolution": history["resolution"]}
+    for field, values in history.items():
+        if field != "resolution":
+            result[field] = [None if value != value else value for value in values.tolist()]
+    return result
+
+@router.get("/{network_id}/health/history", response_model=Dict[str, Any])
+async def get_network_health_history(
+    network_id: int,
+    metric: str = "cpu",
+    hours: float = 24,
+    resolution: str = None,
+    device_id: int = None,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get health history (cpu, memory, temperature, power or fan) for the devices
+    of a network, or one device when device_id is given. The resolution is
+    picked from raw, 1m, 1h and 1d rollups unless given explicitly.
+    """
+    if metric not in HEALTH_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(HEALTH_METRICS)}")
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(RESOLUTIONS)}")
+
+    network = db.query(Network).filter(Network.id == network_id).first()
+    if not network:
+        raise HTTPException(status_code=404, detail="Network not found")
+
+    query = db.query(Device).filter(Device.network_id == network_id)
+    if device_id is not None:
+        query = query.filter(Device.id == device_id)
+    devices = query.all()
+    if device_id is not None and not devices:
+        raise HTTPException(status_code=404, detail="Device not found")
+
+    try:
+        end = datetime.now(timezone.utc).timestamp()
+        histories = health_timeseries.query_many(
+            [device.ip for device in devices], metric, end - hours * 3600, end, resolution
+        )
+        return {
+            "network_id": network_id,
+            "metric": metric,
+            "start": end - hours * 3600,
+            "end": end,
+            "devices": [
+                dict(_history_to_json(histories[device.ip]), device_id=device.id,
+                     device_name=device.name, device_ip=device.ip)
+                for device in devices
+            ]
+        }
+    except Exception as e:
+        logging.error(f"Error getting health history for network {network_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get health history")
+
 @router.get("/{network_id}/device/{device_id}/snmp-discovery", response_model=Dict[str, Any])
 async def discover_device_snmp_oids(
     network_id: int,
@@ -1344,6 +1430,12 @@ async def update_learning_config(
         
         db.commit()
         
+        # Apply to the running learning engine without a restart
+        from app.services.learning_store import learning_store
+        with learning_store.lock:
+            learning_store.config.update(config)
+            learning_store.decisions.clear()
+        
         return {
             "status": "success",
             "message": "Learning configuration updated successfully",
@@ -1378,6 +1470,10 @@ async def clear_learning_data(
         
         db.commit()
         
+        # Drop the in-memory index too so cleared data is not flushed back
+        from app.services.learning_store import learning_store
+        learning_store.reset()
+        
         return {
             "status": "success",
             "message": "All learning data cleared successfully",
@@ -3,7 +3,9 @@ from app.services.ai_engine.gpt_engine import gpt_conversational_with_config
 from app.services.ssh_engine.ssh_connector import send_config_to_device
 from app.core.database import get_db
 from app.models.base import Agent
+from app.services.agents.agent_job_dispatcher import agent_job_dispatcher, ACK_ACCEPTED
 from datetime import datetime
+import asyncio
 import json
 
 router = APIRouter()
@@ -29,9 +31,29 @@ def log_agent_token_event(db, agent_id, event, user_id=None, ip_address=None, de
     except Exception as e:
         print(f"Error logging agent event: {e}")
 
+async def push_agent_jobs(websocket: WebSocket, agent_id: int):
+    """Push an agent's jobs over its websocket as soon as they are due; the agent acks each one."""
+    while True:
+        try:
+            jobs = await agent_job_dispatcher.wait_for_jobs(agent_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error leasing jobs for agent {agent_id}: {e}")
+            await asyncio.sleep(5)
+            continue
+        for index, job in enumerate(jobs):
+            try:
+                await websocket.send_text(json.dumps({"type": "job", "job": job}, default=str))
+            except Exception:
+                # Socket went away; the agent picks the rest up on reconnect or long poll
+                await asyncio.to_thread(agent_job_dispatcher.release, agent_id, jobs[index:])
+                return
+
+
 @router.websocket("/ws/agent/{agent_token}")
 async def agent_websocket(websocket: WebSocket, agent_token: str):
-    """WebSocket endpoint for agent connections."""
+    """WebSocket endpoint for agent connections; queued jobs are pushed to the agent."""
     try:
         # Get database session directly
         from app.core.database import SessionLocal
@@ -49,6 +71,9 @@ async def agent_websocket(websocket: WebSocket, agent_token: str):
                 return
             
             await websocket.accept()
+            # Plain id: reading agent.id after a commit would reopen a transaction
+            # and pin a pool connection for the life of the socket
+            agent_id = agent.id
             
             # Update agent status to online
             agent.status = "online"
@@ -57,8 +82,10 @@ async def agent_websocket(websocket: WebSocket, agent_token: str):
             db.commit()
             
             # Log the connection
-            log_agent_token_event(db, agent.id, "websocket_connected")
+            log_agent_token_event(db, agent_id, "websocket_connected")
             
+            agent_job_dispatcher.register_socket(agent_id)
+            job_pusher = asyncio.create_task(push_agent_jobs(websocket, agent_id))
             try:
                 while True:
                     data = await websocket.receive_text()
@@ -78,6 +105,16 @@ async def agent_websocket(websocket: WebSocket, agent_token: str):
                                 "timestamp": datetime.utcnow().isoformat()
                             }))
                         
+                        elif message_type == "job_ack":
+                            # Agent took (or refused) a pushed job
+                            await asyncio.to_thread(
+                                agent_job_dispatcher.acknowledge,
+                                agent_id,
+                                payload.get("job_id", ""),
+                                payload.get("status", ACK_ACCEPTED),
+                                payload.get("error")
+                            )
+                        
                         elif message_type == "discovery_result":
                             # Handle discovery results
                             devices = payload.get("devices", [])
@@ -110,7 +147,10 @@ async def agent_websocket(websocket: WebSocket, agent_token: str):
                 # Update agent status to offline
                 agent.status = "offline"
                 db.commit()
-                log_agent_token_event(db, agent.id, "websocket_disconnected")
+                log_agent_token_event(db, agent_id, "websocket_disconnected")
+            finally:
+                job_pusher.cancel()
+                agent_job_dispatcher.unregister_socket(agent_id)
                 
         finally:
             db.close()
@@ -4,7 +4,7 @@ from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.models.base import Network, Device, Agent, AgentNetworkAccess
-from app.services.agents import pending_discovery_requests
+from app.services.agents.agent_job_dispatcher import agent_job_dispatcher, PRIORITY_BACKGROUND
 
 logger = logging.getLogger(__name__)
 
@@ -88,7 +88,7 @@ async def background_device_monitoring():
                             }
                             device_data.append(device_info)
                         
-                        # Store status test request for agent to pick up
+                        # Push the status test to the agent
                         status_request = {
                             "type": "status_test",
                             "session_id": session_id,
@@ -98,7 +98,10 @@ async def background_device_monitoring():
                             "source": "background_monitoring"
                         }
                         
-                        pending_discovery_requests[agent_id] = status_request
+                        # Background priority: never delays a user's discovery; repeats merge
+                        await asyncio.to_thread(
+                            agent_job_dispatcher.enqueue, agent_id, status_request, priority=PRIORITY_BACKGROUND
+                        )
                         total_devices_checked += len(devices)
                         logger.info(f"✅ Background status check requested for network {network.name} with {len(devices)} devices via agent {agent.name}")
                         
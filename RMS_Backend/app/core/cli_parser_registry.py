@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+CLI Parser Registry
+Vendor/category parsing templates for show command output, compiled once at
+import. The field patterns of a template are merged into one alternation
+regex, so an output is parsed in a single streaming pass over its lines no
+matter how many fields the template defines.
+"""
+
+import re
+import logging
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class CLIRecord(NamedTuple):
+    """One typed value pulled out of a CLI output line"""
+    field: str            # Template field name (may contain {group} placeholders)
+    key: str              # Output key, field formatted with the row's groups
+    value: Any            # int/float/str, or a dict of columns for table rows
+    unit: Optional[str]
+    section: int          # 0 before the first section header, then 1, 2, ...
+    line_no: int
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """
+    One field of a parsing template.
+
+    Args:
+        name: Output key. Patterns with named groups are table rows; their
+            name may reference the groups, e.g. 'psu_{slot}'
+        pattern: Regex matched within a single line. The first group (or the
+            whole match) is the value; named groups give a dict per row
+        convert: Applied to the captured text, or to the groupdict for rows
+        unit: Unit reported on the records
+        reduce: How repeated matches fold in parse_dict: 'first', 'last',
+            'max', 'merge' (update the output with the first row's dict) or
+            'seq' (successive matches fill name, then next_names)
+        next_names: Keys for the 2nd, 3rd, ... match when reduce='seq'
+        fmt: Format string applied to the folded value in parse_dict
+        ignore_case: Match the pattern case-insensitively
+        fallback: Only reported when no other field of the template matched
+    """
+    name: str
+    pattern: str
+    convert: Callable = int
+    unit: Optional[str] = None
+    reduce: str = 'first'
+    next_names: Tuple[str, ...] = ()
+    fmt: Optional[str] = None
+    ignore_case: bool = True
+    fallback: bool = False
+
+
+@dataclass(frozen=True)
+class CLITemplate:
+    """
+    Fields parsed from one vendor's output for one category.
+
+    Args:
+        fields: Field specs; on overlapping text the earlier field wins
+        section_pattern: Line regex that opens a new block (e.g. one PSU)
+        section_key: Output key of each block, formatted with {section};
+            records before the first block are dropped
+    """
+    fields: Tuple[FieldSpec, ...]
+    section_pattern: Optional[str] = None
+    section_key: Optional[str] = None
+
+
+_NAMED_GROUP = re.compile(r'\(\?P<(\w+)>')
+_CLASS_OR_SPACE = re.compile(r'\[(?:\\.|[^\]\\])*\]|\\s')
+
+
+def _line_local(pattern: str) -> str:
+    """Stop \\s from matching newlines so a pattern never spans two lines."""
+    return _CLASS_OR_SPACE.sub(
+        lambda m: r'[^\S\n]' if m.group(0) == r'\s' else m.group(0).replace(r'\s', r' \t\r\f\v'),
+        pattern)
+
+
+def _fahrenheit_to_celsius(text: str) -> int:
+    return round((int(text) - 32) * 5 / 9)
+
+
+def _upper(text: str) -> str:
+    return text.upper()
+
+
+def _cisco_psu_row(groups: Dict[str, str]) -> Dict[str, str]:
+    watts = groups['watts']
+    power = f"{watts}W" if watts != 'Unknown' else 'Unknown'
+    return {
+        'model': groups['model'],
+        'serial': groups['serial'],
+        'capacity': power,
+        'status': groups['status'],
+        'power_consumption': power,
+        'sys_power': groups['sys_power'],
+        'poe_power': groups['poe_power']
+    }
+
+
+def _inline_power_row(groups: Dict[str, str]) -> Dict[str, str]:
+    return {
+        'module': groups['module'],
+        'available': f"{groups['available']}W",
+        'used': f"{groups['used']}W",
+        'remaining': f"{groups['remaining']}W"
+    }
+
+
+def _sensor_row(groups: Dict[str, str]) -> Dict[str, Any]:
+    return {'sensor': groups.get('sensor') or 'generic_temp', 'value': float(groups['value'])}
+
+
+# Shared field sets
+_CELSIUS = r'(-?\d+)\s*(?:degrees\s*)?C\b'
+
+_TEMPERATURE_SYSTEM_CPU = (
+    FieldSpec('system_temp', _CELSIUS, unit='celsius', reduce='seq', next_names=('cpu_temp',), ignore_case=False),
+)
+
+_CPU_FIELDS = (
+    FieldSpec('cpu_usage', r'CPU utilization for five seconds:\s*(\d+)%', unit='%'),
+    FieldSpec('cpu_usage', r'CPU (?:usage|utilization):\s*(\d+)%', unit='%'),
+    FieldSpec('cpu_usage', r'(\d+)%\s*CPU', unit='%'),
+)
+
+_MEMORY_FIELDS = (
+    FieldSpec('memory', r'Total(?: memory)?:\s*(?P<memory_total>\d+)\s*Used(?: memory)?:\s*(?P<memory_used>\d+)\s*'
+                        r'Free(?: memory)?:\s*(?P<memory_free>\d+)',
+              convert=lambda groups: {k: int(v) for k, v in groups.items()}, reduce='merge'),
+    FieldSpec('memory', r'Processor\s+(?P<memory_total>\d+)\s+(?P<memory_used>\d+)\s+(?P<memory_free>\d+)',
+              convert=lambda groups: {k: int(v) for k, v in groups.items()}, reduce='merge'),
+    FieldSpec('memory_usage', r'Memory(?: utilization)?:\s*(\d+)%', unit='%'),
+)
+
+_GENERIC_POWER_FIELDS = (
+    FieldSpec('total_power', r'(\d+)\s*W\b', unit='W', reduce='max', fmt='{}W', ignore_case=False),
+    FieldSpec('voltage', r'(\d+)\s*V\b', unit='V', fmt='{}V', ignore_case=False),
+)
+
+_PSU_SECTION_FIELDS = (
+    FieldSpec('model', r'Model\s*:\s*(.+?)\s*$', convert=str),
+    FieldSpec('status', r'Status\s*:\s*(.+?)\s*$', convert=str),
+    FieldSpec('power_consumption', r'(\d+)\s*W\b', unit='W', fmt='{}W', ignore_case=False),
+)
+
+_SENSOR_ROWS = (
+    FieldSpec('{sensor}', r'(?P<sensor>\w+)\s+(?P<value>\d+)\s+\d+\s+\d+\s+\w+', convert=_sensor_row, unit='celsius', reduce='last'),
+    FieldSpec('{sensor}', r'(?P<sensor>\w+)\s+(?P<value>\d+)\s*(?:°C|C\b|degrees)', convert=_sensor_row, unit='celsius', reduce='last'),
+)
+
+
+# Templates keyed by (vendor, category); 'generic' is the fallback vendor
+TEMPLATES: Dict[Tuple[str, str], CLITemplate] = {
+    ('cisco', 'temperature'): CLITemplate(fields=(
+        FieldSpec('inlet_temp', r'Inlet Temperature Value:\s*(\d+)\s*Degree Celsius', unit='celsius'),
+        FieldSpec('hotspot_temp', r'Hotspot Temperature Value:\s*(\d+)\s*Degree Celsius', unit='celsius'),
+        FieldSpec('system_status', r'SYSTEM TEMPERATURE is (OK)\b', convert=_upper),
+        FieldSpec('threshold_yellow', r'Yellow Threshold\s*:\s*(\d+)\s*Degree Celsius', unit='celsius'),
+        FieldSpec('threshold_red', r'Red Threshold\s*:\s*(\d+)\s*Degree Celsius', unit='celsius'),
+        FieldSpec('temp_status', r'Temperature State:\s*(\w+)', convert=str),
+        FieldSpec('ambient_temp', r'(\d+)\s*Degrees?\s*Celsius', unit='celsius', reduce='seq',
+                  next_names=('system_temp',), fallback=True),
+    )),
+    ('juniper', 'temperature'): CLITemplate(fields=_TEMPERATURE_SYSTEM_CPU),
+    ('arista', 'temperature'): CLITemplate(fields=_TEMPERATURE_SYSTEM_CPU),
+    ('hp', 'temperature'): CLITemplate(fields=_TEMPERATURE_SYSTEM_CPU),
+    ('dell', 'temperature'): CLITemplate(fields=_TEMPERATURE_SYSTEM_CPU),
+    ('brocade', 'temperature'): CLITemplate(fields=_TEMPERATURE_SYSTEM_CPU),
+    ('generic', 'temperature'): CLITemplate(fields=(
+        FieldSpec('ambient_temp', r'(\d+)\s*Fahrenheit', convert=_fahrenheit_to_celsius, unit='celsius'),
+        FieldSpec('ambient_temp', r'(\d+)\s*Celsius', unit='celsius'),
+    )),
+
+    ('cisco', 'temperature_sensors'): CLITemplate(fields=_SENSOR_ROWS),
+    ('generic', 'temperature_sensors'): CLITemplate(fields=_SENSOR_ROWS[1:] + (
+        FieldSpec('generic_temp', r'temp(?:erature)?[:\s]+(?P<value>\d+)', convert=_sensor_row, unit='celsius', reduce='last'),
+    )),
+    ('juniper', 'temperature_sensors'): CLITemplate(fields=_SENSOR_ROWS[1:]),
+    ('arista', 'temperature_sensors'): CLITemplate(fields=_SENSOR_ROWS[1:]),
+    ('hp', 'temperature_sensors'): CLITemplate(fields=_SENSOR_ROWS[1:]),
+
+    ('cisco', 'power'): CLITemplate(fields=(
+        # show environment power: SW  PID  Serial#  Status  Sys Pwr  PoE Pwr  Watts
+        FieldSpec('psu_{slot}', r'^\s*(?P<slot>\d+[A-Z]?)\s+(?P<model>\S+)\s+(?P<serial>\S+)\s+(?P<status>\S.*?)\s+'
+                                r'(?P<sys_power>Good|Bad|n/a)\s+(?P<poe_power>Good|Bad|n/a)\s+(?P<watts>\d+|Unknown)\s*$',
+                  convert=_cisco_psu_row, unit='W'),
+        FieldSpec('inline_power', r'(?P<module>\d+)\s+(?P<available>\d+\.?\d*)\s+(?P<used>\d+\.?\d*)\s+(?P<remaining>\d+\.?\d*)',
+                  convert=_inline_power_row, unit='W', fallback=True),
+        FieldSpec('overall_status', r'\b(OK|FAIL|WARNING|CRITICAL)\b', convert=_upper, fallback=True),
+    ) + tuple(replace(spec, fallback=True) for spec in _GENERIC_POWER_FIELDS)),
+    ('juniper', 'power'): CLITemplate(fields=_PSU_SECTION_FIELDS,
+                                      section_pattern=r'Power Supply\s+\d+:', section_key='psu_{section}'),
+    ('arista', 'power'): CLITemplate(fields=_PSU_SECTION_FIELDS,
+                                     section_pattern=r'Power Supply\s+\d+:', section_key='psu_{section}'),
+    ('generic', 'power'): CLITemplate(fields=(
+        FieldSpec('overall_status', r'\b(OK|FAIL|WARNING|CRITICAL|ON|OFF)\b', convert=_upper),
+    ) + _GENERIC_POWER_FIELDS),
+
+    ('generic', 'cpu'): CLITemplate(fields=_CPU_FIELDS),
+    ('generic', 'memory'): CLITemplate(fields=_MEMORY_FIELDS),
+}
+
+
+class _CompiledTemplate:
+    """A template's fields merged into one alternation regex."""
+
+    __slots__ = ('template', 'regex', 'slots', 'section_index', 'field_specs')
+
+    def __init__(self, template: CLITemplate):
+        self.template = template
+        self.slots: Dict[int, Tuple[FieldSpec, int, Tuple[Tuple[str, str], ...]]] = {}  # group -> (spec, value group, named)
+        self.field_specs: Dict[str, FieldSpec] = {}
+        self.section_index: Optional[int] = None
+
+        alternatives = []
+        if template.section_pattern:
+            alternatives.append(f"(?P<_section>{_line_local(template.section_pattern)})")
+        for i, spec in enumerate(template.fields):
+            self.field_specs.setdefault(spec.name, spec)
+            # Named groups must be unique across the alternation
+            pattern = _NAMED_GROUP.sub(lambda m: f"(?P<_f{i}_{m.group(1)}>", _line_local(spec.pattern))
+            if spec.ignore_case:
+                pattern = f"(?i:{pattern})"
+            alternatives.append(f"(?P<_f{i}>{pattern})")
+        self.regex = re.compile('|'.join(alternatives), re.MULTILINE)
+
+        if template.section_pattern:
+            self.section_index = self.regex.groupindex['_section']
+        for i, spec in enumerate(template.fields):
+            index = self.regex.groupindex[f"_f{i}"]
+            named = tuple((name[len(f"_f{i}_"):], name) for name in self.regex.groupindex
+                          if name.startswith(f"_f{i}_"))
+            # The value is the field's first group, or the whole match without one
+            value_group = index + 1 if re.compile(spec.pattern).groups else index
+            self.slots[index] = (spec, value_group, named)
+
+
+class CLIParserRegistry:
+    """
+    Registry of compiled CLI parsing templates.
+    parse() returns typed records in output order; parse_dict() folds them
+    into the flat dict shape the monitors return.
+    """
+
+    def __init__(self, templates: Dict[Tuple[str, str], CLITemplate] = None):
+        """
+        Compile every template.
+
+        Args:
+            templates: (vendor, category) -> CLITemplate, defaults to TEMPLATES
+        """
+        self._compiled: Dict[Tuple[str, str], _CompiledTemplate] = {}
+        for (vendor, category), template in (templates or TEMPLATES).items():
+            self.register(vendor, category, template)
+
+    def register(self, vendor: str, category: str, template: CLITemplate) -> None:
+        """Compile and register a template, replacing any existing one"""
+        self._compiled[(vendor.lower(), category)] = _CompiledTemplate(template)
+
+    def resolve_vendor(self, vendor: str, category: str) -> str:
+        """Map a vendor or platform name (e.g. 'cisco_ios') to a registered vendor"""
+        vendor = (vendor or 'generic').lower()
+        if (vendor, category) in self._compiled:
+            return vendor
+        for registered, registered_category in self._compiled:
+            if registered_category == category and registered != 'generic' and vendor.startswith(registered):
+                return registered
+        return 'generic'
+
+    def _get(self, vendor: str, category: str) -> Optional[_CompiledTemplate]:
+        return self._compiled.get((self.resolve_vendor(vendor, category), category))
+
+    def has_template(self, vendor: str, category: str) -> bool:
+        return self._get(vendor, category) is not None
+
+    def parse(self, vendor: str, category: str, output: Union[str, Iterable[str]]) -> List[CLIRecord]:
+        """
+        Parse CLI output in one pass.
+
+        Patterns are confined to a single line, so a full output string is
+        scanned once with a MULTILINE regex; an iterable of lines (e.g. a
+        streamed session read) is scanned line by line with the same regex.
+
+        Args:
+            vendor: Vendor or platform name
+            category: Template category ('temperature', 'power', ...)
+            output: Full output text, or an iterable of lines
+
+        Returns:
+            Typed records in output order
+        """
+        compiled = self._get(vendor, category)
+        if compiled is None or not output:
+            return []
+
+        finditer = compiled.regex.finditer
+        slots = compiled.slots
+        section_index = compiled.section_index
+        records = []
+        section = 0
+
+        text = isinstance(output, str)
+        if text:
+            chunks = ((1, finditer(output)),)
+        else:
+            chunks = ((line_no, finditer(line)) for line_no, line in enumerate(output, 1))
+
+        for line_no, matches in chunks:
+            position = 0
+            for match in matches:
+                if text:
+                    start = match.start()
+                    line_no += output.count('\n', position, start)
+                    position = start
+                index = match.lastindex
+                if index == section_index:
+                    section += 1
+                    continue
+                spec, group, named = slots[index]
+                try:
+                    if named:
+                        groups = {name: match.group(full) for name, full in named}
+                        value = spec.convert(groups)
+                        key = spec.name.format(**groups) if '{' in spec.name else spec.name
+                    else:
+                        value = spec.convert(match.group(group))
+                        key = spec.name
+                except (ValueError, TypeError, KeyError) as e:
+                    logger.debug(f"Skipping unparsable '{spec.name}' value on line {line_no}: {e}")
+                    continue
+                records.append(CLIRecord(spec.name, key, value, spec.unit, section, line_no))
+
+        return records
+
+    def parse_dict(self, vendor: str, category: str, output: Union[str, Iterable[str]]) -> Dict:
+        """Parse CLI output and fold the records into a flat dict"""
+        compiled = self._get(vendor, category)
+        if compiled is None:
+            return {}
+        return self.fold(compiled, self.parse(vendor, category, output))
+
+    @staticmethod
+    def fold(compiled: _CompiledTemplate, records: List[CLIRecord]) -> Dict:
+        """Apply each field's reduce mode and fmt to a record list"""
+        specs = compiled.field_specs
+        template = compiled.template
+        has_primary = any(not specs[r.field].fallback for r in records)
+
+        folded: Dict[Tuple[int, str], Tuple[FieldSpec, Any]] = {}
+        seq_counts: Dict[Tuple[int, str], int] = {}
+        merged = set()
+        for record in records:
+            spec = specs[record.field]
+            if spec.fallback and has_primary:
+                continue
+            section = record.section
+            if template.section_key and section == 0:
+                continue
+
+            if spec.reduce == 'seq':
+                count = seq_counts.get((section, record.key), 0)
+                seq_counts[(section, record.key)] = count + 1
+                names = (spec.name,) + spec.next_names
+                if count < len(names):
+                    folded[(section, names[count])] = (spec, record.value)
+            elif spec.reduce == 'merge':
+                if (section, record.key) not in merged:
+                    merged.add((section, record.key))
+                    for name, value in record.value.items():
+                        folded[(section, name)] = (None, value)
+            elif spec.reduce == 'last':
+                folded[(section, record.key)] = (spec, record.value)
+            elif spec.reduce == 'max':
+                current = folded.get((section, record.key))
+                if current is None or record.value > current[1]:
+                    folded[(section, record.key)] = (spec, record.value)
+            else:
+                folded.setdefault((section, record.key), (spec, record.value))
+
+        result = {}
+        for (section, key), (spec, value) in folded.items():
+            if spec is not None and spec.fmt:
+                value = spec.fmt.format(value)
+            if template.section_key:
+                result.setdefault(template.section_key.format(section=section), {})[key] = value
+            else:
+                result[key] = value
+        return result
+
+    def get_patterns(self, vendor: str, category: str) -> List[str]:
+        """Field patterns of the template parse() uses for vendor and category"""
+        compiled = self._get(vendor, category)
+        return [field.pattern for field in compiled.template.fields] if compiled else []
+
+    def get_info(self) -> Dict[str, Any]:
+        """Registered templates and their field counts"""
+        return {
+            f"{vendor}/{category}": len(compiled.template.fields)
+            for (vendor, category), compiled in sorted(self._compiled.items())
+        }
+
+
+# Global CLI parser registry instance
+cli_parser_registry = CLIParserRegistry()
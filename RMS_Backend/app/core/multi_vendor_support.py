@@ -4,10 +4,11 @@ Multi-Vendor Support System for Network Device Monitoring
 Supports Cisco, Juniper, Arista, HP, Dell, Brocade, and other vendors
 """
 
-import re
 import logging
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+from app.core.cli_parser_registry import cli_parser_registry
+from app.utils.device_classifier import device_classifier
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +19,6 @@ class VendorProfile:
     aliases: List[str]
     snmp_oids: Dict[str, List[str]]
     cli_commands: Dict[str, List[str]]
-    parsing_patterns: Dict[str, List[str]]
     os_versions: List[str]
 
 class MultiVendorSupport:
@@ -91,26 +91,6 @@ class MultiVendorSupport:
                     'show environment all',
                 ]
             },
-            parsing_patterns={
-                'temperature': [
-                    r'Inlet Temperature Value:\s*(\d+)\s*Degree Celsius',
-                    r'Hotspot Temperature Value:\s*(\d+)\s*Degree Celsius',
-                    r'SYSTEM TEMPERATURE is (\w+)',
-                    r'Yellow Threshold\s*:\s*(\d+)\s*Degree Celsius',
-                    r'Red Threshold\s*:\s*(\d+)\s*Degree Celsius',
-                    r'Temperature State:\s*(\w+)',
-                ],
-                'cpu': [
-                    r'CPU utilization for five seconds:\s*(\d+)%',
-                    r'CPU usage:\s*(\d+)%',
-                    r'CPU utilization:\s*(\d+)%',
-                ],
-                'memory': [
-                    r'Total:\s*(\d+)\s*Used:\s*(\d+)\s*Free:\s*(\d+)',
-                    r'Processor\s+(\d+)\s+(\d+)\s+(\d+)',
-                    r'Total memory:\s*(\d+)\s*Used memory:\s*(\d+)\s*Free memory:\s*(\d+)',
-                ]
-            },
             os_versions=['ios', 'ios-xe', 'nx-os', 'catos', 'ios-xr']
         )
         
@@ -166,22 +146,6 @@ class MultiVendorSupport:
                     'show chassis environment',
                 ]
             },
-            parsing_patterns={
-                'temperature': [
-                    r'(\d+)\s*C\s*/\s*(\d+)\s*F',
-                    r'Temperature:\s*(\d+)\s*C',
-                    r'(\d+)\s*degrees C',
-                ],
-                'cpu': [
-                    r'CPU utilization:\s*(\d+)%',
-                    r'CPU usage:\s*(\d+)%',
-                    r'(\d+)%\s*CPU',
-                ],
-                'memory': [
-                    r'Total:\s*(\d+)\s*Used:\s*(\d+)\s*Free:\s*(\d+)',
-                    r'Memory utilization:\s*(\d+)%',
-                ]
-            },
             os_versions=['junos', 'junos-evolved']
         )
         
@@ -233,21 +197,6 @@ class MultiVendorSupport:
                     'show fan',
                 ]
             },
-            parsing_patterns={
-                'temperature': [
-                    r'(\d+)\s*C',
-                    r'Temperature:\s*(\d+)\s*C',
-                    r'(\d+)\s*degrees C',
-                ],
-                'cpu': [
-                    r'CPU utilization:\s*(\d+)%',
-                    r'(\d+)%\s*CPU',
-                ],
-                'memory': [
-                    r'Total:\s*(\d+)\s*Used:\s*(\d+)\s*Free:\s*(\d+)',
-                    r'Memory:\s*(\d+)%',
-                ]
-            },
             os_versions=['eos', 'eos-x']
         )
         
@@ -297,20 +246,6 @@ class MultiVendorSupport:
                     'show environment',
                 ]
             },
-            parsing_patterns={
-                'temperature': [
-                    r'(\d+)\s*C',
-                    r'Temperature:\s*(\d+)\s*C',
-                ],
-                'cpu': [
-                    r'CPU utilization:\s*(\d+)%',
-                    r'(\d+)%\s*CPU',
-                ],
-                'memory': [
-                    r'Total:\s*(\d+)\s*Used:\s*(\d+)\s*Free:\s*(\d+)',
-                    r'Memory:\s*(\d+)%',
-                ]
-            },
             os_versions=['provision', 'arubaos', 'comware']
         )
         
@@ -360,20 +295,6 @@ class MultiVendorSupport:
                     'show environment',
                 ]
             },
-            parsing_patterns={
-                'temperature': [
-                    r'(\d+)\s*C',
-                    r'Temperature:\s*(\d+)\s*C',
-                ],
-                'cpu': [
-                    r'CPU utilization:\s*(\d+)%',
-                    r'(\d+)%\s*CPU',
-                ],
-                'memory': [
-                    r'Total:\s*(\d+)\s*Used:\s*(\d+)\s*Free:\s*(\d+)',
-                    r'Memory:\s*(\d+)%',
-                ]
-            },
             os_versions=['ftos', 'dnos', 'powerconnect']
         )
         
@@ -423,20 +344,6 @@ class MultiVendorSupport:
                     'show environment',
                 ]
             },
-            parsing_patterns={
-                'temperature': [
-                    r'(\d+)\s*C',
-                    r'Temperature:\s*(\d+)\s*C',
-                ],
-                'cpu': [
-                    r'CPU utilization:\s*(\d+)%',
-                    r'(\d+)%\s*CPU',
-                ],
-                'memory': [
-                    r'Total:\s*(\d+)\s*Used:\s*(\d+)\s*Free:\s*(\d+)',
-                    r'Memory:\s*(\d+)%',
-                ]
-            },
             os_versions=['fastiron', 'netiron', 'turboiron']
         )
         
@@ -444,35 +351,7 @@ class MultiVendorSupport:
     
     def identify_vendor(self, sys_object_id: str, sys_descr: str) -> str:
         """Identify vendor from system information"""
-        sys_descr_lower = sys_descr.lower()
-        sys_object_id_lower = sys_object_id.lower()
-        
-        for vendor_name, profile in self.vendor_profiles.items():
-            # Check sysObjectID patterns
-            for alias in profile.aliases:
-                if alias in sys_object_id_lower:
-                    return vendor_name
-            
-            # Check sysDescr patterns
-            for alias in profile.aliases:
-                if alias in sys_descr_lower:
-                    return vendor_name
-        
-        # Check for specific patterns
-        if 'cisco' in sys_descr_lower or '1.3.6.1.4.1.9.' in sys_object_id:
-            return 'cisco'
-        elif 'juniper' in sys_descr_lower or '1.3.6.1.4.1.2636.' in sys_object_id:
-            return 'juniper'
-        elif 'arista' in sys_descr_lower or '1.3.6.1.4.1.30065.' in sys_object_id:
-            return 'arista'
-        elif 'hp' in sys_descr_lower or 'hewlett' in sys_descr_lower or '1.3.6.1.4.1.11.' in sys_object_id:
-            return 'hp'
-        elif 'dell' in sys_descr_lower or '1.3.6.1.4.1.674.' in sys_object_id:
-            return 'dell'
-        elif 'brocade' in sys_descr_lower or '1.3.6.1.4.1.1991.' in sys_object_id:
-            return 'brocade'
-        
-        return 'generic'
+        return device_classifier.vendor(sys_object_id, sys_descr, default='generic')
     
     def get_vendor_profile(self, vendor: str) -> Optional[VendorProfile]:
         """Get vendor profile by name"""
@@ -493,71 +372,12 @@ class MultiVendorSupport:
         return []
     
     def get_parsing_patterns(self, vendor: str, category: str) -> List[str]:
-        """Get parsing patterns for specific vendor and category"""
-        profile = self.get_vendor_profile(vendor)
-        if profile and category in profile.parsing_patterns:
-            return profile.parsing_patterns[category]
-        return []
+        """Get parsing patterns for specific vendor and category (from the CLI parser registry)"""
+        return cli_parser_registry.get_patterns(vendor, category)
     
     def parse_cli_output(self, vendor: str, category: str, output: str) -> Dict:
-        """Parse CLI output using vendor-specific patterns"""
-        patterns = self.get_parsing_patterns(vendor, category)
-        parsed_data = {}
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, output, re.IGNORECASE)
-            if matches:
-                if category == 'temperature':
-                    parsed_data.update(self._parse_temperature_matches(matches, vendor))
-                elif category == 'cpu':
-                    parsed_data.update(self._parse_cpu_matches(matches, vendor))
-                elif category == 'memory':
-                    parsed_data.update(self._parse_memory_matches(matches, vendor))
-        
-        return parsed_data
-    
-    def _parse_temperature_matches(self, matches: List, vendor: str) -> Dict:
-        """Parse temperature matches based on vendor"""
-        data = {}
-        
-        if vendor == 'cisco':
-            # Cisco specific parsing
-            if len(matches) >= 2:
-                data['inlet_temp'] = matches[0]
-                data['hotspot_temp'] = matches[1]
-            if len(matches) >= 4:
-                data['threshold_yellow'] = matches[2]
-                data['threshold_red'] = matches[3]
-        else:
-            # Generic parsing for other vendors
-            if matches:
-                data['system_temp'] = matches[0]
-                if len(matches) > 1:
-                    data['cpu_temp'] = matches[1]
-        
-        return data
-    
-    def _parse_cpu_matches(self, matches: List, vendor: str) -> Dict:
-        """Parse CPU matches based on vendor"""
-        data = {}
-        
-        if matches:
-            data['cpu_usage'] = matches[0]
-        
-        return data
-    
-    def _parse_memory_matches(self, matches: List, vendor: str) -> Dict:
-        """Parse memory matches based on vendor"""
-        data = {}
-        
-        if len(matches) >= 3:
-            data['memory_total'] = matches[0]
-            data['memory_used'] = matches[1]
-            data['memory_free'] = matches[2]
-        elif len(matches) == 1:
-            data['memory_usage'] = matches[0]
-        
-        return data
+        """Parse CLI output using the vendor's compiled template"""
+        return cli_parser_registry.parse_dict(vendor, category, output)
     
     def get_supported_vendors(self) -> List[str]:
         """Get list of supported vendors"""
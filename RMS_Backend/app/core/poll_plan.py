@@ -0,0 +1,161 @@
+"""
+Compiled per-device health poll plans.
+
+A PollPlan packs every learned CPU, memory, temperature, power and fan OID of
+one device into as few multi-varbind GET PDUs as fit in the agent's maximum
+message size, so a health refresh is one or two round trips returning live
+values instead of a walk or a stale read.
+"""
+
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CATEGORIES = ('cpu', 'memory', 'temperature', 'power', 'fan')
+
+# Response size budget per PDU. Stays below a 1500 byte Ethernet MTU after
+# IP/UDP headers; lowered per plan whenever an agent answers tooBig.
+DEFAULT_MAX_PDU_BYTES = 1400
+MIN_PDU_BYTES = 484  # smallest message size every SNMP agent must accept
+MAX_VARBINDS_PER_PDU = 64
+
+# SNMP message/PDU header overhead (version, community, request-id, ...)
+_PDU_HEADER_BYTES = 64
+
+
+class PollPlanEntry:
+    """One OID in a plan and where its value goes in the result."""
+
+    __slots__ = ('category', 'sensor', 'field', 'oid', 'size')
+
+    def __init__(self, category: str, sensor: str, oid: str,
+                 field: Optional[str] = None, sample_value: Any = None):
+        self.category = category
+        self.sensor = sensor
+        self.field = field
+        self.oid = oid
+        self.size = self._estimate_size(oid, sample_value)
+
+    @staticmethod
+    def _estimate_size(oid: str, sample_value: Any) -> int:
+        """Rough BER size of this varbind in the response."""
+        oid_bytes = len(oid.split('.')) + 4
+        value_bytes = max(len(str(sample_value)) if sample_value is not None else 0, 6) + 2
+        return oid_bytes + value_bytes + 4
+
+
+class PollPlan:
+    """Learned health OIDs of one device, packed into GET PDUs."""
+
+    def __init__(self, host: str, entries: List[PollPlanEntry],
+                 max_pdu_bytes: int = DEFAULT_MAX_PDU_BYTES,
+                 max_varbinds: int = MAX_VARBINDS_PER_PDU):
+        self.host = host
+        self.entries = entries
+        self.max_pdu_bytes = max_pdu_bytes
+        self.max_varbinds = max_varbinds
+        self.signature = tuple((e.category, e.sensor, e.field, e.oid) for e in entries)
+        self.pdus: List[List[PollPlanEntry]] = []
+        self.last_round_trips = 0
+        self._pack()
+
+    @classmethod
+    def compile(cls, host: str, mappings: Dict[str, Dict[str, Dict]],
+                max_pdu_bytes: int = DEFAULT_MAX_PDU_BYTES,
+                max_varbinds: int = MAX_VARBINDS_PER_PDU) -> 'PollPlan':
+        """Build a plan from learned sensor mappings.
+
+        Args:
+            host: Device address
+            mappings: {category: {sensor_name: mapping}} where a mapping holds
+                either 'oid' (scalar sensor) or 'oids' ({field: oid}, e.g. PSU
+                tables) next to the last seen 'value'. Sensors without an OID
+                are skipped.
+            max_pdu_bytes: Response size budget per PDU
+            max_varbinds: Maximum varbinds per PDU
+        """
+        entries = [PollPlanEntry(category, sensor, oid, field=field, sample_value=sample)
+                   for category, sensor, field, oid, sample in cls._learned_oids(mappings)]
+        return cls(host, entries, max_pdu_bytes, max_varbinds)
+
+    @classmethod
+    def signature_of(cls, mappings: Dict[str, Dict[str, Dict]]) -> tuple:
+        """Signature a plan compiled from mappings would have, without compiling it."""
+        return tuple((category, sensor, field, oid)
+                     for category, sensor, field, oid, _ in cls._learned_oids(mappings))
+
+    @staticmethod
+    def _learned_oids(mappings: Dict[str, Dict[str, Dict]]):
+        """(category, sensor, field, oid, sample value) of every sensor with a learned OID."""
+        for category in HEALTH_CATEGORIES:
+            for sensor, mapping in (mappings.get(category) or {}).items():
+                if mapping.get('oid'):
+                    yield category, sensor, None, mapping['oid'], mapping.get('value')
+                elif mapping.get('oids'):
+                    sample = mapping.get('value') if isinstance(mapping.get('value'), dict) else {}
+                    for field, oid in mapping['oids'].items():
+                        yield category, sensor, field, oid, sample.get(field)
+
+    def _pack(self):
+        """Greedy first-fit packing of entries into PDUs by estimated size."""
+        self.pdus = []
+        current, current_bytes = [], _PDU_HEADER_BYTES
+        for entry in self.entries:
+            if current and (current_bytes + entry.size > self.max_pdu_bytes
+                            or len(current) >= self.max_varbinds):
+                self.pdus.append(current)
+                current, current_bytes = [], _PDU_HEADER_BYTES
+            current.append(entry)
+            current_bytes += entry.size
+        if current:
+            self.pdus.append(current)
+
+    def execute(self, session: 'SNMPSession') -> Dict[str, Dict[str, Any]]:
+        """Run the plan against the device.
+
+        Returns:
+            {category: {sensor: value}} (or {sensor: {field: value}} for
+            multi-field sensors) with live values as strings, matching what
+            the discovery code stores.
+        """
+        results = {category: {} for category in HEALTH_CATEGORIES}
+        if not self.entries:
+            return results
+
+        pdus_before = session.pdu_count
+        too_big_before = session.too_big_count
+        for pdu in self.pdus:
+            values = session.get_many(self.host, [entry.oid for entry in pdu], max_varbinds=len(pdu))
+            for entry in pdu:
+                if entry.oid not in values:
+                    continue
+                value = str(values[entry.oid])
+                if entry.field:
+                    results[entry.category].setdefault(entry.sensor, {})[entry.field] = value
+                else:
+                    results[entry.category][entry.sensor] = value
+
+        self.last_round_trips = session.pdu_count - pdus_before
+        if session.too_big_count > too_big_before:
+            # The agent's max message size is smaller than assumed - repack for next time
+            self.max_pdu_bytes = max(MIN_PDU_BYTES, self.max_pdu_bytes // 2)
+            self.max_varbinds = max(1, max(len(pdu) for pdu in self.pdus) // 2)
+            self._pack()
+            logger.info(f"Poll plan for {self.host} repacked to {len(self.pdus)} PDUs "
+                        f"({self.max_pdu_bytes} bytes, {self.max_varbinds} varbinds) after tooBig")
+
+        logger.info(f"Poll plan for {self.host}: {len(self.entries)} OIDs, "
+                    f"{self.last_round_trips} round trips")
+        return results
+
+    def get_info(self) -> Dict[str, Any]:
+        """Plan shape for diagnostics."""
+        return {
+            'host': self.host,
+            'oids': len(self.entries),
+            'pdus': len(self.pdus),
+            'max_pdu_bytes': self.max_pdu_bytes,
+            'max_varbinds': self.max_varbinds,
+            'last_round_trips': self.last_round_trips
+        }
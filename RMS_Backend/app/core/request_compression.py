@@ -0,0 +1,91 @@
+"""
+Compressed request bodies
+
+Agents gzip large JSON bodies (discovery result batches, status reports).
+GZipRequestMiddleware inflates a body sent with Content-Encoding: gzip
+before routing, so endpoints and the security middleware only ever see
+plain JSON. The inflated size is capped so a small compressed body cannot
+expand without bound.
+"""
+
+import logging
+import zlib
+from typing import List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Largest body accepted after decompression
+MAX_INFLATED_BYTES = 64 * 1024 * 1024
+
+
+class GZipRequestMiddleware:
+    """Pure ASGI middleware inflating gzip-encoded request bodies."""
+
+    def __init__(self, app: ASGIApp, max_inflated_bytes: int = MAX_INFLATED_BYTES):
+        self.app = app
+        self.max_inflated_bytes = max_inflated_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _is_gzip(scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = []
+        size = 0
+        try:
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] != "http.request":
+                    # Client went away mid-body
+                    return
+                more_body = message.get("more_body", False)
+                chunk = inflater.decompress(message.get("body", b""), self.max_inflated_bytes - size + 1)
+                size += len(chunk)
+                if size > self.max_inflated_bytes or inflater.unconsumed_tail:
+                    await _reject(send, 413, b"Decompressed request body too large")
+                    return
+                chunks.append(chunk)
+            chunks.append(inflater.flush())
+        except zlib.error as e:
+            logger.warning(f"Rejected malformed gzip request body for {scope.get('path')}: {e}")
+            await _reject(send, 400, b"Malformed gzip request body")
+            return
+
+        body = b"".join(chunks)
+        headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        scope = dict(scope, headers=headers)
+
+        sent = False
+
+        async def inflated_receive() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, inflated_receive, send)
+
+
+def _is_gzip(headers: List[Tuple[bytes, bytes]]) -> bool:
+    for name, value in headers:
+        if name == b"content-encoding":
+            return value.strip().lower() == b"gzip"
+    return False
+
+
+async def _reject(send: Send, status: int, detail: bytes) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(detail)).encode())],
+    })
+    await send({"type": "http.response.body", "body": detail})
@@ -4,6 +4,8 @@ from sqlalchemy.orm import Session
 import logging
 import re
 from datetime import datetime
+from app.utils.device_classifier import device_classifier
+from app.core.snmp_session import share_mib_compiler
 
 logger = logging.getLogger(__name__)
 
@@ -122,37 +124,25 @@ class SmartSNMPDiscovery:
                 'platform': 'unknown'
             }
             
-            # Get system description
+            # Get system description and object ID
             sys_descr = self._get_snmp_value(ip_address, '1.3.6.1.2.1.1.1.0')
-            if sys_descr:
-                profile['vendor'] = self._identify_vendor(sys_descr)
-                profile['model'] = self._extract_model(sys_descr)
-                profile['platform'] = sys_descr
-            
-            # Get system object ID
             sys_object_id = self._get_snmp_value(ip_address, '1.3.6.1.2.1.1.2.0')
             if sys_object_id:
                 profile['sys_object_id'] = sys_object_id
             
+            if sys_descr or sys_object_id:
+                classification = device_classifier.classify(sys_object_id or '', sys_descr or '')
+                profile['vendor'] = classification.vendor if classification.vendor != 'unknown' else 'generic'
+                profile['model'] = classification.model if classification.model != 'unknown' else self._extract_model(sys_descr or '')
+            if sys_descr:
+                profile['platform'] = sys_descr
+            
             return profile
             
         except Exception as e:
             logger.error(f"Error getting device profile: {str(e)}")
             return {'vendor': 'unknown', 'model': 'unknown', 'platform': 'unknown'}
     
-    def _identify_vendor(self, sys_object_id: str) -> str:
-        """Identify vendor from system object ID."""
-        if 'cisco' in sys_object_id.lower():
-            return 'cisco'
-        elif 'juniper' in sys_object_id.lower():
-            return 'juniper'
-        elif 'arista' in sys_object_id.lower():
-            return 'arista'
-        elif 'hp' in sys_object_id.lower() or 'hpe' in sys_object_id.lower():
-            return 'hp'
-        else:
-            return 'generic'
-    
     def _extract_model(self, sys_descr: str) -> str:
         """Extract model information from system description."""
         try:
@@ -186,7 +176,7 @@ class SmartSNMPDiscovery:
                 try:
                     # Perform SNMP walk
                     for (error_indication, error_status, error_index, var_binds) in nextCmd(
-                        SnmpEngine(),
+                        share_mib_compiler(SnmpEngine()),
                         CommunityData(self.snmp_community),
                         UdpTransportTarget((ip_address, 161)),
                         ContextData(),
@@ -290,7 +280,7 @@ class SmartSNMPDiscovery:
         try:
             error_indication, error_status, error_index, var_binds = next(
                 getCmd(
-                    SnmpEngine(),
+                    share_mib_compiler(SnmpEngine()),
                     CommunityData(self.snmp_community),
                     UdpTransportTarget((ip_address, 161)),
                     ContextData(),
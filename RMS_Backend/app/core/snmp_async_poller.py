@@ -0,0 +1,329 @@
+"""
+Asyncio fleet SNMP poller
+
+Polls many devices concurrently from async code without blocking the event
+loop. Concurrency is bounded twice: a global in-flight limit across the
+whole fleet and a per-device limit so a single agent is never flooded.
+Results are streamed back through an async iterator as each device finishes.
+
+When pysnmp's asyncio hlapi can be imported it is used directly. pysnmp 4.4
+still decorates those coroutines with @asyncio.coroutine, which no longer
+exists on Python 3.11, so in that case requests go through the blocking
+hlapi on a bounded thread pool instead - same limits, same results.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Union
+
+from pysnmp.hlapi import (
+    SnmpEngine, CommunityData, UdpTransportTarget, ContextData,
+    ObjectType, ObjectIdentity, getCmd, bulkCmd,
+    EndOfMibView, NoSuchObject, NoSuchInstance, Null
+)
+
+from app.core.snmp_session import convert_snmp_value, share_mib_compiler
+
+try:
+    from pysnmp.hlapi.asyncio import (
+        SnmpEngine as AsyncSnmpEngine,
+        UdpTransportTarget as AsyncUdpTransportTarget,
+        getCmd as async_getCmd,
+        bulkCmd as async_bulkCmd
+    )
+    ASYNC_HLAPI_AVAILABLE = True
+except Exception:
+    ASYNC_HLAPI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_EMPTY_VALUES = (EndOfMibView, NoSuchObject, NoSuchInstance, Null)
+
+
+def _raise_for_error(error_indication, error_status=None) -> None:
+    """
+    Raise for a failed GET or walk round, so a truncated walk never passes for
+    a complete one; timeouts as TimeoutError so they report as 'timeout'.
+    """
+    if error_indication:
+        if 'timeout' in str(error_indication).lower():
+            raise TimeoutError(str(error_indication))
+        raise RuntimeError(str(error_indication))
+    if error_status:
+        raise RuntimeError(error_status.prettyPrint())
+
+
+class AsyncSNMPPoller:
+    """Bounded-concurrency SNMP poller for async callers."""
+
+    def __init__(self, community: str = None, max_in_flight: int = 256,
+                 per_device_limit: int = 2, timeout: int = 2, retries: int = 1,
+                 max_repetitions: int = 10, executor_workers: int = 32):
+        """
+        Initialize the fleet poller.
+
+        Args:
+            community: Default SNMP v2c community
+            max_in_flight: Maximum concurrent requests across all devices
+            per_device_limit: Maximum concurrent requests to one device
+            timeout: Per-request timeout (seconds)
+            retries: Per-request retries
+            max_repetitions: GETBULK max-repetitions for walks
+            executor_workers: Thread pool size for blocking work
+        """
+        self.community = community
+        self.max_in_flight = max_in_flight
+        self.per_device_limit = per_device_limit
+        self.timeout = timeout
+        self.retries = retries
+        self.max_repetitions = max_repetitions
+        self.use_native = ASYNC_HLAPI_AVAILABLE
+
+        self._executor = ThreadPoolExecutor(max_workers=executor_workers,
+                                            thread_name_prefix="snmp-poller")
+        self._thread_state = threading.local()
+        self._native_engine = None
+        self._global_limit = None
+        self._device_limits: Dict[str, asyncio.Semaphore] = {}
+        self._device_users: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Concurrency limits
+    # ------------------------------------------------------------------
+
+    def _get_global_limit(self) -> asyncio.Semaphore:
+        if self._global_limit is None:
+            self._global_limit = asyncio.Semaphore(self.max_in_flight)
+        return self._global_limit
+
+    def _acquire_device_slot(self, ip: str) -> asyncio.Semaphore:
+        if ip not in self._device_limits:
+            self._device_limits[ip] = asyncio.Semaphore(self.per_device_limit)
+            self._device_users[ip] = 0
+        self._device_users[ip] += 1
+        return self._device_limits[ip]
+
+    def _release_device_slot(self, ip: str):
+        self._device_users[ip] -= 1
+        if self._device_users[ip] <= 0:
+            # Drop idle per-device semaphores so the dict does not grow forever
+            self._device_limits.pop(ip, None)
+            self._device_users.pop(ip, None)
+
+    async def _limited(self, ip: str, coro_factory: Callable[[], Any]):
+        """Run coro_factory() under the global and per-device limits."""
+        device_limit = self._acquire_device_slot(ip)
+        try:
+            async with device_limit:
+                async with self._get_global_limit():
+                    return await coro_factory()
+        finally:
+            self._release_device_slot(ip)
+
+    async def run_blocking(self, ip: str, func: Callable, *args, **kwargs):
+        """Run a blocking SNMP call (e.g. an SNMPPoller method) off the event loop.
+
+        The call counts against the same global and per-device limits as the
+        native requests.
+        """
+        loop = asyncio.get_running_loop()
+        return await self._limited(
+            ip, lambda: loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+        )
+
+    # ------------------------------------------------------------------
+    # Single-device operations
+    # ------------------------------------------------------------------
+
+    def _auth(self, community: Optional[str]) -> CommunityData:
+        return CommunityData(community or self.community, mpModel=1)
+
+    def _thread_engine(self) -> SnmpEngine:
+        """One SnmpEngine per worker thread (engines are not thread safe)."""
+        engine = getattr(self._thread_state, 'engine', None)
+        if engine is None:
+            engine = share_mib_compiler(SnmpEngine())
+            self._thread_state.engine = engine
+        return engine
+
+    def _get_native_engine(self):
+        if self._native_engine is None:
+            self._native_engine = AsyncSnmpEngine()
+        return self._native_engine
+
+    async def get(self, ip: str, oids: List[str], community: str = None) -> Dict[str, Any]:
+        """GET several OIDs from one device in a single PDU."""
+        return await self._limited(ip, lambda: self._get(ip, oids, community))
+
+    async def _get(self, ip: str, oids: List[str], community: str = None) -> Dict[str, Any]:
+        var_types = [ObjectType(ObjectIdentity(oid)) for oid in oids]
+
+        if self.use_native:
+            error_indication, error_status, error_index, var_binds = await async_getCmd(
+                self._get_native_engine(), self._auth(community),
+                AsyncUdpTransportTarget((ip, 161), timeout=self.timeout, retries=self.retries),
+                ContextData(), *var_types
+            )
+        else:
+            def blocking_get():
+                return next(getCmd(
+                    self._thread_engine(), self._auth(community),
+                    UdpTransportTarget((ip, 161), timeout=self.timeout, retries=self.retries),
+                    ContextData(), *var_types
+                ))
+            loop = asyncio.get_running_loop()
+            error_indication, error_status, error_index, var_binds = await loop.run_in_executor(
+                self._executor, blocking_get
+            )
+
+        _raise_for_error(error_indication, error_status)
+
+        results = {}
+        for name, val in var_binds:
+            if isinstance(val, _EMPTY_VALUES):
+                continue
+            results[str(name)] = convert_snmp_value(val)
+        return results
+
+    async def walk(self, ip: str, columns: Dict[str, str],
+                   community: str = None) -> Dict[str, Dict[str, Any]]:
+        """Walk table columns together with GETBULK (see SNMPSession.walk_columns)."""
+        return await self._limited(ip, lambda: self._walk(ip, columns, community))
+
+    async def _walk(self, ip: str, columns: Dict[str, str],
+                    community: str = None) -> Dict[str, Dict[str, Any]]:
+        names = list(columns.keys())
+        results = {name: {} for name in names}
+        if not names:
+            return results
+
+        if not self.use_native:
+            def blocking_walk():
+                table = {name: {} for name in names}
+                prefixes = [columns[name] + '.' for name in names]
+                for error_indication, error_status, error_index, var_binds in bulkCmd(
+                    self._thread_engine(), self._auth(community),
+                    UdpTransportTarget((ip, 161), timeout=self.timeout, retries=self.retries),
+                    ContextData(), 0, self.max_repetitions,
+                    *[ObjectType(ObjectIdentity(columns[name])) for name in names],
+                    lexicographicMode=False
+                ):
+                    _raise_for_error(error_indication, error_status)
+                    for column, (name, val) in enumerate(var_binds):
+                        oid_str = str(name)
+                        if isinstance(val, _EMPTY_VALUES) or not oid_str.startswith(prefixes[column]):
+                            continue
+                        table[names[column]][oid_str[len(prefixes[column]):]] = convert_snmp_value(val)
+                return table
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, blocking_walk)
+
+        # Native asyncio walk: one GETBULK per round, only for unfinished columns
+        cursors = {name: columns[name] for name in names}
+        while cursors:
+            active = list(cursors.keys())
+            error_indication, error_status, error_index, var_bind_table = await async_bulkCmd(
+                self._get_native_engine(), self._auth(community),
+                AsyncUdpTransportTarget((ip, 161), timeout=self.timeout, retries=self.retries),
+                ContextData(), 0, self.max_repetitions,
+                *[ObjectType(ObjectIdentity(cursors[name])) for name in active]
+            )
+            _raise_for_error(error_indication, error_status)
+            if not var_bind_table:
+                break
+
+            finished = set()
+            for row in var_bind_table:
+                for column, (name, val) in enumerate(row):
+                    column_name = active[column]
+                    if column_name in finished:
+                        continue
+                    oid_str = str(name)
+                    prefix = columns[column_name] + '.'
+                    if isinstance(val, _EMPTY_VALUES) or not oid_str.startswith(prefix):
+                        finished.add(column_name)
+                        continue
+                    results[column_name][oid_str[len(prefix):]] = convert_snmp_value(val)
+                    cursors[column_name] = oid_str
+            for column_name in finished:
+                cursors.pop(column_name, None)
+
+        return results
+
+    # ------------------------------------------------------------------
+    # Fleet polling
+    # ------------------------------------------------------------------
+
+    async def _poll_one(self, target: Dict[str, Any],
+                        operation: Callable[['AsyncSNMPPoller', Dict[str, Any]], Any]) -> Dict[str, Any]:
+        ip = target['ip']
+        start_time = time.monotonic()
+        try:
+            data = await operation(self, target)
+            status = 'success'
+            error = None
+        except (TimeoutError, asyncio.TimeoutError) as e:
+            data, status, error = None, 'timeout', str(e) or 'timeout'
+        except Exception as e:
+            data, status, error = None, 'error', str(e)
+
+        return {
+            'ip': ip,
+            'target': target,
+            'status': status,
+            'data': data,
+            'error': error,
+            'elapsed': round(time.monotonic() - start_time, 3)
+        }
+
+    async def poll_fleet(self, targets: Iterable[Union[str, Dict[str, Any]]],
+                         operation: Callable[['AsyncSNMPPoller', Dict[str, Any]], Any]
+                         ) -> AsyncIterator[Dict[str, Any]]:
+        """Poll many devices concurrently and yield results as they complete.
+
+        Args:
+            targets: IP strings or dicts with at least an 'ip' key (plus e.g.
+                'community') handed through to the operation
+            operation: async callable (poller, target) -> data. It should use
+                poller.get / poller.walk / poller.run_blocking so the
+                concurrency limits apply.
+
+        Yields:
+            One result dict per target: ip, status (success/timeout/error),
+            data, error and elapsed seconds.
+        """
+        tasks = []
+        for target in targets:
+            if isinstance(target, str):
+                target = {'ip': target}
+            tasks.append(asyncio.ensure_future(self._poll_one(target, operation)))
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Consumer stopped early - don't leave polls running in the background
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def get_fleet(self, targets: Iterable[Union[str, Dict[str, Any]]],
+                        oids: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Convenience wrapper: GET the same OIDs from every target."""
+        async def operation(poller, target):
+            return await poller.get(target['ip'], oids, target.get('community'))
+
+        async for result in self.poll_fleet(targets, operation):
+            yield result
+
+    def shutdown(self):
+        """Release the worker threads."""
+        self._executor.shutdown(wait=False)
+
+
+# Global fleet poller instance
+async_snmp_poller = AsyncSNMPPoller()
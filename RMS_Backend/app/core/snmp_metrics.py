@@ -0,0 +1,314 @@
+"""
+SNMP latency and error metrics
+
+Per-device, per-operation histograms and counters for SNMP requests and
+health polls, kept in memory with bounded device cardinality and exported
+in the Prometheus text format by the metrics endpoint.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Operation latency buckets (seconds) - SNMP timeouts are 2-3s per try
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# PDUs sent per operation (GET = 1, walks and discovery many more)
+PDU_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+OUTCOMES = ('ok', 'timeout', 'error')
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative on export, like Prometheus)."""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'min', 'max')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.min = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs including +Inf."""
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            buckets.append(('+Inf' if bound == float('inf') else _format_number(bound), total))
+        return buckets
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket, within [min, max]."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = self.min
+        for i, count in enumerate(self.counts):
+            upper = min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+            if count and seen + count >= rank:
+                return max(lower + (upper - lower) * (rank - seen) / count, self.min)
+            seen += count
+            lower = max(upper, self.min)
+        return self.max
+
+
+class _DeviceOperation:
+    """Histograms and counters for one (device, operation) pair."""
+
+    __slots__ = ('duration', 'pdus', 'outcomes', 'retries')
+
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.pdus = Histogram(PDU_BUCKETS)
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)
+        self.retries = 0
+
+
+class _Measurement:
+    """Context manager returned by SNMPMetrics.measure."""
+
+    __slots__ = ('metrics', 'device', 'operation', 'outcome', '_start', '_sent', '_received')
+
+    def __init__(self, metrics: 'SNMPMetrics', device: str, operation: str):
+        self.metrics = metrics
+        self.device = device
+        self.operation = operation
+        self.outcome = 'ok'
+
+    def fail(self, error: Any) -> None:
+        """Mark the operation failed; SNMP request timeouts are counted separately."""
+        text = str(error).lower()
+        self.outcome = 'timeout' if 'timeout' in text or 'no snmp response' in text else 'error'
+
+    def __enter__(self) -> '_Measurement':
+        self._sent, self._received = self.metrics._pdu_counters()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self._start
+        if exc_type is not None and self.outcome == 'ok':
+            self.outcome = 'error'
+        sent, received = self.metrics._pdu_counters()
+        sent -= self._sent
+        received -= self._received
+        # Every PDU beyond one per answered request is a retransmission; a
+        # timed-out request also used one initial send
+        retries = max(sent - received - (1 if self.outcome == 'timeout' else 0), 0)
+        self.metrics.observe(self.device, self.operation, elapsed, pdus=sent,
+                             outcome=self.outcome, retries=retries)
+        return False
+
+
+class SNMPMetrics:
+    """
+    Per-device, per-operation SNMP instrumentation.
+    Records latency and PDU-count histograms plus outcome and retry counters
+    for get / walk / bulk requests and the health fast-path and full-discovery
+    fallback, and renders them in the Prometheus text exposition format.
+    """
+
+    def __init__(self, max_devices: int = 1024):
+        """
+        Initialize the metrics store.
+
+        Args:
+            max_devices: Devices kept (least recently observed dropped first)
+                so label cardinality stays bounded
+        """
+        self.max_devices = max_devices
+        # {device: {operation: _DeviceOperation}}
+        self._devices: "OrderedDict[str, Dict[str, _DeviceOperation]]" = OrderedDict()
+        self._last_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._evictions = 0
+
+    # ------------------------------------------------------------------
+    # PDU counting
+    # ------------------------------------------------------------------
+
+    def instrument_engine(self, engine):
+        """Count PDUs sent and responses received by engine (once per engine).
+
+        Synchronous pysnmp engines dispatch in the calling thread, so the
+        counters are per-thread and measure() only sees its own traffic.
+        """
+        if engine is None or getattr(engine, '_rms_snmp_metrics', False):
+            return engine
+        try:
+            engine.observer.registerObserver(
+                self._on_pdu, 'rfc3412.sendPdu', 'rfc3412.receiveMessage:response'
+            )
+            engine._rms_snmp_metrics = True
+        except Exception as e:
+            logger.debug(f"Could not attach SNMP metrics to engine: {e}")
+        return engine
+
+    def _on_pdu(self, snmp_engine, execpoint, variables, cb_ctx):
+        if execpoint == 'rfc3412.sendPdu':
+            self._local.sent = getattr(self._local, 'sent', 0) + 1
+        else:
+            self._local.received = getattr(self._local, 'received', 0) + 1
+
+    def _pdu_counters(self) -> Tuple[int, int]:
+        return getattr(self._local, 'sent', 0), getattr(self._local, 'received', 0)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def measure(self, device: str, operation: str) -> _Measurement:
+        """
+        Time one operation against a device.
+
+        Usage:
+            with snmp_metrics.measure(ip, 'get') as op:
+                ...
+                if error_indication:
+                    op.fail(error_indication)
+        """
+        return _Measurement(self, device, operation)
+
+    def observe(self, device: str, operation: str, seconds: float, pdus: int = 0,
+                outcome: str = 'ok', retries: int = 0) -> None:
+        """Record one finished operation."""
+        with self._lock:
+            operations = self._devices.get(device)
+            if operations is None:
+                operations = self._devices[device] = {}
+                while len(self._devices) > self.max_devices:
+                    evicted, _ = self._devices.popitem(last=False)
+                    self._last_seen.pop(evicted, None)
+                    self._evictions += 1
+            else:
+                self._devices.move_to_end(device)
+            stats = operations.get(operation)
+            if stats is None:
+                stats = operations[operation] = _DeviceOperation()
+            stats.duration.observe(seconds)
+            stats.pdus.observe(pdus)
+            stats.outcomes[outcome if outcome in stats.outcomes else 'error'] += 1
+            stats.retries += retries
+            self._last_seen[device] = time.time()
+
+    def reset(self, device: str = None) -> None:
+        """Drop the metrics of one device, or of all devices."""
+        with self._lock:
+            if device is None:
+                self._devices.clear()
+                self._last_seen.clear()
+            else:
+                self._devices.pop(device, None)
+                self._last_seen.pop(device, None)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def device_summary(self, device: str = None) -> Dict[str, Any]:
+        """
+        Per-device summary for the admin API.
+
+        Args:
+            device: Only this device (all devices when None)
+
+        Returns:
+            {device: {'last_seen': ts, 'operations': {operation: {...}}}} with
+            counts, outcome counters, retries, PDUs and latency percentiles in ms
+        """
+        with self._lock:
+            devices = [device] if device is not None else list(self._devices)
+            summary = {}
+            for name in devices:
+                operations = self._devices.get(name)
+                if operations is None:
+                    continue
+                summary[name] = {
+                    'last_seen': self._last_seen.get(name),
+                    'operations': {
+                        operation: {
+                            'count': stats.duration.count,
+                            **stats.outcomes,
+                            'retries': stats.retries,
+                            'pdus': int(stats.pdus.sum),
+                            'avg_ms': round(stats.duration.sum / stats.duration.count * 1000, 1)
+                            if stats.duration.count else 0.0,
+                            'p50_ms': round(stats.duration.quantile(0.5) * 1000, 1),
+                            'p95_ms': round(stats.duration.quantile(0.95) * 1000, 1),
+                            'max_ms': round(stats.duration.max * 1000, 1),
+                        }
+                        for operation, stats in sorted(operations.items())
+                    }
+                }
+            return summary
+
+    def get_info(self) -> Dict[str, Any]:
+        """Store size counters."""
+        with self._lock:
+            return {
+                'devices': len(self._devices),
+                'max_devices': self.max_devices,
+                'series': sum(len(operations) for operations in self._devices.values()),
+                'evictions': self._evictions,
+            }
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        duration = ['# HELP rms_snmp_operation_duration_seconds SNMP operation latency per device.',
+                    '# TYPE rms_snmp_operation_duration_seconds histogram']
+        pdus = ['# HELP rms_snmp_operation_pdus SNMP PDUs sent per operation.',
+                '# TYPE rms_snmp_operation_pdus histogram']
+        outcomes = ['# HELP rms_snmp_operations_total SNMP operations by outcome.',
+                    '# TYPE rms_snmp_operations_total counter']
+        retries = ['# HELP rms_snmp_retries_total SNMP request retransmissions.',
+                   '# TYPE rms_snmp_retries_total counter']
+
+        with self._lock:
+            for device, operations in self._devices.items():
+                for operation, stats in sorted(operations.items()):
+                    labels = f'device="{_escape(device)}",operation="{_escape(operation)}"'
+                    _render_histogram(duration, 'rms_snmp_operation_duration_seconds', labels, stats.duration)
+                    _render_histogram(pdus, 'rms_snmp_operation_pdus', labels, stats.pdus)
+                    for outcome, count in stats.outcomes.items():
+                        outcomes.append(f'rms_snmp_operations_total{{{labels},outcome="{outcome}"}} {count}')
+                    retries.append(f'rms_snmp_retries_total{{{labels}}} {stats.retries}')
+
+        return '\n'.join(duration + pdus + outcomes + retries) + '\n'
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _render_histogram(lines: List[str], name: str, labels: str, histogram: Histogram) -> None:
+    for le, count in histogram.cumulative():
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+    lines.append(f'{name}_sum{{{labels}}} {_format_number(histogram.sum)}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+
+# Global SNMP metrics instance
+snmp_metrics = SNMPMetrics()
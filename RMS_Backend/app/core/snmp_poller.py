@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pysnmp.hlapi import *
 
 from pysnmp.proto.rfc1902 import *
@@ -12,13 +12,40 @@ from app.models.base import Device as BaseDevice
 from app.services.adaptive_learning import AdaptiveLearningEngine
 from app.services.ssh_engine.ssh_connector import run_show_command
 from app.core.enhanced_power_monitor import EnhancedPowerMonitor
+from app.core.cli_parser_registry import cli_parser_registry
+from app.core.snmp_session import SNMPSession, share_mib_compiler
+from app.core.poll_plan import PollPlan, HEALTH_CATEGORIES
+from app.services.health_cache import health_cache
+from app.services.device_profile_store import device_profile_store
+from app.services.health_timeseries import health_timeseries
+from app.core.snmp_metrics import snmp_metrics
+from app.utils.device_classifier import device_classifier
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 logger = logging.getLogger(__name__)
 
+# Scalars fetched in one GET to decide whether a device's topology changed:
+# sysUpTime (reboot), ifTableLastChange and lldpStatsRemTablesLastChangeTime
+SYS_UPTIME_OID = '1.3.6.1.2.1.1.3.0'
+TOPOLOGY_CHANGE_OIDS = [
+    SYS_UPTIME_OID,
+    '1.3.6.1.2.1.31.1.5.0',
+    '1.0.8802.1.1.2.1.2.1.0',
+]
+
 class SNMPPoller:
-    health_cache = {}
-    cache_timeout = 30  # seconds
+    # Process-wide bounded LRU+TTL cache shared by all pollers
+    health_cache = health_cache
+    cache_timeout = health_cache.ttl  # seconds
+    # Compiled health poll plans per host (see app.core.poll_plan)
+    poll_plans = {}
+    # Last topology poll per host: {'markers', 'node', 'neighbors', 'polled_at'}
+    topology_state = {}
+    topology_state_lock = threading.Lock()
+    topology_workers = 16
+    topology_max_age = 900  # seconds - CDP changes move no counter, re-poll at least this often
 
     def __init__(self, community: str = None, version: str = "2c", 
                  username: str = None, auth_protocol: str = None, 
@@ -35,10 +62,14 @@ class SNMPPoller:
         self.auth_data = None
         self.target = None
         self.context_data = None
+        # Shared-engine GETBULK collector (one engine, counted PDUs)
+        self.session = SNMPSession(self)
+        # Idle per-worker pollers reused by discover_topology
+        self._topology_pollers = []
         
     def _get_snmp_engine(self):
         try:
-            return SnmpEngine()
+            return snmp_metrics.instrument_engine(share_mib_compiler(SnmpEngine()))
         except Exception as e:
             logger.warning(f"Error creating SNMP engine: {str(e)}")
             return None
@@ -73,15 +104,18 @@ class SNMPPoller:
         try:
             logger.info(f"Testing SNMP connection to {host} with community {self.community}")
             # Try to get system description
-            error_indication, error_status, error_index, var_binds = next(
-                getCmd(
-                    self._get_snmp_engine(),
-                    self._get_auth_data(),
-                    self._get_target(host),
-                    self._get_context_data(),
-                    ObjectType(ObjectIdentity('1.3.6.1.2.1.1.1.0'))  # sysDescr
+            with snmp_metrics.measure(host, 'get') as op:
+                error_indication, error_status, error_index, var_binds = next(
+                    getCmd(
+                        self._get_snmp_engine(),
+                        self._get_auth_data(),
+                        self._get_target(host),
+                        self._get_context_data(),
+                        ObjectType(ObjectIdentity('1.3.6.1.2.1.1.1.0'))  # sysDescr
+                    )
                 )
-            )
+                if error_indication or error_status:
+                    op.fail(error_indication or error_status)
 
             if error_indication:
                 logger.warning(f"SNMP connection test failed for {host}: {error_indication}")
@@ -115,15 +149,18 @@ class SNMPPoller:
                     # Create ObjectIdentity with the raw OID
                     obj_identity = ObjectIdentity(oid)
                     
-                    error_indication, error_status, error_index, var_binds = next(
-                        getCmd(
-                            self._get_snmp_engine(),
-                            self._get_auth_data(),
-                            self._get_target(host),
-                            self._get_context_data(),
-                            ObjectType(obj_identity)
+                    with snmp_metrics.measure(host, 'get') as op:
+                        error_indication, error_status, error_index, var_binds = next(
+                            getCmd(
+                                self._get_snmp_engine(),
+                                self._get_auth_data(),
+                                self._get_target(host),
+                                self._get_context_data(),
+                                ObjectType(obj_identity)
+                            )
                         )
-                    )
+                        if error_indication or error_status:
+                            op.fail(error_indication or error_status)
 
                     if error_indication:
                         logger.warning(f"SNMP error for {name} on {host}: {error_indication}")
@@ -140,6 +177,10 @@ class SNMPPoller:
                     logger.warning(f"Error getting {name} for {host}: {str(e)}")
                     continue
 
+            # Any identity poll doubles as a reboot/hardware-swap check for the profile store
+            if results:
+                device_profile_store.observe(host, results.get('sysObjectID'), results.get('sysUpTime'))
+
             return results
         except Exception as e:
             logger.error(f"Error getting basic device info for {host}: {str(e)}")
@@ -862,46 +903,33 @@ class SNMPPoller:
             return {}
 
     def get_interfaces(self, ip: str) -> List[Dict]:
-        """Get interfaces for a device."""
+        """Get interfaces for a device.
+
+        All ifTable/ifXTable columns are fetched in one multi-column GETBULK
+        walk over the shared engine; the per-column _get_interface_* walkers
+        are kept for comparison benchmarks only.
+        """
         try:
-            # Get interface names
-            if_names = self._get_interface_names(ip)
-            if not if_names:
+            # Get ifTable/ifXTable rows in one bulk walk
+            if_rows = self.session.collect_interface_table(ip)
+            if not if_rows:
                 logger.warning(f"No interface names found for {ip}")
                 return []
 
-            # Get interface descriptions
-            if_descriptions = self._get_interface_descriptions(ip)
-            if not if_descriptions:
-                logger.warning(f"No interface descriptions found for {ip}")
-
-            # Get interface status
-            if_status = self._get_interface_status(ip)
-            if not if_status:
-                logger.warning(f"No interface status found for {ip}")
-
-            # Get interface administrative status
-            if_admin_status = self._get_interface_admin_status(ip)
-            if not if_admin_status:
-                logger.warning(f"No interface administrative status found for {ip}")
-
-            # Get interface operational status
-            if_oper_status = self._get_interface_oper_status(ip)
-            if not if_oper_status:
-                logger.warning(f"No interface operational status found for {ip}")
-
-            # Get interface speeds
-            if_speeds = self._get_interface_speeds(ip)
-            if not if_speeds:
-                logger.warning(f"No interface speeds found for {ip}")
-
-            # Get interface MAC addresses
-            if_macs = self._get_interface_macs(ip)
-            if not if_macs:
-                logger.warning(f"No interface MAC addresses found for {ip}")
+            if_names = {if_index: row['ifDescr'] for if_index, row in if_rows.items()}
+            if_descriptions = if_names
+            if_status = {if_index: row['ifOperStatus'] for if_index, row in if_rows.items()
+                         if row['ifOperStatus'] is not None}
+            if_admin_status = {if_index: row['ifAdminStatus'] for if_index, row in if_rows.items()
+                               if row['ifAdminStatus'] is not None}
+            if_oper_status = if_status
+            if_speeds = {if_index: row['ifSpeed'] for if_index, row in if_rows.items()
+                         if row['ifSpeed'] is not None}
+            if_macs = {if_index: row['ifPhysAddress'] for if_index, row in if_rows.items()
+                       if row['ifPhysAddress'] is not None}
 
             # Get proper IP-to-interface mapping using SNMP
-            if_ips = self._get_interface_ips(ip)
+            if_ips = self.session.collect_interface_ips(ip)
             logger.info(f"SNMP IP-to-interface mapping for {ip}: {if_ips}")
 
             # Combine all interface information
@@ -1057,173 +1085,23 @@ class SNMPPoller:
             return []
 
     def get_cdp_neighbors(self, ip: str) -> List[Dict]:
-        """Get CDP neighbors for a device."""
+        """Get CDP and LLDP neighbors for a device.
+
+        Both neighbor tables are collected in one GETBULK walk. Both are
+        always walked: an empty table cannot be told apart from an
+        unimplemented one, and a protocol that has no neighbors today may
+        have some on the next run. A table the device lacks only costs its
+        columns leaving the subtree in the first response. The protocols
+        that returned rows are recorded in the device profile.
+        """
         try:
-            # First discover available MIBs
-            available_mibs = self.discover_available_mibs(ip)
-            logger.info(f"Available MIBs on {ip}: {available_mibs}")
+            collected = self.session.collect_neighbors(ip)
+            neighbors = collected['neighbors']
 
-            # Try different neighbor discovery methods based on available MIBs
-            neighbors = []
-            
-            # Try CDP if available
-            if "1.3.6.1.4.1.9.9.23" in available_mibs:
-                try:
-                    # CDP OIDs for Cisco devices
-                    cdp_cache_device_id = "1.3.6.1.4.1.9.9.23.1.2.1.1.6"  # cdpCacheDeviceId
-                    cdp_cache_device_port = "1.3.6.1.4.1.9.9.23.1.2.1.1.7"  # cdpCacheDevicePort
-                    cdp_cache_if_index = "1.3.6.1.4.1.9.9.23.1.2.1.1.1"  # cdpCacheIfIndex
-                    cdp_cache_platform = "1.3.6.1.4.1.9.9.23.1.2.1.1.8"  # cdpCachePlatform
-                    cdp_cache_capabilities = "1.3.6.1.4.1.9.9.23.1.2.1.1.4"  # cdpCacheCapabilities
-                    cdp_cache_version = "1.3.6.1.4.1.9.9.23.1.2.1.1.5"  # cdpCacheVersion
-                    cdp_cache_address = "1.3.6.1.4.1.9.9.23.1.2.1.1.3"  # cdpCacheAddress
-
-                    logger.info(f"Starting CDP neighbor discovery on {ip}")
-
-                    # Get device IDs and ports
-                    device_ids = {}
-                    device_ports = {}
-                    if_indices = {}
-                    platforms = {}
-                    capabilities = {}
-                    versions = {}
-                    addresses = {}
-
-                    # Query device IDs
-                    logger.info(f"Querying CDP device IDs on {ip}")
-                    for (error_indication, error_status, error_index, var_binds) in nextCmd(
-                        self._get_snmp_engine(),
-                        self._get_auth_data(),
-                        self._get_target(ip),
-                        self._get_context_data(),
-                        ObjectType(ObjectIdentity(cdp_cache_device_id)),
-                        lexicographicMode=False
-                    ):
-                        if error_indication:
-                            logger.warning(f"SNMP error getting CDP device IDs on {ip}: {error_indication}")
-                            break
-                        if error_status:
-                            logger.warning(f"SNMP error getting CDP device IDs on {ip}: {error_status}")
-                            break
-
-                        for var_bind in var_binds:
-                            name, val = var_bind
-                            if isinstance(val, OctetString):
-                                val = val.prettyPrint()
-                            oid_parts = str(name).split('.')
-                            if len(oid_parts) >= 4:
-                                index = oid_parts[-2]
-                                device_ids[index] = val
-                                logger.info(f"Found CDP device ID on {ip}: {name} = {val}")
-
-                    # Query device ports
-                    logger.info(f"Querying CDP device ports on {ip}")
-                    for (error_indication, error_status, error_index, var_binds) in nextCmd(
-                        self._get_snmp_engine(),
-                        self._get_auth_data(),
-                        self._get_target(ip),
-                        self._get_context_data(),
-                        ObjectType(ObjectIdentity(cdp_cache_device_port)),
-                        lexicographicMode=False
-                    ):
-                        if error_indication:
-                            logger.warning(f"SNMP error getting CDP device ports on {ip}: {error_indication}")
-                            break
-                        if error_status:
-                            logger.warning(f"SNMP error getting CDP device ports on {ip}: {error_status}")
-                            break
-
-                        for var_bind in var_binds:
-                            name, val = var_bind
-                            if isinstance(val, OctetString):
-                                val = val.prettyPrint()
-                            oid_parts = str(name).split('.')
-                            if len(oid_parts) >= 4:
-                                index = oid_parts[-2]
-                                device_ports[index] = val
-                                logger.info(f"Found CDP device port on {ip}: {name} = {val}")
-
-                    # Query interface indices
-                    logger.info(f"Querying CDP interface indices on {ip}")
-                    for (error_indication, error_status, error_index, var_binds) in nextCmd(
-                        self._get_snmp_engine(),
-                        self._get_auth_data(),
-                        self._get_target(ip),
-                        self._get_context_data(),
-                        ObjectType(ObjectIdentity(cdp_cache_if_index)),
-                        lexicographicMode=False
-                    ):
-                        if error_indication:
-                            logger.warning(f"SNMP error getting CDP interface indices on {ip}: {error_indication}")
-                            break
-                        if error_status:
-                            logger.warning(f"SNMP error getting CDP interface indices on {ip}: {error_status}")
-                            break
-
-                        for var_bind in var_binds:
-                            name, val = var_bind
-                            if isinstance(val, Integer32):
-                                val = int(val)
-                            oid_parts = str(name).split('.')
-                            if len(oid_parts) >= 4:
-                                index = oid_parts[-2]
-                                if_indices[index] = val
-                                logger.info(f"Found CDP interface index on {ip}: {name} = {val}")
-
-                    # If we didn't get interface indices, try to get them from the device IDs
-                    if not if_indices and device_ids:
-                        logger.info(f"No interface indices found, trying to extract from device IDs on {ip}")
-                        for index in device_ids.keys():
-                            # The interface index is often the same as the device ID index
-                            if_indices[index] = int(index)
-                            logger.info(f"Using device ID index as interface index on {ip}: {index}")
-
-                    # Build neighbor entries from the collected data
-                    for index in device_ids.keys():
-                        if index in device_ports and index in if_indices:
-                            # Clean up the device ID (remove domain if present)
-                            device_id = device_ids[index].split('.')[0] if '.' in device_ids[index] else device_ids[index]
-                            
-                            # Create a properly formatted neighbor entry
-                            neighbors.append({
-                                "device_id": device_id,
-                                "local_port": str(if_indices[index]),
-                                "remote_port": device_ports[index],
-                                "platform": platforms.get(index, "Unknown"),
-                                "capabilities": capabilities.get(index, "Unknown"),
-                                "version": versions.get(index, "Unknown"),
-                                "address": addresses.get(index, "Unknown")
-                            })
-                            logger.info(f"Found complete CDP neighbor on {ip}: {neighbors[-1]}")
-                        else:
-                            missing_keys = []
-                            if index not in device_ports:
-                                missing_keys.append("device_port")
-                            if index not in if_indices:
-                                missing_keys.append("interface_index")
-                            logger.warning(f"Incomplete CDP neighbor entry on {ip}, missing keys: {missing_keys}")
-                            logger.debug(f"Raw data for index {index}: device_id={device_ids.get(index)}, device_port={device_ports.get(index)}, if_index={if_indices.get(index)}")
-
-                    if not neighbors:
-                        logger.warning(f"No complete CDP neighbors found on {ip}, CDP might be disabled")
-
-                except Exception as e:
-                    logger.warning(f"Error getting CDP neighbors on {ip}: {str(e)}")
-
-            # Try LLDP if available
-            if "1.0.8802.1.1.2" in available_mibs:
-                try:
-                    lldp_rem_sys_name = "1.0.8802.1.1.2.1.4.1.1.9"  # lldpRemSysName
-                    lldp_rem_port_desc = "1.0.8802.1.1.2.1.4.2.1.4"  # lldpRemPortDesc
-                    lldp_rem_port_id = "1.0.8802.1.1.2.1.4.2.1.3"  # lldpRemPortId
-                    lldp_neighbors = self._get_neighbors_lldp(ip, lldp_rem_sys_name, lldp_rem_port_desc, lldp_rem_port_id)
-                    if lldp_neighbors:
-                        logger.info(f"Found {len(lldp_neighbors)} LLDP neighbors on {ip}")
-                        neighbors.extend(lldp_neighbors)
-                    else:
-                        logger.warning(f"No LLDP neighbors found on {ip}, LLDP might be disabled")
-                except Exception as e:
-                    logger.warning(f"Error getting LLDP neighbors on {ip}: {str(e)}")
+            if collected['protocols']:
+                device_profile_store.update(ip, neighbor_protocols=collected['protocols'])
+            if not neighbors:
+                logger.warning(f"No CDP/LLDP neighbors found on {ip}, CDP and LLDP might be disabled")
 
             return neighbors
 
@@ -1231,259 +1109,20 @@ class SNMPPoller:
             logger.error(f"Error getting neighbors for {ip}: {str(e)}")
             return []
 
-    def _get_neighbors_cdp(self, ip: str, device_id_oid: str, port_oid: str, if_index_oid: str, 
-                          platform_oid: str, capabilities_oid: str, version_oid: str, address_oid: str) -> List[Dict]:
-        """Get neighbors using CDP MIB."""
-        try:
-            auth_data = self._get_auth_data()
-            if not auth_data:
-                logger.error(f"Failed to create auth data for {ip}")
-                return []
-
-            target = self._get_target(ip)
-            if not target:
-                logger.error(f"Failed to create target for {ip}")
-                return []
-
-            context_data = self._get_context_data()
-            if not context_data:
-                logger.error(f"Failed to create context data for {ip}")
-                return []
-
-            # First try to get the CDP cache table
-            cdp_cache_table = "1.3.6.1.4.1.9.9.23.1.2.1"
-            logger.debug(f"Walking CDP cache table {cdp_cache_table} on {ip}")
-            
-            neighbors = []
-            try:
-                for (error_indication, error_status, error_index, var_binds) in nextCmd(
-                    self._get_snmp_engine(),
-                    auth_data,
-                    target,
-                    context_data,
-                    ObjectType(ObjectIdentity(cdp_cache_table)),
-                    lexicographicMode=False
-                ):
-                    if error_indication:
-                        logger.warning(f"SNMP error walking CDP table on {ip}: {error_indication}")
-                        break
-                    if error_status:
-                        logger.warning(f"SNMP error walking CDP table on {ip}: {error_status}")
-                        break
-
-                    for var_bind in var_binds:
-                        try:
-                            name, val = var_bind
-                            if isinstance(val, OctetString):
-                                val = val.prettyPrint()
-                            elif isinstance(val, Integer32):
-                                val = int(val)
-
-                            oid_parts = str(name).split('.')
-                            if len(oid_parts) >= 4:
-                                index = oid_parts[-2]
-                                neighbor = next((n for n in neighbors if n.get("index") == index), None)
-                                if not neighbor:
-                                    neighbor = {"index": index}
-                                    neighbors.append(neighbor)
-
-                                # Map OIDs to their meanings
-                                oid_suffix = '.'.join(oid_parts[-2:])
-                                if oid_suffix.endswith('.1'):  # cdpCacheIfIndex
-                                    neighbor["cdpCacheIfIndex"] = val
-                                    logger.debug(f"Found CDP interface index on {ip}: {val}")
-                                elif oid_suffix.endswith('.3'):  # cdpCacheAddress
-                                    neighbor["cdpCacheAddress"] = val
-                                    logger.debug(f"Found CDP address on {ip}: {val}")
-                                elif oid_suffix.endswith('.4'):  # cdpCacheCapabilities
-                                    neighbor["cdpCacheCapabilities"] = val
-                                    logger.debug(f"Found CDP capabilities on {ip}: {val}")
-                                elif oid_suffix.endswith('.5'):  # cdpCacheVersion
-                                    neighbor["cdpCacheVersion"] = val
-                                    logger.debug(f"Found CDP version on {ip}: {val}")
-                                elif oid_suffix.endswith('.6'):  # cdpCacheDeviceId
-                                    neighbor["cdpCacheDeviceId"] = val
-                                    logger.debug(f"Found CDP device ID on {ip}: {val}")
-                                elif oid_suffix.endswith('.7'):  # cdpCacheDevicePort
-                                    neighbor["cdpCacheDevicePort"] = val
-                                    logger.debug(f"Found CDP port on {ip}: {val}")
-                                elif oid_suffix.endswith('.8'):  # cdpCachePlatform
-                                    neighbor["cdpCachePlatform"] = val
-                                    logger.debug(f"Found CDP platform on {ip}: {val}")
-
-                        except Exception as e:
-                            logger.warning(f"Error processing CDP data for {name} on {ip}: {str(e)}")
-                            continue
-
-            except Exception as e:
-                logger.warning(f"Error walking CDP table on {ip}: {str(e)}")
-
-            # Filter out incomplete neighbor entries and format them
-            valid_neighbors = []
-            for n in neighbors:
-                if all(k in n for k in ["cdpCacheDeviceId", "cdpCacheDevicePort", "cdpCacheIfIndex"]):
-                    # Clean up the device ID (remove domain if present)
-                    device_id = n["cdpCacheDeviceId"].split('.')[0] if '.' in n["cdpCacheDeviceId"] else n["cdpCacheDeviceId"]
-                    
-                    # Create a properly formatted neighbor entry
-                    valid_neighbors.append({
-                        "device_id": device_id,
-                        "local_port": str(n["cdpCacheIfIndex"]),
-                        "remote_port": n["cdpCacheDevicePort"],
-                        "platform": n.get("cdpCachePlatform", "Unknown"),
-                        "capabilities": n.get("cdpCacheCapabilities", "Unknown"),
-                        "version": n.get("cdpCacheVersion", "Unknown"),
-                        "address": n.get("cdpCacheAddress", "Unknown")
-                    })
-                    logger.info(f"Formatted CDP neighbor on {ip}: {valid_neighbors[-1]}")
-            
-            return valid_neighbors
-
-        except Exception as e:
-            logger.error(f"Error getting CDP neighbors for {ip}: {str(e)}")
-            return []
-
-    def _get_neighbors_lldp(self, ip: str, sys_name_oid: str, port_desc_oid: str, port_id_oid: str) -> List[Dict]:
-        """Get neighbors using LLDP MIB."""
-        try:
-            auth_data = self._get_auth_data()
-            target = self._get_target(ip)
-            context_data = self._get_context_data()
-
-            neighbors = []
-            for oid in [sys_name_oid, port_desc_oid, port_id_oid]:
-                try:
-                    error_indication, error_status, error_index, var_binds = next(
-                        nextCmd(
-                            self._get_snmp_engine(),
-                            auth_data,
-                            target,
-                            context_data,
-                            ObjectType(ObjectIdentity(oid)),
-                            lexicographicMode=False
-                        )
-                    )
-
-                    if error_indication or error_status:
-                        continue
-
-                    for var_bind in var_binds:
-                        name, val = var_bind
-                        if isinstance(val, OctetString):
-                            val = val.prettyPrint()
-                        elif isinstance(val, Integer32):
-                            val = int(val)
-
-                        oid_parts = str(name).split('.')
-                        if len(oid_parts) >= 4:
-                            index = oid_parts[-2]
-                            neighbor = next((n for n in neighbors if n.get("index") == index), None)
-                            if not neighbor:
-                                neighbor = {"index": index}
-                                neighbors.append(neighbor)
-
-                            if oid == sys_name_oid:
-                                neighbor["cdpCacheDeviceId"] = val
-                            elif oid == port_desc_oid:
-                                neighbor["cdpCacheDevicePort"] = val
-                            elif oid == port_id_oid:
-                                neighbor["cdpCacheIfIndex"] = val
-
-                except Exception as e:
-                    logger.warning(f"Error getting LLDP neighbor info for {oid} on {ip}: {str(e)}")
-                    continue
-
-            return [n for n in neighbors if all(k in n for k in ["cdpCacheDeviceId", "cdpCacheDevicePort", "cdpCacheIfIndex"])]
-
-        except Exception as e:
-            logger.error(f"Error getting LLDP neighbors for {ip}: {str(e)}")
-            return []
-
     def get_device_health(self, host: str, db_session: Session = None, device_id: int = None) -> Dict:
-        """Get comprehensive device health information using smart discovery with fast-path optimization and fallback."""
+        """Get comprehensive device health information using smart discovery with fast-path optimization and fallback.
+
+        Results go through the shared health cache: fresh entries are returned
+        directly, stale ones are served while a background refresh runs, and
+        concurrent misses for the same host share a single poll.
+        """
         try:
             logger.info(f"Getting device health for {host}")
-            
-            # Clean up expired cache entries periodically
-            if len(SNMPPoller.health_cache) > 10:  # Only cleanup if cache has many entries
-                self.cleanup_expired_cache()
-            
-            # Check cache first
-            current_time = time.time()
-            if host in SNMPPoller.health_cache:
-                cache_entry = SNMPPoller.health_cache[host]
-                if current_time - cache_entry['timestamp'] < SNMPPoller.cache_timeout:
-                    logger.info(f"Using cached health data for {host} (age: {current_time - cache_entry['timestamp']:.1f}s)")
-                    return cache_entry['data']
-                else:
-                    # Cache expired, remove it
-                    del SNMPPoller.health_cache[host]
-            
-            # Initialize smart discovery
-            smart_discovery = SmartSNMPDiscovery("cisco", db_session)
-            self.smart_discovery = smart_discovery
-            
-            # Try fast-path first (using learned OIDs)
-            fast_health = self._get_health_fast_path(host, smart_discovery, device_id)
-            needs_fallback = False
-            # Check if any main category is missing or empty
-            if fast_health:
-                if (
-                    not fast_health.get('cpu_details') or not fast_health['cpu_details']
-                    or not fast_health.get('memory_details') or not fast_health['memory_details']
-                    or not fast_health.get('temperature_details') or not fast_health['temperature_details']
-                ):
-                    needs_fallback = True
-                # Check if we have enough memory values for proper calculation
-                elif fast_health.get('memory_details') and len(fast_health['memory_details']) < 3:
-                    # If we have less than 3 memory values, we might not have enough for proper calculation
-                    # Check if the calculated memory values are all 0 (indicating insufficient data)
-                    if (fast_health.get('memory_used_gb', 0) == 0 and 
-                        fast_health.get('memory_free_gb', 0) == 0 and 
-                        fast_health.get('memory_total_gb', 0) == 0):
-                        logger.info(f"Fast-path found insufficient memory data for {host}, falling back to full discovery")
-                        needs_fallback = True
-                # Also check for new categories
-                if (
-                    'power_details' in fast_health and not fast_health['power_details']
-                ) or (
-                    'fan_details' in fast_health and not fast_health['fan_details']
-                ):
-                    needs_fallback = True
-            else:
-                needs_fallback = True
-            
-            if not needs_fallback:
-                logger.info(f"Fast-path health check successful for {host}")
-                SNMPPoller.health_cache[host] = {
-                    'data': fast_health,
-                    'timestamp': current_time,
-                    'method': 'fast_path'
-                }
-                return fast_health
-            
-            logger.info(f"Fast-path incomplete for {host}, using full discovery fallback")
-            # Do full discovery for missing categories
-            full_health = self._get_health_full_discovery(host, smart_discovery, device_id)
-            # Merge: prefer full discovery for missing/empty categories
-            merged = fast_health or {}
-            for key in ['cpu_details', 'memory_details', 'temperature_details', 'power_details', 'fan_details',
-                        'cpu_usage', 'memory_usage', 'temperature', 'power_consumption', 'fan_speed']:
-                if not merged.get(key):
-                    merged[key] = full_health.get(key)
-            # Also update the main values if they are 0 or missing
-            for key in ['cpu_usage', 'memory_usage', 'temperature', 'power_consumption', 'fan_speed']:
-                if not merged.get(key) or merged[key] == 0:
-                    merged[key] = full_health.get(key)
-            # CRITICAL FIX: Always use full discovery for memory GB values
-            for key in ['memory_used_gb', 'memory_free_gb', 'memory_total_gb']:
-                merged[key] = full_health.get(key, 0)
-            SNMPPoller.health_cache[host] = {
-                'data': merged,
-                'timestamp': current_time,
-                'method': 'fallback_full_discovery'
-            }
-            return merged
+            return SNMPPoller.health_cache.get_or_poll(
+                host,
+                lambda: self._record_health(host, self._poll_device_health(host, db_session, device_id)),
+                refresh=lambda: self._record_health(host, self._refresh_device_health(host, device_id))
+            )
         except Exception as e:
             logger.error(f"Error getting device health for {host}: {e}")
             return {
@@ -1498,57 +1137,124 @@ class SNMPPoller:
                 'status': 'error',
                 'error': str(e)
             }
-    
+
+    def _record_health(self, host: str, result: Tuple[Dict, str]) -> Tuple[Dict, str]:
+        """Append a fresh poll to the health history (cache hits are not re-recorded)."""
+        try:
+            health_timeseries.record_health(host, result[0])
+        except Exception as e:
+            logger.warning(f"Error recording health history for {host}: {e}")
+        return result
+
+    def _refresh_device_health(self, host: str, device_id: int = None) -> Tuple[Dict, str]:
+        """Background stale-while-revalidate poll with its own DB session."""
+        from app.core.database import SessionLocal
+        db_session = SessionLocal()
+        try:
+            return self._poll_device_health(host, db_session, device_id)
+        finally:
+            db_session.close()
+
+    def _poll_device_health(self, host: str, db_session: Session = None, device_id: int = None) -> Tuple[Dict, str]:
+        """Poll device health (fast path, then full discovery fallback). Returns (health_data, method)."""
+        # Initialize smart discovery
+        smart_discovery = SmartSNMPDiscovery(self.community or "cisco", db_session)
+        self.smart_discovery = smart_discovery
+
+        # Try fast-path first (using learned OIDs)
+        with snmp_metrics.measure(host, 'fast_path'):
+            fast_health = self._get_health_fast_path(host, smart_discovery, device_id)
+        needs_fallback = False
+        # Check if any main category is missing or empty
+        if fast_health:
+            if (
+                not fast_health.get('cpu_details') or not fast_health['cpu_details']
+                or not fast_health.get('memory_details') or not fast_health['memory_details']
+                or not fast_health.get('temperature_details') or not fast_health['temperature_details']
+            ):
+                needs_fallback = True
+            # Check if we have enough memory values for proper calculation
+            elif fast_health.get('memory_details') and len(fast_health['memory_details']) < 3:
+                # If we have less than 3 memory values, we might not have enough for proper calculation
+                # Check if the calculated memory values are all 0 (indicating insufficient data)
+                if (fast_health.get('memory_used_gb', 0) == 0 and 
+                    fast_health.get('memory_free_gb', 0) == 0 and 
+                    fast_health.get('memory_total_gb', 0) == 0):
+                    logger.info(f"Fast-path found insufficient memory data for {host}, falling back to full discovery")
+                    needs_fallback = True
+            # Also check for new categories
+            if (
+                'power_details' in fast_health and not fast_health['power_details']
+            ) or (
+                'fan_details' in fast_health and not fast_health['fan_details']
+            ):
+                needs_fallback = True
+        else:
+            needs_fallback = True
+        
+        if not needs_fallback:
+            logger.info(f"Fast-path health check successful for {host}")
+            return fast_health, 'fast_path'
+        
+        logger.info(f"Fast-path incomplete for {host}, using full discovery fallback")
+        # Do full discovery for missing categories
+        with snmp_metrics.measure(host, 'full_discovery'):
+            full_health = self._get_health_full_discovery(host, smart_discovery, device_id)
+        # Merge: prefer full discovery for missing/empty categories
+        merged = fast_health or {}
+        for key in ['cpu_details', 'memory_details', 'temperature_details', 'power_details', 'fan_details',
+                    'cpu_usage', 'memory_usage', 'temperature', 'power_consumption', 'fan_speed']:
+            if not merged.get(key):
+                merged[key] = full_health.get(key)
+        # Also update the main values if they are 0 or missing
+        for key in ['cpu_usage', 'memory_usage', 'temperature', 'power_consumption', 'fan_speed']:
+            if not merged.get(key) or merged[key] == 0:
+                merged[key] = full_health.get(key)
+        # CRITICAL FIX: Always use full discovery for memory GB values
+        for key in ['memory_used_gb', 'memory_free_gb', 'memory_total_gb']:
+            merged[key] = full_health.get(key, 0)
+        # Nothing could be read: report the failure so the cache only keeps it briefly
+        if full_health.get('status') == 'error' and not any(
+            merged.get(key) for key in ['cpu_details', 'memory_details', 'temperature_details',
+                                        'power_details', 'fan_details']
+        ):
+            merged['status'] = 'error'
+            merged['error'] = full_health.get('error')
+        return merged, 'fallback_full_discovery'
+
     def _get_health_fast_path(self, host: str, smart_discovery: 'SmartSNMPDiscovery', device_id: int = None) -> Dict:
-        """Fast-path health check using learned OIDs"""
+        """Fast-path health check: re-poll the learned OIDs through the compiled poll plan"""
         try:
             logger.info(f"Attempting fast-path health check for {host}")
             
-            # Get device profile for vendor/model info
-            device_profile = smart_discovery._get_device_profile(host)
-            logger.info(f"Device profile: {device_profile.get('vendor')} {device_profile.get('model')}")
-            
-            # Get learned OIDs from smart discovery first
-            cpu_oids = smart_discovery._get_learned_oids_for_category(host, 'cpu')
-            memory_oids = smart_discovery._get_learned_oids_for_category(host, 'memory')
-            temperature_oids = smart_discovery._get_learned_oids_for_category(host, 'temperature')
-            power_oids = smart_discovery._get_learned_oids_for_category(host, 'power')
-            fan_oids = smart_discovery._get_learned_oids_for_category(host, 'fan')
-            
-            # Also try to get from learning engine if available
-            if smart_discovery.learning_engine:
-                try:
-                    predicted_cpu_oids = smart_discovery.learning_engine.predict_successful_oids(device_profile, 'cpu')
-                    predicted_memory_oids = smart_discovery.learning_engine.predict_successful_oids(device_profile, 'memory')
-                    predicted_temp_oids = smart_discovery.learning_engine.predict_successful_oids(device_profile, 'temperature')
-                    predicted_power_oids = smart_discovery.learning_engine.predict_successful_oids(device_profile, 'power')
-                    predicted_fan_oids = smart_discovery.learning_engine.predict_successful_oids(device_profile, 'fan')
-                    
-                    # Combine learned and predicted OIDs
-                    cpu_oids.extend(predicted_cpu_oids)
-                    memory_oids.extend(predicted_memory_oids)
-                    temperature_oids.extend(predicted_temp_oids)
-                    power_oids.extend(predicted_power_oids)
-                    fan_oids.extend(predicted_fan_oids)
-                except Exception as e:
-                    logger.warning(f"Learning engine prediction failed: {e}")
+            plan = self._get_poll_plan(host)
+            if not plan:
+                logger.info(f"No learned OIDs for {host}, skipping fast path")
+                return {}
             
-            logger.info(f"Smart discovery learned OIDs - CPU: {len(cpu_oids)}, Memory: {len(memory_oids)}, Temperature: {len(temperature_oids)}, Power: {len(power_oids)}, Fan: {len(fan_oids)}")
+            live_data = plan.execute(self.session)
             
-            # Perform fast SNMP gets for each category
-            cpu_data = self._fast_snmp_get(host, cpu_oids, 'cpu')
-            memory_data = self._fast_snmp_get(host, memory_oids, 'memory')
+            # Same unit formatting/validation as discovery applies
+            cpu_data = smart_discovery._validate_discovered_data(live_data['cpu'], 'cpu')
+            memory_data = smart_discovery._validate_discovered_data(live_data['memory'], 'memory')
+            fan_data = smart_discovery._validate_discovered_data(live_data['fan'], 'fan')
             
-            # Use enhanced temperature monitoring for better accuracy
+            # Temperature and power fall back to the enhanced monitors (SNMP, then SSH)
+            # when the plan has nothing live for them
             temp_monitor = EnhancedTemperatureMonitor(self, smart_discovery.db_session)
-            temperature_data = temp_monitor.get_temperature_data(host, device_id)
+            temperature_data = {
+                sensor: value for sensor, value in live_data['temperature'].items()
+                if temp_monitor._is_valid_temperature(value)
+            }
+            if not temperature_data:
+                temperature_data = temp_monitor.get_temperature_data(host, device_id)
             
-            # Use enhanced power monitoring for PSU information
-            power_monitor = EnhancedPowerMonitor(self, smart_discovery.db_session)
-            power_data = power_monitor.get_power_data(host, device_id)
-            fan_data = self._fast_snmp_get(host, fan_oids, 'fan')
+            power_data = live_data['power']
+            if not power_data:
+                power_monitor = EnhancedPowerMonitor(self, smart_discovery.db_session)
+                power_data = power_monitor.get_power_data(host, device_id)
             
-            logger.info(f"Fast-path results - CPU: {len(cpu_data)}, Memory: {len(memory_data)}, Temperature: {len(temperature_data)}, Power: {len(power_data)}, Fan: {len(fan_data)}")
+            logger.info(f"Fast-path results ({plan.last_round_trips} round trips) - CPU: {len(cpu_data)}, Memory: {len(memory_data)}, Temperature: {len(temperature_data)}, Power: {len(power_data)}, Fan: {len(fan_data)}")
             
             # Process the data
             health_data = self._process_health_data(cpu_data, memory_data, temperature_data, power_data, fan_data)
@@ -1571,31 +1277,29 @@ class SNMPPoller:
                 'fan_details': {}
             }
     
-    def _fast_snmp_get(self, host: str, sensor_names: List[str], data_category: str) -> Dict:
-        """Perform fast SNMP gets using stored sensor mappings"""
-        try:
-            discovered_data = {}
-            
-            # Get stored mappings for this host and category (using class-level storage)
-            mapping_key = f"{host}_{data_category}"
-            if mapping_key in SmartSNMPDiscovery.oid_mappings:
-                stored_mappings = SmartSNMPDiscovery.oid_mappings[mapping_key]
-                
-                # If we have stored mappings, use them directly for fast-path
-                # This avoids the need to query sensor_names that might not exist
-                for sensor_name, mapping_data in stored_mappings.items():
-                    discovered_data[sensor_name] = mapping_data['value']
-                    logger.debug(f"Fast-path using stored value for {sensor_name}")
-                
-                logger.info(f"Fast-path retrieved {len(discovered_data)} {data_category} values from stored mappings")
-            else:
-                logger.warning(f"No stored mappings found for {host}_{data_category}")
-            
-            return discovered_data
-            
-        except Exception as e:
-            logger.error(f"Error in fast SNMP get for {host}: {e}")
-            return {}
+    def _get_poll_plan(self, host: str) -> Optional[PollPlan]:
+        """Get the compiled poll plan for host, compiling only when its learned OID set changed"""
+        mappings = {
+            category: SmartSNMPDiscovery.oid_mappings.get(f"{host}_{category}", {})
+            for category in HEALTH_CATEGORIES
+        }
+        signature = PollPlan.signature_of(mappings)
+        if not signature:
+            SNMPPoller.poll_plans.pop(host, None)
+            return None
+        
+        plan = SNMPPoller.poll_plans.get(host)
+        if plan is not None and plan.signature == signature:
+            return plan
+        
+        if plan is not None:
+            # Keep what we learned about the agent's message size
+            plan = PollPlan.compile(host, mappings, plan.max_pdu_bytes, plan.max_varbinds)
+        else:
+            plan = PollPlan.compile(host, mappings)
+        SNMPPoller.poll_plans[host] = plan
+        logger.info(f"Compiled poll plan for {host}: {len(plan.entries)} OIDs in {len(plan.pdus)} PDUs")
+        return plan
     
     def _get_health_full_discovery(self, host: str, smart_discovery: 'SmartSNMPDiscovery', device_id: int = None) -> Dict:
         """Full health discovery using smart SNMP discovery with enhanced temperature monitoring"""
@@ -1619,8 +1323,10 @@ class SNMPPoller:
             device_profile = smart_discovery._get_device_profile(host)
             smart_discovery._learn_from_discovery(host, "cpu", cpu_data, device_profile)
             smart_discovery._learn_from_discovery(host, "memory", memory_data, device_profile)
-            smart_discovery._learn_from_discovery(host, "temperature", temperature_data, device_profile)
-            smart_discovery._learn_from_discovery(host, "power", power_data, device_profile)
+            smart_discovery._learn_from_discovery(host, "temperature", temperature_data, device_profile,
+                                                  temp_monitor.sensor_oids)
+            smart_discovery._learn_from_discovery(host, "power", power_data, device_profile,
+                                                  power_monitor.sensor_oids)
             smart_discovery._learn_from_discovery(host, "fan", fan_data, device_profile)
             
             # Process all health data
@@ -1641,7 +1347,9 @@ class SNMPPoller:
                 'memory_details': {},
                 'temperature_details': {},
                 'power_details': {},
-                'fan_details': {}
+                'fan_details': {},
+                'status': 'error',
+                'error': str(e)
             }
     
     def _process_health_data(self, cpu_data: Dict, memory_data: Dict, temperature_data: Dict, 
@@ -2088,96 +1796,155 @@ class SNMPPoller:
                 'fan_details': fan_data or {}
             }
 
+    def _clone(self) -> 'SNMPPoller':
+        """New poller with the same credentials and its own SNMP engine."""
+        return type(self)(self.community, self.version, self.username,
+                          self.auth_protocol, self.auth_password,
+                          self.priv_protocol, self.priv_password)
+
+    def _topology_unchanged(self, state: Optional[Dict], markers: Dict) -> bool:
+        """True if the change markers show nothing moved since state was polled."""
+        if not state or time.time() - state['polled_at'] >= self.topology_max_age:
+            return False
+        try:
+            if int(markers[SYS_UPTIME_OID]) < int(state['markers'][SYS_UPTIME_OID]):
+                return False  # rebooted
+        except (KeyError, TypeError, ValueError):
+            return False
+        return all(markers.get(oid) == state['markers'].get(oid) for oid in TOPOLOGY_CHANGE_OIDS[1:])
+
+    def _poll_topology_device(self, name: str, ip: str) -> Optional[Dict]:
+        """Poll one device for discover_topology (runs on a worker thread).
+
+        Returns:
+            {'node': ..., 'neighbors': [...], 'cached': bool}, or None if the
+            device is unreachable or returned no usable data.
+        """
+        markers = self.session.get_many(ip, TOPOLOGY_CHANGE_OIDS)
+        if not markers:
+            logger.warning(f"Device {name} ({ip}) did not answer SNMP")
+            with self.topology_state_lock:
+                self.topology_state.pop(ip, None)
+            return None
+
+        with self.topology_state_lock:
+            state = self.topology_state.get(ip)
+        if self._topology_unchanged(state, markers) and state['node']['id'] == name:
+            logger.debug(f"Topology of {name} unchanged since last poll, reusing it")
+            return {'node': state['node'], 'neighbors': state['neighbors'], 'cached': True}
+
+        device_info = self.get_basic_device_info(ip)
+        if not device_info:
+            logger.warning(f"Could not get device info for {name}")
+            return None
+
+        interfaces = self.get_interfaces(ip)
+        if not interfaces:
+            logger.warning(f"Could not get interfaces for {name}")
+            return None
+
+        node = {
+            "id": name,
+            "label": name,
+            "type": "device",
+            "ip": ip,
+            "model": device_info.get("model", "Unknown"),
+            "os_version": device_info.get("os_version", "Unknown"),
+            "interfaces": interfaces
+        }
+        neighbors = self.get_cdp_neighbors(ip)
+
+        with self.topology_state_lock:
+            self.topology_state[ip] = {
+                'markers': markers,
+                'node': node,
+                'neighbors': neighbors,
+                'polled_at': time.time()
+            }
+        return {'node': node, 'neighbors': neighbors, 'cached': False}
+
     def discover_topology(self, network_id: int, db: Session) -> Dict:
-        """Discover network topology using SNMP."""
+        """Discover network topology using SNMP.
+
+        Devices are polled in parallel on a bounded worker pool, each worker
+        with its own poller and SNMP engine. One GET of sysUpTime,
+        ifTableLastChange and lldpStatsRemTablesLastChangeTime decides per
+        device whether the previous run's interfaces and neighbors can be
+        reused; only rebooted or changed devices (or ones last polled more
+        than topology_max_age ago) are walked again.
+        """
         try:
             # Get all devices in the network
             devices = db.query(Device).filter(Device.network_id == network_id).all()
             if not devices:
                 return {"nodes": [], "edges": []}
 
-            nodes = []
-            edges = []
-            device_map = {}  # Map device names to their data
-
-            # First pass: Get basic device info and interfaces
+            targets = []
             for device in devices:
-                try:
-                    if not device.snmp_status:
-                        logger.warning(f"Device {device.name} has SNMP disabled")
-                        continue
-
-                    # Get device info
-                    device_info = self.get_basic_device_info(device.ip)
-                    if not device_info:
-                        logger.warning(f"Could not get device info for {device.name}")
-                        continue
-
-                    # Get interfaces
-                    interfaces = self.get_interfaces(device.ip)  # Changed from get_interface_info to get_interfaces
-                    if not interfaces:
-                        logger.warning(f"Could not get interfaces for {device.name}")
-                        continue
-
-                    # Add device to nodes
-                    node_data = {
-                        "id": device.name,
-                        "label": device.name,
-                        "type": "device",
-                        "ip": device.ip,
-                        "model": device_info.get("model", "Unknown"),
-                        "os_version": device_info.get("os_version", "Unknown"),
-                        "interfaces": interfaces
-                    }
-                    nodes.append(node_data)
-                    device_map[device.name] = node_data
-
-                except Exception as e:
-                    logger.error(f"Error discovering topology for device {device.name}: {str(e)}")
+                if not device.snmp_status:
+                    logger.warning(f"Device {device.name} has SNMP disabled")
                     continue
+                targets.append((device.name, device.ip))
+            if not targets:
+                return {"nodes": [], "edges": []}
 
-            # Second pass: Get CDP neighbors and create edges
-            for device in devices:
+            # Worker pollers (one SNMP engine each) are kept for the next run
+            idle_pollers = self._topology_pollers
+
+            def poll(name: str, ip: str) -> Optional[Dict]:
+                with self.topology_state_lock:
+                    poller = idle_pollers.pop() if idle_pollers else None
+                poller = poller or self._clone()
                 try:
-                    if not device.snmp_status or device.name not in device_map:
-                        continue
+                    return poller._poll_topology_device(name, ip)
+                finally:
+                    with self.topology_state_lock:
+                        idle_pollers.append(poller)
 
-                    # Get CDP neighbors
-                    neighbors = self.get_cdp_neighbors(device.ip)
-                    if not neighbors:
+            results = {}
+            started = time.time()
+            with ThreadPoolExecutor(max_workers=min(self.topology_workers, len(targets)),
+                                    thread_name_prefix="topology") as executor:
+                futures = {executor.submit(poll, name, ip): name for name, ip in targets}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Error discovering topology for device {name}: {str(e)}")
                         continue
+                    if result:
+                        results[name] = result
+
+            # Keep the database order for nodes
+            nodes = [results[name]['node'] for name, _ in targets if name in results]
+            device_map = {node["id"]: node for node in nodes}
+            if_names = {
+                node["id"]: {str(interface.get("ifIndex")): interface.get("ifDescr", "")
+                             for interface in node["interfaces"]}
+                for node in nodes
+            }
 
-                    # Process each neighbor
-                    for neighbor in neighbors:
-                        neighbor_id = neighbor.get("device_id", "")
-                        if not neighbor_id or neighbor_id not in device_map:
-                            continue
-
-                        # Get interface info
-                        local_if_index = neighbor.get("local_port", "")
-                        remote_if_name = neighbor.get("remote_port", "")
-
-                        # Find local interface name
-                        local_if_name = ""
-                        for interface in device_map[device.name]["interfaces"]:
-                            if interface.get("ifIndex") == local_if_index:
-                                local_if_name = interface.get("ifDescr", "")
-                                break
-
-                        # Create edge
-                        edge = {
-                            "id": f"{device.name}-{neighbor_id}",
-                            "source": device.name,
-                            "target": neighbor_id,
-                            "label": f"{local_if_name} - {remote_if_name}",
-                            "type": "connection"
-                        }
-                        edges.append(edge)
+            edges = []
+            for node in nodes:
+                for neighbor in results[node["id"]]['neighbors']:
+                    neighbor_id = neighbor.get("device_id", "")
+                    if not neighbor_id or neighbor_id not in device_map:
+                        continue
 
-                except Exception as e:
-                    logger.error(f"Error processing CDP neighbors for device {device.name}: {str(e)}")
-                    continue
+                    local_if_name = if_names[node["id"]].get(str(neighbor.get("local_port", "")), "")
+                    remote_if_name = neighbor.get("remote_port", "")
+                    edges.append({
+                        "id": f"{node['id']}-{neighbor_id}",
+                        "source": node["id"],
+                        "target": neighbor_id,
+                        "label": f"{local_if_name} - {remote_if_name}",
+                        "type": "connection"
+                    })
 
+            reused = sum(1 for result in results.values() if result['cached'])
+            logger.info(f"Topology for network {network_id}: {len(nodes)}/{len(targets)} devices "
+                        f"({reused} unchanged), {len(edges)} edges in {time.time() - started:.1f}s")
             return {
                 "nodes": nodes,
                 "edges": edges
@@ -2249,47 +2016,21 @@ class SNMPPoller:
 
     def clear_health_cache(self, host: str = None):
         """Clear health cache for a specific host or all hosts"""
+        SNMPPoller.health_cache.invalidate(host)
         if host:
-            if host in SNMPPoller.health_cache:
-                del SNMPPoller.health_cache[host]
-                logger.info(f"Cleared health cache for {host}")
+            logger.info(f"Cleared health cache for {host}")
         else:
-            SNMPPoller.health_cache.clear()
             logger.info("Cleared all health cache")
     
     def get_cache_info(self) -> Dict:
-        """Get information about the health cache"""
-        current_time = time.time()
-        cache_info = {
-            'total_entries': len(SNMPPoller.health_cache),
-            'cache_timeout': SNMPPoller.cache_timeout,
-            'entries': {}
-        }
-        
-        for host, entry in SNMPPoller.health_cache.items():
-            age = current_time - entry['timestamp']
-            cache_info['entries'][host] = {
-                'age_seconds': round(age, 1),
-                'method': entry['method'],
-                'expired': age >= SNMPPoller.cache_timeout
-            }
-        
-        return cache_info
+        """Get information about the health cache, including hit/miss/coalesce counters"""
+        return SNMPPoller.health_cache.get_info()
     
     def cleanup_expired_cache(self):
         """Remove expired cache entries"""
-        current_time = time.time()
-        expired_hosts = []
-        
-        for host, entry in SNMPPoller.health_cache.items():
-            if current_time - entry['timestamp'] >= SNMPPoller.cache_timeout:
-                expired_hosts.append(host)
-        
-        for host in expired_hosts:
-            del SNMPPoller.health_cache[host]
-        
-        if expired_hosts:
-            logger.info(f"Cleaned up {len(expired_hosts)} expired cache entries")
+        removed = SNMPPoller.health_cache.cleanup_expired()
+        if removed:
+            logger.info(f"Cleaned up {removed} expired cache entries")
 
 
 class SmartSNMPDiscovery:
@@ -2303,12 +2044,14 @@ class SmartSNMPDiscovery:
         self.device_profiles = {}  # Cache device capabilities
         self.oid_patterns = {}     # Discovered OID patterns
         self.discovery_cache = {}  # Cache successful discoveries
+        self.sensor_oids = {}      # {ip_category: {sensor_name: oid}} for poll plans
+        self._probe_poller = None  # Reused engine for batched OID probes
         
         # Initialize learning engine with error handling
         self.db_session = db_session
         self.learning_engine = None
         try:
-            # Initialize without database session for file-based storage
+            # Shared learning store; loads the learning tables once per process
             self.learning_engine = AdaptiveLearningEngine()
             logger.info("Learning engine initialized successfully")
         except Exception as e:
@@ -2427,12 +2170,14 @@ class SmartSNMPDiscovery:
         try:
             discovered_data = {}
             
+            values = self._get_snmp_values(ip_address, preferred_oids)
             for oid in preferred_oids:
                 try:
-                    value = self._get_snmp_value(ip_address, oid)
+                    value = values.get(oid)
                     if value and self._is_relevant_data(oid, value, data_category):
                         sensor_name = self._generate_sensor_name(oid, value, data_category)
                         discovered_data[sensor_name] = value
+                        self._record_sensor_oid(ip_address, data_category, sensor_name, oid)
                         logger.info(f"Preferred OID {oid} discovered: {sensor_name} = {value}")
                 except Exception as e:
                     logger.debug(f"Preferred OID {oid} failed: {e}")
@@ -2450,46 +2195,53 @@ class SmartSNMPDiscovery:
             return self.device_profiles[ip_address]
         
         try:
-            # Get basic device info
-            snmp_poller = SNMPPoller(self.snmp_community)
-            device_info = snmp_poller.get_basic_device_info(ip_address)
-            
-            profile = {
-                'ip_address': ip_address,
-                'sys_descr': device_info.get('sysDescr', ''),
-                'sys_object_id': device_info.get('sysObjectID', ''),
-                'vendor': self._identify_vendor(device_info.get('sysObjectID', '')),
-                'model': self._extract_model(device_info.get('sysDescr', '')),
-                'capabilities': {},
-                'discovered_oids': {}
-            }
+            # Shared across instances and restarts; rebuilt on reboot/hardware swap
+            profile = device_profile_store.get_or_create(
+                ip_address,
+                lambda: self._build_device_profile(ip_address),
+                probe=lambda: self._probe_device_identity(ip_address)
+            )
+            if not profile:
+                return {'ip_address': ip_address, 'vendor': 'unknown', 'model': 'unknown'}
             
             self.device_profiles[ip_address] = profile
-            logger.info(f"Created device profile for {ip_address}: {profile['model']} ({profile['vendor']})")
             return profile
             
         except Exception as e:
             logger.error(f"Error creating device profile for {ip_address}: {e}")
             return {'ip_address': ip_address, 'vendor': 'unknown', 'model': 'unknown'}
     
-    def _identify_vendor(self, sys_object_id: str) -> str:
-        """Identify vendor from sysObjectID"""
-        if not sys_object_id:
-            return 'unknown'
+    def _build_device_profile(self, ip_address: str) -> dict:
+        """Identify the device over SNMP and build its profile"""
+        snmp_poller = SNMPPoller(self.snmp_community)
+        device_info = snmp_poller.get_basic_device_info(ip_address)
+        if not device_info:
+            return {}
         
-        vendor_patterns = {
-            'cisco': ['1.3.6.1.4.1.9.', 'cisco'],
-            'juniper': ['1.3.6.1.4.1.2636.', 'juniper'],
-            'hp': ['1.3.6.1.4.1.11.', 'hp'],
-            'arista': ['1.3.6.1.4.1.30065.', 'arista'],
-            'brocade': ['1.3.6.1.4.1.1588.', 'brocade']
+        classification = device_classifier.classify(device_info.get('sysObjectID', ''))
+        profile = {
+            'ip_address': ip_address,
+            'sys_descr': device_info.get('sysDescr', ''),
+            'sys_object_id': device_info.get('sysObjectID', ''),
+            'sys_uptime': device_info.get('sysUpTime'),
+            'vendor': classification.vendor,
+            'family': classification.family,
+            'model': classification.model if classification.model != 'unknown'
+                     else self._extract_model(device_info.get('sysDescr', '')),
+            'capabilities': {},
+            'discovered_oids': {}
         }
         
-        for vendor, patterns in vendor_patterns.items():
-            if any(pattern in sys_object_id.lower() for pattern in patterns):
-                return vendor
-        
-        return 'unknown'
+        logger.info(f"Created device profile for {ip_address}: {profile['model']} ({profile['vendor']})")
+        return profile
+    
+    def _probe_device_identity(self, ip_address: str) -> dict:
+        """Fetch sysObjectID and sysUpTime in one GET for profile revalidation"""
+        values = self._get_snmp_values(ip_address, ['1.3.6.1.2.1.1.2.0', '1.3.6.1.2.1.1.3.0'])
+        return {
+            'sysObjectID': values.get('1.3.6.1.2.1.1.2.0'),
+            'sysUpTime': values.get('1.3.6.1.2.1.1.3.0')
+        } if values else {}
     
     def _extract_model(self, sys_descr: str) -> str:
         """Extract device model from system description"""
@@ -2525,32 +2277,36 @@ class SmartSNMPDiscovery:
                 try:
                     logger.info(f"Walking OID tree {tree_name} ({base_oid}) for {data_category}")
                     
-                    snmp_engine = SnmpEngine()
+                    snmp_engine = snmp_metrics.instrument_engine(share_mib_compiler(SnmpEngine()))
                     auth_data = CommunityData(self.snmp_community, mpModel=1)
                     target = UdpTransportTarget((ip_address, 161), timeout=3, retries=1)
                     context = ContextData()
                     
-                    for (errorIndication, errorStatus, errorIndex, varBinds) in nextCmd(
-                        snmp_engine, auth_data, target, context,
-                        ObjectType(ObjectIdentity(base_oid)),
-                        lexicographicMode=False, maxRows=100
-                    ):
-                        if errorIndication:
-                            logger.debug(f"SNMP walk error in {tree_name}: {errorIndication}")
-                            break
-                        elif errorStatus:
-                            logger.debug(f"SNMP walk error in {tree_name}: {errorStatus.prettyPrint()}")
-                            break
-                        else:
-                            for varBind in varBinds:
-                                oid = str(varBind[0])
-                                value = str(varBind[1])
+                    with snmp_metrics.measure(ip_address, f"walk.{tree_name}") as op:
+                        for (errorIndication, errorStatus, errorIndex, varBinds) in nextCmd(
+                            snmp_engine, auth_data, target, context,
+                            ObjectType(ObjectIdentity(base_oid)),
+                            lexicographicMode=False, maxRows=100
+                        ):
+                            if errorIndication:
+                                logger.debug(f"SNMP walk error in {tree_name}: {errorIndication}")
+                                op.fail(errorIndication)
+                                break
+                            elif errorStatus:
+                                logger.debug(f"SNMP walk error in {tree_name}: {errorStatus.prettyPrint()}")
+                                op.fail(errorStatus.prettyPrint())
+                                break
+                            else:
+                                for varBind in varBinds:
+                                    oid = str(varBind[0])
+                                    value = str(varBind[1])
                                 
-                                # Validate if this is relevant data
-                                if self._is_relevant_data(oid, value, data_category):
-                                    sensor_name = self._generate_sensor_name(oid, value, data_category)
-                                    discovered_data[sensor_name] = value
-                                    logger.info(f"Discovered {data_category} sensor {sensor_name}: {value} (OID: {oid})")
+                                    # Validate if this is relevant data
+                                    if self._is_relevant_data(oid, value, data_category):
+                                        sensor_name = self._generate_sensor_name(oid, value, data_category)
+                                        discovered_data[sensor_name] = value
+                                        self._record_sensor_oid(ip_address, data_category, sensor_name, oid)
+                                        logger.info(f"Discovered {data_category} sensor {sensor_name}: {value} (OID: {oid})")
                 
                 except Exception as e:
                     logger.debug(f"Error walking OID tree {tree_name}: {e}")
@@ -2679,15 +2435,18 @@ class SmartSNMPDiscovery:
     def _get_snmp_value(self, ip_address: str, oid: str) -> str:
         """Get single SNMP value"""
         try:
-            snmp_engine = SnmpEngine()
+            snmp_engine = snmp_metrics.instrument_engine(share_mib_compiler(SnmpEngine()))
             auth_data = CommunityData(self.snmp_community, mpModel=1)
             target = UdpTransportTarget((ip_address, 161), timeout=2, retries=1)
             context = ContextData()
             
-            error_indication, error_status, error_index, var_binds = next(
-                getCmd(snmp_engine, auth_data, target, context,
-                      ObjectType(ObjectIdentity(oid)))
-            )
+            with snmp_metrics.measure(ip_address, 'get') as op:
+                error_indication, error_status, error_index, var_binds = next(
+                    getCmd(snmp_engine, auth_data, target, context,
+                          ObjectType(ObjectIdentity(oid)))
+                )
+                if error_indication or error_status:
+                    op.fail(error_indication or error_status)
             
             if error_indication or error_status:
                 return None
@@ -2700,6 +2459,22 @@ class SmartSNMPDiscovery:
         except Exception:
             return None
     
+    def _get_snmp_values(self, ip_address: str, oids: List[str]) -> Dict[str, str]:
+        """Get many SNMP values in grouped GET requests over one reused engine.
+        
+        Batches split automatically on tooBig/noSuchName; an unreachable device
+        costs one timeout instead of one per OID. Values are strings, as from
+        _get_snmp_value, and OIDs the agent doesn't implement are left out.
+        """
+        try:
+            if self._probe_poller is None or self._probe_poller.community != self.snmp_community:
+                self._probe_poller = SNMPPoller(self.snmp_community)
+            unique_oids = list(dict.fromkeys(oids))
+            return self._probe_poller.session.get_many(ip_address, unique_oids, as_text=True)
+        except Exception as e:
+            logger.debug(f"Batched SNMP get failed for {ip_address}: {e}")
+            return {}
+    
     def _pattern_based_discovery(self, ip_address: str, data_category: str, device_profile: dict) -> dict:
         """Discover data using pattern matching and intelligent OID generation"""
         try:
@@ -2708,11 +2483,15 @@ class SmartSNMPDiscovery:
             # Generate OID patterns based on device profile and category
             oid_patterns = self._generate_oid_patterns(data_category, device_profile)
             
+            # Probe every candidate in grouped GETs instead of one request per pattern
+            values = self._get_snmp_values(ip_address, list(oid_patterns.values()))
+            
             for pattern_name, oid_pattern in oid_patterns.items():
                 try:
-                    result = self._get_snmp_value(ip_address, oid_pattern)
+                    result = values.get(oid_pattern)
                     if result and self._is_relevant_data(oid_pattern, result, data_category):
                         discovered_data[pattern_name] = result
+                        self._record_sensor_oid(ip_address, data_category, pattern_name, oid_pattern)
                         logger.info(f"Pattern discovery found {pattern_name}: {result} (OID: {oid_pattern})")
                 except Exception:
                     continue
@@ -2872,21 +2651,40 @@ class SmartSNMPDiscovery:
         
         return validated_data
     
-    def _learn_from_discovery(self, ip_address: str, data_category: str, discovered_data: dict, device_profile: dict):
-        """Learn from successful discovery and store OID mappings"""
+    def _record_sensor_oid(self, ip_address: str, data_category: str, sensor_name: str, oid: str):
+        """Remember which OID a discovered sensor came from"""
+        self.sensor_oids.setdefault(f"{ip_address}_{data_category}", {})[sensor_name] = oid
+    
+    def _learn_from_discovery(self, ip_address: str, data_category: str, discovered_data: dict, device_profile: dict,
+                              sensor_oids: dict = None):
+        """Learn from successful discovery and store OID mappings
+        
+        Args:
+            sensor_oids: {sensor_name: oid} (or {sensor_name: {field: oid}} for multi-field
+                sensors) for data not found by this instance's own discovery methods
+        """
         try:
             # Store OID mappings for learning (using class-level storage)
             mapping_key = f"{ip_address}_{data_category}"
             if mapping_key not in SmartSNMPDiscovery.oid_mappings:
                 SmartSNMPDiscovery.oid_mappings[mapping_key] = {}
             
+            if sensor_oids is None:
+                sensor_oids = self.sensor_oids.get(mapping_key, {})
+            
             # Store ALL discovered data, not just sensor names
             for sensor_name, value in discovered_data.items():
-                # Store all discovered mappings for fast-path retrieval
-                SmartSNMPDiscovery.oid_mappings[mapping_key][sensor_name] = {
+                # Store the OID with the value so the poll plan can re-poll it
+                mapping = {
                     'value': value,
                     'discovered_at': datetime.utcnow().isoformat()
                 }
+                oid = sensor_oids.get(sensor_name)
+                if isinstance(oid, dict):
+                    mapping['oids'] = oid
+                elif oid:
+                    mapping['oid'] = oid
+                SmartSNMPDiscovery.oid_mappings[mapping_key][sensor_name] = mapping
             
             logger.info(f"Stored {len(discovered_data)} {data_category} mappings for {ip_address}")
             
@@ -2914,6 +2712,7 @@ class EnhancedTemperatureMonitor:
     def __init__(self, snmp_poller: 'SNMPPoller', db_session: Session = None):
         self.snmp_poller = snmp_poller
         self.db_session = db_session
+        self.sensor_oids = {}  # {temp_type: oid} for values read via SNMP
         
         # Comprehensive temperature OIDs for different vendors
         self.temperature_oids = {
@@ -2998,6 +2797,7 @@ class EnhancedTemperatureMonitor:
                     value = self._get_snmp_value(ip_address, oid)
                     if value and self._is_valid_temperature(value):
                         temperature_data[temp_type] = value
+                        self.sensor_oids[temp_type] = oid
                         logger.debug(f"SNMP temperature {temp_type}: {value}°C")
                 except Exception as e:
                     logger.debug(f"Failed to get {temp_type} via SNMP: {e}")
@@ -3011,6 +2811,7 @@ class EnhancedTemperatureMonitor:
                         value = self._get_snmp_value(ip_address, oid)
                         if value and self._is_valid_temperature(value):
                             temperature_data[temp_type] = value
+                            self.sensor_oids[temp_type] = oid
                             logger.debug(f"Additional SNMP temperature {temp_type}: {value}°C")
                     except Exception:
                         continue
@@ -3087,154 +2888,19 @@ class EnhancedTemperatureMonitor:
     def _parse_temperature_cli(self, output: str, platform: str) -> Dict:
         """Parse temperature data from CLI output for different platforms"""
         try:
-            temperature_data = {}
-            
-            if platform.startswith('cisco'):
-                return self._parse_cisco_temperature(output)
-            elif platform.startswith('juniper'):
-                return self._parse_juniper_temperature(output)
-            elif platform.startswith('arista'):
-                return self._parse_arista_temperature(output)
-            elif platform.startswith('hp'):
-                return self._parse_hp_temperature(output)
-            else:
-                return self._parse_generic_temperature(output)
-                
+            return cli_parser_registry.parse_dict(platform, 'temperature', output)
         except Exception as e:
             logger.error(f"Error parsing CLI temperature output: {e}")
             return {}
     
-    def _parse_cisco_temperature(self, output: str) -> Dict:
-        """Parse Cisco temperature CLI output"""
-        temperature_data = {}
-        
-        try:
-            # Parse inlet temperature
-            inlet_match = re.search(r'Inlet Temperature Value:\s*(\d+)\s*Degree Celsius', output, re.IGNORECASE)
-            if inlet_match:
-                temperature_data['inlet_temp'] = inlet_match.group(1)
-            
-            # Parse hotspot temperature
-            hotspot_match = re.search(r'Hotspot Temperature Value:\s*(\d+)\s*Degree Celsius', output, re.IGNORECASE)
-            if hotspot_match:
-                temperature_data['hotspot_temp'] = hotspot_match.group(1)
-            
-            # Parse system temperature
-            system_match = re.search(r'SYSTEM TEMPERATURE is OK', output, re.IGNORECASE)
-            if system_match:
-                temperature_data['system_status'] = 'OK'
-            
-            # Parse yellow threshold
-            yellow_match = re.search(r'Yellow Threshold\s*:\s*(\d+)\s*Degree Celsius', output, re.IGNORECASE)
-            if yellow_match:
-                temperature_data['threshold_yellow'] = yellow_match.group(1)
-            
-            # Parse red threshold
-            red_match = re.search(r'Red Threshold\s*:\s*(\d+)\s*Degree Celsius', output, re.IGNORECASE)
-            if red_match:
-                temperature_data['threshold_red'] = red_match.group(1)
-            
-            # Parse temperature state
-            state_match = re.search(r'Temperature State:\s*(\w+)', output, re.IGNORECASE)
-            if state_match:
-                temperature_data['temp_status'] = state_match.group(1)
-            
-            # Try alternative patterns
-            if not temperature_data:
-                # Look for any temperature values in the output
-                temp_matches = re.findall(r'(\d+)\s*[Dd]egree[s]?\s*[Cc]elsius', output)
-                if temp_matches:
-                    temperature_data['ambient_temp'] = temp_matches[0]
-                    if len(temp_matches) > 1:
-                        temperature_data['system_temp'] = temp_matches[1]
-            
-            return temperature_data
-            
-        except Exception as e:
-            logger.error(f"Error parsing Cisco temperature output: {e}")
-            return {}
-    
-    def _parse_juniper_temperature(self, output: str) -> Dict:
-        """Parse Juniper temperature CLI output"""
-        temperature_data = {}
-        
-        try:
-            # Parse temperature values
-            temp_matches = re.findall(r'(\d+)\s*C', output)
-            if temp_matches:
-                temperature_data['system_temp'] = temp_matches[0]
-                if len(temp_matches) > 1:
-                    temperature_data['cpu_temp'] = temp_matches[1]
-            
-            return temperature_data
-            
-        except Exception as e:
-            logger.error(f"Error parsing Juniper temperature output: {e}")
-            return {}
-    
-    def _parse_arista_temperature(self, output: str) -> Dict:
-        """Parse Arista temperature CLI output"""
-        temperature_data = {}
-        
-        try:
-            # Parse temperature values
-            temp_matches = re.findall(r'(\d+)\s*C', output)
-            if temp_matches:
-                temperature_data['system_temp'] = temp_matches[0]
-                if len(temp_matches) > 1:
-                    temperature_data['cpu_temp'] = temp_matches[1]
-            
-            return temperature_data
-            
-        except Exception as e:
-            logger.error(f"Error parsing Arista temperature output: {e}")
-            return {}
-    
-    def _parse_hp_temperature(self, output: str) -> Dict:
-        """Parse HP temperature CLI output"""
-        temperature_data = {}
-        
-        try:
-            # Parse temperature values
-            temp_matches = re.findall(r'(\d+)\s*C', output)
-            if temp_matches:
-                temperature_data['system_temp'] = temp_matches[0]
-                if len(temp_matches) > 1:
-                    temperature_data['cpu_temp'] = temp_matches[1]
-            
-            return temperature_data
-            
-        except Exception as e:
-            logger.error(f"Error parsing HP temperature output: {e}")
-            return {}
-    
-    def _parse_generic_temperature(self, output: str) -> Dict:
-        """Parse generic temperature CLI output"""
-        temperature_data = {}
-        
-        try:
-            # Look for any temperature patterns
-            temp_matches = re.findall(r'(\d+)\s*[Cc]elsius', output)
-            if temp_matches:
-                temperature_data['ambient_temp'] = temp_matches[0]
-            
-            # Look for Fahrenheit and convert
-            fahrenheit_matches = re.findall(r'(\d+)\s*[Ff]ahrenheit', output)
-            if fahrenheit_matches:
-                fahrenheit = int(fahrenheit_matches[0])
-                celsius = round((fahrenheit - 32) * 5/9)
-                temperature_data['ambient_temp'] = str(celsius)
-            
-            return temperature_data
-            
-        except Exception as e:
-            logger.error(f"Error parsing generic temperature output: {e}")
-            return {}
-    
     def _get_device_profile(self, ip_address: str) -> Dict:
         """Get device profile for vendor identification"""
         try:
-            # Use the existing smart discovery to get device profile
+            profile = device_profile_store.get(ip_address)
+            if profile:
+                return profile
+            
+            # Not identified yet - use the existing smart discovery to get device profile
             smart_discovery = SmartSNMPDiscovery(self.snmp_poller.community, self.db_session)
             return smart_discovery._get_device_profile(ip_address)
         except Exception as e:
@@ -3244,15 +2910,18 @@ class EnhancedTemperatureMonitor:
     def _get_snmp_value(self, ip_address: str, oid: str) -> str:
         """Get single SNMP value"""
         try:
-            snmp_engine = SnmpEngine()
+            snmp_engine = snmp_metrics.instrument_engine(share_mib_compiler(SnmpEngine()))
             auth_data = CommunityData(self.snmp_poller.community, mpModel=1)
             target = UdpTransportTarget((ip_address, 161), timeout=2, retries=1)
             context = ContextData()
             
-            error_indication, error_status, error_index, var_binds = next(
-                getCmd(snmp_engine, auth_data, target, context,
-                      ObjectType(ObjectIdentity(oid)))
-            )
+            with snmp_metrics.measure(ip_address, 'get') as op:
+                error_indication, error_status, error_index, var_binds = next(
+                    getCmd(snmp_engine, auth_data, target, context,
+                          ObjectType(ObjectIdentity(oid)))
+                )
+                if error_indication or error_status:
+                    op.fail(error_indication or error_status)
             
             if error_indication or error_status:
                 return None
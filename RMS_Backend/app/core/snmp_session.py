@@ -0,0 +1,452 @@
+"""
+Shared-engine SNMP session helpers.
+
+SNMPSession walks several table columns together with GETBULK over the
+poller's single SnmpEngine instead of one nextCmd walk (and one engine) per
+column. Every PDU the engine sends is counted so callers and benchmarks can
+see how many round trips an operation really cost, and every walk and GET is
+recorded in the per-device SNMP metrics.
+"""
+
+from typing import Any, Dict, List, Optional
+from threading import Lock
+from pysnmp.hlapi import *
+from pysnmp.proto.rfc1902 import *
+from pysnmp.smi.compiler import addMibCompiler, defaultDest
+from app.core.snmp_metrics import snmp_metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ifTable / ifXTable columns fetched together by collect_interface_table
+INTERFACE_TABLE_COLUMNS = {
+    'ifDescr': '1.3.6.1.2.1.2.2.1.2',
+    'ifSpeed': '1.3.6.1.2.1.2.2.1.5',
+    'ifPhysAddress': '1.3.6.1.2.1.2.2.1.6',
+    'ifAdminStatus': '1.3.6.1.2.1.2.2.1.7',
+    'ifOperStatus': '1.3.6.1.2.1.2.2.1.8',
+    'ifHighSpeed': '1.3.6.1.2.1.31.1.1.1.15',
+}
+
+# ipAddrTable columns (indexed by IP address)
+IP_ADDRESS_TABLE_COLUMNS = {
+    'ipAdEntAddr': '1.3.6.1.2.1.4.20.1.1',
+    'ipAdEntIfIndex': '1.3.6.1.2.1.4.20.1.2',
+}
+
+# ipNetToMediaTable column (indexed by ifIndex.IP)
+IP_NET_TO_MEDIA_COLUMNS = {
+    'ipNetToMediaIfIndex': '1.3.6.1.2.1.4.22.1.1',
+}
+
+# cdpCacheTable columns (indexed by cdpCacheIfIndex.cdpCacheDeviceIndex)
+CDP_CACHE_COLUMNS = {
+    'cdpCacheAddress': '1.3.6.1.4.1.9.9.23.1.2.1.1.4',
+    'cdpCacheVersion': '1.3.6.1.4.1.9.9.23.1.2.1.1.5',
+    'cdpCacheDeviceId': '1.3.6.1.4.1.9.9.23.1.2.1.1.6',
+    'cdpCacheDevicePort': '1.3.6.1.4.1.9.9.23.1.2.1.1.7',
+    'cdpCachePlatform': '1.3.6.1.4.1.9.9.23.1.2.1.1.8',
+    'cdpCacheCapabilities': '1.3.6.1.4.1.9.9.23.1.2.1.1.9',
+}
+
+# lldpRemTable columns (indexed by lldpRemTimeMark.lldpRemLocalPortNum.lldpRemIndex)
+LLDP_REM_COLUMNS = {
+    'lldpRemPortId': '1.0.8802.1.1.2.1.4.1.1.7',
+    'lldpRemPortDesc': '1.0.8802.1.1.2.1.4.1.1.8',
+    'lldpRemSysName': '1.0.8802.1.1.2.1.4.1.1.9',
+    'lldpRemSysDesc': '1.0.8802.1.1.2.1.4.1.1.10',
+    'lldpRemSysCapEnabled': '1.0.8802.1.1.2.1.4.1.1.12',
+}
+
+NEIGHBOR_PROTOCOLS = ('cdp', 'lldp')
+
+# ifSpeed saturates at 2^32-1 for links faster than ~4.29 Gbps
+IF_SPEED_SATURATED = 4294967295
+
+
+def convert_snmp_value(val: Any) -> Any:
+    """Convert a pysnmp value the same way the legacy column walkers did."""
+    if isinstance(val, OctetString):
+        return val.prettyPrint()
+    if isinstance(val, (Integer32, Integer, Gauge32, Counter32, Unsigned32)):
+        return int(val)
+    if isinstance(val, Counter64):
+        return int(val)
+    return val
+
+
+_shared_mib_compiler = None
+_shared_mib_compiler_lock = Lock()
+
+
+def share_mib_compiler(engine: SnmpEngine) -> SnmpEngine:
+    """Give engine the process-wide pysmi MIB compiler.
+
+    pysnmp attaches a new MIB compiler to every engine the first time an OID
+    is resolved, and building its parser costs about a second of CPU per
+    engine. Numeric OIDs never need compiling, so one compiler is built once
+    and shared by every engine instead.
+    """
+    global _shared_mib_compiler
+    try:
+        mib_builder = engine.getMibBuilder()
+        if mib_builder.getMibCompiler():
+            return engine
+        with _shared_mib_compiler_lock:
+            if _shared_mib_compiler is None:
+                addMibCompiler(mib_builder, ifAvailable=True, ifNotAdded=True)
+                _shared_mib_compiler = mib_builder.getMibCompiler() or False
+            elif _shared_mib_compiler:
+                mib_builder.setMibCompiler(_shared_mib_compiler, defaultDest)
+    except Exception as e:
+        logger.debug(f"Could not share MIB compiler: {e}")
+    return engine
+
+
+def _decode_address(value: Any) -> str:
+    """Render a 4-byte cdpCacheAddress (0x0a000001) as a dotted IPv4 address."""
+    text = str(value)
+    if text.startswith('0x') and len(text) == 10:
+        try:
+            return '.'.join(str(int(text[i:i + 2], 16)) for i in range(2, 10, 2))
+        except ValueError:
+            pass
+    return text or "Unknown"
+
+
+def _decode_text(value: Any) -> str:
+    """Undo prettyPrint's hex rendering of multi-line strings such as sysDescr."""
+    text = str(value)
+    if text.startswith('0x'):
+        try:
+            return bytes.fromhex(text[2:]).decode('utf-8', 'replace')
+        except ValueError:
+            pass
+    return text
+
+
+def _short_name(device_id: Any) -> str:
+    """Strip the domain from a neighbor hostname."""
+    text = str(device_id)
+    return text.split('.')[0] if '.' in text else text
+
+
+class SNMPSession:
+    """GETBULK table collector bound to one SNMPPoller and its SnmpEngine."""
+
+    def __init__(self, poller: 'SNMPPoller', max_repetitions: int = 10):
+        self.poller = poller
+        self.max_repetitions = max_repetitions
+        self.pdu_count = 0
+        self.too_big_count = 0
+        self._engine = None
+
+    @property
+    def engine(self):
+        """Shared SnmpEngine with a PDU counter attached."""
+        if self._engine is None:
+            self._engine = snmp_metrics.instrument_engine(
+                share_mib_compiler(self.poller.snmp_engine or SnmpEngine())
+            )
+            try:
+                self._engine.observer.registerObserver(self._count_pdu, 'rfc3412.sendPdu')
+            except Exception as e:
+                logger.debug(f"Could not attach PDU counter to SNMP engine: {e}")
+        return self._engine
+
+    def _count_pdu(self, snmp_engine, execpoint, variables, cb_ctx):
+        """Observer callback - invoked once for every PDU put on the wire."""
+        self.pdu_count += 1
+
+    def reset_counters(self):
+        """Reset the round trip counters."""
+        self.pdu_count = 0
+        self.too_big_count = 0
+
+    def walk_columns(self, ip: str, columns: Dict[str, str],
+                     max_repetitions: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Walk several table columns in one multi-varbind GETBULK walk.
+
+        Args:
+            ip: Device address
+            columns: Mapping of column name -> column OID
+            max_repetitions: Rows requested per column per PDU
+
+        Returns:
+            {column_name: {row_index: value}} where row_index is the OID
+            suffix after the column OID (e.g. "3" or "10.1").
+        """
+        results = {name: {} for name in columns}
+        if not columns:
+            return results
+
+        names = list(columns.keys())
+        prefixes = [columns[name] + '.' for name in names]
+
+        auth_data = self.poller._get_auth_data()
+        target = self.poller._get_target(ip)
+        context_data = self.poller._get_context_data()
+        if not auth_data or not target or not context_data:
+            logger.error(f"Failed to create SNMP session parameters for {ip}")
+            return results
+
+        try:
+            with snmp_metrics.measure(ip, 'bulk') as op:
+                for (error_indication, error_status, error_index, var_binds) in bulkCmd(
+                    self.engine,
+                    auth_data,
+                    target,
+                    context_data,
+                    0, max_repetitions or self.max_repetitions,
+                    *[ObjectType(ObjectIdentity(columns[name])) for name in names],
+                    lexicographicMode=False
+                ):
+                    if error_indication:
+                        logger.warning(f"SNMP error walking {', '.join(names)} on {ip}: {error_indication}")
+                        op.fail(error_indication)
+                        break
+                    if error_status:
+                        logger.warning(f"SNMP error walking {', '.join(names)} on {ip}: {error_status.prettyPrint()}")
+                        op.fail(error_status.prettyPrint())
+                        break
+
+                    for column, var_bind in enumerate(var_binds):
+                        try:
+                            name, val = var_bind
+                            if isinstance(val, (EndOfMibView, NoSuchObject, NoSuchInstance, Null)):
+                                continue
+                            oid_str = str(name)
+                            # Finished columns keep returning OIDs past their subtree
+                            if column >= len(prefixes) or not oid_str.startswith(prefixes[column]):
+                                continue
+                            results[names[column]][oid_str[len(prefixes[column]):]] = convert_snmp_value(val)
+                        except Exception as e:
+                            logger.warning(f"Error processing varbind {var_bind} on {ip}: {str(e)}")
+                            continue
+
+        except Exception as e:
+            logger.warning(f"Error bulk walking {', '.join(names)} on {ip}: {str(e)}")
+
+        return results
+
+    def get_many(self, ip: str, oids: List[str], max_varbinds: int = 32,
+                 as_text: bool = False) -> Dict[str, Any]:
+        """GET many scalar OIDs with as few multi-varbind PDUs as possible.
+
+        OIDs are sent max_varbinds at a time. A tooBig response splits the
+        request in half and retries; a noSuchName (SNMPv1-style) error drops
+        the offending OID and retries the rest, or retries each OID on its
+        own when the error index lies outside the request. OIDs the agent
+        does not implement are simply absent from the result.
+
+        Args:
+            ip: Device address
+            oids: OIDs to fetch
+            max_varbinds: Maximum varbinds per request PDU
+            as_text: Return str(value) like the single-OID getters instead
+                of converted Python values
+
+        Returns:
+            {oid: value} using the OID strings exactly as passed in.
+        """
+        results = {}
+        if not oids:
+            return results
+
+        auth_data = self.poller._get_auth_data()
+        target = self.poller._get_target(ip)
+        context_data = self.poller._get_context_data()
+        if not auth_data or not target or not context_data:
+            logger.error(f"Failed to create SNMP session parameters for {ip}")
+            return results
+
+        pending = [list(oids[i:i + max_varbinds]) for i in range(0, len(oids), max_varbinds)]
+        while pending:
+            chunk = pending.pop(0)
+            try:
+                with snmp_metrics.measure(ip, 'get') as op:
+                    error_indication, error_status, error_index, var_binds = next(getCmd(
+                        self.engine,
+                        auth_data,
+                        target,
+                        context_data,
+                        *[ObjectType(ObjectIdentity(oid)) for oid in chunk]
+                    ))
+                    if error_indication:
+                        op.fail(error_indication)
+                    elif error_status:
+                        op.fail(error_status.prettyPrint())
+            except Exception as e:
+                logger.warning(f"Error in multi-OID GET on {ip}: {str(e)}")
+                continue
+
+            if error_indication:
+                # Timeouts affect every remaining chunk too - stop here
+                logger.warning(f"SNMP error in multi-OID GET on {ip}: {error_indication}")
+                break
+
+            if error_status:
+                status = error_status.prettyPrint()
+                if status == 'tooBig' and len(chunk) > 1:
+                    self.too_big_count += 1
+                    half = len(chunk) // 2
+                    pending[0:0] = [chunk[:half], chunk[half:]]
+                    logger.debug(f"tooBig from {ip}, splitting {len(chunk)} varbinds")
+                elif int(error_index) and len(chunk) > 1:
+                    bad = int(error_index) - 1
+                    if 0 <= bad < len(chunk):
+                        # noSuchName/badValue etc. point at one varbind - drop it and retry the rest
+                        logger.debug(f"{status} for {chunk[bad]} on {ip}")
+                        pending.insert(0, [oid for i, oid in enumerate(chunk) if i != bad])
+                    else:
+                        # The index points outside the request - fetch the OIDs one by one
+                        logger.debug(f"{status} with out-of-range error index {bad + 1} on {ip}, "
+                                     f"retrying {len(chunk)} varbinds singly")
+                        pending[0:0] = [[oid] for oid in chunk]
+                else:
+                    logger.debug(f"SNMP error {status} in multi-OID GET on {ip} for {chunk}")
+                continue
+
+            # Responses keep request order, so map back by position
+            for oid, (name, val) in zip(chunk, var_binds):
+                if isinstance(val, (EndOfMibView, NoSuchObject, NoSuchInstance, Null)):
+                    continue
+                results[oid] = str(val) if as_text else convert_snmp_value(val)
+
+        return results
+
+    def collect_interface_table(self, ip: str) -> Dict[str, Dict[str, Any]]:
+        """Collect ifTable/ifXTable rows keyed by ifIndex in a single bulk walk."""
+        columns = self.walk_columns(ip, INTERFACE_TABLE_COLUMNS)
+
+        rows = {}
+        for if_index, if_descr in columns['ifDescr'].items():
+            speed = columns['ifSpeed'].get(if_index)
+            high_speed = columns['ifHighSpeed'].get(if_index)
+            speed_mbps = None
+            try:
+                if speed is not None and int(speed) < IF_SPEED_SATURATED:
+                    speed_mbps = int(speed) // 1000000
+                elif high_speed is not None:
+                    speed_mbps = int(high_speed)
+                elif speed is not None:
+                    speed_mbps = int(speed) // 1000000
+            except (ValueError, TypeError):
+                speed_mbps = None
+
+            admin = columns['ifAdminStatus'].get(if_index)
+            oper = columns['ifOperStatus'].get(if_index)
+            rows[if_index] = {
+                'ifDescr': if_descr,
+                'ifSpeed': speed_mbps,
+                'ifPhysAddress': columns['ifPhysAddress'].get(if_index),
+                'ifAdminStatus': None if admin is None else ("up" if admin == 1 else "down"),
+                'ifOperStatus': None if oper is None else ("up" if oper == 1 else "down"),
+            }
+
+        logger.info(f"Bulk interface walk for {ip}: {len(rows)} interfaces, {self.pdu_count} PDUs so far")
+        return rows
+
+    def collect_interface_ips(self, ip: str) -> Dict[str, List[str]]:
+        """Map ifIndex -> locally configured IPv4 addresses.
+
+        Mirrors the legacy lookup order: ipNetToMediaTable entries filtered to
+        the addresses in ipAddrTable, falling back to ipAdEntIfIndex.
+        """
+        address_table = self.walk_columns(ip, IP_ADDRESS_TABLE_COLUMNS)
+        local_ips = set(address_table['ipAdEntAddr'].keys())
+
+        if_ips = {}
+        if local_ips:
+            net_to_media = self.walk_columns(ip, IP_NET_TO_MEDIA_COLUMNS)
+            for index in net_to_media['ipNetToMediaIfIndex'].keys():
+                parts = index.split('.')
+                if len(parts) < 5:
+                    continue
+                if_index = parts[0]
+                ip_addr = '.'.join(parts[1:5])
+                if ip_addr in local_ips:
+                    if_ips.setdefault(if_index, []).append(ip_addr)
+
+        if not if_ips:
+            for ip_addr, if_index in address_table['ipAdEntIfIndex'].items():
+                if len(ip_addr.split('.')) == 4:
+                    if_ips.setdefault(str(if_index), []).append(ip_addr)
+
+        logger.info(f"Bulk IP-to-interface mapping for {ip}: {if_ips}")
+        return if_ips
+
+    def collect_neighbors(self, ip: str, protocols: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Collect CDP and LLDP neighbors in one GETBULK walk.
+
+        The cdpCacheTable and lldpRemTable columns are walked together and
+        joined by row index in memory. A protocol the device does not
+        implement costs nothing beyond its columns leaving their subtree in
+        the first response, so no separate MIB probe is needed.
+
+        Args:
+            ip: Device address
+            protocols: Protocols to walk ('cdp', 'lldp'); all when None
+
+        Returns:
+            {'neighbors': [...], 'protocols': [...]} where each neighbor has
+            device_id, local_port (ifIndex / LLDP local port number),
+            remote_port, platform, capabilities, version, address and
+            protocol, and 'protocols' lists the protocols that returned rows.
+        """
+        protocols = [p for p in (protocols or NEIGHBOR_PROTOCOLS) if p in NEIGHBOR_PROTOCOLS]
+        columns = {}
+        if 'cdp' in protocols:
+            columns.update(CDP_CACHE_COLUMNS)
+        if 'lldp' in protocols:
+            columns.update(LLDP_REM_COLUMNS)
+        table = self.walk_columns(ip, columns)
+
+        neighbors = []
+        found = []
+
+        if 'cdp' in protocols and table['cdpCacheDeviceId']:
+            found.append('cdp')
+            for index, device_id in table['cdpCacheDeviceId'].items():
+                port = table['cdpCacheDevicePort'].get(index)
+                if port is None:
+                    logger.warning(f"Incomplete CDP neighbor entry on {ip} for index {index}, missing device_port")
+                    continue
+                address = table['cdpCacheAddress'].get(index)
+                neighbors.append({
+                    "device_id": _short_name(device_id),
+                    "local_port": index.split('.')[0],
+                    "remote_port": port,
+                    "platform": table['cdpCachePlatform'].get(index, "Unknown"),
+                    "capabilities": table['cdpCacheCapabilities'].get(index, "Unknown"),
+                    "version": table['cdpCacheVersion'].get(index, "Unknown"),
+                    "address": "Unknown" if address is None else _decode_address(address),
+                    "protocol": "cdp"
+                })
+
+        if 'lldp' in protocols and (table['lldpRemSysName'] or table['lldpRemPortId']):
+            found.append('lldp')
+            for index in sorted(set(table['lldpRemSysName']) | set(table['lldpRemPortId'])):
+                parts = index.split('.')
+                if len(parts) < 3:
+                    continue
+                device_id = table['lldpRemSysName'].get(index)
+                port = table['lldpRemPortDesc'].get(index) or table['lldpRemPortId'].get(index)
+                if not device_id or port is None:
+                    logger.warning(f"Incomplete LLDP neighbor entry on {ip} for index {index}")
+                    continue
+                sys_desc = _decode_text(table['lldpRemSysDesc'].get(index, "Unknown"))
+                neighbors.append({
+                    "device_id": _short_name(device_id),
+                    "local_port": parts[1],
+                    "remote_port": port,
+                    "platform": sys_desc.splitlines()[0] if sys_desc else "Unknown",
+                    "capabilities": table['lldpRemSysCapEnabled'].get(index, "Unknown"),
+                    "version": sys_desc,
+                    "address": "Unknown",
+                    "protocol": "lldp"
+                })
+
+        logger.info(f"Bulk neighbor walk for {ip}: {len(neighbors)} neighbors via {found or 'none'}, "
+                    f"{self.pdu_count} PDUs so far")
+        return {'neighbors': neighbors, 'protocols': found}
@@ -1,8 +1,8 @@
 from typing import Dict, Optional
 from sqlalchemy.orm import Session
 import logging
-import re
 from datetime import datetime
+from app.core.cli_parser_registry import cli_parser_registry
 
 logger = logging.getLogger(__name__)
 
@@ -172,9 +172,9 @@ class EnhancedTemperatureMonitor:
             
             # Execute command
             from app.services.ssh_engine.ssh_connector import run_show_command
-            output = run_show_command(ip_address, command, credentials)
+            output = run_show_command(ip_address, credentials['username'], credentials['password'], command)
             
-            if output:
+            if output and not output.startswith('❌'):
                 return self._parse_temperature_cli(output, platform)
             
             return {}
@@ -214,195 +214,22 @@ class EnhancedTemperatureMonitor:
     def _parse_temperature_cli(self, output: str, platform: str) -> Dict:
         """Parse temperature data from CLI output."""
         try:
-            if platform == 'cisco':
-                return self._parse_cisco_temperature(output)
-            elif platform == 'juniper':
-                return self._parse_juniper_temperature(output)
-            elif platform == 'arista':
-                return self._parse_arista_temperature(output)
-            elif platform == 'hp':
-                return self._parse_hp_temperature(output)
-            else:
-                return self._parse_generic_temperature(output)
-                
-        except Exception as e:
-            logger.error(f"Error parsing temperature CLI output: {str(e)}")
-            return {}
-    
-    def _parse_cisco_temperature(self, output: str) -> Dict:
-        """Parse Cisco temperature output."""
-        try:
-            temperature_data = {}
-            
-            # Common patterns for Cisco temperature output
-            patterns = [
-                r'(\w+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\w+)',  # Standard format
-                r'(\w+)\s+(\d+)C',  # Simple format
-                r'(\w+)\s+(\d+)°C',  # With degree symbol
-                r'(\w+)\s+(\d+)\s+degrees'  # Text format
-            ]
-            
-            lines = output.split('\n')
-            for line in lines:
-                for pattern in patterns:
-                    match = re.search(pattern, line, re.IGNORECASE)
-                    if match:
-                        sensor_name = match.group(1).strip()
-                        try:
-                            temp_value = float(match.group(2))
-                            temperature_data[sensor_name] = {
-                                'value': temp_value,
-                                'unit': 'celsius',
-                                'source': 'cli',
-                                'status': self._get_temperature_status(temp_value, 'cisco')
-                            }
-                        except ValueError:
-                            continue
-            
-            return temperature_data
-            
-        except Exception as e:
-            logger.error(f"Error parsing Cisco temperature: {str(e)}")
-            return {}
-    
-    def _parse_juniper_temperature(self, output: str) -> Dict:
-        """Parse Juniper temperature output."""
-        try:
-            temperature_data = {}
-            
-            # Juniper temperature patterns
-            patterns = [
-                r'(\w+)\s+(\d+)C',
-                r'(\w+)\s+(\d+)°C',
-                r'(\w+)\s+(\d+)\s+degrees'
-            ]
-            
-            lines = output.split('\n')
-            for line in lines:
-                for pattern in patterns:
-                    match = re.search(pattern, line, re.IGNORECASE)
-                    if match:
-                        sensor_name = match.group(1).strip()
-                        try:
-                            temp_value = float(match.group(2))
-                            temperature_data[sensor_name] = {
-                                'value': temp_value,
-                                'unit': 'celsius',
-                                'source': 'cli',
-                                'status': self._get_temperature_status(temp_value, 'juniper')
-                            }
-                        except ValueError:
-                            continue
-            
-            return temperature_data
-            
-        except Exception as e:
-            logger.error(f"Error parsing Juniper temperature: {str(e)}")
-            return {}
-    
-    def _parse_arista_temperature(self, output: str) -> Dict:
-        """Parse Arista temperature output."""
-        try:
+            vendor = platform if platform in ('cisco', 'juniper', 'arista', 'hp') else 'generic'
             temperature_data = {}
             
-            # Arista temperature patterns
-            patterns = [
-                r'(\w+)\s+(\d+)C',
-                r'(\w+)\s+(\d+)°C'
-            ]
-            
-            lines = output.split('\n')
-            for line in lines:
-                for pattern in patterns:
-                    match = re.search(pattern, line, re.IGNORECASE)
-                    if match:
-                        sensor_name = match.group(1).strip()
-                        try:
-                            temp_value = float(match.group(2))
-                            temperature_data[sensor_name] = {
-                                'value': temp_value,
-                                'unit': 'celsius',
-                                'source': 'cli',
-                                'status': self._get_temperature_status(temp_value, 'arista')
-                            }
-                        except ValueError:
-                            continue
-            
-            return temperature_data
-            
-        except Exception as e:
-            logger.error(f"Error parsing Arista temperature: {str(e)}")
-            return {}
-    
-    def _parse_hp_temperature(self, output: str) -> Dict:
-        """Parse HP temperature output."""
-        try:
-            temperature_data = {}
-            
-            # HP temperature patterns
-            patterns = [
-                r'(\w+)\s+(\d+)C',
-                r'(\w+)\s+(\d+)°C'
-            ]
-            
-            lines = output.split('\n')
-            for line in lines:
-                for pattern in patterns:
-                    match = re.search(pattern, line, re.IGNORECASE)
-                    if match:
-                        sensor_name = match.group(1).strip()
-                        try:
-                            temp_value = float(match.group(2))
-                            temperature_data[sensor_name] = {
-                                'value': temp_value,
-                                'unit': 'celsius',
-                                'source': 'cli',
-                                'status': self._get_temperature_status(temp_value, 'hp')
-                            }
-                        except ValueError:
-                            continue
-            
-            return temperature_data
-            
-        except Exception as e:
-            logger.error(f"Error parsing HP temperature: {str(e)}")
-            return {}
-    
-    def _parse_generic_temperature(self, output: str) -> Dict:
-        """Parse generic temperature output."""
-        try:
-            temperature_data = {}
-            
-            # Generic temperature patterns
-            patterns = [
-                r'(\w+)\s+(\d+)C',
-                r'(\w+)\s+(\d+)°C',
-                r'(\w+)\s+(\d+)\s+degrees',
-                r'temperature[:\s]+(\d+)',
-                r'temp[:\s]+(\d+)'
-            ]
-            
-            lines = output.split('\n')
-            for line in lines:
-                for pattern in patterns:
-                    match = re.search(pattern, line, re.IGNORECASE)
-                    if match:
-                        sensor_name = match.group(1).strip() if len(match.groups()) > 1 else 'generic_temp'
-                        try:
-                            temp_value = float(match.group(2) if len(match.groups()) > 1 else match.group(1))
-                            temperature_data[sensor_name] = {
-                                'value': temp_value,
-                                'unit': 'celsius',
-                                'source': 'cli',
-                                'status': self._get_temperature_status(temp_value, 'generic')
-                            }
-                        except ValueError:
-                            continue
+            for record in cli_parser_registry.parse(vendor, 'temperature_sensors', output):
+                temp_value = record.value['value']
+                temperature_data[record.value['sensor']] = {
+                    'value': temp_value,
+                    'unit': 'celsius',
+                    'source': 'cli',
+                    'status': self._get_temperature_status(temp_value, vendor)
+                }
             
             return temperature_data
-            
+                
         except Exception as e:
-            logger.error(f"Error parsing generic temperature: {str(e)}")
+            logger.error(f"Error parsing temperature CLI output: {str(e)}")
             return {}
     
     def _get_device_profile(self, ip_address: str) -> Dict:
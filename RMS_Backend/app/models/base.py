@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, Boolean, UniqueConstraint, DateTime, Enum, CheckConstraint, Float, Text, ARRAY, func, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Boolean, UniqueConstraint, DateTime, Enum, CheckConstraint, Float, Text, ARRAY, func, JSON, Index, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -328,6 +328,61 @@ class AgentTokenAuditLog(Base):
     agent = relationship("Agent", back_populates="audit_logs")
 
 
+class AgentJob(Base):
+    """Durable per-agent job queue (discovery requests, status tests)"""
+    __tablename__ = "agent_jobs"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String, unique=True, nullable=False)
+    agent_id = Column(Integer, ForeignKey("agents.id", ondelete="CASCADE"), nullable=False)
+    job_type = Column(String, nullable=False)  # 'discovery', 'status_test'
+    payload = Column(JSON, nullable=False)
+    priority = Column(Integer, nullable=False, default=0)  # higher is handed out first
+    dedup_key = Column(String, nullable=True)  # identical open jobs of an agent are merged
+    state = Column(String, nullable=False, default="queued")  # queued, leased, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    lease_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_agent_jobs_ready", "agent_id", "state", "priority", "id"),
+        Index(
+            "uq_agent_jobs_open_dedup", "agent_id", "dedup_key", unique=True,
+            postgresql_where=text("state IN ('queued', 'leased') AND dedup_key IS NOT NULL"),
+            sqlite_where=text("state IN ('queued', 'leased') AND dedup_key IS NOT NULL")
+        ),
+    )
+
+    def __repr__(self):
+        return f"<AgentJob(job_id='{self.job_id}', agent_id={self.agent_id}, type='{self.job_type}', state='{self.state}')>"
+
+
+class AgentResultBatch(Base):
+    """Ingested streamed discovery result batches: dedup key and payload (shared across workers and restarts)"""
+    __tablename__ = "agent_result_batches"
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, nullable=False)
+    agent_id = Column(Integer, ForeignKey("agents.id", ondelete="CASCADE"), nullable=False)
+    sequence = Column(Integer, nullable=False)
+    total_batches = Column(Integer, nullable=True)  # set by the agent's final batch
+    discovered_devices = Column(JSON, nullable=False, default=list)
+    errors = Column(JSON, nullable=False, default=list)
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('session_id', 'agent_id', 'sequence', name='uq_agent_result_batch'),
+        Index("ix_agent_result_batches_received_at", "received_at"),
+    )
+
+    def __repr__(self):
+        return f"<AgentResultBatch(session_id='{self.session_id}', agent_id={self.agent_id}, sequence={self.sequence})>"
+
+
 
 
 
@@ -36,6 +36,9 @@ from .discovery import (
     DiscoverySession,
     DiscoveryDevice,
     DiscoveryProgress,
+    AgentDiscoveryProgressUpdate,
+    AgentDiscoveryResultBatch,
+    AgentJobAck,
     DiscoveryResult,
     DiscoveryConfig,
     DiscoveryFilter,
@@ -87,6 +90,9 @@ __all__ = [
     "DiscoverySession",
     "DiscoveryDevice",
     "DiscoveryProgress",
+    "AgentDiscoveryProgressUpdate",
+    "AgentDiscoveryResultBatch",
+    "AgentJobAck",
     "DiscoveryResult",
     "DiscoveryConfig",
     "DiscoveryFilter",
@@ -152,6 +152,42 @@ class DiscoveryProgress(BaseModel):
         from_attributes = True
 
 
+class AgentDiscoveryProgressUpdate(BaseModel):
+    """Aggregated progress posted by an agent (many per-host updates coalesced)."""
+    session_id: str
+    progress: int = Field(..., ge=0, le=100)
+    processed_ips: int = 0
+    discovered_count: int = 0
+    total_ips: Optional[int] = None
+    coalesced_updates: int = 1
+    final: bool = False
+    timestamp: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AgentDiscoveryResultBatch(BaseModel):
+    """One sequenced batch of an agent's streamed discovery results."""
+    session_id: str
+    sequence: int = Field(..., ge=0)
+    discovered_devices: List[dict] = Field(default_factory=list)
+    errors: List[str] = Field(default_factory=list)
+    final: bool = False
+    total_batches: Optional[int] = None
+    total_devices: Optional[int] = None
+    timestamp: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AgentJobAck(BaseModel):
+    """Agent acknowledgement of a job it was handed."""
+    status: str = Field("accepted", pattern="^(accepted|failed)$")
+    error: Optional[str] = None
+
+
 class DiscoveryResult(BaseModel):
     """Final discovery result."""
     session_id: str
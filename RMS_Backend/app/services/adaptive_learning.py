@@ -1,94 +1,41 @@
 import logging
-import time
-import re
-import json
-import os
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from pathlib import Path
+
+from app.services.learning_store import LearningStore, learning_store
 
 logger = logging.getLogger(__name__)
 
+# Strategies within this success rate of the best one compete on latency
+STRATEGY_SUCCESS_TOLERANCE = 0.05
+
 
 class AdaptiveLearningEngine:
-    """Advanced adaptive learning system for SNMP discovery optimization - File-based storage"""
+    """Advanced adaptive learning system for SNMP discovery optimization - backed by the shared learning store"""
     
-    def __init__(self, db_session=None):
-        self.db = db_session  # Keep for compatibility but don't use
-        
-        # Initialize data directory first
-        self.data_dir = Path("data/learning")
-        self.data_dir.mkdir(parents=True, exist_ok=True)
+    def __init__(self, db_session=None, store: LearningStore = None):
+        self.db = db_session  # Keep for compatibility; the store manages its own sessions
         
-        # Load config after data_dir is available
-        self.config = self._load_config()
-        
-        # File-based storage
-        self.patterns_file = self.data_dir / "learned_patterns.json"
-        self.strategies_file = self.data_dir / "discovery_strategies.json"
-        self.capabilities_file = self.data_dir / "device_capabilities.json"
-        self.history_file = self.data_dir / "discovery_history.json"
-        
-        # Initialize data structures
-        self._load_data()
+        # Shared, process-wide index loaded from the learning tables once
+        self.store = store or learning_store
+        self.store.ensure_loaded()
+        self.config = self.store.config
     
-    def _load_config(self) -> Dict:
-        """Load adaptive learning configuration"""
-        config_file = self.data_dir / "learning_config.json"
-        default_config = {
-            'learning_enabled': True,
-            'min_success_rate': 0.7,
-            'max_pattern_age_days': 30,
-            'strategy_optimization_threshold': 10
-        }
-        
-        try:
-            if config_file.exists():
-                with open(config_file, 'r') as f:
-                    config = json.load(f)
-                    # Merge with defaults
-                    for key, value in default_config.items():
-                        if key not in config:
-                            config[key] = value
-                    return config
-            else:
-                # Create default config file
-                with open(config_file, 'w') as f:
-                    json.dump(default_config, f, indent=2)
-                return default_config
-        except Exception as e:
-            logger.error(f"Error loading learning config: {e}")
-            return default_config
+    @property
+    def patterns(self) -> Dict:
+        return self.store.patterns
     
-    def _load_data(self):
-        """Load all learning data from files"""
-        self.patterns = self._load_json_file(self.patterns_file, {})
-        self.strategies = self._load_json_file(self.strategies_file, {})
-        self.capabilities = self._load_json_file(self.capabilities_file, {})
-        self.history = self._load_json_file(self.history_file, [])
+    @property
+    def strategies(self) -> Dict:
+        return self.store.strategies
     
-    def _load_json_file(self, file_path: Path, default_value):
-        """Load JSON file with error handling"""
-        try:
-            if file_path.exists():
-                with open(file_path, 'r') as f:
-                    return json.load(f)
-            else:
-                # Create file with default value
-                with open(file_path, 'w') as f:
-                    json.dump(default_value, f, indent=2)
-                return default_value
-        except Exception as e:
-            logger.error(f"Error loading {file_path}: {e}")
-            return default_value
+    @property
+    def capabilities(self) -> Dict:
+        return self.store.capabilities
     
-    def _save_json_file(self, file_path: Path, data):
-        """Save data to JSON file with error handling"""
-        try:
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving {file_path}: {e}")
+    @property
+    def rollups(self) -> Dict:
+        return self.store.rollups
     
     def learn_from_discovery(self, device_profile: Dict, data_category: str, 
                            discovered_data: Dict, strategy_used: str, 
@@ -114,30 +61,35 @@ class AdaptiveLearningEngine:
                         # For now, we'll use the sensor name as a key and store the OID separately
                         successful_oids.append(sensor_name)
             
-            # Record discovery history
-            self._record_discovery_history(
-                device_ip, vendor, model, data_category, strategy_used,
-                oids_tried or [], successful_oids, discovery_time,
-                len(discovered_data) > 0
-            )
-            
-            # Update strategy performance
-            self._update_strategy_performance(
-                vendor, model, strategy_used, data_category, discovery_time,
-                len(discovered_data) > 0
-            )
-            
-            # Learn successful patterns
-            if discovered_data:
-                self._learn_successful_patterns(
-                    vendor, model, data_category, discovered_data, oids_tried or []
+            # One consistent update of the shared index; persisted by the write-behind thread
+            with self.store.lock:
+                # Record discovery history
+                self._record_discovery_history(
+                    device_ip, vendor, model, data_category, strategy_used,
+                    oids_tried or [], successful_oids, discovery_time,
+                    len(discovered_data) > 0
+                )
+            
+                # Update strategy performance
+                self._update_strategy_performance(
+                    vendor, model, strategy_used, data_category, discovery_time,
+                    len(discovered_data) > 0
                 )
             
-            # Update device capabilities
-            self._update_device_capabilities(device_profile, data_category, discovered_data)
+                # Learn successful patterns
+                if discovered_data:
+                    self._learn_successful_patterns(
+                        vendor, model, data_category, discovered_data, oids_tried or []
+                    )
             
-            # Optimize strategies periodically
-            self._optimize_strategies(vendor, data_category)
+                # Update device capabilities
+                self._update_device_capabilities(device_profile, data_category, discovered_data)
+            
+                # Optimize strategies periodically
+                self._optimize_strategies(vendor, data_category)
+                
+                # Memoised strategy decisions for this vendor/category are now stale
+                self.store.invalidate_decisions(vendor, data_category)
             
             logger.info(f"Learning engine updated with {data_category} discovery results")
             
@@ -149,15 +101,25 @@ class AdaptiveLearningEngine:
         """Get the best discovery strategy and OIDs for a device"""
         vendor = device_profile.get('vendor', 'unknown')
         model = device_profile.get('model', 'unknown')
+        decision_key = self.store.pattern_key(vendor, model, data_category)
         
-        # Get learned patterns for this device type
-        learned_patterns = self._get_learned_patterns(vendor, model, data_category)
-        
-        # Get best performing strategy
-        best_strategy = self._get_best_strategy(vendor, model, data_category)
+        # O(1) on the hot path: decisions are memoised until new results arrive
+        decision = self.store.decisions.get(decision_key)
+        if decision is not None:
+            best_strategy, preferred_oids = decision
+            return best_strategy, list(preferred_oids)
         
-        # Get preferred OIDs from learned patterns
-        preferred_oids = self._get_preferred_oids(learned_patterns)
+        with self.store.lock:
+            # Get learned patterns for this device type
+            learned_patterns = self._get_learned_patterns(vendor, model, data_category)
+            
+            # Get best performing strategy
+            best_strategy = self._get_best_strategy(vendor, model, data_category)
+            
+            # Get preferred OIDs from learned patterns
+            preferred_oids = self._get_preferred_oids(learned_patterns)
+            
+            self.store.decisions[decision_key] = (best_strategy, tuple(preferred_oids))
         
         logger.info(f"Optimized strategy for {vendor} {model} {data_category}: "
                    f"strategy={best_strategy}, oids={len(preferred_oids)}")
@@ -203,13 +165,9 @@ class AdaptiveLearningEngine:
                 'discovered_at': datetime.utcnow().isoformat()
             }
             
-            self.history.append(history_entry)
-            
-            # Keep only last 1000 entries
-            if len(self.history) > 1000:
-                self.history = self.history[-1000:]
-            
-            self._save_json_file(self.history_file, self.history)
+            # Fixed-size ring per (vendor, model, category) with incremental rollups;
+            # the write-behind flush appends it to discovery_history and compacts the table
+            self.store.add_history(history_entry)
             
         except Exception as e:
             logger.error(f"Error recording discovery history: {e}")
@@ -219,10 +177,10 @@ class AdaptiveLearningEngine:
                                    success: bool) -> None:
         """Update strategy performance metrics"""
         try:
-            strategy_key = f"{vendor}_{strategy}_{data_category}"
+            strategy_data = self.store.get_strategy(vendor, strategy, data_category)
             
-            if strategy_key not in self.strategies:
-                self.strategies[strategy_key] = {
+            if strategy_data is None:
+                strategy_data = {
                     'vendor': vendor,
                     'model': model,
                     'strategy_name': strategy,
@@ -234,26 +192,24 @@ class AdaptiveLearningEngine:
                     'is_preferred': False
                 }
             
-            strategy_data = self.strategies[strategy_key]
-            
             if success:
                 strategy_data['success_count'] += 1
             else:
                 strategy_data['failure_count'] += 1
             
-            # Update average discovery time
+            # Update average discovery time (EWMA, so recent behaviour dominates)
             total_attempts = strategy_data['success_count'] + strategy_data['failure_count']
             if total_attempts > 1:
+                alpha = self.store.ewma_alpha
                 strategy_data['avg_discovery_time'] = (
-                    (strategy_data['avg_discovery_time'] * (total_attempts - 1) + discovery_time) 
-                    / total_attempts
+                    alpha * discovery_time + (1 - alpha) * strategy_data['avg_discovery_time']
                 )
             else:
                 strategy_data['avg_discovery_time'] = discovery_time
             
             strategy_data['last_used'] = datetime.utcnow().isoformat()
             
-            self._save_json_file(self.strategies_file, self.strategies)
+            self.store.put_strategy(strategy_data)
             
         except Exception as e:
             logger.error(f"Error updating strategy performance: {e}")
@@ -262,11 +218,11 @@ class AdaptiveLearningEngine:
                                  discovered_data: Dict, oids_tried: List[str]) -> None:
         """Learn from successful discoveries and update patterns"""
         try:
-            pattern_key = f"{vendor}_{model}_{data_category}"
             successful_oids = list(discovered_data.keys())
+            pattern = self.store.get_pattern(vendor, model, data_category)
             
-            if pattern_key not in self.patterns:
-                self.patterns[pattern_key] = {
+            if pattern is None:
+                pattern = {
                     'vendor': vendor,
                     'model': model,
                     'data_category': data_category,
@@ -277,7 +233,6 @@ class AdaptiveLearningEngine:
                     'is_active': True
                 }
             else:
-                pattern = self.patterns[pattern_key]
                 existing_oids = set(pattern['successful_oids'])
                 new_oids = set(successful_oids)
                 
@@ -287,22 +242,12 @@ class AdaptiveLearningEngine:
                 pattern['discovery_count'] += 1
                 pattern['last_successful'] = datetime.utcnow().isoformat()
                 
-                # Calculate success rate from recent history
-                recent_successes = sum(1 for h in self.history[-50:] 
-                                     if h.get('vendor') == vendor and 
-                                     h.get('model') == model and 
-                                     h.get('data_category') == data_category and 
-                                     h.get('success', False))
-                
-                recent_attempts = sum(1 for h in self.history[-50:] 
-                                    if h.get('vendor') == vendor and 
-                                    h.get('model') == model and 
-                                    h.get('data_category') == data_category)
-                
-                if recent_attempts > 0:
-                    pattern['success_rate'] = recent_successes / recent_attempts
+                # Success rate over the recent-attempts ring (maintained incrementally)
+                rollup = self.store.get_rollup(vendor, model, data_category)
+                if rollup is not None and rollup.ring:
+                    pattern['success_rate'] = rollup.success_rate
             
-            self._save_json_file(self.patterns_file, self.patterns)
+            self.store.put_pattern(pattern)
             
         except Exception as e:
             logger.error(f"Error learning successful patterns: {e}")
@@ -313,8 +258,9 @@ class AdaptiveLearningEngine:
         try:
             device_ip = device_profile.get('ip_address', 'unknown')
             
-            if device_ip not in self.capabilities:
-                self.capabilities[device_ip] = {
+            capabilities = self.capabilities.get(device_ip)
+            if capabilities is None:
+                capabilities = {
                     'device_ip': device_ip,
                     'vendor': device_profile.get('vendor', 'unknown'),
                     'model': device_profile.get('model', 'unknown'),
@@ -325,8 +271,6 @@ class AdaptiveLearningEngine:
                     'last_discovery': datetime.utcnow().isoformat()
                 }
             
-            capabilities = self.capabilities[device_ip]
-            
             if data_category not in capabilities['capabilities']:
                 capabilities['capabilities'][data_category] = []
             
@@ -338,7 +282,7 @@ class AdaptiveLearningEngine:
             capabilities['discovered_sensors'][data_category] = discovered_data
             capabilities['last_discovery'] = datetime.utcnow().isoformat()
             
-            self._save_json_file(self.capabilities_file, self.capabilities)
+            self.store.put_capabilities(device_ip, capabilities)
             
         except Exception as e:
             logger.error(f"Error updating device capabilities: {e}")
@@ -349,16 +293,14 @@ class AdaptiveLearningEngine:
             patterns = []
             
             # Get patterns for exact match first
-            pattern_key = f"{vendor}_{model}_{data_category}"
-            if pattern_key in self.patterns:
-                patterns.append(self.patterns[pattern_key])
+            exact = self.store.get_pattern(vendor, model, data_category)
+            if exact is not None:
+                patterns.append(exact)
             
             # If no exact match, get patterns for same vendor
             if not patterns:
-                for key, pattern in self.patterns.items():
-                    if (pattern.get('vendor') == vendor and 
-                        pattern.get('data_category') == data_category and 
-                        pattern.get('is_active', True)):
+                for pattern in self.store.patterns_for_vendor(vendor, data_category):
+                    if pattern.get('is_active', True):
                         patterns.append(pattern)
             
             # Sort by success rate
@@ -373,19 +315,22 @@ class AdaptiveLearningEngine:
     def _get_best_strategy(self, vendor: str, model: str, data_category: str) -> str:
         """Get the best performing strategy for a device type"""
         try:
+            # Recent behaviour of this exact device type first: success rate over
+            # its ring, ties broken by EWMA latency
+            recent = self._get_best_recent_strategy(vendor, model, data_category)
+            if recent:
+                return recent
+            
             best_strategy = 'snmp_walk'
             best_success_rate = 0.0
             
-            for key, strategy in self.strategies.items():
-                if (strategy.get('vendor') == vendor and 
-                    strategy.get('data_category') == data_category):
-                    
-                    total_attempts = strategy.get('success_count', 0) + strategy.get('failure_count', 0)
-                    if total_attempts >= self.config['strategy_optimization_threshold']:
-                        success_rate = strategy.get('success_count', 0) / total_attempts
-                        if success_rate > best_success_rate:
-                            best_success_rate = success_rate
-                            best_strategy = strategy.get('strategy_name', 'snmp_walk')
+            for strategy in self.store.strategies_for_vendor(vendor, data_category):
+                total_attempts = strategy.get('success_count', 0) + strategy.get('failure_count', 0)
+                if total_attempts >= self.config['strategy_optimization_threshold']:
+                    success_rate = strategy.get('success_count', 0) / total_attempts
+                    if success_rate > best_success_rate:
+                        best_success_rate = success_rate
+                        best_strategy = strategy.get('strategy_name', 'snmp_walk')
             
             return best_strategy
             
@@ -393,6 +338,29 @@ class AdaptiveLearningEngine:
             logger.error(f"Error getting best strategy: {e}")
             return 'snmp_walk'
     
+    def _get_best_recent_strategy(self, vendor: str, model: str, data_category: str) -> Optional[str]:
+        """Pick a strategy from the device type's rolling success rates and latencies"""
+        rollup = self.store.get_rollup(vendor, model, data_category)
+        if rollup is None:
+            return None
+        
+        # Enough recent attempts to judge, capped so a small ring can still qualify
+        min_attempts = min(self.config['strategy_optimization_threshold'], max(rollup.ring.maxlen // 5, 1))
+        candidates = [
+            (name, strategy) for name, strategy in rollup.strategies.items()
+            if strategy.recent_attempts >= min_attempts and strategy.success_rate >= self.config['min_success_rate']
+        ]
+        if not candidates:
+            return None
+        
+        # Among strategies close to the best success rate, the fastest one wins
+        best_rate = max(strategy.success_rate for _, strategy in candidates)
+        close = [(name, strategy) for name, strategy in candidates
+                 if strategy.success_rate >= best_rate - STRATEGY_SUCCESS_TOLERANCE]
+        name, _ = min(close, key=lambda item: (item[1].ewma_latency if item[1].ewma_latency is not None
+                                                else float('inf'), -item[1].success_rate))
+        return name
+    
     def _get_preferred_oids(self, patterns: List[Dict]) -> List[str]:
         """Get preferred OIDs from learned patterns"""
         preferred_oids = []
@@ -410,31 +378,26 @@ class AdaptiveLearningEngine:
             best_strategy = None
             best_success_rate = 0.0
             
-            for key, strategy in self.strategies.items():
-                if (strategy.get('vendor') == vendor and 
-                    strategy.get('data_category') == data_category):
-                    
-                    total_attempts = strategy.get('success_count', 0) + strategy.get('failure_count', 0)
-                    if total_attempts >= self.config['strategy_optimization_threshold']:
-                        success_rate = strategy.get('success_count', 0) / total_attempts
-                        if success_rate > best_success_rate:
-                            best_success_rate = success_rate
-                            best_strategy = key
+            candidates = self.store.strategies_for_vendor(vendor, data_category)
+            for strategy in candidates:
+                total_attempts = strategy.get('success_count', 0) + strategy.get('failure_count', 0)
+                if total_attempts >= self.config['strategy_optimization_threshold']:
+                    success_rate = strategy.get('success_count', 0) / total_attempts
+                    if success_rate > best_success_rate:
+                        best_success_rate = success_rate
+                        best_strategy = strategy
             
             # Mark the best strategy as preferred
             if best_strategy and best_success_rate >= self.config['min_success_rate']:
-                # Clear all preferred flags for this vendor/category
-                for key, strategy in self.strategies.items():
-                    if (strategy.get('vendor') == vendor and 
-                        strategy.get('data_category') == data_category):
-                        strategy['is_preferred'] = False
-                
-                # Set the best strategy as preferred
-                self.strategies[best_strategy]['is_preferred'] = True
-                self._save_json_file(self.strategies_file, self.strategies)
+                # Only write strategies whose preferred flag actually changes
+                for strategy in candidates:
+                    is_preferred = strategy is best_strategy
+                    if strategy.get('is_preferred', False) != is_preferred:
+                        strategy['is_preferred'] = is_preferred
+                        self.store.put_strategy(strategy)
                 
                 logger.info(f"Optimized strategy for {vendor} {data_category}: "
-                           f"{self.strategies[best_strategy]['strategy_name']} (success rate: {best_success_rate:.2f})")
+                           f"{best_strategy['strategy_name']} (success rate: {best_success_rate:.2f})")
             
         except Exception as e:
             logger.error(f"Error optimizing strategies: {e}")
@@ -442,24 +405,36 @@ class AdaptiveLearningEngine:
     def get_learning_statistics(self) -> Dict:
         """Get learning system statistics"""
         try:
+            week_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
+            with self.store.lock:
+                rollups = list(self.rollups.items())
+                strategies = list(self.strategies.values())
+            
+            # Cumulative counts live in the (persisted) strategy counters; the
+            # rings only hold the most recent attempts per device type
+            vendor_counts = {}
+            for strategy in strategies:
+                vendor = strategy.get('vendor', 'unknown')
+                vendor_counts[vendor] = (vendor_counts.get(vendor, 0)
+                                         + strategy.get('success_count', 0) + strategy.get('failure_count', 0))
+            
             stats = {
                 'total_patterns': len(self.patterns),
                 'total_strategies': len(self.strategies),
                 'total_devices': len(self.capabilities),
-                'total_discoveries': len(self.history),
-                'recent_discoveries': len([h for h in self.history 
-                                         if datetime.fromisoformat(h['discovered_at']) > 
-                                         datetime.utcnow() - timedelta(days=7)]),
+                'total_discoveries': sum(vendor_counts.values()),
+                'recent_discoveries': sum(
+                    1 for _, rollup in rollups for entry in rollup.ring
+                    if (entry.get('discovered_at') or '') > week_ago
+                ),
+                'device_types': {
+                    f"{vendor}/{model}/{category}": rollup.to_dict()
+                    for (vendor, model, category), rollup in rollups
+                },
                 'top_vendors': [],
                 'top_strategies': []
             }
             
-            # Get top vendors by discovery count
-            vendor_counts = {}
-            for entry in self.history:
-                vendor = entry.get('vendor', 'unknown')
-                vendor_counts[vendor] = vendor_counts.get(vendor, 0) + 1
-            
             stats['top_vendors'] = [
                 {'vendor': vendor, 'count': count} 
                 for vendor, count in sorted(vendor_counts.items(), key=lambda x: x[1], reverse=True)[:5]
@@ -467,7 +442,7 @@ class AdaptiveLearningEngine:
             
             # Get top strategies by success rate
             strategy_stats = []
-            for key, strategy in self.strategies.items():
+            for strategy in strategies:
                 total_attempts = strategy.get('success_count', 0) + strategy.get('failure_count', 0)
                 if total_attempts >= 5:
                     success_rate = strategy.get('success_count', 0) / total_attempts
@@ -7,6 +7,7 @@ This package contains all agent-related business logic services:
 - Authentication and authorization
 - Token management
 - SNMP discovery operations
+- Job delivery to agents (websocket push, long-poll fallback)
 """
 
 from .agent_service import AgentService
@@ -14,15 +15,17 @@ from .agent_discovery_service import AgentDiscoveryService
 from .agent_auth_service import AgentAuthService
 from .agent_token_service import AgentTokenService
 from .snmp_discovery_service import SNMPDiscoveryService
+from .agent_job_dispatcher import AgentJobDispatcher, agent_job_dispatcher
 
 __all__ = [
     "AgentService",
     "AgentDiscoveryService", 
     "AgentAuthService",
     "AgentTokenService",
-    "SNMPDiscoveryService"
+    "SNMPDiscoveryService",
+    "AgentJobDispatcher",
+    "agent_job_dispatcher"
 ]
 
 # Initialize global state variables that need to be shared across services
-pending_discovery_requests = {}
 discovery_sessions = {} 
\ No newline at end of file
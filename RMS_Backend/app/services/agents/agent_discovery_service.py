@@ -3,28 +3,43 @@ Agent Discovery Service - Discovery logic and global state management
 
 This service handles all agent discovery operations:
 - Discovery session management
-- Global state for pending requests and sessions
+- Global state for discovery sessions (jobs live in the agent job queue)
 - Discovery progress tracking
 - Agent assignment and coordination
 """
 
+import asyncio
+import json
 import logging
-from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
 from fastapi import HTTPException
 
-from app.models.base import Agent
+from app.core.database import SessionLocal
+from app.models.base import Agent, AgentResultBatch
 from app.schemas.agents.discovery import AgentDiscoveryRequest
+from app.services.agents.agent_job_dispatcher import agent_job_dispatcher
 
 
 class AgentDiscoveryService:
     """Service class for agent discovery operations and state management"""
     
-    def __init__(self):
+    def __init__(self, session_factory: sessionmaker = SessionLocal, batch_retention: timedelta = timedelta(days=7)):
+        """
+        Args:
+            session_factory: Sessions on the database holding agent_result_batches
+            batch_retention: How long ingested result batches are kept
+                when their session is never cleaned up
+        """
         # Global state variables - these will be shared across the application
-        self.pending_discovery_requests = {}
         self.discovery_sessions = {}
+        self.session_factory = session_factory
+        self.batch_retention = batch_retention
+        self._last_batch_prune: Optional[float] = None
         self.logger = logging.getLogger(__name__)
     
     async def start_discovery_on_agent(
@@ -51,8 +66,8 @@ class AgentDiscoveryService:
                 "agent_index": discovery_data.agent_ids.index(agent.id)
             }
             
-            # Store the discovery request for the agent to pick up
-            self.pending_discovery_requests[agent.id] = agent_discovery_request
+            # Queue the request; it is pushed to the agent and survives restarts
+            job_id = await asyncio.to_thread(agent_job_dispatcher.enqueue, agent.id, agent_discovery_request)
             
             # Also store the network_id in the discovery session immediately
             if session_id not in self.discovery_sessions:
@@ -66,8 +81,7 @@ class AgentDiscoveryService:
             
             self.logger.info(f"🔍 DEBUG: Stored discovery request for agent {agent.name} (ID: {agent.id}) for session {session_id}")
             self.logger.info(f"🔍 DEBUG: Assigned IPs: {assigned_ips}")
-            self.logger.info(f"🔍 DEBUG: Total pending requests: {len(self.pending_discovery_requests)}")
-            self.logger.info(f"🔍 DEBUG: Pending requests keys: {list(self.pending_discovery_requests.keys())}")
+            self.logger.info(f"🔍 DEBUG: Queued as job {job_id}")
             
             return {
                 "agent_id": agent.id,
@@ -87,10 +101,25 @@ class AgentDiscoveryService:
     
     async def get_discovery_status(
         self, 
-        session_id: str
+        session_id: str,
+        include_results: bool = True
     ) -> Dict[str, Any]:
-        """Get the status of a discovery session."""
+        """
+        Get the status of a discovery session.
+        
+        Devices and errors of streamed result batches are read from
+        agent_result_batches, so they are complete whichever worker
+        ingested each batch.
+        
+        Args:
+            include_results: Load the stored batch results (skip for a
+                progress-only lookup)
+        """
         try:
+            batch_devices, batch_errors = [], []
+            if include_results:
+                batch_devices, batch_errors = await asyncio.to_thread(self._load_batch_results, session_id)
+            
             # Check for discovery session in memory storage
             if session_id in self.discovery_sessions:
                 session_data = self.discovery_sessions[session_id]
@@ -98,8 +127,10 @@ class AgentDiscoveryService:
                     "session_id": session_id,
                     "status": session_data.get("status", "in_progress"),
                     "progress": session_data.get("progress", 0),
-                    "discovered_devices": session_data.get("discovered_devices", []),
-                    "errors": session_data.get("errors", []),
+                    "processed_ips": session_data.get("processed_ips", 0),
+                    "total_ips": session_data.get("total_ips"),
+                    "discovered_devices": session_data.get("discovered_devices", []) + batch_devices,
+                    "errors": session_data.get("errors", []) + batch_errors,
                     "started_at": session_data.get("started_at", datetime.now(timezone.utc)),
                     "estimated_completion": session_data.get("estimated_completion")
                 }
@@ -109,8 +140,8 @@ class AgentDiscoveryService:
                 "session_id": session_id,
                 "status": "in_progress",
                 "progress": 0,
-                "discovered_devices": [],
-                "errors": [],
+                "discovered_devices": batch_devices,
+                "errors": batch_errors,
                 "started_at": datetime.now(timezone.utc),
                 "estimated_completion": None
             }
@@ -123,15 +154,63 @@ class AgentDiscoveryService:
         session_id: str, 
         progress: int, 
         discovered_devices: List[Dict] = None,
-        errors: List[str] = None
+        errors: List[str] = None,
+        agent_id: int = None,
+        processed_ips: int = None,
+        total_ips: int = None,
+        discovered_count: int = None,
+        coalesced_updates: int = 1
     ) -> bool:
-        """Update discovery progress for a session."""
+        """
+        Update discovery progress for a session.
+        
+        Agents post coalesced updates (one per several hosts or seconds), so
+        an agent-reported session is created on its first update and the
+        session progress is aggregated over all agents working on it.
+        
+        Args:
+            agent_id: Reporting agent (None for an unattributed update)
+            processed_ips: Addresses the agent has finished
+            total_ips: Addresses assigned to the agent
+            discovered_count: Devices the agent has found so far
+            coalesced_updates: Per-host updates folded into this one
+        """
         try:
             if session_id not in self.discovery_sessions:
-                return False
+                if agent_id is None:
+                    return False
+                self.discovery_sessions[session_id] = {
+                    "started_at": datetime.now(timezone.utc),
+                    "discovered_devices": [],
+                    "errors": []
+                }
             
             session = self.discovery_sessions[session_id]
+            
+            if agent_id is not None:
+                agents = session.setdefault("agent_progress", {})
+                previous = agents.get(agent_id, {})
+                # A delayed or retried post never moves an agent backwards
+                agents[agent_id] = {
+                    "progress": max(progress, previous.get("progress", 0)),
+                    "processed_ips": max(processed_ips or 0, previous.get("processed_ips", 0)),
+                    "total_ips": total_ips or previous.get("total_ips"),
+                    "discovered_count": max(discovered_count or 0, previous.get("discovered_count", 0)),
+                    "updated_at": datetime.now(timezone.utc)
+                }
+                totals = [state["total_ips"] for state in agents.values()]
+                if all(totals):
+                    processed = sum(state["processed_ips"] for state in agents.values())
+                    progress = int(processed * 100 / sum(totals))
+                else:
+                    progress = min(state["progress"] for state in agents.values())
+                session["processed_ips"] = sum(state["processed_ips"] for state in agents.values())
+                session["total_ips"] = sum(totals) if all(totals) else None
+                session["discovered_count"] = sum(state["discovered_count"] for state in agents.values())
+            else:
+                progress = max(progress, session.get("progress", 0))
             session["progress"] = progress
+            session["updates_received"] = session.get("updates_received", 0) + coalesced_updates
             
             if discovered_devices:
                 session["discovered_devices"].extend(discovered_devices)
@@ -152,23 +231,163 @@ class AgentDiscoveryService:
             self.logger.error(f"Error updating discovery progress: {e}")
             return False
     
+    async def ingest_result_batch(
+        self,
+        session_id: str,
+        agent_id: int,
+        sequence: int,
+        discovered_devices: List[Dict] = None,
+        errors: List[str] = None,
+        final: bool = False,
+        total_batches: int = None
+    ) -> Dict[str, Any]:
+        """
+        Ingest one streamed result batch exactly once.
+        
+        Batches are stored with their devices and errors in
+        agent_result_batches, keyed by (session, agent, sequence): a batch the
+        agent re-sends because it missed the acknowledgement is acknowledged
+        again without being added twice, whichever worker it reaches and
+        across restarts.
+        
+        Args:
+            agent_id: Sending agent
+            sequence: Batch number within the agent's stream (from 0)
+            final: Last batch of the stream; total_batches is then set
+        
+        Returns:
+            Acknowledgement with the batches received and whether the agent's
+            stream is complete
+        """
+        if session_id not in self.discovery_sessions:
+            self.discovery_sessions[session_id] = {
+                "started_at": datetime.now(timezone.utc),
+                "discovered_devices": [],
+                "errors": []
+            }
+        duplicate, received, expected = await asyncio.to_thread(
+            self._record_batch, session_id, agent_id, sequence,
+            discovered_devices or [], errors or [], total_batches if final else None
+        )
+        
+        complete = expected is not None and received >= expected
+        if complete and not duplicate:
+            self.logger.info(f"Result stream of agent {agent_id} for session {session_id} complete: "
+                             f"{expected} batches")
+        
+        return {
+            "session_id": session_id,
+            "acked": sequence,
+            "duplicate": duplicate,
+            "received_batches": received,
+            "complete": complete
+        }
+    
+    def _record_batch(
+        self,
+        session_id: str,
+        agent_id: int,
+        sequence: int,
+        discovered_devices: List[Dict],
+        errors: List[str],
+        total_batches: Optional[int]
+    ):
+        """
+        Store a batch with its payload; the unique constraint decides duplicates.
+        
+        Returns:
+            (duplicate, batches received, total batches or None while unknown)
+        """
+        self._prune_batches()
+        db = self.session_factory()
+        try:
+            db.add(AgentResultBatch(
+                session_id=session_id, agent_id=agent_id, sequence=sequence, total_batches=total_batches,
+                discovered_devices=json.loads(json.dumps(discovered_devices, default=str)),
+                errors=[str(error) for error in errors]
+            ))
+            try:
+                db.commit()
+                duplicate = False
+            except IntegrityError:
+                # Already ingested here, by another worker or before a restart
+                db.rollback()
+                duplicate = True
+                if total_batches is not None:
+                    db.query(AgentResultBatch).filter(
+                        AgentResultBatch.session_id == session_id,
+                        AgentResultBatch.agent_id == agent_id,
+                        AgentResultBatch.sequence == sequence
+                    ).update({AgentResultBatch.total_batches: total_batches})
+                    db.commit()
+            received, expected = db.query(
+                func.count(AgentResultBatch.id), func.max(AgentResultBatch.total_batches)
+            ).filter(
+                AgentResultBatch.session_id == session_id,
+                AgentResultBatch.agent_id == agent_id
+            ).one()
+            return duplicate, received, expected
+        finally:
+            db.close()
+    
+    def _load_batch_results(self, session_id: str) -> Tuple[List[Dict], List[str]]:
+        """Devices and errors of a session's ingested batches, in stream order."""
+        db = self.session_factory()
+        try:
+            rows = db.query(AgentResultBatch.discovered_devices, AgentResultBatch.errors).filter(
+                AgentResultBatch.session_id == session_id
+            ).order_by(AgentResultBatch.agent_id, AgentResultBatch.sequence).all()
+        finally:
+            db.close()
+        devices, errors = [], []
+        for batch_devices, batch_errors in rows:
+            devices.extend(batch_devices or [])
+            errors.extend(batch_errors or [])
+        return devices, errors
+    
+    def _delete_batches(self, session_id: str) -> int:
+        db = self.session_factory()
+        try:
+            deleted = db.query(AgentResultBatch).filter(
+                AgentResultBatch.session_id == session_id
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+    
+    def _prune_batches(self) -> None:
+        """Hourly, drop batches of sessions that were never cleaned up."""
+        if self._last_batch_prune is not None and time.monotonic() - self._last_batch_prune < 3600:
+            return
+        self._last_batch_prune = time.monotonic()
+        db = self.session_factory()
+        try:
+            pruned = db.query(AgentResultBatch).filter(
+                AgentResultBatch.received_at < datetime.utcnow() - self.batch_retention
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        if pruned:
+            self.logger.info(f"Pruned {pruned} expired discovery result batches")
+    
     async def get_pending_discovery_request(
         self, 
         agent_id: int
     ) -> Optional[Dict[str, Any]]:
-        """Get pending discovery request for an agent."""
-        return self.pending_discovery_requests.get(agent_id)
+        """Get the next open discovery request of an agent."""
+        pending = await asyncio.to_thread(agent_job_dispatcher.pending, agent_id)
+        jobs = [job for job in pending if job.get("type") == "discovery"]
+        return jobs[0] if jobs else None
     
     async def remove_pending_discovery_request(
         self, 
         agent_id: int
     ) -> bool:
-        """Remove pending discovery request for an agent after completion."""
+        """Cancel an agent's open discovery requests."""
         try:
-            if agent_id in self.pending_discovery_requests:
-                del self.pending_discovery_requests[agent_id]
-                return True
-            return False
+            return await asyncio.to_thread(agent_job_dispatcher.cancel, agent_id, job_type="discovery") > 0
         except Exception as e:
             self.logger.error(f"Error removing pending discovery request: {e}")
             return False
@@ -177,12 +396,13 @@ class AgentDiscoveryService:
         self, 
         session_id: str
     ) -> bool:
-        """Clean up a completed discovery session."""
+        """Clean up a completed discovery session and its stored result batches."""
         try:
+            deleted = await asyncio.to_thread(self._delete_batches, session_id)
             if session_id in self.discovery_sessions:
                 del self.discovery_sessions[session_id]
                 return True
-            return False
+            return deleted > 0
         except Exception as e:
             self.logger.error(f"Error cleaning up discovery session: {e}")
             return False
@@ -192,11 +412,13 @@ class AgentDiscoveryService:
         return self.discovery_sessions.copy()
     
     async def get_all_pending_requests(self) -> Dict[int, Any]:
-        """Get all pending discovery requests."""
-        return self.pending_discovery_requests.copy()
+        """Get each agent's next open job (discovery or status test)."""
+        requests = {}
+        for job in await asyncio.to_thread(agent_job_dispatcher.pending):
+            requests.setdefault(job["agent_id"], job)
+        return requests
     
     async def reset_discovery_state(self) -> None:
-        """Reset all discovery state (useful for testing or system restart)."""
-        self.pending_discovery_requests.clear()
+        """Reset in-memory discovery state (useful for testing); queued agent jobs are kept."""
         self.discovery_sessions.clear()
         self.logger.info("Discovery state reset completed") 
\ No newline at end of file
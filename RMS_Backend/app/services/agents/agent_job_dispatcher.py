@@ -0,0 +1,436 @@
+"""
+Agent Job Dispatcher - Durable job queue and push delivery for agents
+
+Jobs for an agent (discovery requests, status tests) are rows of the
+agent_jobs table, so they survive restarts and are shared by every API
+worker process:
+- enqueue() queues a job with a priority; an identical open status test of
+  the same agent is merged into the queued one instead of stacking up
+- Jobs are leased highest priority first. A leased job is invisible for
+  visibility_timeout seconds and handed out again when the agent does not
+  acknowledge it in time, until max_attempts deliveries went unanswered
+- ack() completes (or fails) a job once the agent has taken it;
+  acknowledge() applies the agent's ack status (only "accepted" succeeds)
+  for both the websocket and the HTTP ack path
+- Delivery is pushed: the websocket sender task of a connected agent and
+  parked long polls (GET /agents/{agent_id}/pending-discovery?wait=N) wait on
+  the agent's queue. Enqueues in this process wake them directly; enqueues
+  in other workers arrive through PostgreSQL LISTEN/NOTIFY, and a periodic
+  sweep picks up expired leases and anything a notification missed
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.database import SessionLocal
+from app.models.base import AgentJob
+
+# Longest a long-poll request is parked, kept below common proxy idle timeouts
+LONG_POLL_MAX_WAIT = 30.0
+
+# User-triggered work overtakes background monitoring
+PRIORITY_BACKGROUND = 0
+PRIORITY_USER = 10
+
+NOTIFY_CHANNEL = "agent_jobs"
+OPEN_STATES = ("queued", "leased")
+
+# Ack status with which an agent takes a job; any other status fails it
+ACK_ACCEPTED = "accepted"
+
+
+def status_test_dedup_key(job: Dict[str, Any]) -> str:
+    """Key under which status tests of the same devices are merged."""
+    device_ids = sorted(str(device.get("id", device.get("ip"))) for device in job.get("devices", []))
+    digest = hashlib.sha1(",".join(device_ids).encode()).hexdigest()[:16]
+    return f"status_test:{job.get('network_id')}:{digest}"
+
+
+class AgentJobDispatcher:
+    """DB-backed per-agent job queue with lease/ack and push wake-ups."""
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal, visibility_timeout: float = 60.0,
+                 max_attempts: int = 5, sweep_interval: float = 5.0, retention: timedelta = timedelta(days=7)):
+        """
+        Args:
+            session_factory: Sessions on the database holding agent_jobs
+            visibility_timeout: Seconds a handed-out job waits for its ack
+                before it is handed out again
+            max_attempts: Unacknowledged deliveries before a job is failed
+            sweep_interval: Seconds between checks for expired leases
+            retention: How long finished jobs are kept
+        """
+        self.session_factory = session_factory
+        self.engine = session_factory.kw.get("bind")
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self.retention = retention
+
+        self._waiters: Dict[int, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._sockets: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._running = False
+        self._last_cleanup = 0.0
+        self.stats = {"enqueued": 0, "deduplicated": 0, "leased": 0, "released": 0,
+                      "acked": 0, "failed": 0, "notifications": 0}
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def _postgres(self) -> bool:
+        return self.engine is not None and self.engine.dialect.name == "postgresql"
+
+    def enqueue(self, agent_id: int, job: Dict[str, Any], priority: int = PRIORITY_USER,
+                dedup_key: Optional[str] = None) -> str:
+        """
+        Queue a job for an agent and wake whoever waits for it.
+
+        Args:
+            agent_id: Agent that runs the job
+            job: Job payload; its "type" is sent to the agent unchanged
+            priority: Higher priorities are handed out first
+            dedup_key: Open jobs of the agent with the same key are merged
+                (derived automatically for status tests)
+
+        Returns:
+            The job id (of the existing job when merged)
+        """
+        job_type = job.get("type", "unknown")
+        if dedup_key is None and job_type == "status_test":
+            dedup_key = status_test_dedup_key(job)
+        payload = json.loads(json.dumps(job, default=str))
+
+        db = self.session_factory()
+        try:
+            existing = self._open_duplicate(db, agent_id, dedup_key, priority)
+            if existing:
+                return existing
+
+            now = datetime.utcnow()
+            job_id = uuid.uuid4().hex
+            db.add(AgentJob(
+                job_id=job_id, agent_id=agent_id, job_type=job_type, payload=payload, priority=priority,
+                dedup_key=dedup_key, max_attempts=self.max_attempts, available_at=now, created_at=now
+            ))
+            try:
+                db.flush()
+            except IntegrityError:
+                # Another worker queued the same job between the check and the insert
+                db.rollback()
+                existing = self._open_duplicate(db, agent_id, dedup_key, priority)
+                if existing:
+                    return existing
+                raise
+            if self._postgres:
+                db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                           {"channel": NOTIFY_CHANNEL, "payload": str(agent_id)})
+            db.commit()
+        finally:
+            db.close()
+
+        self.stats["enqueued"] += 1
+        self._wake(agent_id)
+        self.logger.info(f"Queued {job_type} job {job_id} for agent {agent_id} (priority {priority}, "
+                         f"{'websocket' if self.is_connected(agent_id) else 'long poll'})")
+        return job_id
+
+    def _open_duplicate(self, db: Session, agent_id: int, dedup_key: Optional[str], priority: int) -> Optional[str]:
+        if not dedup_key:
+            return None
+        row = db.query(AgentJob).filter(
+            AgentJob.agent_id == agent_id,
+            AgentJob.dedup_key == dedup_key,
+            AgentJob.state.in_(OPEN_STATES)
+        ).first()
+        if row is None:
+            return None
+        job_id = row.job_id
+        if priority > row.priority:
+            row.priority = priority
+            db.commit()
+        self.stats["deduplicated"] += 1
+        self.logger.debug(f"Merged duplicate job for agent {agent_id} into {job_id}")
+        return job_id
+
+    def lease(self, agent_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Hand out the agent's due jobs, invisible to other consumers until acked or expired."""
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            exhausted = db.query(AgentJob).filter(
+                AgentJob.agent_id == agent_id,
+                AgentJob.state == "leased",
+                AgentJob.lease_expires_at <= now,
+                AgentJob.attempts >= AgentJob.max_attempts
+            ).update({
+                AgentJob.state: "failed",
+                AgentJob.completed_at: now,
+                AgentJob.last_error: "Not acknowledged by the agent"
+            }, synchronize_session=False)
+            if exhausted:
+                self.stats["failed"] += exhausted
+                self.logger.warning(f"{exhausted} jobs of agent {agent_id} failed: never acknowledged")
+
+            rows = db.query(AgentJob).filter(
+                AgentJob.agent_id == agent_id,
+                or_(
+                    and_(AgentJob.state == "queued", AgentJob.available_at <= now),
+                    and_(AgentJob.state == "leased", AgentJob.lease_expires_at <= now)
+                )
+            ).order_by(AgentJob.priority.desc(), AgentJob.id).limit(limit).with_for_update(skip_locked=True).all()
+
+            jobs = []
+            for row in rows:
+                row.state = "leased"
+                row.attempts += 1
+                row.lease_expires_at = now + timedelta(seconds=self.visibility_timeout)
+                jobs.append({**row.payload, "job_id": row.job_id, "priority": row.priority, "attempt": row.attempts})
+            db.commit()
+        finally:
+            db.close()
+        self.stats["leased"] += len(jobs)
+        return jobs
+
+    def release(self, agent_id: int, jobs: List[Dict[str, Any]]) -> None:
+        """Return leased jobs that never reached the agent to the queue."""
+        job_ids = [job["job_id"] for job in jobs]
+        if not job_ids:
+            return
+        db = self.session_factory()
+        try:
+            released = db.query(AgentJob).filter(
+                AgentJob.agent_id == agent_id,
+                AgentJob.job_id.in_(job_ids),
+                AgentJob.state == "leased"
+            ).update({
+                AgentJob.state: "queued",
+                AgentJob.attempts: AgentJob.attempts - 1,
+                AgentJob.lease_expires_at: None
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        self.stats["released"] += released
+        self._wake(agent_id)
+
+    def ack(self, agent_id: int, job_id: str, success: bool = True, error: Optional[str] = None) -> bool:
+        """Complete a job the agent has taken (idempotent); False for unknown jobs."""
+        db = self.session_factory()
+        try:
+            row = db.query(AgentJob).filter(AgentJob.job_id == job_id, AgentJob.agent_id == agent_id).first()
+            if row is None:
+                return False
+            if row.state in OPEN_STATES:
+                row.state = "done" if success else "failed"
+                row.completed_at = datetime.utcnow()
+                row.last_error = error
+                db.commit()
+                self.stats["acked" if success else "failed"] += 1
+            return True
+        finally:
+            db.close()
+
+    def acknowledge(self, agent_id: int, job_id: str, status: Optional[str] = ACK_ACCEPTED,
+                    error: Optional[str] = None) -> bool:
+        """Apply an agent's job ack: the job is done when it was accepted and failed otherwise."""
+        return self.ack(agent_id, job_id, success=status == ACK_ACCEPTED, error=error)
+
+    def cancel(self, agent_id: int, job_type: Optional[str] = None) -> int:
+        """Fail the agent's open jobs (of one type); returns how many were cancelled."""
+        db = self.session_factory()
+        try:
+            query = db.query(AgentJob).filter(AgentJob.agent_id == agent_id, AgentJob.state.in_(OPEN_STATES))
+            if job_type:
+                query = query.filter(AgentJob.job_type == job_type)
+            cancelled = query.update({
+                AgentJob.state: "failed",
+                AgentJob.completed_at: datetime.utcnow(),
+                AgentJob.last_error: "Cancelled"
+            }, synchronize_session=False)
+            db.commit()
+            return cancelled
+        finally:
+            db.close()
+
+    def pending(self, agent_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Open (queued or leased) jobs, of one agent or all, in hand-out order."""
+        db = self.session_factory()
+        try:
+            query = db.query(AgentJob).filter(AgentJob.state.in_(OPEN_STATES))
+            if agent_id is not None:
+                query = query.filter(AgentJob.agent_id == agent_id)
+            return [
+                {**row.payload, "job_id": row.job_id, "agent_id": row.agent_id, "state": row.state,
+                 "priority": row.priority, "attempts": row.attempts}
+                for row in query.order_by(AgentJob.priority.desc(), AgentJob.id).all()
+            ]
+        finally:
+            db.close()
+
+    async def wait_for_jobs(self, agent_id: int, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Lease the agent's due jobs, waiting for one to become due if there are none.
+
+        Args:
+            agent_id: Agent whose queue is leased
+            timeout: Seconds to wait for a job (None waits indefinitely, 0 returns at once)
+
+        Returns:
+            The leased jobs, empty when the wait expired
+        """
+        self._ensure_listener()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        while True:
+            future = loop.create_future()
+            waiter = (loop, future)
+            # Registered before leasing, so an enqueue in between is not missed
+            with self._lock:
+                self._waiters.setdefault(agent_id, []).append(waiter)
+            try:
+                jobs = await asyncio.to_thread(self.lease, agent_id)
+                if jobs:
+                    return jobs
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                await asyncio.wait({future}, timeout=remaining)
+                if not future.done():
+                    return []
+            finally:
+                with self._lock:
+                    waiters = self._waiters.get(agent_id, [])
+                    if waiter in waiters:
+                        waiters.remove(waiter)
+                    if not waiters:
+                        self._waiters.pop(agent_id, None)
+
+    def _wake(self, agent_id: int) -> None:
+        with self._lock:
+            waiters = self._waiters.pop(agent_id, [])
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def _ensure_listener(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._listener = threading.Thread(target=self._listen, name="agent-job-listener", daemon=True)
+            self._listener.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            self._running = False
+        if self._listener:
+            self._listener.join(timeout)
+            self._listener = None
+
+    def _listen(self) -> None:
+        while self._running:
+            try:
+                if self._postgres:
+                    self._listen_postgres()
+                else:
+                    time.sleep(self.sweep_interval)
+                    self._sweep()
+            except Exception as e:
+                self.logger.warning(f"Agent job listener error: {e}")
+                time.sleep(self.sweep_interval)
+
+    def _listen_postgres(self) -> None:
+        """Wake local waiters on NOTIFYs from other workers; sweep in between."""
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            raw = connection.connection.dbapi_connection
+            raw.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+            next_sweep = time.monotonic() + self.sweep_interval
+            while self._running:
+                readable, _, _ = select.select([raw], [], [], max(next_sweep - time.monotonic(), 0))
+                if readable:
+                    raw.poll()
+                    while raw.notifies:
+                        notification = raw.notifies.pop(0)
+                        self.stats["notifications"] += 1
+                        self._wake(int(notification.payload))
+                if time.monotonic() >= next_sweep:
+                    self._sweep()
+                    next_sweep = time.monotonic() + self.sweep_interval
+
+    def _sweep(self) -> None:
+        """Wake waiters whose agents have due jobs (expired leases, missed notifies); prune old jobs."""
+        with self._lock:
+            waiting = list(self._waiters)
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            if waiting:
+                due = db.query(AgentJob.agent_id).filter(
+                    AgentJob.agent_id.in_(waiting),
+                    or_(
+                        and_(AgentJob.state == "queued", AgentJob.available_at <= now),
+                        and_(AgentJob.state == "leased", AgentJob.lease_expires_at <= now)
+                    )
+                ).distinct().all()
+                for (agent_id,) in due:
+                    self._wake(agent_id)
+            if time.monotonic() - self._last_cleanup >= 3600:
+                self._last_cleanup = time.monotonic()
+                pruned = db.query(AgentJob).filter(
+                    AgentJob.state.in_(("done", "failed")),
+                    AgentJob.completed_at < now - self.retention
+                ).delete(synchronize_session=False)
+                db.commit()
+                if pruned:
+                    self.logger.info(f"Pruned {pruned} finished agent jobs")
+        finally:
+            db.close()
+
+    def register_socket(self, agent_id: int) -> None:
+        with self._lock:
+            self._sockets[agent_id] = self._sockets.get(agent_id, 0) + 1
+
+    def unregister_socket(self, agent_id: int) -> None:
+        with self._lock:
+            count = self._sockets.get(agent_id, 0) - 1
+            if count > 0:
+                self._sockets[agent_id] = count
+            else:
+                self._sockets.pop(agent_id, None)
+
+    def is_connected(self, agent_id: int) -> bool:
+        """Whether the agent holds a websocket to this worker."""
+        with self._lock:
+            return bool(self._sockets.get(agent_id))
+
+    def get_info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connected_agents": len(self._sockets),
+                "waiting_agents": len(self._waiters),
+                **self.stats
+            }
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+# Global agent job dispatcher instance
+agent_job_dispatcher = AgentJobDispatcher()
@@ -12,6 +12,7 @@ import logging
 import ipaddress
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from app.utils.device_classifier import device_classifier
 
 # SNMP imports - these will be imported when needed to avoid dependency issues
 # from pysnmp.hlapi import *
@@ -111,6 +112,7 @@ class SNMPDiscoveryService:
                 SnmpEngine, UsmUserData, UdpTransportTarget, ContextData,
                 ObjectType, ObjectIdentity, getCmd
             )
+            from app.core.snmp_session import share_mib_compiler
             
             security_level = snmp_config.get('security_level', 'noAuthNoPriv')
             username = snmp_config.get('username', '')
@@ -149,7 +151,7 @@ class SNMPDiscoveryService:
             
             # Query device
             for (errorIndication, errorStatus, errorIndex, varBinds) in getCmd(
-                SnmpEngine(),
+                share_mib_compiler(SnmpEngine()),
                 user_data,
                 UdpTransportTarget((ip_address, port), timeout=3, retries=1),
                 ContextData(),
@@ -178,6 +180,7 @@ class SNMPDiscoveryService:
                 location = str(varBinds[2][1]) if len(varBinds) > 2 and varBinds[2][1] else 'Unknown'
                 contact = str(varBinds[3][1]) if len(varBinds) > 3 and varBinds[3][1] else 'Unknown'
                 uptime = str(varBinds[5][1]) if len(varBinds) > 5 and varBinds[5][1] else 'Unknown'
+                sys_object_id = str(varBinds[4][1]) if len(varBinds) > 4 and varBinds[4][1] else ''
                 
                 device_info = {
                     'ip_address': ip_address,
@@ -185,9 +188,9 @@ class SNMPDiscoveryService:
                     'description': description,
                     'location': self.extract_device_location(description, location),
                     'contact': self.extract_device_contact(description, contact),
-                    'object_id': str(varBinds[4][1]) if len(varBinds) > 4 and varBinds[4][1] else 'Unknown',
+                    'object_id': sys_object_id or 'Unknown',
                     'uptime': self.extract_device_uptime(uptime),
-                    'device_type': self.detect_device_type(description),
+                    'device_type': self.detect_device_type(description, sys_object_id),
                     'os_version': self.extract_os_version(description),
                     'serial_number': self.extract_serial_number(description),
                     'discovery_method': 'snmp',
@@ -220,6 +223,7 @@ class SNMPDiscoveryService:
                 SnmpEngine, CommunityData, UdpTransportTarget, ContextData,
                 ObjectType, ObjectIdentity, getCmd
             )
+            from app.core.snmp_session import share_mib_compiler
             
             # SNMP OIDs to query
             oids = [
@@ -239,7 +243,7 @@ class SNMPDiscoveryService:
             
             # Query device
             for (errorIndication, errorStatus, errorIndex, varBinds) in getCmd(
-                SnmpEngine(),
+                share_mib_compiler(SnmpEngine()),
                 community_data,
                 UdpTransportTarget((ip_address, port), timeout=3, retries=1),
                 ContextData(),
@@ -260,6 +264,7 @@ class SNMPDiscoveryService:
                 location = str(varBinds[2][1]) if len(varBinds) > 2 and varBinds[2][1] else 'Unknown'
                 contact = str(varBinds[3][1]) if len(varBinds) > 3 and varBinds[3][1] else 'Unknown'
                 uptime = str(varBinds[5][1]) if len(varBinds) > 5 and varBinds[5][1] else 'Unknown'
+                sys_object_id = str(varBinds[4][1]) if len(varBinds) > 4 and varBinds[4][1] else ''
                 
                 device_info = {
                     'ip_address': ip_address,
@@ -267,9 +272,9 @@ class SNMPDiscoveryService:
                     'description': description,
                     'location': self.extract_device_location(description, location),
                     'contact': self.extract_device_contact(description, contact),
-                    'object_id': str(varBinds[4][1]) if len(varBinds) > 4 and varBinds[4][1] else 'Unknown',
+                    'object_id': sys_object_id or 'Unknown',
                     'uptime': self.extract_device_uptime(uptime),
-                    'device_type': self.detect_device_type(description),
+                    'device_type': self.detect_device_type(description, sys_object_id),
                     'os_version': self.extract_os_version(description),
                     'serial_number': self.extract_serial_number(description),
                     'discovery_method': 'snmp',
@@ -389,34 +394,11 @@ class SNMPDiscoveryService:
         except (ValueError, TypeError):
             return uptime
     
-    def detect_device_type(self, description: str) -> str:
-        """Detect device type from description"""
-        if not description:
+    def detect_device_type(self, description: str, sys_object_id: str = '') -> str:
+        """Detect device type from sysObjectID, falling back to the description"""
+        if not description and not sys_object_id:
             return 'Unknown'
-        
-        description_lower = description.lower()
-        
-        # Router detection
-        if any(keyword in description_lower for keyword in ['router', 'gateway', 'border']):
-            return 'Router'
-        
-        # Switch detection
-        if any(keyword in description_lower for keyword in ['switch', 'catalyst', 'nexus']):
-            return 'Switch'
-        
-        # Firewall detection
-        if any(keyword in description_lower for keyword in ['firewall', 'asa', 'palo alto']):
-            return 'Firewall'
-        
-        # Server detection
-        if any(keyword in description_lower for keyword in ['server', 'host', 'workstation']):
-            return 'Server'
-        
-        # Access point detection
-        if any(keyword in description_lower for keyword in ['access point', 'ap', 'wireless']):
-            return 'Access Point'
-        
-        return 'Unknown'
+        return device_classifier.classify(sys_object_id, description).device_type
     
     def extract_os_version(self, description: str) -> str:
         """Extract OS version from description"""
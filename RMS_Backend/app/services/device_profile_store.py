@@ -0,0 +1,240 @@
+import json
+import os
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceProfileStore:
+    """
+    Process-wide device profile store keyed by IP and sysObjectID.
+    Profiles (vendor, model, sysObjectID, ...) live in memory with a TTL and
+    are persisted to a JSON file so restarts do not re-identify every device.
+    A profile is dropped when the device reports a different sysObjectID
+    (hardware swap) or its sysUpTime went backwards (reboot).
+    """
+
+    def __init__(self,
+                 cache_file: str = "data/cache/device_profiles.json",
+                 ttl: int = 86400,                 # re-identify devices daily
+                 revalidate_interval: int = 300,   # sysObjectID/sysUpTime check every 5 minutes
+                 enable_disk_cache: bool = True):
+        """
+        Initialize the profile store.
+
+        Args:
+            cache_file: JSON file the profiles are persisted to
+            ttl: Seconds a profile is trusted before it is rebuilt
+            revalidate_interval: Seconds between sysObjectID/sysUpTime checks
+                when a probe callable is given to get_or_create
+            enable_disk_cache: Whether to persist profiles to disk
+        """
+        self.cache_file = Path(cache_file)
+        self.ttl = ttl
+        self.revalidate_interval = revalidate_interval
+        self.enable_disk_cache = enable_disk_cache
+
+        # {ip: {'profile': dict, 'sys_object_id': str, 'sys_uptime': int,
+        #       'created_at': float, 'validated_at': float}}
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+        if self.enable_disk_cache:
+            self._load()
+
+    def _load(self) -> None:
+        """Load persisted profiles, dropping expired ones."""
+        try:
+            if not self.cache_file.exists():
+                return
+            with open(self.cache_file, 'r') as f:
+                stored = json.load(f)
+            now = time.time()
+            self._profiles = {
+                ip: entry for ip, entry in stored.items()
+                if now - entry.get('created_at', 0) < self.ttl
+            }
+            logger.info(f"Loaded {len(self._profiles)} device profiles from {self.cache_file}")
+        except Exception as e:
+            logger.warning(f"Error loading device profiles from {self.cache_file}: {e}")
+            self._profiles = {}
+
+    def _save(self) -> None:
+        """Persist profiles atomically (caller holds the lock)."""
+        if not self.enable_disk_cache:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_file.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(self._profiles, f, default=str)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logger.warning(f"Error saving device profiles to {self.cache_file}: {e}")
+
+    @staticmethod
+    def _parse_uptime(sys_uptime: Any) -> Optional[int]:
+        try:
+            return int(sys_uptime)
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, ip_address: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the stored profile for ip_address if it has not expired.
+
+        Facts recorded with update() before the device was identified are not
+        a profile yet: None is returned until put() stores one.
+        """
+        with self._lock:
+            entry = self._profiles.get(ip_address)
+            if entry is None:
+                return None
+            if time.time() - entry['created_at'] >= self.ttl:
+                del self._profiles[ip_address]
+                return None
+            return entry['profile'] if entry['sys_object_id'] else None
+
+    def put(self, ip_address: str, profile: Dict[str, Any], sys_uptime: Any = None) -> None:
+        """Store a profile. sysObjectID is taken from profile['sys_object_id']."""
+        now = time.time()
+        with self._lock:
+            entry = self._profiles.get(ip_address)
+            if entry is not None and not entry['sys_object_id']:
+                # Keep facts learned before the device was identified
+                profile = {**entry['profile'], **profile}
+            self._profiles[ip_address] = {
+                'profile': profile,
+                'sys_object_id': profile.get('sys_object_id', ''),
+                'sys_uptime': self._parse_uptime(sys_uptime),
+                'created_at': now,
+                'validated_at': now
+            }
+            self._save()
+
+    def update(self, ip_address: str, **fields: Any) -> bool:
+        """
+        Merge learned facts (e.g. neighbor_protocols) into the device's profile,
+        creating an unidentified entry when the device has no profile yet.
+
+        Returns:
+            True if the stored facts changed
+        """
+        with self._lock:
+            entry = self._profiles.get(ip_address)
+            if entry is None:
+                now = time.time()
+                self._profiles[ip_address] = {
+                    'profile': dict(fields),
+                    'sys_object_id': '',
+                    'sys_uptime': None,
+                    'created_at': now,
+                    'validated_at': now
+                }
+                self._save()
+                return True
+            if all(entry['profile'].get(key) == value for key, value in fields.items()):
+                return False
+            entry['profile'].update(fields)
+            self._save()
+            return True
+
+    def observe(self, ip_address: str, sys_object_id: str = None, sys_uptime: Any = None) -> bool:
+        """
+        Check freshly polled sysObjectID/sysUpTime against the stored profile.
+
+        Args:
+            ip_address: Device address
+            sys_object_id: Current sysObjectID.0 (None if not polled)
+            sys_uptime: Current sysUpTime.0 in TimeTicks (None if not polled)
+
+        Returns:
+            False if the stored profile was invalidated, True otherwise
+        """
+        uptime = self._parse_uptime(sys_uptime)
+        with self._lock:
+            entry = self._profiles.get(ip_address)
+            if entry is None:
+                return True
+
+            reason = None
+            if sys_object_id and entry['sys_object_id'] and sys_object_id != entry['sys_object_id']:
+                reason = f"sysObjectID changed {entry['sys_object_id']} -> {sys_object_id}"
+            elif uptime is not None and entry['sys_uptime'] is not None and uptime < entry['sys_uptime']:
+                reason = "sysUpTime went backwards (reboot)"
+
+            if reason:
+                del self._profiles[ip_address]
+                self._stats['invalidations'] += 1
+                self._save()
+                logger.info(f"Invalidated device profile for {ip_address}: {reason}")
+                return False
+
+            if uptime is not None:
+                entry['sys_uptime'] = uptime
+            entry['validated_at'] = time.time()
+            return True
+
+    def get_or_create(self, ip_address: str,
+                      create: Callable[[], Dict[str, Any]],
+                      probe: Optional[Callable[[], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Return the stored profile, building it with create() on a miss.
+
+        Args:
+            ip_address: Device address
+            create: Builds the profile dict (must contain 'sys_object_id';
+                may contain 'sys_uptime')
+            probe: Returns {'sysObjectID', 'sysUpTime'} for the device; run at
+                most every revalidate_interval to catch reboots and swaps
+        """
+        profile = self.get(ip_address)
+        if profile is not None and probe is not None:
+            with self._lock:
+                entry = self._profiles.get(ip_address)
+                due = entry is not None and time.time() - entry['validated_at'] >= self.revalidate_interval
+            if due:
+                current = probe() or {}
+                if current and not self.observe(ip_address, current.get('sysObjectID'), current.get('sysUpTime')):
+                    profile = None
+
+        if profile is not None:
+            with self._lock:
+                self._stats['hits'] += 1
+            return profile
+
+        with self._lock:
+            self._stats['misses'] += 1
+        profile = create()
+        if profile and profile.get('sys_object_id'):
+            self.put(ip_address, profile, profile.get('sys_uptime'))
+            profile = self.get(ip_address) or profile
+        return profile
+
+    def invalidate(self, ip_address: str = None) -> None:
+        """Drop one profile (or all profiles when ip_address is None)."""
+        with self._lock:
+            if ip_address:
+                self._profiles.pop(ip_address, None)
+            else:
+                self._profiles.clear()
+            self._save()
+
+    def get_info(self) -> Dict[str, Any]:
+        """Store size and hit/miss/invalidation counters."""
+        with self._lock:
+            return {
+                'total_profiles': len(self._profiles),
+                'ttl': self.ttl,
+                'revalidate_interval': self.revalidate_interval,
+                'stats': dict(self._stats)
+            }
+
+
+# Global device profile store instance
+device_profile_store = DeviceProfileStore()
@@ -0,0 +1,232 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _InFlight:
+    """A poll that is currently running for one host."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.data = None
+        self.error = None
+        self.waiters = 0
+
+
+class HealthCache:
+    """
+    Thread-safe device health cache.
+    Bounded LRU with a TTL per entry, stale-while-revalidate and single-flight
+    polling: concurrent misses for the same host share one in-flight poll.
+    Error results ({'status': 'error', ...}) are only negative-cached for
+    error_ttl seconds and never served stale, so one transient failure does
+    not mark a device broken for the whole TTL.
+    """
+
+    def __init__(self,
+                 max_entries: int = 512,
+                 ttl: int = 30,          # entries are fresh for 30 seconds
+                 stale_ttl: int = 120,   # then served stale for 2 more minutes while refreshing
+                 wait_timeout: int = 120,
+                 error_ttl: int = 5):    # error results are retried after 5 seconds
+        """
+        Initialize the health cache.
+
+        Args:
+            max_entries: Maximum number of hosts kept (least recently used evicted first)
+            ttl: Seconds an entry is served as fresh
+            stale_ttl: Extra seconds an expired entry may be served while a
+                background refresh runs (0 disables stale-while-revalidate)
+            wait_timeout: Maximum seconds a coalesced caller waits for the in-flight poll
+            error_ttl: Seconds an error result is served before the host is
+                polled again (0 disables negative caching)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.wait_timeout = wait_timeout
+        self.error_ttl = error_ttl
+
+        # {host: {'data': dict, 'timestamp': float, 'method': str, 'error': bool}}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'evictions': 0,
+            'errors': 0,
+            'error_results': 0
+        }
+
+    @staticmethod
+    def is_error(data: Any) -> bool:
+        """Whether a poll result reports a failure instead of health data."""
+        return isinstance(data, dict) and data.get('status') == 'error'
+
+    def _lifetimes(self, entry: Dict[str, Any]) -> Tuple[float, float]:
+        """(fresh, fresh + stale) seconds for an entry."""
+        if entry['error']:
+            return self.error_ttl, self.error_ttl
+        return self.ttl, self.ttl + self.stale_ttl
+
+    def get_or_poll(self, host: str, poll: Callable[[], Tuple[Dict, str]],
+                    refresh: Optional[Callable[[], Tuple[Dict, str]]] = None) -> Dict:
+        """
+        Return cached health for host, polling at most once across all callers.
+
+        Args:
+            host: Device address (cache key)
+            poll: Callable returning (health_data, method) - runs in the caller's thread
+            refresh: Callable used for stale-while-revalidate in a background
+                thread (defaults to poll). It must not rely on request-scoped
+                resources such as the caller's DB session.
+
+        Returns:
+            The health data dict
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is not None:
+                age = now - entry['timestamp']
+                fresh, usable = self._lifetimes(entry)
+                if age < fresh:
+                    self._entries.move_to_end(host)
+                    self._stats['hits'] += 1
+                    logger.info(f"Using cached health data for {host} (age: {age:.1f}s)")
+                    return entry['data']
+
+                if age < usable:
+                    self._entries.move_to_end(host)
+                    self._stats['stale_hits'] += 1
+                    if host not in self._in_flight:
+                        self._in_flight[host] = _InFlight()
+                        self._stats['refreshes'] += 1
+                        threading.Thread(
+                            target=self._run_poll, args=(host, refresh or poll),
+                            name=f"health-refresh-{host}", daemon=True
+                        ).start()
+                    logger.info(f"Serving stale health data for {host} (age: {age:.1f}s) while refreshing")
+                    return entry['data']
+
+                del self._entries[host]
+
+            in_flight = self._in_flight.get(host)
+            if in_flight is not None:
+                in_flight.waiters += 1
+                self._stats['coalesced'] += 1
+                owner = False
+            else:
+                in_flight = _InFlight()
+                self._in_flight[host] = in_flight
+                self._stats['misses'] += 1
+                owner = True
+
+        if owner:
+            self._run_poll(host, poll)
+        else:
+            logger.info(f"Joining in-flight health poll for {host}")
+            if not in_flight.event.wait(self.wait_timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight health poll of {host}")
+
+        if in_flight.error is not None:
+            raise in_flight.error
+        return in_flight.data
+
+    def _run_poll(self, host: str, poll: Callable[[], Tuple[Dict, str]]) -> None:
+        """Run a poll, store its result and wake everyone waiting on it."""
+        with self._lock:
+            in_flight = self._in_flight[host]
+        try:
+            data, method = poll()
+            in_flight.data = data
+            self.set(host, data, method)
+        except Exception as e:
+            logger.error(f"Health poll for {host} failed: {e}")
+            in_flight.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+        finally:
+            with self._lock:
+                self._in_flight.pop(host, None)
+            in_flight.event.set()
+
+    def set(self, host: str, data: Dict, method: str) -> None:
+        """Store health data for host, evicting least recently used entries."""
+        error = self.is_error(data)
+        with self._lock:
+            if error:
+                self._stats['error_results'] += 1
+                if self.error_ttl <= 0:
+                    self._entries.pop(host, None)
+                    return
+            self._entries[host] = {
+                'data': data,
+                'timestamp': time.time(),
+                'method': method,
+                'error': error
+            }
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+                logger.debug(f"Evicted health cache entry for {evicted}")
+
+    def invalidate(self, host: str = None) -> None:
+        """Drop one host (or everything when host is None)."""
+        with self._lock:
+            if host:
+                self._entries.pop(host, None)
+            else:
+                self._entries.clear()
+
+    def cleanup_expired(self) -> int:
+        """Remove entries that are past their stale window. Returns the number removed."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                host for host, entry in self._entries.items()
+                if now - entry['timestamp'] >= self._lifetimes(entry)[1]
+            ]
+            for host in expired:
+                del self._entries[host]
+        return len(expired)
+
+    def get_info(self) -> Dict[str, Any]:
+        """Entry ages and hit/miss/coalesce counters."""
+        now = time.time()
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['stale_hits'] + self._stats['misses'] + self._stats['coalesced']
+            info = {
+                'total_entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'cache_timeout': self.ttl,
+                'stale_ttl': self.stale_ttl,
+                'in_flight': len(self._in_flight),
+                'stats': dict(self._stats),
+                'hit_rate': round((self._stats['hits'] + self._stats['stale_hits']) / lookups, 3) if lookups else 0.0,
+                'entries': {}
+            }
+            for host, entry in self._entries.items():
+                age = now - entry['timestamp']
+                fresh, usable = self._lifetimes(entry)
+                info['entries'][host] = {
+                    'age_seconds': round(age, 1),
+                    'method': entry['method'],
+                    'error': entry['error'],
+                    'expired': age >= fresh,
+                    'stale': fresh <= age < usable
+                }
+        return info
+
+
+# Global health cache instance
+health_cache = HealthCache()
@@ -0,0 +1,658 @@
+import atexit
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEARNING_CONFIG = {
+    'learning_enabled': True,
+    'min_success_rate': 0.7,
+    'max_pattern_age_days': 30,
+    'strategy_optimization_threshold': 10
+}
+
+# Longest wait between flush attempts while the database keeps failing
+MAX_FLUSH_BACKOFF = 300.0
+
+# Legacy file-based storage, imported once when the tables are empty
+LEGACY_DATA_DIR = Path("data/learning")
+
+PatternKey = Tuple[str, str, str]    # (vendor, model, data_category)
+StrategyKey = Tuple[str, str, str]   # (vendor, strategy_name, data_category)
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_datetime(value: Any) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ewma(current: Optional[float], sample: Optional[float], alpha: float) -> Optional[float]:
+    if sample is None:
+        return current
+    return sample if current is None else alpha * sample + (1 - alpha) * current
+
+
+class StrategyRollup:
+    """Recent attempts, successes and EWMA latency of one strategy inside a DiscoveryRollup ring."""
+
+    __slots__ = ('recent_attempts', 'recent_successes', 'ewma_latency')
+
+    def __init__(self):
+        self.recent_attempts = 0
+        self.recent_successes = 0
+        self.ewma_latency: Optional[float] = None
+
+    @property
+    def success_rate(self) -> float:
+        return self.recent_successes / self.recent_attempts if self.recent_attempts else 0.0
+
+
+class DiscoveryRollup:
+    """
+    Fixed-size ring of recent discovery attempts for one (vendor, model,
+    category) with incrementally maintained statistics, overall and per
+    strategy, so nothing has to rescan history.
+    """
+
+    __slots__ = ('ring', 'ring_successes', 'attempts', 'successes', 'ewma_latency', 'alpha', 'strategies')
+
+    def __init__(self, ring_size: int, alpha: float):
+        self.ring: deque = deque(maxlen=ring_size)
+        self.ring_successes = 0   # successes currently inside the ring
+        self.attempts = 0         # all attempts seen by this process
+        self.successes = 0
+        self.ewma_latency: Optional[float] = None
+        self.alpha = alpha
+        self.strategies: Dict[str, StrategyRollup] = {}
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        if len(self.ring) == self.ring.maxlen:
+            evicted = self.ring[0]
+            evicted_success = bool(evicted.get('success'))
+            self.ring_successes -= evicted_success
+            evicted_strategy = self.strategies.get(evicted.get('strategy_used', 'unknown'))
+            if evicted_strategy is not None:
+                evicted_strategy.recent_attempts -= 1
+                evicted_strategy.recent_successes -= evicted_success
+        self.ring.append(entry)
+
+        success = bool(entry.get('success'))
+        self.ring_successes += success
+        self.attempts += 1
+        self.successes += success
+
+        latency = entry.get('discovery_time')
+        self.ewma_latency = _ewma(self.ewma_latency, latency, self.alpha)
+
+        strategy = self.strategies.get(entry.get('strategy_used', 'unknown'))
+        if strategy is None:
+            strategy = self.strategies[entry.get('strategy_used', 'unknown')] = StrategyRollup()
+        strategy.recent_attempts += 1
+        strategy.recent_successes += success
+        strategy.ewma_latency = _ewma(strategy.ewma_latency, latency, self.alpha)
+
+    @property
+    def success_rate(self) -> float:
+        """Success rate over the ring (recent attempts)."""
+        return self.ring_successes / len(self.ring) if self.ring else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'attempts': self.attempts,
+            'successes': self.successes,
+            'recent_attempts': len(self.ring),
+            'success_rate': round(self.success_rate, 3),
+            'ewma_latency': round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            'last_discovered_at': self.ring[-1].get('discovered_at') if self.ring else None,
+            'strategies': {
+                name: {
+                    'recent_attempts': strategy.recent_attempts,
+                    'success_rate': round(strategy.success_rate, 3),
+                    'ewma_latency': round(strategy.ewma_latency, 3) if strategy.ewma_latency is not None else None
+                }
+                for name, strategy in self.strategies.items() if strategy.recent_attempts
+            }
+        }
+
+
+class LearningStore:
+    """
+    Shared in-memory index of adaptive learning data backed by the
+    LearnedPatterns, DiscoveryStrategies, DeviceCapabilities and
+    DiscoveryHistory tables.
+
+    The tables are read once per process. Reads are served from memory,
+    indexed by (vendor, model, category) for patterns and (vendor, category)
+    for strategies; changes are marked dirty and a write-behind thread
+    flushes them to the database in batches.
+    """
+
+    def __init__(self,
+                 session_factory: Optional[Callable[[], Any]] = None,
+                 flush_interval: float = 5.0,
+                 ring_size: int = 50,
+                 ewma_alpha: float = 0.2):
+        """
+        Initialize the learning store.
+
+        Args:
+            session_factory: Returns a new SQLAlchemy session (defaults to SessionLocal)
+            flush_interval: Seconds between write-behind flushes
+            ring_size: Discovery attempts kept per (vendor, model, category),
+                in memory and in the discovery_history table
+            ewma_alpha: Weight of the newest sample in latency averages
+        """
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.ring_size = ring_size
+        self.ewma_alpha = ewma_alpha
+
+        self.lock = threading.RLock()
+        self.config: Dict[str, Any] = dict(DEFAULT_LEARNING_CONFIG)
+        self.patterns: Dict[PatternKey, Dict[str, Any]] = {}
+        self.strategies: Dict[StrategyKey, Dict[str, Any]] = {}
+        self.capabilities: Dict[str, Dict[str, Any]] = {}
+        self.rollups: Dict[PatternKey, DiscoveryRollup] = {}
+
+        # Secondary indexes: (vendor, data_category) -> keys
+        self._patterns_by_vendor: Dict[Tuple[str, str], Set[PatternKey]] = {}
+        self._strategies_by_vendor: Dict[Tuple[str, str], Set[StrategyKey]] = {}
+        # Memoised strategy decisions per (vendor, model, category), dropped on updates
+        self.decisions: Dict[PatternKey, Any] = {}
+
+        # Write-behind state
+        self._dirty_patterns: Set[PatternKey] = set()
+        self._dirty_strategies: Set[StrategyKey] = set()
+        self._dirty_capabilities: Set[str] = set()
+        # Unwritten attempts per (vendor, model, category), capped at ring_size
+        # like the rings, so a long database outage drops the oldest instead of
+        # growing without bound
+        self._pending_history: Dict[PatternKey, deque] = {}
+        # Counter values already in the database: flushes add only the increments
+        # since, so several processes (or one that started empty) never overwrite
+        # each other's counts
+        self._stored_pattern_counts: Dict[PatternKey, int] = {}
+        self._stored_strategy_counts: Dict[StrategyKey, Tuple[int, int]] = {}
+        self._flush_failures = 0
+        self._loaded = False
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        self._stats = {'flushes': 0, 'rows_written': 0, 'flush_errors': 0}
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _new_session(self):
+        if self._session_factory is None:
+            from app.core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def ensure_loaded(self) -> None:
+        """Load the tables into memory once per process and start the flusher."""
+        if self._loaded:
+            return
+        with self.lock:
+            if self._loaded:
+                return
+            try:
+                self._load_from_db()
+            except Exception as e:
+                logger.warning(f"Could not load learning data from database: {e}. Starting empty.")
+            self._loaded = True
+            self._start_flusher()
+
+    def _load_from_db(self) -> None:
+        from app.models.learning import (
+            LearnedPatterns, DiscoveryStrategies, DeviceCapabilities,
+            DiscoveryHistory, AdaptiveLearningConfig
+        )
+
+        db = self._new_session()
+        try:
+            for row in db.query(AdaptiveLearningConfig).all():
+                self.config[row.config_key] = row.config_value
+
+            for row in db.query(LearnedPatterns).all():
+                self._index_pattern({
+                    'vendor': row.vendor,
+                    'model': row.model,
+                    'data_category': row.data_category,
+                    'successful_oids': row.successful_oids or [],
+                    'success_rate': row.success_rate or 0.0,
+                    'discovery_count': row.discovery_count or 0,
+                    'last_successful': _format_datetime(row.last_successful),
+                    'is_active': row.is_active if row.is_active is not None else True
+                })
+                key = self.pattern_key(row.vendor, row.model, row.data_category)
+                self._stored_pattern_counts[key] = row.discovery_count or 0
+
+            for row in db.query(DiscoveryStrategies).all():
+                self._index_strategy({
+                    'vendor': row.vendor,
+                    'model': row.model,
+                    'strategy_name': row.strategy_name,
+                    'data_category': row.data_category,
+                    'success_count': row.success_count or 0,
+                    'failure_count': row.failure_count or 0,
+                    'avg_discovery_time': row.avg_discovery_time or 0.0,
+                    'last_used': _format_datetime(row.last_used),
+                    'is_preferred': bool(row.is_preferred)
+                })
+                key = self.strategy_key(row.vendor, row.strategy_name, row.data_category)
+                self._stored_strategy_counts[key] = (row.success_count or 0, row.failure_count or 0)
+
+            for row in db.query(DeviceCapabilities).all():
+                self.capabilities[row.device_ip] = {
+                    'device_ip': row.device_ip,
+                    'vendor': row.vendor,
+                    'model': row.model,
+                    'sys_object_id': row.sys_object_id or '',
+                    'sys_descr': row.sys_descr or '',
+                    'capabilities': row.capabilities or {},
+                    'discovered_sensors': row.discovered_sensors or {},
+                    'last_discovery': _format_datetime(row.last_discovery)
+                }
+
+            # The table is compacted to ring_size rows per key, so this stays small
+            for row in db.query(DiscoveryHistory).order_by(DiscoveryHistory.id).all():
+                self._add_to_ring(self._history_from_row(row))
+        finally:
+            db.close()
+
+        if not (self.patterns or self.strategies or self.capabilities or self.rollups):
+            self._import_legacy_files()
+
+        logger.info(f"Learning store loaded: {len(self.patterns)} patterns, "
+                    f"{len(self.strategies)} strategies, {len(self.capabilities)} devices, "
+                    f"{len(self.rollups)} history rings")
+
+    @staticmethod
+    def _history_from_row(row) -> Dict[str, Any]:
+        return {
+            'device_ip': row.device_ip,
+            'vendor': row.vendor,
+            'model': row.model,
+            'data_category': row.data_category,
+            'strategy_used': row.strategy_used,
+            'oids_tried': row.oids_tried or [],
+            'successful_oids': row.successful_oids or [],
+            'discovery_time': row.discovery_time or 0.0,
+            'success': bool(row.success),
+            'discovered_at': _format_datetime(row.discovered_at)
+        }
+
+    def _import_legacy_files(self) -> None:
+        """One-time import of the old data/learning/*.json files."""
+        def read(name, default):
+            path = LEGACY_DATA_DIR / name
+            try:
+                if path.exists():
+                    with open(path, 'r') as f:
+                        return json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not import legacy learning file {path}: {e}")
+            return default
+
+        for pattern in read("learned_patterns.json", {}).values():
+            self._index_pattern(pattern)
+            self._dirty_patterns.add(self.pattern_key(pattern['vendor'], pattern['model'], pattern['data_category']))
+        for strategy in read("discovery_strategies.json", {}).values():
+            self._index_strategy(strategy)
+            self._dirty_strategies.add(self.strategy_key(strategy['vendor'], strategy['strategy_name'],
+                                                         strategy['data_category']))
+        for device_ip, capabilities in read("device_capabilities.json", {}).items():
+            self.capabilities[device_ip] = capabilities
+            self._dirty_capabilities.add(device_ip)
+        for entry in read("discovery_history.json", []):
+            self._add_to_ring(entry)
+        for rollup in self.rollups.values():
+            for entry in rollup.ring:
+                self._queue_history(entry)
+
+        if self.patterns or self.strategies or self.capabilities or self.rollups:
+            logger.info("Imported legacy JSON learning data; it will be written to the database")
+
+    # ------------------------------------------------------------------
+    # Index access (callers hold self.lock while mutating)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def pattern_key(vendor: str, model: str, data_category: str) -> PatternKey:
+        return (vendor, model, data_category)
+
+    @staticmethod
+    def strategy_key(vendor: str, strategy_name: str, data_category: str) -> StrategyKey:
+        return (vendor, strategy_name, data_category)
+
+    def _index_pattern(self, pattern: Dict[str, Any]) -> None:
+        key = self.pattern_key(pattern['vendor'], pattern['model'], pattern['data_category'])
+        self.patterns[key] = pattern
+        self._patterns_by_vendor.setdefault((key[0], key[2]), set()).add(key)
+
+    def _index_strategy(self, strategy: Dict[str, Any]) -> None:
+        key = self.strategy_key(strategy['vendor'], strategy['strategy_name'], strategy['data_category'])
+        self.strategies[key] = strategy
+        self._strategies_by_vendor.setdefault((key[0], key[2]), set()).add(key)
+
+    def get_pattern(self, vendor: str, model: str, data_category: str) -> Optional[Dict[str, Any]]:
+        return self.patterns.get(self.pattern_key(vendor, model, data_category))
+
+    def put_pattern(self, pattern: Dict[str, Any]) -> None:
+        with self.lock:
+            self._index_pattern(pattern)
+            self._dirty_patterns.add(self.pattern_key(pattern['vendor'], pattern['model'], pattern['data_category']))
+
+    def patterns_for_vendor(self, vendor: str, data_category: str) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [self.patterns[key] for key in self._patterns_by_vendor.get((vendor, data_category), ())]
+
+    def get_strategy(self, vendor: str, strategy_name: str, data_category: str) -> Optional[Dict[str, Any]]:
+        return self.strategies.get(self.strategy_key(vendor, strategy_name, data_category))
+
+    def put_strategy(self, strategy: Dict[str, Any]) -> None:
+        with self.lock:
+            self._index_strategy(strategy)
+            self._dirty_strategies.add(self.strategy_key(strategy['vendor'], strategy['strategy_name'],
+                                                         strategy['data_category']))
+
+    def strategies_for_vendor(self, vendor: str, data_category: str) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [self.strategies[key] for key in self._strategies_by_vendor.get((vendor, data_category), ())]
+
+    def put_capabilities(self, device_ip: str, capabilities: Dict[str, Any]) -> None:
+        with self.lock:
+            self.capabilities[device_ip] = capabilities
+            self._dirty_capabilities.add(device_ip)
+
+    def _history_key(self, entry: Dict[str, Any]) -> PatternKey:
+        return self.pattern_key(entry.get('vendor', 'unknown'), entry.get('model', 'unknown'),
+                                entry.get('data_category', 'unknown'))
+
+    def _queue_history(self, entry: Dict[str, Any]) -> None:
+        key = self._history_key(entry)
+        pending = self._pending_history.get(key)
+        if pending is None:
+            pending = self._pending_history[key] = deque(maxlen=self.ring_size)
+        pending.append(entry)
+
+    def _requeue_history(self, history: List[Dict[str, Any]]) -> None:
+        """Put unwritten attempts back ahead of newer ones, keeping the newest ring_size per key."""
+        older: Dict[PatternKey, List[Dict[str, Any]]] = {}
+        for entry in history:
+            older.setdefault(self._history_key(entry), []).append(entry)
+        for key, entries in older.items():
+            self._pending_history[key] = deque(entries + list(self._pending_history.get(key, ())),
+                                               maxlen=self.ring_size)
+
+    def _add_to_ring(self, entry: Dict[str, Any]) -> DiscoveryRollup:
+        key = self._history_key(entry)
+        rollup = self.rollups.get(key)
+        if rollup is None:
+            rollup = self.rollups[key] = DiscoveryRollup(self.ring_size, self.ewma_alpha)
+        rollup.add(entry)
+        return rollup
+
+    def add_history(self, entry: Dict[str, Any]) -> DiscoveryRollup:
+        """Append an attempt to its ring and return the updated rollup."""
+        with self.lock:
+            self._queue_history(entry)
+            return self._add_to_ring(entry)
+
+    def get_rollup(self, vendor: str, model: str, data_category: str) -> Optional[DiscoveryRollup]:
+        return self.rollups.get(self.pattern_key(vendor, model, data_category))
+
+    def invalidate_decisions(self, vendor: str, data_category: str) -> None:
+        """Forget memoised strategy decisions that may depend on (vendor, category) data."""
+        with self.lock:
+            for key in [k for k in self.decisions if k[0] == vendor and k[2] == data_category]:
+                del self.decisions[key]
+
+    def reset(self) -> None:
+        """Forget everything in memory (after the tables were cleared)."""
+        with self.lock:
+            self.patterns.clear()
+            self.strategies.clear()
+            self.capabilities.clear()
+            self.rollups.clear()
+            self.decisions.clear()
+            self._patterns_by_vendor.clear()
+            self._strategies_by_vendor.clear()
+            self._dirty_patterns.clear()
+            self._dirty_strategies.clear()
+            self._dirty_capabilities.clear()
+            self._pending_history.clear()
+            self._stored_pattern_counts.clear()
+            self._stored_strategy_counts.clear()
+
+    # ------------------------------------------------------------------
+    # Write-behind
+    # ------------------------------------------------------------------
+
+    def _start_flusher(self) -> None:
+        if self._flush_thread is not None or self.flush_interval <= 0:
+            return
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="learning-store-flush", daemon=True)
+        self._flush_thread.start()
+        atexit.register(self.close)
+
+    def _flush_loop(self) -> None:
+        while not self._stopped.is_set():
+            # Back off while the database is unreachable (or not configured)
+            self._wakeup.wait(min(self.flush_interval * 2 ** self._flush_failures, MAX_FLUSH_BACKOFF))
+            self._wakeup.clear()
+            self.flush()
+
+    def request_flush(self) -> None:
+        """Wake the flusher without waiting for the interval."""
+        self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write all dirty entries to the database in one transaction. Returns rows written."""
+        with self._flush_lock:
+            with self.lock:
+                patterns = [dict(self.patterns[k]) for k in self._dirty_patterns if k in self.patterns]
+                strategies = [dict(self.strategies[k]) for k in self._dirty_strategies if k in self.strategies]
+                pattern_counts = {k: self._stored_pattern_counts.get(k) for k in self._dirty_patterns}
+                strategy_counts = {k: self._stored_strategy_counts.get(k) for k in self._dirty_strategies}
+                capabilities = [dict(self.capabilities[k]) for k in self._dirty_capabilities if k in self.capabilities]
+                history = [entry for pending in self._pending_history.values() for entry in pending]
+                compact_keys = set(self._pending_history)
+                dirty = (set(self._dirty_patterns), set(self._dirty_strategies), set(self._dirty_capabilities))
+                self._dirty_patterns.clear()
+                self._dirty_strategies.clear()
+                self._dirty_capabilities.clear()
+                self._pending_history.clear()
+
+            rows = len(patterns) + len(strategies) + len(capabilities) + len(history)
+            if not rows:
+                return 0
+
+            try:
+                self._write_batch(patterns, strategies, capabilities, history, compact_keys,
+                                  pattern_counts, strategy_counts)
+                with self.lock:
+                    for pattern in patterns:
+                        key = self.pattern_key(pattern['vendor'], pattern['model'], pattern['data_category'])
+                        self._stored_pattern_counts[key] = pattern.get('discovery_count', 0)
+                    for strategy in strategies:
+                        key = self.strategy_key(strategy['vendor'], strategy['strategy_name'],
+                                                strategy['data_category'])
+                        self._stored_strategy_counts[key] = (strategy.get('success_count', 0),
+                                                             strategy.get('failure_count', 0))
+                    self._stats['flushes'] += 1
+                    self._stats['rows_written'] += rows
+                if self._flush_failures:
+                    logger.info(f"Learning store flush succeeded after {self._flush_failures} failed attempts")
+                self._flush_failures = 0
+                logger.debug(f"Learning store flushed {rows} rows")
+                return rows
+            except Exception as e:
+                self._flush_failures += 1
+                if self._flush_failures == 1:
+                    logger.error(f"Learning store flush failed, will retry with backoff: {e}")
+                else:
+                    logger.debug(f"Learning store flush failed ({self._flush_failures} in a row): {e}")
+                with self.lock:
+                    self._stats['flush_errors'] += 1
+                    self._dirty_patterns |= dirty[0]
+                    self._dirty_strategies |= dirty[1]
+                    self._dirty_capabilities |= dirty[2]
+                    self._requeue_history(history)
+                return 0
+
+    def _write_batch(self, patterns: List[Dict], strategies: List[Dict],
+                     capabilities: List[Dict], history: List[Dict],
+                     compact_keys: Set[PatternKey] = (),
+                     pattern_counts: Optional[Dict[PatternKey, Optional[int]]] = None,
+                     strategy_counts: Optional[Dict[StrategyKey, Optional[Tuple[int, int]]]] = None) -> None:
+        """
+        Upsert one flush in a single transaction.
+
+        Counters are written as increments (SET n = n + delta) over the values
+        this process last read or wrote (pattern_counts / strategy_counts), so
+        concurrent writers add up instead of overwriting each other.
+        """
+        from sqlalchemy import func
+        from app.models.learning import (
+            LearnedPatterns, DiscoveryStrategies, DeviceCapabilities, DiscoveryHistory
+        )
+
+        db = self._new_session()
+        try:
+            for pattern in patterns:
+                row = db.query(LearnedPatterns).filter(
+                    LearnedPatterns.vendor == pattern['vendor'],
+                    LearnedPatterns.model == pattern['model'],
+                    LearnedPatterns.data_category == pattern['data_category']
+                ).first()
+                key = self.pattern_key(pattern['vendor'], pattern['model'], pattern['data_category'])
+                delta = pattern.get('discovery_count', 0) - ((pattern_counts or {}).get(key) or 0)
+                if row is None:
+                    row = LearnedPatterns(vendor=pattern['vendor'], model=pattern['model'],
+                                          data_category=pattern['data_category'], discovery_count=delta)
+                    db.add(row)
+                elif delta:
+                    row.discovery_count = func.coalesce(LearnedPatterns.discovery_count, 0) + delta
+                row.successful_oids = list(pattern.get('successful_oids', []))
+                row.success_rate = pattern.get('success_rate', 0.0)
+                row.last_successful = _parse_datetime(pattern.get('last_successful')) or datetime.utcnow()
+                row.is_active = pattern.get('is_active', True)
+
+            for strategy in strategies:
+                row = db.query(DiscoveryStrategies).filter(
+                    DiscoveryStrategies.vendor == strategy['vendor'],
+                    DiscoveryStrategies.strategy_name == strategy['strategy_name'],
+                    DiscoveryStrategies.data_category == strategy['data_category']
+                ).first()
+                key = self.strategy_key(strategy['vendor'], strategy['strategy_name'], strategy['data_category'])
+                stored_success, stored_failure = (strategy_counts or {}).get(key) or (0, 0)
+                success_delta = strategy.get('success_count', 0) - stored_success
+                failure_delta = strategy.get('failure_count', 0) - stored_failure
+                if row is None:
+                    row = DiscoveryStrategies(vendor=strategy['vendor'], strategy_name=strategy['strategy_name'],
+                                              data_category=strategy['data_category'],
+                                              success_count=success_delta, failure_count=failure_delta)
+                    db.add(row)
+                else:
+                    if success_delta:
+                        row.success_count = func.coalesce(DiscoveryStrategies.success_count, 0) + success_delta
+                    if failure_delta:
+                        row.failure_count = func.coalesce(DiscoveryStrategies.failure_count, 0) + failure_delta
+                row.model = strategy.get('model')
+                row.avg_discovery_time = strategy.get('avg_discovery_time', 0.0)
+                row.last_used = _parse_datetime(strategy.get('last_used')) or datetime.utcnow()
+                row.is_preferred = strategy.get('is_preferred', False)
+
+            for device in capabilities:
+                row = db.query(DeviceCapabilities).filter(
+                    DeviceCapabilities.device_ip == device['device_ip']
+                ).first()
+                if row is None:
+                    row = DeviceCapabilities(device_ip=device['device_ip'])
+                    db.add(row)
+                row.vendor = device.get('vendor', 'unknown')
+                row.model = device.get('model', 'unknown')
+                row.sys_object_id = device.get('sys_object_id', '')
+                row.sys_descr = device.get('sys_descr', '')
+                row.capabilities = device.get('capabilities', {})
+                row.discovered_sensors = device.get('discovered_sensors', {})
+                row.last_discovery = _parse_datetime(device.get('last_discovery')) or datetime.utcnow()
+
+            if history:
+                db.bulk_save_objects([
+                    DiscoveryHistory(
+                        device_ip=entry.get('device_ip', 'unknown'),
+                        vendor=entry.get('vendor', 'unknown'),
+                        model=entry.get('model', 'unknown'),
+                        data_category=entry.get('data_category', 'unknown'),
+                        strategy_used=entry.get('strategy_used', 'unknown'),
+                        oids_tried=entry.get('oids_tried', []),
+                        successful_oids=entry.get('successful_oids', []),
+                        discovery_time=entry.get('discovery_time'),
+                        success=entry.get('success', False),
+                        discovered_at=_parse_datetime(entry.get('discovered_at')) or datetime.utcnow()
+                    )
+                    for entry in history
+                ])
+                db.flush()
+
+            # Keep the table at ring_size rows per (vendor, model, category)
+            for vendor, model, data_category in compact_keys:
+                stale_ids = [row_id for (row_id,) in db.query(DiscoveryHistory.id).filter(
+                    DiscoveryHistory.vendor == vendor,
+                    DiscoveryHistory.model == model,
+                    DiscoveryHistory.data_category == data_category
+                ).order_by(DiscoveryHistory.id.desc()).offset(self.ring_size).all()]
+                if stale_ids:
+                    db.query(DiscoveryHistory).filter(
+                        DiscoveryHistory.id.in_(stale_ids)
+                    ).delete(synchronize_session=False)
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def close(self) -> None:
+        """Stop the flusher after a final flush."""
+        self._stopped.set()
+        self._wakeup.set()
+        self.flush()
+
+    def get_info(self) -> Dict[str, Any]:
+        """Index sizes, pending writes and flush counters."""
+        with self.lock:
+            return {
+                'patterns': len(self.patterns),
+                'strategies': len(self.strategies),
+                'devices': len(self.capabilities),
+                'history_rings': len(self.rollups),
+                'history': sum(len(rollup.ring) for rollup in self.rollups.values()),
+                'pending_writes': (len(self._dirty_patterns) + len(self._dirty_strategies)
+                                   + len(self._dirty_capabilities)
+                                   + sum(len(pending) for pending in self._pending_history.values())),
+                'stats': dict(self._stats)
+            }
+
+
+# Global learning store instance
+learning_store = LearningStore()
@@ -9,6 +9,7 @@ from pysnmp.hlapi import (
     getCmd
 )
 import re
+from app.core.snmp_session import share_mib_compiler
 
 class SNMPService:
     def __init__(self):
@@ -18,7 +19,7 @@ class SNMPService:
         """Check SNMP connectivity to a device."""
         try:
             iterator = getCmd(
-                SnmpEngine(),
+                share_mib_compiler(SnmpEngine()),
                 CommunityData(snmp_config.get('community', 'public'), 
                             mpModel=0 if snmp_config.get('snmp_version') == 'v1' else 1),
                 UdpTransportTarget((ip, snmp_config.get('port', 161)), timeout=2, retries=1),
@@ -44,7 +45,7 @@ class SNMPService:
         """Get detailed device information via SNMP."""
         try:
             iterator = getCmd(
-                SnmpEngine(),
+                share_mib_compiler(SnmpEngine()),
                 CommunityData(snmp_config.get('community', 'public'), 
                             mpModel=0 if snmp_config.get('snmp_version') == 'v1' else 1),
                 UdpTransportTarget((ip, snmp_config.get('port', 161)), timeout=2, retries=1),
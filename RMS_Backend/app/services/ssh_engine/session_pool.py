@@ -0,0 +1,262 @@
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from netmiko import ConnectHandler
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, str]  # (ip, username)
+
+
+def _connect_cisco_ios(ip: str, username: str, password: str) -> ConnectHandler:
+    """Open an authenticated, enabled netmiko session (the run_show_command defaults)."""
+    connection = ConnectHandler(
+        device_type='cisco_ios',
+        host=ip,
+        username=username,
+        password=password,
+        secret=password,
+        fast_cli=False,
+    )
+    connection.set_base_prompt()
+    connection.enable()
+    return connection
+
+
+class _PooledSession:
+    """One authenticated SSH channel; used by one caller at a time."""
+
+    __slots__ = ('connection', 'password', 'created_at', 'last_used', 'last_checked', 'in_use')
+
+    def __init__(self, connection: Any, password: str):
+        now = time.time()
+        self.connection = connection
+        self.password = password
+        self.created_at = now
+        self.last_used = now
+        self.last_checked = now
+        self.in_use = False
+
+
+class SSHSessionPool:
+    """
+    Pool of authenticated SSH sessions keyed by (ip, username).
+    A caller checks a session out for exclusive use and returns it afterwards,
+    so consecutive show commands against one device share a single login,
+    set_base_prompt and enable. Sessions idle longer than idle_ttl are closed
+    by a reaper thread; sessions idle longer than health_check_interval are
+    probed with is_alive() before reuse.
+    """
+
+    def __init__(self,
+                 max_sessions_per_device: int = 2,
+                 idle_ttl: int = 300,              # close sessions idle for 5 minutes
+                 max_lifetime: int = 3600,         # re-login at least hourly
+                 health_check_interval: int = 30,  # probe sessions idle for 30 seconds
+                 checkout_timeout: int = 60,
+                 connect: Optional[Callable[[str, str, str], Any]] = None):
+        """
+        Initialize the session pool.
+
+        Args:
+            max_sessions_per_device: Concurrent sessions allowed per (ip, username)
+            idle_ttl: Seconds an unused session is kept open
+            max_lifetime: Seconds after which a session is replaced on return
+            health_check_interval: Idle seconds after which a session is
+                checked with is_alive() before it is handed out
+            checkout_timeout: Seconds a caller waits for a busy device's session
+            connect: Factory (ip, username, password) -> connection; defaults
+                to an enabled netmiko cisco_ios session
+        """
+        self.max_sessions_per_device = max_sessions_per_device
+        self.idle_ttl = idle_ttl
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self._connect = connect or _connect_cisco_ios
+
+        self._sessions: Dict[PoolKey, List[_PooledSession]] = {}
+        self._condition = threading.Condition()
+        self._stats = {'created': 0, 'reused': 0, 'closed': 0, 'health_check_failures': 0, 'waits': 0}
+
+        self._stopped = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _close(session: _PooledSession) -> None:
+        try:
+            session.connection.disconnect()
+        except Exception as e:
+            logger.debug(f"Error closing SSH session: {e}")
+
+    def _is_healthy(self, session: _PooledSession) -> bool:
+        if time.time() - session.last_used < self.health_check_interval:
+            return True
+        try:
+            alive = session.connection.is_alive()
+        except Exception:
+            alive = False
+        session.last_checked = time.time()
+        return bool(alive)
+
+    def _acquire(self, key: PoolKey, password: str) -> Optional[_PooledSession]:
+        """Reserve an idle session or a slot for a new one (None = open a new session)."""
+        deadline = time.time() + self.checkout_timeout
+        with self._condition:
+            while True:
+                sessions = self._sessions.setdefault(key, [])
+                for session in sessions:
+                    if not session.in_use and session.password == password:
+                        session.in_use = True
+                        return session
+                # Sessions opened with an old password are replaced
+                for session in [s for s in sessions if not s.in_use and s.password != password]:
+                    sessions.remove(session)
+                    self._stats['closed'] += 1
+                    self._close(session)
+                if len(sessions) < self.max_sessions_per_device:
+                    placeholder = _PooledSession(None, password)
+                    placeholder.in_use = True
+                    sessions.append(placeholder)
+                    return placeholder
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError(f"No SSH session available for {key[0]} within {self.checkout_timeout}s")
+                self._stats['waits'] += 1
+                self._condition.wait(remaining)
+
+    def _discard(self, key: PoolKey, session: _PooledSession) -> None:
+        with self._condition:
+            sessions = self._sessions.get(key, [])
+            if session in sessions:
+                sessions.remove(session)
+            self._stats['closed'] += 1
+            self._condition.notify()
+        if session.connection is not None:
+            self._close(session)
+
+    @contextmanager
+    def session(self, ip: str, username: str, password: str) -> Iterator[Any]:
+        """
+        Check out an authenticated connection for exclusive use.
+
+        The connection goes back to the pool when the block exits normally;
+        if the block raises, the session is closed because the channel may be
+        left mid-command.
+        """
+        key = (ip, username)
+        session = self._acquire(key, password)
+        try:
+            if session.connection is not None and not self._is_healthy(session):
+                logger.info(f"Pooled SSH session to {ip} failed health check, reconnecting")
+                with self._condition:
+                    self._stats['health_check_failures'] += 1
+                self._close(session)
+                session.connection = None
+            if session.connection is None:
+                session.connection = self._connect(ip, username, password)
+                session.created_at = time.time()
+                with self._condition:
+                    self._stats['created'] += 1
+            else:
+                with self._condition:
+                    self._stats['reused'] += 1
+            self._start_reaper()
+        except Exception:
+            self._discard(key, session)
+            raise
+
+        try:
+            yield session.connection
+        except Exception:
+            self._discard(key, session)
+            raise
+
+        if time.time() - session.created_at >= self.max_lifetime:
+            self._discard(key, session)
+            return
+        with self._condition:
+            session.in_use = False
+            session.last_used = time.time()
+            self._condition.notify()
+
+    def send_command(self, ip: str, username: str, password: str, command: str, **kwargs) -> str:
+        """Run one command on a pooled session."""
+        with self.session(ip, username, password) as connection:
+            return connection.send_command(command, **kwargs)
+
+    def cleanup_idle(self) -> int:
+        """Close sessions idle longer than idle_ttl. Returns sessions closed."""
+        now = time.time()
+        expired = []
+        with self._condition:
+            for key, sessions in list(self._sessions.items()):
+                for session in [s for s in sessions if not s.in_use and now - s.last_used >= self.idle_ttl]:
+                    sessions.remove(session)
+                    expired.append(session)
+                if not sessions:
+                    del self._sessions[key]
+            self._stats['closed'] += len(expired)
+        for session in expired:
+            self._close(session)
+        if expired:
+            logger.debug(f"Closed {len(expired)} idle SSH sessions")
+        return len(expired)
+
+    def close_all(self, ip: str = None) -> None:
+        """Close idle sessions (of one device, or all). Busy sessions close on return."""
+        with self._condition:
+            idle = []
+            for key, sessions in list(self._sessions.items()):
+                if ip and key[0] != ip:
+                    continue
+                for session in [s for s in sessions if not s.in_use]:
+                    sessions.remove(session)
+                    idle.append(session)
+            self._stats['closed'] += len(idle)
+        for session in idle:
+            self._close(session)
+
+    def _start_reaper(self) -> None:
+        if self._reaper is not None:
+            return
+        with self._condition:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="ssh-pool-reaper", daemon=True)
+            self._reaper.start()
+        atexit.register(self.close)
+
+    def _reap_loop(self) -> None:
+        interval = max(1, min(self.idle_ttl, 60))
+        while not self._stopped.wait(interval):
+            self.cleanup_idle()
+
+    def close(self) -> None:
+        """Stop the reaper and close every idle session."""
+        self._stopped.set()
+        self.close_all()
+
+    def get_info(self) -> Dict[str, Any]:
+        """Open and busy sessions per device plus counters."""
+        with self._condition:
+            return {
+                'devices': {
+                    f"{ip} ({username})": {
+                        'open': len(sessions),
+                        'in_use': sum(1 for s in sessions if s.in_use)
+                    }
+                    for (ip, username), sessions in self._sessions.items() if sessions
+                },
+                'max_sessions_per_device': self.max_sessions_per_device,
+                'idle_ttl': self.idle_ttl,
+                'stats': dict(self._stats)
+            }
+
+
+# Global SSH session pool instance
+ssh_session_pool = SSHSessionPool()
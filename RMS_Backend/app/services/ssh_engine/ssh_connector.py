@@ -1,10 +1,10 @@
-from netmiko import ConnectHandler
 import paramiko
 import time
 import subprocess
 import platform
 import logging
 from app.utils.sanitizer import validate_device_credentials, validate_command, validate_config
+from app.services.ssh_engine.session_pool import ssh_session_pool
 
 logger = logging.getLogger(__name__)
 
@@ -72,27 +72,14 @@ def run_show_command(ip: str, username: str, password: str, command: str):
         # Log the operation for security monitoring
         logger.info(f"Running show command on device {ip} with user {username}: {command}")
         
-        device = {
-            'device_type': 'cisco_ios',
-            'host': ip,
-            'username': username,
-            'password': password,
-            'secret': password,
-            'fast_cli': False,
-        }
-
-        net_connect = ConnectHandler(**device)
-        net_connect.set_base_prompt()
-        net_connect.enable()
-
-        output = net_connect.send_command(
-            command,
+        # Pooled, already enabled session: repeated commands reuse one login
+        output = ssh_session_pool.send_command(
+            ip, username, password, command,
             expect_string=r"#",
             delay_factor=2,
             read_timeout=20
         )
 
-        net_connect.disconnect()
         logger.info(f"Show command executed successfully on {ip}")
         return output
     except Exception as e:
@@ -165,19 +152,8 @@ def check_device_status(ip: str, username: str, password: str) -> dict:
 
 def get_hostname(ip: str, username: str, password: str) -> str:
     try:
-        device = {
-            'device_type': 'cisco_ios',
-            'host': ip,
-            'username': username,
-            'password': password,
-            'secret': password,
-        }
-
-        net_connect = ConnectHandler(**device)
-        net_connect.enable()
-        hostname = net_connect.find_prompt().strip()
-        net_connect.disconnect()
-        return hostname
+        with ssh_session_pool.session(ip, username, password) as net_connect:
+            return net_connect.find_prompt().strip()
     except Exception as e:
         logger.debug(f"Failed to get hostname for {ip}: {e}")
         return "device"
@@ -8,16 +8,28 @@ from sqlalchemy.orm import Session
 from app.models.base import Device, DeviceLog, LogType
 from app.services.snmp_service import SNMPService
 from app.services.device_service import DeviceService
+from app.utils.icmp_sweeper import icmp_sweeper
 
 class DeviceStatusService:
     def __init__(self, db: Session):
         self.db = db
         self.snmp_service = SNMPService()
         self.device_service = DeviceService(db)
+        # Echo results of the last batched sweep (refresh_all_devices_status)
+        self._swept_ping: Dict[str, bool] = {}
     
     def ping_device(self, ip: str) -> bool:
         """Ping a device to check basic connectivity."""
         try:
+            if ip in self._swept_ping:
+                return self._swept_ping[ip]
+            
+            # In-process ICMP echo; the ping command and TCP probes are fallbacks
+            if icmp_sweeper.available():
+                ok = icmp_sweeper.ping(ip, timeout=1.0)
+                print(f"[PING] {ip} -> {'✅' if ok else '❌'} (icmp)")
+                return ok
+            
             # First try using ping command if available
             system = platform.system().lower()
             if system == "windows":
@@ -225,10 +237,9 @@ class DeviceStatusService:
             agent = online_agents[0]
             print(f"[AGENT] Found online agent {agent.id} for network {network_id}")
             
-            # Add status test request to pending requests
-            # Import the global pending_discovery_requests from agents service
+            # Push the status test to the agent (websocket, or its long poll)
             try:
-                from app.services.agents import pending_discovery_requests
+                from app.services.agents.agent_job_dispatcher import agent_job_dispatcher
                 
                 # Create a status test request
                 request_id = f"status_test_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}_{agent.id}"
@@ -272,7 +283,7 @@ class DeviceStatusService:
                     "timestamp": datetime.now(timezone.utc).isoformat()
                 }
                 
-                pending_discovery_requests[agent.id] = status_request
+                await asyncio.to_thread(agent_job_dispatcher.enqueue, agent.id, status_request)
                 print(f"[AGENT] Status test request {request_id} queued for agent {agent.id}")
                 
                 # Request agent to test device status
@@ -280,7 +291,7 @@ class DeviceStatusService:
                 return True
                 
             except ImportError:
-                print(f"[AGENT] Could not import pending_discovery_requests, falling back to direct check")
+                print(f"[AGENT] Could not import agent_job_dispatcher, falling back to direct check")
                 return False
             
         except Exception as e:
@@ -296,20 +307,31 @@ class DeviceStatusService:
             devices = self.device_service.get_devices_by_network(network_id)
             print(f"[STATUS] Found {len(devices)} devices in network")
             
+            # Ping every device with one echo sweep up front
+            if icmp_sweeper.available():
+                results = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: icmp_sweeper.sweep([device_info['ip'] for device_info in devices], timeout=1.0)
+                )
+                self._swept_ping = {ip: result.alive for ip, result in results.items()}
+            
             # Process devices
             updated_count = 0
-            for device_info in devices:
-                try:
-                    device_id = device_info['id']
-                    print(f"[STATUS] Processing device: {device_info['ip']}")
-                    
-                    # Refresh individual device status
-                    await self.refresh_device_status(device_id)
-                    updated_count += 1
-                    
-                except Exception as e:
-                    print(f"[STATUS] Error processing device {device_info['ip']}: {str(e)}")
-                    continue
+            try:
+                for device_info in devices:
+                    try:
+                        device_id = device_info['id']
+                        print(f"[STATUS] Processing device: {device_info['ip']}")
+                        
+                        # Refresh individual device status
+                        await self.refresh_device_status(device_id)
+                        updated_count += 1
+                        
+                    except Exception as e:
+                        print(f"[STATUS] Error processing device {device_info['ip']}: {str(e)}")
+                        continue
+            finally:
+                # Sweep results are only valid for this pass
+                self._swept_ping = {}
             
             print(f"[STATUS] Successfully updated {updated_count} devices")
             
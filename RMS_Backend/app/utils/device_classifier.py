@@ -0,0 +1,265 @@
+"""
+sysObjectID device classifier
+
+Vendor, family, model and device type from a sysObjectID, looked up in a
+longest-prefix trie of enterprise and product OIDs. A lookup walks the OID's
+arcs once, and results are memoised per sysObjectID so the classifier can run
+inline on every response of a discovery sweep. sysDescr keywords are only
+consulted for the device type when the table entry does not carry one.
+
+Stdlib only: the standalone agent imports this module as well.
+"""
+
+import json
+import re
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ENTERPRISES = '1.3.6.1.4.1'
+
+
+class DeviceClassification(NamedTuple):
+    vendor: str
+    family: str
+    model: str
+    device_type: str
+    matched_prefix: str
+
+
+# (OID prefix, vendor, family, model, device_type); longest prefix wins and
+# empty fields inherit from the enclosing prefix
+SYS_OBJECT_ID_TABLE: List[Tuple[str, str, str, str, str]] = [
+    # Cisco
+    ('1.3.6.1.4.1.9', 'cisco', '', '', ''),
+    ('1.3.6.1.4.1.9.1.516', '', 'Catalyst', 'WS-C3750', 'Switch'),
+    ('1.3.6.1.4.1.9.1.1208', '', 'Catalyst', 'WS-C2960S', 'Switch'),
+    ('1.3.6.1.4.1.9.1.1745', '', 'Catalyst', 'WS-C3850', 'Switch'),
+    ('1.3.6.1.4.1.9.12.3.1.3', '', 'Nexus', '', 'Switch'),
+    # Juniper
+    ('1.3.6.1.4.1.2636', 'juniper', '', '', ''),
+    ('1.3.6.1.4.1.2636.1.1.1.2.21', '', 'MX', 'MX960', 'Router'),
+    ('1.3.6.1.4.1.2636.1.1.1.2.25', '', 'MX', 'MX480', 'Router'),
+    ('1.3.6.1.4.1.2636.1.1.1.2.29', '', 'MX', 'MX240', 'Router'),
+    ('1.3.6.1.4.1.2636.1.1.1.2.30', '', 'EX', 'EX3200', 'Switch'),
+    ('1.3.6.1.4.1.2636.1.1.1.2.31', '', 'EX', 'EX4200', 'Switch'),
+    # Arista
+    ('1.3.6.1.4.1.30065', 'arista', 'EOS', '', 'Switch'),
+    # HP / HPE / Aruba
+    ('1.3.6.1.4.1.11', 'hp', '', '', ''),
+    ('1.3.6.1.4.1.11.2.3.7.11', '', 'ProCurve', '', 'Switch'),
+    ('1.3.6.1.4.1.25506', 'hp', 'Comware', '', ''),
+    ('1.3.6.1.4.1.14823', 'hp', 'Aruba', '', ''),
+    # Dell / Force10
+    ('1.3.6.1.4.1.674', 'dell', '', '', ''),
+    ('1.3.6.1.4.1.674.10895', '', 'PowerConnect', '', 'Switch'),
+    ('1.3.6.1.4.1.6027', 'dell', 'FTOS', '', 'Switch'),
+    # Brocade / Foundry
+    ('1.3.6.1.4.1.1991', 'brocade', 'FastIron', '', 'Switch'),
+    ('1.3.6.1.4.1.1588', 'brocade', 'Fabric OS', '', 'Switch'),
+    # Others
+    ('1.3.6.1.4.1.1916', 'extreme', '', '', 'Switch'),
+    ('1.3.6.1.4.1.2011', 'huawei', '', '', ''),
+    ('1.3.6.1.4.1.14988', 'mikrotik', 'RouterOS', '', 'Router'),
+    ('1.3.6.1.4.1.41112', 'ubiquiti', '', '', ''),
+    ('1.3.6.1.4.1.25461', 'paloalto', 'PAN-OS', '', 'Firewall'),
+    ('1.3.6.1.4.1.12356', 'fortinet', 'FortiOS', '', 'Firewall'),
+    ('1.3.6.1.4.1.2620', 'checkpoint', '', '', 'Firewall'),
+    ('1.3.6.1.4.1.8072.3.2.10', 'net-snmp', 'Linux', '', 'Server'),
+    ('1.3.6.1.4.1.311', 'microsoft', 'Windows', '', 'Server'),
+    ('1.3.6.1.4.1.6876', 'vmware', 'ESXi', '', 'Server'),
+]
+
+# sysDescr keywords, in priority order, for entries without a device type
+DEVICE_TYPE_KEYWORDS: List[Tuple[str, str]] = [
+    ('Router', r'router|rtr|gateway|border'),
+    ('Switch', r'switch|catalyst|nexus'),
+    ('Firewall', r'firewall|\basa\b|security appliance|palo alto|fortigate'),
+    ('Access Point', r'access point|wireless|\bap\b'),
+]
+
+# Host OS keywords, tried after DEVICE_TYPE_KEYWORDS and never for network
+# vendors: IOS-XE images name their Linux host (X86_64_LINUX_IOSD-...)
+HOST_TYPE_KEYWORDS: List[Tuple[str, str]] = [
+    ('Virtual Machine', r'vmware'),
+    ('Server', r'server|workstation|linux|ubuntu|centos|debian|red ?hat|windows'),
+]
+
+# sysDescr vendor keywords, used when the sysObjectID is missing or unknown
+VENDOR_KEYWORDS: List[Tuple[str, str]] = [
+    ('cisco', r'cisco|\bios\b|ios-xe|nx-os'),
+    ('juniper', r'juniper|junos'),
+    ('arista', r'arista|\beos\b'),
+    ('hp', r'\bhp\b|hewlett|procurve|aruba|comware'),
+    ('dell', r'\bdell\b|powerconnect|force10'),
+    ('brocade', r'brocade|foundry|fastiron'),
+]
+
+NETWORK_VENDORS = {'cisco', 'juniper', 'arista', 'hp', 'dell', 'brocade', 'extreme', 'huawei', 'mikrotik', 'ubiquiti'}
+
+
+def _keyword_regex(rules: List[Tuple[str, str]]) -> re.Pattern:
+    return re.compile('|'.join(f"(?P<_k{i}>{pattern})" for i, (_, pattern) in enumerate(rules)), re.IGNORECASE)
+
+
+def _first_rule(regex: re.Pattern, rules: List[Tuple[str, str]], text: str) -> Optional[str]:
+    """Highest-priority rule matching anywhere in text, in one scan."""
+    best = None
+    for match in regex.finditer(text):
+        index = int(match.lastgroup[2:])
+        if best is None or index < best:
+            best = index
+            if best == 0:
+                break
+    return rules[best][0] if best is not None else None
+
+
+def parse_oid(sys_object_id: str) -> Tuple[int, ...]:
+    """Numeric arcs of a sysObjectID ('1.3.6...', '.1.3.6...', 'SNMPv2-SMI::enterprises.9...')"""
+    oid = (sys_object_id or '').strip()
+    if '::' in oid:
+        oid = oid.split('::', 1)[1]
+    if oid.startswith('enterprises.'):
+        oid = ENTERPRISES + oid[len('enterprises'):]
+    elif oid.startswith('iso.'):
+        oid = '1' + oid[3:]
+    try:
+        return tuple(int(arc) for arc in oid.strip('.').split('.'))
+    except ValueError:
+        return ()
+
+
+class DeviceClassifier:
+    """
+    Longest-prefix trie over sysObjectID arcs.
+    Each trie node is a dict of child arcs; a node with an entry stores it
+    under the None key, already merged with its ancestors' fields.
+    """
+
+    def __init__(self, table: Iterable[Tuple[str, str, str, str, str]] = None, cache_size: int = 65536):
+        """
+        Build the trie.
+
+        Args:
+            table: (prefix, vendor, family, model, device_type) rows,
+                defaults to SYS_OBJECT_ID_TABLE
+            cache_size: sysObjectIDs memoised before the cache is reset
+        """
+        self._root: Dict[Any, Any] = {}
+        self._cache: Dict[str, Tuple[str, str, str, str, str]] = {}
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._device_type_regex = _keyword_regex(DEVICE_TYPE_KEYWORDS)
+        self._host_type_regex = _keyword_regex(HOST_TYPE_KEYWORDS)
+        self._vendor_regex = _keyword_regex(VENDOR_KEYWORDS)
+        self._stats = {'lookups': 0, 'cache_hits': 0}
+
+        rows = sorted(table if table is not None else SYS_OBJECT_ID_TABLE, key=lambda row: len(parse_oid(row[0])))
+        for row in rows:
+            self.add(*row)
+
+    def add(self, prefix: str, vendor: str = '', family: str = '', model: str = '', device_type: str = '') -> None:
+        """
+        Add or replace a prefix. Empty fields inherit from the longest shorter
+        prefix already in the trie, so add enterprise prefixes before products.
+        """
+        arcs = parse_oid(prefix)
+        if not arcs:
+            raise ValueError(f"Invalid sysObjectID prefix: {prefix!r}")
+        with self._lock:
+            node = self._root
+            inherited = ('', '', '', '', '')
+            for arc in arcs:
+                node = node.setdefault(arc, {})
+                if None in node:
+                    inherited = node[None]
+            node[None] = (
+                vendor or inherited[0],
+                family or inherited[1],
+                model or inherited[2],
+                device_type or inherited[3],
+                '.'.join(map(str, arcs))
+            )
+            self._cache.clear()
+
+    def load_table(self, path: str) -> int:
+        """
+        Add rows from a JSON file: a list of objects with 'prefix' and any of
+        vendor/family/model/device_type. Returns rows added.
+        """
+        with open(path) as f:
+            rows = json.load(f)
+        rows.sort(key=lambda row: len(parse_oid(row.get('prefix', ''))))
+        for row in rows:
+            self.add(row['prefix'], row.get('vendor', ''), row.get('family', ''),
+                     row.get('model', ''), row.get('device_type', ''))
+        logger.info(f"Loaded {len(rows)} sysObjectID entries from {path}")
+        return len(rows)
+
+    def lookup(self, sys_object_id: str) -> Tuple[str, str, str, str, str]:
+        """Longest-prefix entry for a sysObjectID: (vendor, family, model, device_type, prefix)"""
+        cached = self._cache.get(sys_object_id)
+        self._stats['lookups'] += 1
+        if cached is not None:
+            self._stats['cache_hits'] += 1
+            return cached
+
+        entry = ('', '', '', '', '')
+        node = self._root
+        for arc in parse_oid(sys_object_id):
+            node = node.get(arc)
+            if node is None:
+                break
+            entry = node.get(None, entry)
+
+        if len(self._cache) >= self._cache_size:
+            self._cache.clear()
+        self._cache[sys_object_id] = entry
+        return entry
+
+    def classify(self, sys_object_id: str = '', sys_descr: str = '') -> DeviceClassification:
+        """
+        Classify a device.
+
+        Args:
+            sys_object_id: sysObjectID value
+            sys_descr: sysDescr, used for vendor and device type when the
+                sysObjectID entry does not provide them
+
+        Returns:
+            DeviceClassification; unknown fields are 'unknown', an unknown
+            device type is 'Unknown'
+        """
+        vendor, family, model, device_type, prefix = self.lookup(sys_object_id) if sys_object_id else ('', '', '', '', '')
+        if sys_descr:
+            if not vendor:
+                vendor = _first_rule(self._vendor_regex, VENDOR_KEYWORDS, sys_descr) or ''
+            if not device_type:
+                device_type = _first_rule(self._device_type_regex, DEVICE_TYPE_KEYWORDS, sys_descr) or ''
+            if not device_type and vendor not in NETWORK_VENDORS:
+                device_type = _first_rule(self._host_type_regex, HOST_TYPE_KEYWORDS, sys_descr) or ''
+        if not device_type and vendor in NETWORK_VENDORS:
+            device_type = 'Network Device'
+
+        return DeviceClassification(
+            vendor or 'unknown',
+            family or 'unknown',
+            model or 'unknown',
+            device_type or 'Unknown',
+            prefix
+        )
+
+    def vendor(self, sys_object_id: str = '', sys_descr: str = '', default: str = 'unknown') -> str:
+        """Vendor only, with a caller-specific default"""
+        vendor = self.classify(sys_object_id, sys_descr).vendor
+        return vendor if vendor != 'unknown' else default
+
+    def get_info(self) -> Dict[str, Any]:
+        """Cache size and hit counters"""
+        return {'cached': len(self._cache), **self._stats}
+
+
+# Global device classifier instance
+device_classifier = DeviceClassifier()
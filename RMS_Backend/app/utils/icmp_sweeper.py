@@ -0,0 +1,317 @@
+"""
+In-process ICMP echo sweeper
+
+Pings thousands of IPv4 targets from one socket instead of forking a `ping`
+process per address. Echo requests for every target are paced out of a
+single ICMP socket, replies are matched back by (source address, sequence)
+and each host gets its sent / received counts and round-trip times.
+
+The socket is a Linux unprivileged datagram ICMP socket (allowed for groups
+listed in net.ipv4.ping_group_range); the kernel then owns the echo
+identifier and only hands this socket its own replies. A raw socket is used
+when that is not permitted but the process has CAP_NET_RAW. When neither
+is available, available() is False and callers keep their `ping` fallback.
+
+Stdlib only: the standalone agent imports this module as well.
+"""
+
+import errno
+import ipaddress
+import logging
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# 8-byte ICMP header + 16 bytes of payload (a 24-byte echo like `ping -s 16`)
+_PAYLOAD = b'rms-icmp-sweeper'
+_HEADER = struct.Struct('!BBHHH')
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def _echo_request(ident: int, sequence: int) -> bytes:
+    header = _HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, ident, sequence)
+    checksum = _checksum(header + _PAYLOAD)
+    return _HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum, ident, sequence) + _PAYLOAD
+
+
+class PingResult:
+    """Echo statistics for one target."""
+
+    __slots__ = ('ip', 'sent', 'received', 'rtts')
+
+    def __init__(self, ip: str):
+        self.ip = ip
+        self.sent = 0
+        self.received = 0
+        self.rtts: List[float] = []   # milliseconds
+
+    @property
+    def alive(self) -> bool:
+        return self.received > 0
+
+    @property
+    def loss(self) -> float:
+        """Fraction of echoes lost (1.0 when nothing could be sent)."""
+        return 1.0 - self.received / self.sent if self.sent else 1.0
+
+    @property
+    def rtt_avg(self) -> Optional[float]:
+        return sum(self.rtts) / len(self.rtts) if self.rtts else None
+
+    def to_dict(self) -> Dict:
+        return {
+            'ip': self.ip,
+            'alive': self.alive,
+            'sent': self.sent,
+            'received': self.received,
+            'loss': round(self.loss, 3),
+            'rtt_min': round(min(self.rtts), 3) if self.rtts else None,
+            'rtt_avg': round(self.rtt_avg, 3) if self.rtts else None,
+            'rtt_max': round(max(self.rtts), 3) if self.rtts else None,
+        }
+
+    def __repr__(self) -> str:
+        return f"PingResult({self.ip}, {self.received}/{self.sent}, avg={self.rtt_avg})"
+
+
+class IcmpSweeper:
+    """Batched ICMP echo over one socket per sweep."""
+
+    def __init__(self, timeout: float = 1.0, count: int = 1, rate: int = 5000):
+        """
+        Args:
+            timeout: Seconds to wait for replies after the last echo of a round
+            count: Echoes per target
+            rate: Echo requests sent per second (paces large sweeps so the
+                first-hop router and the receive buffer are not flooded)
+        """
+        self.timeout = timeout
+        self.count = count
+        self.rate = rate
+        self._mode: Optional[str] = None   # 'dgram', 'raw' or '' (unavailable)
+        self._mode_lock = threading.Lock()
+        self._ident_lock = threading.Lock()
+        self._next_ident = os.getpid() & 0xffff
+        self._stats = {'sweeps': 0, 'targets': 0, 'sent': 0, 'received': 0}
+
+    # ------------------------------------------------------------------
+    # Socket
+    # ------------------------------------------------------------------
+
+    def _open(self, mode: str) -> socket.socket:
+        kind = socket.SOCK_DGRAM if mode == 'dgram' else socket.SOCK_RAW
+        sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        except OSError:
+            pass
+        sock.setblocking(False)
+        return sock
+
+    def _socket(self) -> Optional[socket.socket]:
+        """A fresh ICMP socket, or None when ICMP sockets are not permitted."""
+        if self._mode == '':
+            return None
+        if self._mode:
+            return self._open(self._mode)
+        with self._mode_lock:
+            for mode in ('dgram', 'raw'):
+                try:
+                    sock = self._open(mode)
+                except (OSError, AttributeError) as e:
+                    logger.debug(f"ICMP {mode} socket unavailable: {e}")
+                    continue
+                if self._mode is None:
+                    logger.info(f"ICMP sweeper using {mode} sockets")
+                self._mode = mode
+                return sock
+            logger.info("ICMP sockets not permitted; callers fall back to the ping command")
+            self._mode = ''
+            return None
+
+    def available(self) -> bool:
+        """True when this process may open an ICMP socket."""
+        if self._mode is None:
+            sock = self._socket()
+            if sock:
+                sock.close()
+        return bool(self._mode)
+
+    def _ident(self) -> int:
+        # Raw sockets see every echo reply on the host: tell sweeps apart by id
+        with self._ident_lock:
+            self._next_ident = (self._next_ident + 1) & 0xffff
+            return self._next_ident
+
+    # ------------------------------------------------------------------
+    # Sweeping
+    # ------------------------------------------------------------------
+
+    def sweep(self, ips: Iterable[str], count: int = None, timeout: float = None) -> Dict[str, PingResult]:
+        """
+        Ping every target and collect per-host results.
+
+        Args:
+            ips: IPv4 addresses (hostnames are resolved first)
+            count: Echoes per target (default self.count)
+            timeout: Seconds to wait after each round (default self.timeout)
+
+        Returns:
+            {ip: PingResult} in input order; an unresolvable target has sent == 0
+
+        Raises:
+            OSError: ICMP sockets are not permitted (check available() first)
+        """
+        count = max(1, count or self.count)
+        timeout = self.timeout if timeout is None else timeout
+        results: Dict[str, PingResult] = {}
+        targets: List[Tuple[str, str]] = []   # (ip as given, resolved address)
+        for ip in ips:
+            if ip in results:
+                continue
+            results[ip] = PingResult(ip)
+            address = _resolve(ip)
+            if address:
+                targets.append((ip, address))
+        if not targets:
+            return results
+
+        sock = self._socket()
+        if sock is None:
+            raise OSError(errno.EPERM, "ICMP sockets are not permitted")
+
+        raw = self._mode == 'raw'
+        ident = self._ident()
+        # (address, sequence) -> (result, send time); sequences wrap at 16 bits,
+        # which only matters for the same address, i.e. after 65536 rounds
+        pending: Dict[Tuple[str, int], Tuple[PingResult, float]] = {}
+        by_address: Dict[str, PingResult] = {}
+        for ip, address in targets:
+            by_address.setdefault(address, results[ip])
+        gap = 1.0 / self.rate if self.rate else 0.0
+        sequence = 0
+
+        try:
+            for _ in range(count):
+                next_send = time.monotonic()
+                for address, result in by_address.items():
+                    sequence = (sequence + 1) & 0xffff
+                    now = time.monotonic()
+                    while now < next_send:
+                        self._receive(sock, raw, ident, pending, next_send - now)
+                        now = time.monotonic()
+                    try:
+                        sock.sendto(_echo_request(ident, sequence), (address, 0))
+                    except BlockingIOError:
+                        # Send buffer full: drain replies and retry once
+                        self._receive(sock, raw, ident, pending, 0.01)
+                        try:
+                            sock.sendto(_echo_request(ident, sequence), (address, 0))
+                        except OSError as e:
+                            logger.debug(f"ICMP echo to {address} not sent: {e}")
+                            continue
+                    except OSError as e:
+                        # Unroutable, broadcast without SO_BROADCAST, ...: counted as lost
+                        result.sent += 1
+                        logger.debug(f"ICMP echo to {address} not sent: {e}")
+                        continue
+                    result.sent += 1
+                    pending[(address, sequence)] = (result, time.monotonic())
+                    next_send = max(next_send + gap, now)
+
+                deadline = time.monotonic() + timeout
+                while pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._receive(sock, raw, ident, pending, remaining)
+                # Late replies of this round no longer count
+                pending.clear()
+        finally:
+            sock.close()
+
+        # Results for duplicate resolutions (two names, one address)
+        for ip, address in targets:
+            source = by_address[address]
+            if results[ip] is not source:
+                results[ip].sent, results[ip].received, results[ip].rtts = source.sent, source.received, source.rtts
+
+        self._stats['sweeps'] += 1
+        self._stats['targets'] += len(results)
+        self._stats['sent'] += sum(r.sent for r in by_address.values())
+        self._stats['received'] += sum(r.received for r in by_address.values())
+        return results
+
+    def _receive(self, sock: socket.socket, raw: bool, ident: int,
+                 pending: Dict[Tuple[str, int], Tuple[PingResult, float]], wait: float) -> None:
+        """Wait up to wait seconds for replies, then read every queued reply."""
+        readable, _, _ = select.select([sock], [], [], max(wait, 0))
+        if not readable:
+            return
+        while True:
+            try:
+                packet, (address, _) = sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # ICMP errors queued on the socket (e.g. host unreachable)
+                logger.debug(f"ICMP receive error: {e}")
+                continue
+            received = time.monotonic()
+            if raw:
+                packet = packet[(packet[0] & 0x0f) * 4:]
+            if len(packet) < _HEADER.size:
+                continue
+            kind, _, _, reply_ident, sequence = _HEADER.unpack_from(packet)
+            # Datagram sockets: the kernel rewrote the id and filters replies
+            if kind != ICMP_ECHO_REPLY or (raw and reply_ident != ident):
+                continue
+            entry = pending.pop((address, sequence), None)
+            if entry:
+                result, sent_at = entry
+                result.received += 1
+                result.rtts.append((received - sent_at) * 1000)
+
+    def ping(self, ip: str, timeout: float = None, count: int = 1) -> bool:
+        """Single-target convenience wrapper: True when any echo was answered."""
+        return self.sweep([ip], count=count, timeout=timeout)[ip].alive
+
+    def alive(self, ips: Iterable[str], timeout: float = None, count: int = None) -> List[str]:
+        """The targets that answered, in input order."""
+        return [ip for ip, result in self.sweep(ips, count=count, timeout=timeout).items() if result.alive]
+
+    def get_info(self) -> Dict:
+        return {'mode': self._mode or None, 'rate': self.rate, **self._stats}
+
+
+def _resolve(ip: str) -> Optional[str]:
+    try:
+        return str(ipaddress.IPv4Address(ip))
+    except ValueError:
+        pass
+    try:
+        return socket.gethostbyname(ip)
+    except OSError:
+        logger.debug(f"Cannot resolve {ip} for ICMP echo")
+        return None
+
+
+# Global ICMP sweeper instance
+icmp_sweeper = IcmpSweeper()
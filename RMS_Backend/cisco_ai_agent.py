@@ -9,12 +9,14 @@ import sys
 import json
 import time
 import logging
+import random
 import threading
 import subprocess
 import platform
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import requests
 import websocket
@@ -40,6 +42,7 @@ try:
         getCmd, SnmpEngine, CommunityData, UsmUserData,
         UdpTransportTarget, ContextData, ObjectType, ObjectIdentity
     )
+    from pysnmp.smi.compiler import addMibCompiler, defaultDest
     SNMP_AVAILABLE = True
     logger.info("SNMP libraries loaded successfully")
 except ImportError as e:
@@ -49,6 +52,57 @@ except Exception as e:
     logger.warning(f"SNMP library error: {e}. SNMP discovery will be disabled.")
     SNMP_AVAILABLE = False
 
+# Shared sysObjectID classifier; only importable when run from the backend tree
+try:
+    from app.utils.device_classifier import device_classifier
+    CLASSIFIER_AVAILABLE = True
+except ImportError:
+    CLASSIFIER_AVAILABLE = False
+
+# Shared keep-alive HTTP client (pooled TLS connections, gzip bodies, jittered
+# retries); the requests module has the same call interface
+try:
+    from cisco_ai_agent_modules.http_transport import agent_transport as http_client
+except ImportError:
+    http_client = requests
+
+# In-process ICMP echo sweeper; without it (or without ICMP socket permission)
+# reachability checks fork the ping command
+try:
+    from app.utils.icmp_sweeper import icmp_sweeper
+    ICMP_SWEEPER_AVAILABLE = True
+except ImportError:
+    ICMP_SWEEPER_AVAILABLE = False
+
+# Coalescing progress sender; without it every progress update is a blocking POST
+try:
+    from cisco_ai_agent_modules.progress_reporter import ProgressReporter
+    PROGRESS_REPORTER_AVAILABLE = True
+except ImportError:
+    PROGRESS_REPORTER_AVAILABLE = False
+
+# Sequenced result batches streamed during discovery; without it all results
+# are sent in one request at the end
+try:
+    from cisco_ai_agent_modules.result_streamer import ResultStreamer
+    RESULT_STREAMER_AVAILABLE = True
+except ImportError:
+    RESULT_STREAMER_AVAILABLE = False
+
+# On-disk spool for reports the backend could not take; without it they are dropped
+try:
+    from cisco_ai_agent_modules.offline_spool import OfflineSpool, DELIVERED, REJECTED, SPOOLED, send_result
+    OFFLINE_SPOOL_AVAILABLE = True
+except ImportError:
+    OFFLINE_SPOOL_AVAILABLE = False
+
+# Concurrent sweep engine; without it enhanced discovery probes one IP at a time
+try:
+    from cisco_ai_agent_modules.sweep_engine import SweepEngine
+    SWEEP_ENGINE_AVAILABLE = True
+except ImportError:
+    SWEEP_ENGINE_AVAILABLE = False
+
 class CiscoAIAgent:
     """Main agent class for device discovery and monitoring"""
     
@@ -63,11 +117,54 @@ class CiscoAIAgent:
         # WebSocket connection for real-time communication
         self.ws = None
         self.ws_connected = False
+        self._ws_opened = False
+        self._ws_close_code = None
+        # Recently started job ids: a redelivered job is acknowledged, not rerun
+        self._started_jobs = deque(maxlen=256)
         
         # Discovery state
         self.discovered_devices = {}
         self.discovery_running = False
         
+        # One SNMP engine per discovery thread, all sharing one MIB compiler
+        self._snmp_local = threading.local()
+        self._mib_compiler = None
+        self._mib_compiler_lock = threading.Lock()
+        
+        # Discovery progress is posted from a background thread, coalesced
+        self.progress_reporter = None
+        if PROGRESS_REPORTER_AVAILABLE:
+            self.progress_reporter = ProgressReporter(
+                self.post_enhanced_discovery_progress,
+                min_interval=self.config.get('progress_interval', 2.0),
+                min_step=self.config.get('progress_step', 5)
+            )
+        
+        # Reports the backend could not take are spooled to disk and replayed
+        self.offline_spool = None
+        if OFFLINE_SPOOL_AVAILABLE:
+            try:
+                self.offline_spool = OfflineSpool(
+                    self.config.get('spool_dir', 'agent_spool'),
+                    self.post_spooled_report,
+                    max_bytes=int(self.config.get('spool_max_mb', 64)) << 20
+                )
+            except OSError as e:
+                logger.warning(f"Offline spool unavailable: {e}")
+        
+        # Discovery results are streamed in acknowledged batches while sweeping;
+        # batches the backend does not acknowledge go to the offline spool
+        self.result_streamer = None
+        if RESULT_STREAMER_AVAILABLE:
+            self.result_streamer = ResultStreamer(
+                self.post_discovery_result_batch,
+                batch_size=self.config.get('result_batch_size', 50),
+                max_delay=self.config.get('result_batch_delay', 5.0),
+                spool=self.offline_spool,
+                spool_path=(f"/api/v1/agents/{self.config['agent_id']}/discovery-results/batch"
+                            if self.config.get('agent_id') else None)
+            )
+        
         # Service state
         self.running = False
         
@@ -167,66 +264,141 @@ class CiscoAIAgent:
         if self.ws:
             self.ws.close()
         
+        # Spooled reports stay on disk and are replayed after the next start
+        if self.result_streamer:
+            self.result_streamer.stop()
+        if self.offline_spool:
+            self.offline_spool.close()
+        
         # Update status to offline
         self.update_status("offline")
     
     def start_websocket(self):
-        """Start HTTP polling instead of WebSocket (Cloud Run doesn't support WebSocket)"""
+        """Start the command channel: jobs are pushed over the agent websocket, long-polled over HTTP without it"""
         try:
-            logger.info("Starting HTTP polling mode (Cloud Run compatible)")
-            self.ws_connected = True  # Simulate connection for compatibility
+            logger.info("Starting command channel")
             self.update_status("online")
             
-            # Start polling thread
-            polling_thread = threading.Thread(target=self.polling_loop, daemon=True)
-            polling_thread.start()
+            command_thread = threading.Thread(target=self.command_loop, daemon=True)
+            command_thread.start()
             
         except Exception as e:
-            logger.error(f"Failed to start HTTP polling: {e}")
+            logger.error(f"Failed to start command channel: {e}")
     
-    def polling_loop(self):
-        """HTTP polling loop to check for commands from backend"""
+    def command_loop(self):
+        """Receive jobs from the backend, over the websocket when it connects and HTTP long poll otherwise"""
+        use_websocket = self.config.get('use_websocket', True)
+        retry_interval = self.config.get('websocket_retry_interval', 300)
+        failures = 0
         while self.running:
-            try:
-                # Check for any pending commands from backend
-                self.check_for_commands()
-                time.sleep(10)  # Poll every 10 seconds for faster response
-            except Exception as e:
-                logger.error(f"Error in polling loop: {e}")
-                time.sleep(30)  # Wait longer on error
-    
-    def check_for_commands(self):
-        """Check for any commands from the backend"""
+            if use_websocket:
+                if self.run_websocket():
+                    # Dropped after being up (backend restart): reconnect, spread across agents
+                    failures = 0
+                    time.sleep(random.uniform(1, 5))
+                    continue
+                if not self.running:
+                    break
+                failures += 1
+                if failures < 3 and self._ws_close_code not in (4001, 4003):
+                    time.sleep(2 ** failures)
+                    continue
+                logger.warning(f"Agent websocket unavailable, long-polling for jobs; "
+                               f"retrying the websocket in {retry_interval}s")
+            
+            # Long poll until the websocket is worth another try
+            retry_at = time.monotonic() + retry_interval
+            while self.running and (not use_websocket or time.monotonic() < retry_at):
+                if not self.check_for_discovery_requests(wait=self.config.get('long_poll_wait', 25)):
+                    time.sleep(10)
+            failures = 0
+    
+    def websocket_url(self) -> str:
+        base = self.backend_url.rstrip('/')
+        if base.startswith('https://'):
+            base = 'wss://' + base[len('https://'):]
+        elif base.startswith('http://'):
+            base = 'ws://' + base[len('http://'):]
+        return f"{base}/ws/agent/{self.agent_token}"
+    
+    def run_websocket(self) -> bool:
+        """Hold the agent websocket until it closes; True if it was connected at all"""
+        self._ws_opened = False
+        self._ws_close_code = None
         try:
-            # Check for discovery requests from backend
-            self.check_for_discovery_requests()
-            
-            # Send heartbeat
-            self.send_heartbeat_http()
+            self.ws = websocket.WebSocketApp(
+                self.websocket_url(),
+                on_open=self.on_websocket_open,
+                on_message=self.on_websocket_message,
+                on_error=self.on_websocket_error,
+                on_close=self.on_websocket_close
+            )
+            # Protocol pings keep proxies from idling the socket out and detect a dead backend
+            self.ws.run_forever(ping_interval=self.config.get('websocket_ping_interval', 30), ping_timeout=10)
         except Exception as e:
-            logger.error(f"Error checking for commands: {e}")
+            logger.error(f"Agent websocket error: {e}")
+        finally:
+            self.ws = None
+            self.ws_connected = False
+        return self._ws_opened
     
-    def check_for_discovery_requests(self):
-        """Check for discovery requests from backend"""
+    def check_for_discovery_requests(self, wait: float = 0) -> bool:
+        """Fetch queued jobs from the backend, holding the request up to wait seconds (long poll)"""
         try:
-            # Get pending discovery requests for this agent
             response = self.safe_request(
                 'GET',
                 f"{self.backend_url.rstrip('/')}/api/v1/agents/{self.config['agent_id']}/pending-discovery",
                 headers={'X-Agent-Token': self.agent_token},
-                timeout=15
+                params={'wait': wait},
+                timeout=wait + 15
             )
             
             if response and response.status_code == 200:
-                discovery_requests = response.json()
-                for request in discovery_requests:
-                    if request.get('type') == 'discovery':
-                        self.handle_enhanced_discovery_request(request)
-                    elif request.get('type') == 'status_test':
-                        self.handle_status_test_request(request)
+                for request in response.json():
+                    self.dispatch_job(request)
+                return True
+            return False
                     
         except Exception as e:
             logger.error(f"Error checking for discovery requests: {e}")
+            return False
+    
+    def dispatch_job(self, job: Dict, via_websocket: bool = False):
+        """Start a job pushed or long-polled from the backend and acknowledge it"""
+        job_id = job.get('job_id')
+        status, error = 'accepted', None
+        if job_id and job_id in self._started_jobs:
+            # Our ack was lost and the lease expired: acknowledge again, don't rerun
+            logger.info(f"Job {job_id} was already started, acknowledging redelivery")
+        elif job.get('type') == 'discovery':
+            self.handle_enhanced_discovery_request(job)
+        elif job.get('type') == 'status_test':
+            self.handle_status_test_request(job)
+        else:
+            logger.warning(f"Unknown job type: {job.get('type')}")
+            status, error = 'failed', f"Unknown job type: {job.get('type')}"
+        if job_id:
+            self._started_jobs.append(job_id)
+            self.ack_job(job_id, status, error, via_websocket)
+    
+    def ack_job(self, job_id: str, status: str = 'accepted', error: str = None, via_websocket: bool = False):
+        """Acknowledge a job so the backend does not hand it out again"""
+        ack = {'type': 'job_ack', 'job_id': job_id, 'status': status, 'error': error}
+        if via_websocket and self.ws and self.ws_connected:
+            try:
+                self.ws.send(json.dumps(ack))
+                return
+            except Exception as e:
+                logger.debug(f"Websocket ack of job {job_id} failed, using HTTP: {e}")
+        response = self.safe_request(
+            'POST',
+            f"{self.backend_url.rstrip('/')}/api/v1/agents/{self.config['agent_id']}/jobs/{job_id}/ack",
+            headers={'X-Agent-Token': self.agent_token},
+            json={'status': status, 'error': error},
+            timeout=15
+        )
+        if not response or response.status_code != 200:
+            logger.warning(f"Ack of job {job_id} failed: {response.status_code if response else 'No response'}")
     
     def handle_enhanced_discovery_request(self, request_data: Dict):
         """Handle enhanced discovery request with SNMP configuration"""
@@ -324,109 +496,47 @@ class CiscoAIAgent:
             ip_list = self.parse_ip_range(ip_range, start_ip, end_ip)
             total_ips = len(ip_list)
             discovered_devices = []
+            discovered_count = [0]
             errors = []
             
             # Perform discovery based on method
             method = discovery_method.get('method', 'auto')
             
-            for i, ip_address in enumerate(ip_list):
-                try:
-                    # Update progress
-                    progress = int((i / total_ips) * 100)
-                    self.notify_enhanced_discovery_progress(session_id, progress, i, len(discovered_devices))
-                    
-                    device_info = None
-                    capabilities = []
-                    
-                    if method == 'snmp_only' or method == 'auto':
-                        logger.info(f"Trying SNMP discovery for {ip_address}")
-                        device_info = self.enhanced_snmp_discovery(ip_address, discovery_method, credentials)
-                        if device_info:
-                            logger.info(f"SNMP discovery successful for {ip_address}")
-                            logger.info(f"SNMP serial number: {device_info.get('serial_number', 'Not set')}")
-                            capabilities.append('snmp')
-                            
-                            # If SNMP didn't provide serial number, try SSH to get it
-                            if device_info.get('serial_number') == 'Unknown' and method == 'auto':
-                                logger.info(f"SNMP didn't provide serial number, trying SSH for {ip_address}")
-                                ssh_device_info = self.enhanced_ssh_discovery(ip_address, credentials)
-                                if ssh_device_info and ssh_device_info.get('serial_number') != 'Unknown':
-                                    device_info['serial_number'] = ssh_device_info['serial_number']
-                                    logger.info(f"Updated serial number from SSH: {ssh_device_info['serial_number']}")
-                                    capabilities.append('ssh')
-                                else:
-                                    logger.warning("SSH also didn't provide serial number")
-                                    # Log SSH failure for auto method
-                                    if method == 'auto':
-                                        error_msg = f"Device at {ip_address} SSH authentication failed - could not retrieve serial number"
-                                        errors.append(error_msg)
-                                        logger.warning(error_msg)
-                            else:
-                                logger.info(f"SNMP provided serial number: {device_info.get('serial_number')}")
-                        else:
-                            logger.info(f"SNMP discovery failed for {ip_address}, trying SSH")
-                            # Add SNMP-specific error for better logging
-                            if method == 'snmp_only':
-                                error_msg = f"Device at {ip_address} SNMP discovery failed - device may be unreachable, SNMP not configured, or wrong community string"
-                                errors.append(error_msg)
-                                logger.warning(error_msg)
-                            elif method == 'auto':
-                                # Log SNMP failure for auto method even when we'll try SSH
-                                error_msg = f"Device at {ip_address} SNMP discovery failed - will try SSH as fallback"
-                                errors.append(error_msg)
-                                logger.warning(error_msg)
-                    
-                    if not device_info and (method == 'ssh_only' or method == 'auto'):
-                        logger.info(f"Trying SSH discovery for {ip_address}")
-                        device_info = self.enhanced_ssh_discovery(ip_address, credentials)
-                        if device_info:
-                            logger.info(f"SSH discovery successful for {ip_address}")
-                            capabilities.append('ssh')
-                        else:
-                            logger.info(f"SSH discovery failed for {ip_address}")
-                            # Add SSH-specific error for better logging
-                            if method == 'ssh_only':
-                                error_msg = f"Device at {ip_address} SSH discovery failed - authentication failed or SSH not enabled"
-                                errors.append(error_msg)
-                                logger.warning(error_msg)
-                    
-                    if not device_info and method == 'ping_only':
-                        device_info = self.ping_discovery(ip_address)
-                        if device_info:
-                            capabilities.append('ping')
-                    
+            def record(ip_address: str, device_info: Optional[Dict], host_errors: List[str]):
+                """Collect (or stream) one finished host and report progress."""
+                if device_info:
+                    device_info['discovered_by_agent'] = self.config['agent_id']
+                    device_info['discovered_at'] = datetime.now().isoformat()
+                    device_info['session_id'] = session_id
+                    discovered_count[0] += 1
+                if self.result_streamer:
+                    self.result_streamer.add(session_id, device_info, host_errors)
+                else:
                     if device_info:
-                        device_info['discovered_by_agent'] = self.config['agent_id']
-                        device_info['discovered_at'] = datetime.now().isoformat()
-                        device_info['session_id'] = session_id
-                        
-                        # Set capabilities based on what methods were successful
-                        device_info['capabilities'] = capabilities
                         discovered_devices.append(device_info)
-                    else:
-                        # Device was not discovered - create specific error message
-                        if method == 'ping_only':
-                            error_msg = f"Device at {ip_address} is unreachable (ping failed)"
-                        elif method == 'snmp_only':
-                            error_msg = f"Device at {ip_address} SNMP discovery failed - device may be unreachable or SNMP not configured"
-                        elif method == 'ssh_only':
-                            # SSH error already added above
-                            pass
-                        else:  # auto method
-                            error_msg = f"Device at {ip_address} discovery failed - device unreachable via all methods (ping, SNMP, SSH)"
-                            errors.append(error_msg)
-                            logger.warning(error_msg)
-                        
-                except Exception as e:
-                    error_msg = f"Error discovering {ip_address}: {str(e)}"
-                    errors.append(error_msg)
-                    logger.error(error_msg)
-            
-            # Send results to backend
-            self.send_enhanced_discovery_results(session_id, discovered_devices, errors)
+                    errors.extend(host_errors)
+                processed[0] += 1
+                progress = int((processed[0] / total_ips) * 100) if total_ips else 100
+                self.notify_enhanced_discovery_progress(session_id, progress, processed[0], discovered_count[0],
+                                                        total_ips)
+            
+            processed = [0]
+            if SWEEP_ENGINE_AVAILABLE and total_ips > 1:
+                self.sweep_discovery(ip_list, method, discovery_method, credentials, record)
+            else:
+                for ip_address in ip_list:
+                    record(ip_address, *self.discover_host(ip_address, method, discovery_method, credentials))
+            if self.progress_reporter:
+                self.progress_reporter.finish(session_id)
+            
+            # Send results to backend (the rest of the stream, or everything at once)
+            if self.result_streamer:
+                self.result_streamer.finish(session_id, timeout=self.config.get('result_finish_timeout', 60))
+            else:
+                self.send_enhanced_discovery_results(session_id, discovered_devices, errors)
             
             # Notify completion
-            self.notify_enhanced_discovery_status(session_id, 'completed', len(discovered_devices))
+            self.notify_enhanced_discovery_status(session_id, 'completed', discovered_count[0])
             
         except Exception as e:
             logger.error(f"Error during enhanced discovery: {e}")
@@ -434,6 +544,166 @@ class CiscoAIAgent:
         finally:
             self.discovery_running = False
     
+    def sweep_discovery(self, ip_list: List[str], method: str, discovery_method: Dict, credentials: Dict,
+                        record) -> Dict:
+        """Discover ip_list concurrently; record(ip, device_info, errors) runs as each host completes"""
+        limits = {
+            protocol: tuple(spec)
+            for protocol, spec in self.config.get('sweep_limits', {}).items()
+        }
+        if self._icmp_available():
+            ping_options = {'ping_sweep': lambda ips: icmp_sweeper.alive(ips, timeout=1.0)}
+        else:
+            ping_options = {'ping': self.ping_device}
+        if method in ('snmp_only', 'auto'):
+            # Hosts that only answer SNMP (TCP filtered, no ping) must still count as alive
+            snmp_version = discovery_method.get('snmp_version', 'v2c')
+            ping_options['snmp_port'] = discovery_method.get('snmp_port', 161)
+            ping_options['snmp_communities'] = (
+                [] if snmp_version == 'v3' else [discovery_method.get('snmp_community', 'cisco')]
+            )
+        sweep = SweepEngine(
+            limits=limits,
+            liveness_workers=self.config.get('sweep_liveness_workers', 128),
+            **ping_options
+        )
+        # ping_only identification is the liveness check itself
+        liveness_check = discovery_method.get('liveness_check', True) and method != 'ping_only'
+        
+        def on_result(ip_address: str, alive: bool, result):
+            if not alive:
+                # Skipped as dead: report what discover_host reports for a silent host
+                host_errors = []
+                error_msg = self._unreachable_error(ip_address, method)
+                if error_msg:
+                    host_errors.append(error_msg)
+                    logger.warning(error_msg)
+                record(ip_address, None, host_errors)
+            elif isinstance(result, Exception):
+                error_msg = f"Error discovering {ip_address}: {str(result)}"
+                logger.error(error_msg)
+                record(ip_address, None, [error_msg])
+            else:
+                record(ip_address, *result)
+        
+        stats = sweep.sweep(
+            ip_list,
+            lambda ip_address: self.discover_host(ip_address, method, discovery_method, credentials, sweep),
+            on_result,
+            liveness_check=liveness_check,
+            should_stop=lambda: not self.discovery_running
+        )
+        logger.info(f"Sweep stats: {stats}")
+        return stats
+    
+    @staticmethod
+    def _unreachable_error(ip_address: str, method: str) -> Optional[str]:
+        """Per-host error of a discovery method when the host answers nothing"""
+        if method == 'snmp_only':
+            return f"Device at {ip_address} SNMP discovery failed - device may be unreachable, SNMP not configured, or wrong community string"
+        if method == 'ssh_only':
+            return f"Device at {ip_address} SSH discovery failed - authentication failed or SSH not enabled"
+        if method == 'auto':
+            return f"Device at {ip_address} discovery failed - device unreachable via all methods (ping, SNMP, SSH)"
+        return None
+    
+    def _sweep_call(self, sweep, protocol: str, fn, *args):
+        """Run a discovery probe under the sweep's per-protocol limit (directly without a sweep)"""
+        if sweep is None:
+            return fn(*args)
+        return sweep.call(protocol, fn, *args)
+    
+    def discover_host(self, ip_address: str, method: str, discovery_method: Dict, credentials: Dict,
+                      sweep=None) -> Tuple[Optional[Dict], List[str]]:
+        """Identify one address with the configured method. Returns (device_info, errors)"""
+        errors = []
+        try:
+            device_info = None
+            capabilities = []
+
+            if method == 'snmp_only' or method == 'auto':
+                logger.info(f"Trying SNMP discovery for {ip_address}")
+                device_info = self._sweep_call(sweep, 'snmp', self.enhanced_snmp_discovery, ip_address, discovery_method, credentials)
+                if device_info:
+                    logger.info(f"SNMP discovery successful for {ip_address}")
+                    logger.info(f"SNMP serial number: {device_info.get('serial_number', 'Not set')}")
+                    capabilities.append('snmp')
+
+                    # If SNMP didn't provide serial number, try SSH to get it
+                    if device_info.get('serial_number') == 'Unknown' and method == 'auto':
+                        logger.info(f"SNMP didn't provide serial number, trying SSH for {ip_address}")
+                        ssh_device_info = self._sweep_call(sweep, 'ssh', self.enhanced_ssh_discovery, ip_address, credentials)
+                        if ssh_device_info and ssh_device_info.get('serial_number') != 'Unknown':
+                            device_info['serial_number'] = ssh_device_info['serial_number']
+                            logger.info(f"Updated serial number from SSH: {ssh_device_info['serial_number']}")
+                            capabilities.append('ssh')
+                        else:
+                            logger.warning("SSH also didn't provide serial number")
+                            # Log SSH failure for auto method
+                            if method == 'auto':
+                                error_msg = f"Device at {ip_address} SSH authentication failed - could not retrieve serial number"
+                                errors.append(error_msg)
+                                logger.warning(error_msg)
+                    else:
+                        logger.info(f"SNMP provided serial number: {device_info.get('serial_number')}")
+                else:
+                    logger.info(f"SNMP discovery failed for {ip_address}, trying SSH")
+                    # Add SNMP-specific error for better logging
+                    if method == 'snmp_only':
+                        error_msg = self._unreachable_error(ip_address, method)
+                        errors.append(error_msg)
+                        logger.warning(error_msg)
+                    elif method == 'auto':
+                        # Log SNMP failure for auto method even when we'll try SSH
+                        error_msg = f"Device at {ip_address} SNMP discovery failed - will try SSH as fallback"
+                        errors.append(error_msg)
+                        logger.warning(error_msg)
+
+            if not device_info and (method == 'ssh_only' or method == 'auto'):
+                logger.info(f"Trying SSH discovery for {ip_address}")
+                device_info = self._sweep_call(sweep, 'ssh', self.enhanced_ssh_discovery, ip_address, credentials)
+                if device_info:
+                    logger.info(f"SSH discovery successful for {ip_address}")
+                    capabilities.append('ssh')
+                else:
+                    logger.info(f"SSH discovery failed for {ip_address}")
+                    # Add SSH-specific error for better logging
+                    if method == 'ssh_only':
+                        error_msg = self._unreachable_error(ip_address, method)
+                        errors.append(error_msg)
+                        logger.warning(error_msg)
+
+            if not device_info and method == 'ping_only':
+                device_info = self.ping_discovery(ip_address)
+                if device_info:
+                    capabilities.append('ping')
+
+            if device_info:
+                # Set capabilities based on what methods were successful
+                device_info['capabilities'] = capabilities
+            
+            if not device_info:
+                # Device was not discovered - create specific error message
+                if method == 'ping_only':
+                    error_msg = f"Device at {ip_address} is unreachable (ping failed)"
+                elif method == 'snmp_only':
+                    error_msg = f"Device at {ip_address} SNMP discovery failed - device may be unreachable or SNMP not configured"
+                elif method == 'ssh_only':
+                    # SSH error already added above
+                    pass
+                else:  # auto method
+                    error_msg = self._unreachable_error(ip_address, method)
+                    errors.append(error_msg)
+                    logger.warning(error_msg)
+
+        except Exception as e:
+            error_msg = f"Error discovering {ip_address}: {str(e)}"
+            errors.append(error_msg)
+            logger.error(error_msg)
+            device_info = None
+        
+        return device_info, errors
+    
     def parse_ip_range(self, ip_range: str = None, start_ip: str = None, end_ip: str = None) -> List[str]:
         """Parse IP range into list of IP addresses"""
         ip_list = []
@@ -482,6 +752,29 @@ class CiscoAIAgent:
             logger.error(f"Error parsing IP range {start_ip}-{end_ip}: {e}")
             return []
     
+    def _snmp_engine(self):
+        """SNMP engine for the calling thread.
+        
+        Building an engine (and the MIB compiler pysnmp attaches on the first
+        OID lookup) costs about a second of CPU, which made a concurrent sweep
+        CPU-bound; each thread keeps its engine and all share one compiler.
+        """
+        engine = getattr(self._snmp_local, 'engine', None)
+        if engine is None:
+            engine = SnmpEngine()
+            try:
+                mib_builder = engine.getMibBuilder()
+                with self._mib_compiler_lock:
+                    if self._mib_compiler is None:
+                        addMibCompiler(mib_builder, ifAvailable=True, ifNotAdded=True)
+                        self._mib_compiler = mib_builder.getMibCompiler() or False
+                    elif self._mib_compiler:
+                        mib_builder.setMibCompiler(self._mib_compiler, defaultDest)
+            except Exception as e:
+                logger.debug(f"Could not share MIB compiler: {e}")
+            self._snmp_local.engine = engine
+        return engine
+    
     def enhanced_snmp_discovery(self, ip_address: str, discovery_method: Dict, credentials: Dict) -> Optional[Dict]:
         """Enhanced SNMP discovery with full SNMPv3 support"""
         if not SNMP_AVAILABLE:
@@ -541,7 +834,7 @@ class CiscoAIAgent:
             
             # Query device
             for (errorIndication, errorStatus, errorIndex, varBinds) in getCmd(
-                SnmpEngine(),
+                self._snmp_engine(),
                 user_data,
                 UdpTransportTarget((ip_address, port), timeout=3, retries=1),
                 ContextData(),
@@ -570,6 +863,7 @@ class CiscoAIAgent:
                 location = str(varBinds[2][1]) if len(varBinds) > 2 and varBinds[2][1] else 'Unknown'
                 contact = str(varBinds[3][1]) if len(varBinds) > 3 and varBinds[3][1] else 'Unknown'
                 uptime = str(varBinds[5][1]) if len(varBinds) > 5 and varBinds[5][1] else 'Unknown'
+                sys_object_id = str(varBinds[4][1]) if len(varBinds) > 4 and varBinds[4][1] else ''
                 
                 device_info = {
                     'ip_address': ip_address,
@@ -577,9 +871,9 @@ class CiscoAIAgent:
                     'description': description,
                     'location': self.extract_device_location(description, location),
                     'contact': self.extract_device_contact(description, contact),
-                    'object_id': str(varBinds[4][1]) if len(varBinds) > 4 and varBinds[4][1] else 'Unknown',
+                    'object_id': sys_object_id or 'Unknown',
                     'uptime': self.extract_device_uptime(uptime),
-                    'device_type': self.detect_device_type(description),
+                    'device_type': self.detect_device_type(description, sys_object_id),
                     'os_version': self.extract_os_version(description),
                     'serial_number': self.extract_serial_number(description),
                     'discovery_method': 'snmp',
@@ -620,7 +914,7 @@ class CiscoAIAgent:
             
             # Query device
             for (errorIndication, errorStatus, errorIndex, varBinds) in getCmd(
-                SnmpEngine(),
+                self._snmp_engine(),
                 CommunityData(community, mpModel=mp_model),
                 UdpTransportTarget((ip_address, port), timeout=3, retries=1),
                 ContextData(),
@@ -649,6 +943,7 @@ class CiscoAIAgent:
                 location = str(varBinds[2][1]) if len(varBinds) > 2 and varBinds[2][1] else 'Unknown'
                 contact = str(varBinds[3][1]) if len(varBinds) > 3 and varBinds[3][1] else 'Unknown'
                 uptime = str(varBinds[5][1]) if len(varBinds) > 5 and varBinds[5][1] else 'Unknown'
+                sys_object_id = str(varBinds[4][1]) if len(varBinds) > 4 and varBinds[4][1] else ''
                 
                 logger.info(f"SNMP device info - Description: {description[:100]}...")
                 logger.info(f"SNMP device info - Hostname: {hostname}")
@@ -662,9 +957,9 @@ class CiscoAIAgent:
                     'description': description,
                     'location': self.extract_device_location(description, location),
                     'contact': self.extract_device_contact(description, contact),
-                    'object_id': str(varBinds[4][1]) if len(varBinds) > 4 and varBinds[4][1] else 'Unknown',
+                    'object_id': sys_object_id or 'Unknown',
                     'uptime': self.extract_device_uptime(uptime),
-                    'device_type': self.detect_device_type(description),
+                    'device_type': self.detect_device_type(description, sys_object_id),
                     'os_version': self.extract_os_version(description),
                     'serial_number': self.extract_serial_number(description),
                     'discovery_method': 'snmp',
@@ -1059,29 +1354,38 @@ class CiscoAIAgent:
         
         return device_info
     
+    def _icmp_available(self) -> bool:
+        """True when reachability checks can use the in-process ICMP sweeper"""
+        return ICMP_SWEEPER_AVAILABLE and icmp_sweeper.available()
+    
     def ping_discovery(self, ip_address: str) -> Optional[Dict]:
         """Simple ping discovery"""
         try:
-            # Use ping to check if device is reachable
-            result = subprocess.run(['ping', '-c', '1', '-W', '2', ip_address], 
-                                  capture_output=True, text=True, timeout=5)
-            
-            if result.returncode == 0:
-                return {
-                    'ip_address': ip_address,
-                    'hostname': ip_address,
-                    'description': 'Pingable device',
-                    'location': 'Unknown',
-                    'device_type': 'Unknown',
-                    'os_version': 'Unknown',
-                    'discovery_method': 'ping',
-                    'capabilities': ['ping']
-                }
+            if self._icmp_available():
+                reachable = icmp_sweeper.ping(ip_address, timeout=2.0)
+                if not reachable:
+                    logger.warning(f"Ping failed for {ip_address}: no echo reply")
+                    return None
             else:
-                # Ping failed - log the specific error
-                error_output = result.stderr.strip() if result.stderr else result.stdout.strip()
-                logger.warning(f"Ping failed for {ip_address}: return code {result.returncode}, output: {error_output}")
-                return None
+                # Use ping to check if device is reachable
+                result = subprocess.run(['ping', '-c', '1', '-W', '2', ip_address], 
+                                      capture_output=True, text=True, timeout=5)
+                if result.returncode != 0:
+                    # Ping failed - log the specific error
+                    error_output = result.stderr.strip() if result.stderr else result.stdout.strip()
+                    logger.warning(f"Ping failed for {ip_address}: return code {result.returncode}, output: {error_output}")
+                    return None
+            
+            return {
+                'ip_address': ip_address,
+                'hostname': ip_address,
+                'description': 'Pingable device',
+                'location': 'Unknown',
+                'device_type': 'Unknown',
+                'os_version': 'Unknown',
+                'discovery_method': 'ping',
+                'capabilities': ['ping']
+            }
             
         except subprocess.TimeoutExpired:
             logger.warning(f"Ping timeout for {ip_address} - device may be unreachable")
@@ -1139,7 +1443,7 @@ class CiscoAIAgent:
             
             # Simple SNMP get for system description
             iterator = getCmd(
-                SnmpEngine(),
+                self._snmp_engine(),
                 CommunityData(community),
                 UdpTransportTarget((ip, port), timeout=2, retries=1),
                 ContextData(),
@@ -1174,12 +1478,24 @@ class CiscoAIAgent:
                 agent_id = 94  # Fallback for now
             
             # Use agent-specific endpoint
-            url = f"{self.backend_url}/api/v1/agents/{agent_id}/device-status-report"
+            path = f"/api/v1/agents/{agent_id}/device-status-report"
+            url = f"{self.backend_url}{path}"
             payload = {
                 "network_id": network_id,
                 "device_statuses": device_statuses
             }
             
+            if self.offline_spool:
+                # Spooled while the backend is down; replayed merged per network
+                outcome = self.offline_spool.deliver(path, payload, key=f"network:{network_id}",
+                                                     extend=('device_statuses',))
+                if outcome == DELIVERED:
+                    logger.info(f"Successfully reported status for {len(device_statuses)} devices")
+                    return True
+                if outcome == SPOOLED:
+                    logger.warning(f"Backend did not take the report, spooled status of {len(device_statuses)} devices")
+                return False
+            
             response = self.safe_request(
                 'POST',
                 url,
@@ -1201,6 +1517,9 @@ class CiscoAIAgent:
     def ping_device(self, ip: str) -> bool:
         """Test ping connectivity to a device"""
         try:
+            if self._icmp_available():
+                return icmp_sweeper.ping(ip, timeout=1.0)
+            
             system = platform.system().lower()
             if system == "windows":
                 cmd = ["ping", "-n", "1", "-w", "1000", ip]
@@ -1683,17 +2002,25 @@ class CiscoAIAgent:
         except Exception as e:
             logger.error(f"Error sending discovery status: {e}")
     
-    def notify_enhanced_discovery_progress(self, session_id: str, progress: int, processed_ips: int, discovered_count: int):
-        """Notify backend of enhanced discovery progress"""
+    def notify_enhanced_discovery_progress(self, session_id: str, progress: int, processed_ips: int, discovered_count: int,
+                                           total_ips: int = None):
+        """Notify backend of enhanced discovery progress (coalesced by the progress reporter)"""
+        if self.progress_reporter:
+            self.progress_reporter.update(session_id, progress, processed_ips, discovered_count, total_ips)
+            return
+        
+        self.post_enhanced_discovery_progress({
+            'session_id': session_id,
+            'progress': progress,
+            'processed_ips': processed_ips,
+            'discovered_count': discovered_count,
+            'total_ips': total_ips,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    def post_enhanced_discovery_progress(self, progress_data: Dict) -> bool:
+        """POST one (possibly aggregated) discovery progress update"""
         try:
-            progress_data = {
-                'session_id': session_id,
-                'progress': progress,
-                'processed_ips': processed_ips,
-                'discovered_count': discovered_count,
-                'timestamp': datetime.now().isoformat()
-            }
-            
             response = self.safe_request(
                 'POST',
                 f"{self.backend_url}/api/v1/agents/{self.config['agent_id']}/discovery-progress",
@@ -1702,12 +2029,36 @@ class CiscoAIAgent:
             )
             
             if response and response.status_code == 200:
-                logger.debug(f"Discovery progress sent: {progress}%")
-            else:
-                logger.warning(f"Failed to send discovery progress: {response.status_code if response else 'No response'}")
+                logger.debug(f"Discovery progress sent: {progress_data['progress']}%")
+                return True
+            logger.warning(f"Failed to send discovery progress: {response.status_code if response else 'No response'}")
+            return False
                 
         except Exception as e:
             logger.error(f"Error sending discovery progress: {e}")
+            return False
+    
+    def post_discovery_result_batch(self, batch: Dict) -> bool:
+        """POST one sequenced result batch; True once the backend acknowledged it"""
+        response = self.safe_request(
+            'POST',
+            f"{self.backend_url}/api/v1/agents/{self.config['agent_id']}/discovery-results/batch",
+            headers={'X-Agent-Token': self.agent_token},
+            json=batch,
+            timeout=30
+        )
+        if not response or response.status_code != 200:
+            logger.warning(f"Result batch {batch['sequence']} not accepted: {response.status_code if response else 'No response'}")
+            return False
+        try:
+            ack = response.json()
+        except ValueError:
+            return False
+        if ack.get('acked') != batch['sequence']:
+            return False
+        logger.debug(f"Result batch {batch['sequence']} acknowledged"
+                     f"{' (duplicate)' if ack.get('duplicate') else ''}: {len(batch['discovered_devices'])} devices")
+        return True
     
     def send_enhanced_discovery_results(self, session_id: str, discovered_devices: List[Dict], errors: List[str]):
         """Send enhanced discovery results to backend"""
@@ -1719,6 +2070,16 @@ class CiscoAIAgent:
                 'timestamp': datetime.now().isoformat()
             }
             
+            if self.offline_spool:
+                outcome = self.offline_spool.deliver(f"/api/v1/agents/{self.config['agent_id']}/discovery-results",
+                                                     results_data, key=f"session:{session_id}",
+                                                     extend=('discovered_devices', 'errors'))
+                if outcome == DELIVERED:
+                    logger.info(f"Discovery results sent: {len(discovered_devices)} devices, {len(errors)} errors")
+                elif outcome == SPOOLED:
+                    logger.warning(f"Backend did not take the results, spooled {len(discovered_devices)} discovery results")
+                return
+            
             response = self.safe_request(
                 'POST',
                 f"{self.backend_url}/api/v1/agents/{self.config['agent_id']}/discovery-results",
@@ -1734,6 +2095,23 @@ class CiscoAIAgent:
         except Exception as e:
             logger.error(f"Error sending discovery results: {e}")
     
+    def post_spooled_report(self, path: str, payload: Dict):
+        """Post a (possibly merged) report for the offline spool; see OfflineSpool for the result"""
+        response = self.safe_request(
+            'POST',
+            f"{self.backend_url.rstrip('/')}{path}",
+            headers={'X-Agent-Token': self.agent_token},
+            json=payload,
+            timeout=30
+        )
+        status_code = response.status_code if response is not None else None
+        result = send_result(status_code)
+        if result == REJECTED:
+            logger.error(f"Backend rejected spooled report for {path}: {status_code}, dropping it")
+        elif not result:
+            logger.debug(f"Backend did not take spooled report for {path}: {status_code or 'No response'}")
+        return result
+    
     def send_heartbeat_http(self):
         """Send heartbeat via HTTP instead of WebSocket"""
         try:
@@ -1766,13 +2144,13 @@ class CiscoAIAgent:
 
     
     def on_websocket_open(self, ws):
-        """Handle WebSocket connection open (deprecated - using HTTP polling)"""
-        logger.info("HTTP polling mode active")
+        """Handle agent websocket connection open"""
+        logger.info("Agent websocket connected, jobs are pushed")
         self.ws_connected = True
-        self.update_status("online")
+        self._ws_opened = True
     
     def on_websocket_message(self, ws, message):
-        """Handle WebSocket messages from backend (deprecated - using HTTP polling)"""
+        """Handle agent websocket messages from backend"""
         try:
             data = json.loads(message)
             message_type = data.get('type')
@@ -1780,7 +2158,9 @@ class CiscoAIAgent:
             if message_type == 'error' and ('token' in data.get('detail', '').lower() or 'revoked' in data.get('detail', '').lower()):
                 self.handle_token_error(data.get('detail', 'Agent token error'))
                 return
-            if message_type == 'discovery_request':
+            if message_type == 'job':
+                self.dispatch_job(data.get('job', {}), via_websocket=True)
+            elif message_type == 'discovery_request':
                 self.handle_discovery_request(data)
             elif message_type == 'ping':
                 self.send_pong()
@@ -1791,22 +2171,21 @@ class CiscoAIAgent:
             logger.error(f"Error handling WebSocket message: {e}")
     
     def on_websocket_error(self, ws, error):
-        """Handle WebSocket errors (deprecated - using HTTP polling)"""
-        logger.error(f"HTTP polling error: {error}")
+        """Handle agent websocket errors"""
+        logger.error(f"Agent websocket error: {error}")
         self.ws_connected = False
     
     def on_websocket_close(self, ws, close_status_code, close_msg):
-        """Handle WebSocket connection close (deprecated - using HTTP polling)"""
-        logger.info("HTTP polling stopped")
+        """Handle agent websocket close; the command loop reconnects or falls back to long poll"""
+        logger.info(f"Agent websocket closed ({close_status_code}: {close_msg})")
         self.ws_connected = False
-        self.update_status("offline")
+        self._ws_close_code = close_status_code
     
     def heartbeat_loop(self):
         """Send periodic heartbeats to backend (now using HTTP)"""
         while self.running:
             try:
-                if self.ws_connected:
-                    self.send_heartbeat_http()
+                self.send_heartbeat_http()
                 time.sleep(self.heartbeat_interval)
             except Exception as e:
                 logger.error(f"Error in heartbeat loop: {e}")
@@ -1990,7 +2369,7 @@ class CiscoAIAgent:
         try:
             # Try to get system description
             for (errorIndication, errorStatus, errorIndex, varBinds) in getCmd(
-                SnmpEngine(),
+                self._snmp_engine(),
                 CommunityData(community, mpModel=0 if snmp_version == 'v1' else 1),
                 UdpTransportTarget((ip_address, 161), timeout=3, retries=1),
                 ContextData(),
@@ -2108,9 +2487,12 @@ class CiscoAIAgent:
             logger.debug(f"SSH connection failed for {ip_address}: {e}")
             return None
     
-    def detect_device_type(self, description: str) -> str:
-        """Enhanced device type detection from description"""
+    def detect_device_type(self, description: str, sys_object_id: str = '') -> str:
+        """Device type from the sysObjectID classifier, or keywords in the description"""
         try:
+            if CLASSIFIER_AVAILABLE:
+                return device_classifier.classify(sys_object_id, description).device_type
+            
             description_lower = description.lower()
             
             # Cisco devices
@@ -2224,7 +2606,7 @@ class CiscoAIAgent:
                 'timestamp': datetime.now().isoformat()
             }
             
-            response = requests.post(
+            response = http_client.post(
                 f"{self.backend_url.rstrip('/')}/api/v1/agents/discovery",
                 headers={'X-Agent-Token': self.agent_token},
                 json=discovery_data,
@@ -2255,7 +2637,7 @@ class CiscoAIAgent:
             if error:
                 status_data['error'] = error
             
-            response = requests.post(
+            response = http_client.post(
                 f"{self.backend_url.rstrip('/')}/api/v1/agents/discovery-status",
                 headers={'X-Agent-Token': self.agent_token},
                 json=status_data,
@@ -2317,7 +2699,7 @@ class CiscoAIAgent:
             headers = kwargs.pop('headers', {})
             headers['X-Agent-Token'] = self.agent_token
             logger.debug(f"Making {method} request to {url} with token: {self.agent_token[:10]}...")
-            resp = requests.request(method, url, headers=headers, **kwargs)
+            resp = http_client.request(method, url, headers=headers, **kwargs)
             logger.debug(f"Response status: {resp.status_code}")
             if resp.status_code in (401, 403):
                 try:
@@ -2340,7 +2722,7 @@ class CiscoAIAgent:
 def fetch_organizations(agent_token, backend_url):
     try:
         headers = {"X-Agent-Token": agent_token}
-        resp = requests.get(f"{backend_url}/api/v1/agents/agent/organizations", headers=headers, timeout=10)
+        resp = http_client.get(f"{backend_url}/api/v1/agents/agent/organizations", headers=headers, timeout=10)
         if resp.status_code == 200:
             return resp.json()
         else:
@@ -2351,7 +2733,7 @@ def fetch_organizations(agent_token, backend_url):
 def fetch_networks(agent_token, backend_url, org_id):
     try:
         headers = {"X-Agent-Token": agent_token}
-        resp = requests.get(f"{backend_url}/api/v1/agents/agent/networks", headers=headers, timeout=10)
+        resp = http_client.get(f"{backend_url}/api/v1/agents/agent/networks", headers=headers, timeout=10)
         if resp.status_code == 200:
             return resp.json()
         else:
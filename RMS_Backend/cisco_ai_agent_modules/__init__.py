@@ -6,6 +6,7 @@ This module integrates all topology discovery capabilities:
 - TopologyDiscovery: Network device and neighbor discovery
 - DeviceMonitor: Continuous device status monitoring
 - InterfaceTracker: Interface status and configuration tracking
+- OfflineSpool: Keeps reports on disk while the backend is unreachable
 """
 
 import asyncio
@@ -19,6 +20,8 @@ from datetime import datetime
 from .topology_discovery import TopologyDiscovery
 from .device_monitoring import DeviceMonitor
 from .interface_tracker import InterfaceTracker
+from .offline_spool import OfflineSpool, REJECTED, send_result
+from .http_transport import agent_transport
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,9 +34,20 @@ class AgentTopologyManager:
         self.agent_config = agent_config
         self.is_running = False
         
+        # Reports the backend could not take are kept on disk and replayed
+        self.spool = None
+        try:
+            self.spool = OfflineSpool(
+                os.path.join(agent_config.get('spool_dir', 'agent_spool'), 'topology'),
+                self._post_spooled,
+                max_bytes=int(agent_config.get('spool_max_mb', 64)) << 20
+            )
+        except OSError as e:
+            logger.warning(f"Offline spool unavailable: {str(e)}")
+        
         # Initialize modules
-        self.topology_discovery = TopologyDiscovery(agent_config)
-        self.device_monitor = DeviceMonitor(agent_config)
+        self.topology_discovery = TopologyDiscovery(agent_config, spool=self.spool)
+        self.device_monitor = DeviceMonitor(agent_config, spool=self.spool)
         self.interface_tracker = InterfaceTracker(agent_config)
         
         # Status tracking
@@ -44,6 +58,18 @@ class AgentTopologyManager:
         # Configuration validation
         self._validate_config()
     
+    def _post_spooled(self, path: str, payload: Dict[str, Any]):
+        """Post a (possibly merged) spooled report; see OfflineSpool for the result."""
+        url = f"{self.agent_config['backend_url'].rstrip('/')}{path}"
+        response = agent_transport.post(url, headers={'X-Agent-Token': self.agent_config['agent_token']},
+                                        json=payload)
+        result = send_result(response.status_code)
+        if result == REJECTED:
+            logger.error(f"Backend rejected spooled report for {path}: {response.status_code}, dropping it")
+        elif not result:
+            logger.debug(f"Backend did not take spooled report for {path}: {response.status_code}")
+        return result
+    
     def _validate_config(self):
         """Validate agent configuration."""
         required_fields = ['backend_url', 'agent_token', 'agent_id', 'networks']
@@ -88,6 +114,8 @@ class AgentTopologyManager:
             self.interface_tracker.stop_tracking(),
             return_exceptions=True
         )
+        if self.spool:
+            self.spool.stop()
         
         logger.info("All agent topology services stopped")
     
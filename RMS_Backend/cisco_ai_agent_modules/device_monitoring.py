@@ -15,18 +15,33 @@ import subprocess
 import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from .http_transport import agent_transport
+from .offline_spool import DELIVERED, SPOOLED
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# In-process ICMP echo sweeper (backend tree); the ping command otherwise
+try:
+    from app.utils.icmp_sweeper import icmp_sweeper
+    ICMP_SWEEPER_AVAILABLE = True
+except ImportError:
+    ICMP_SWEEPER_AVAILABLE = False
+
 class DeviceMonitor:
     """Handles continuous monitoring of network devices."""
     
-    def __init__(self, agent_config: Dict[str, Any]):
+    def __init__(self, agent_config: Dict[str, Any], spool=None):
+        """
+        Args:
+            agent_config: Agent configuration
+            spool: Optional OfflineSpool that keeps reports while the backend is down
+        """
         self.agent_config = agent_config
+        self.spool = spool
         self.backend_url = agent_config.get('backend_url')
         self.agent_token = agent_config.get('agent_token')
         self.agent_id = agent_config.get('agent_id')
@@ -173,6 +188,16 @@ class DeviceMonitor:
             
             logger.debug(f"Checking ping status for {len(devices)} devices in network {network_id}")
             
+            if ICMP_SWEEPER_AVAILABLE and icmp_sweeper.available():
+                # One batched echo sweep instead of a ping process per device
+                results = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: icmp_sweeper.sweep([device['ip'] for device in devices], timeout=2.0)
+                )
+                for device in devices:
+                    await self._update_device_status(network_id, device['ip'], 'ping_status', results[device['ip']].alive)
+                await self._report_device_status(network_id)
+                return
+            
             # Check ping status concurrently
             with ThreadPoolExecutor(max_workers=10) as executor:
                 future_to_device = {
@@ -294,6 +319,9 @@ class DeviceMonitor:
         try:
             ip = device['ip']
             
+            if ICMP_SWEEPER_AVAILABLE and icmp_sweeper.available():
+                return icmp_sweeper.ping(ip, timeout=2.0)
+            
             # Use ping command appropriate for the OS
             if self._is_windows():
                 cmd = ['ping', '-n', '1', '-w', '2000', ip]
@@ -427,14 +455,28 @@ class DeviceMonitor:
                 device_statuses.append(device_status)
             
             # Send to backend
-            url = f"{self.backend_url}/api/v1/agents/{self.agent_id}/device-status-report"
+            path = f"/api/v1/agents/{self.agent_id}/device-status-report"
+            url = f"{self.backend_url}{path}"
             headers = {'X-Agent-Token': self.agent_token}
             data = {
                 'network_id': network_id,
                 'device_statuses': device_statuses
             }
             
-            response = requests.post(url, headers=headers, json=data)
+            # Posts (and disk appends) block: keep them off the monitoring loop
+            loop = asyncio.get_running_loop()
+            if self.spool:
+                outcome = await loop.run_in_executor(
+                    None, lambda: self.spool.deliver(path, data, key=f"network:{network_id}",
+                                                     extend=('device_statuses',))
+                )
+                if outcome == DELIVERED:
+                    logger.debug(f"Device status reported for network {network_id}")
+                elif outcome == SPOOLED:
+                    logger.warning(f"Backend did not take the report, spooled device status for network {network_id}")
+                return
+            
+            response = await loop.run_in_executor(None, lambda: agent_transport.post(url, headers=headers, json=data))
             if response.status_code == 200:
                 logger.debug(f"Device status reported for network {network_id}")
             else:
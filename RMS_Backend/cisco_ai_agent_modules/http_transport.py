@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Transport for Cisco AI Agent
+
+This module carries all agent-to-backend HTTP traffic:
+- One requests.Session with a pooled, keep-alive connection per backend
+  host, so heartbeats, polls and reports reuse an established TLS connection
+  instead of handshaking on every call
+- JSON bodies above gzip_min_bytes are sent gzip-compressed
+  (Content-Encoding: gzip; the backend inflates them)
+- Retries with full-jitter exponential backoff on connection failures and
+  on 429/502/503/504, honouring Retry-After; non-idempotent methods are only
+  retried when the connection was never established (connect timeout or
+  refused/unresolved), since after a reset or read timeout the backend may
+  already have acted on them
+- A default timeout, so no request can hang the agent
+
+The interface mirrors the requests module (request/get/post/put), so callers
+can fall back to plain requests when this module is not shipped.
+"""
+
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'}
+
+
+def _never_sent(error: requests.RequestException) -> bool:
+    """True when the request failed before a connection to the backend existed."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # requests wraps urllib3's MaxRetryError, whose reason is the underlying error
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, NewConnectionError):
+            return True
+        pending.extend(arg for arg in getattr(current, 'args', ()) if isinstance(arg, BaseException))
+        pending.extend([getattr(current, 'reason', None), current.__cause__, current.__context__])
+    return False
+
+
+class AgentTransport:
+    """Pooled keep-alive HTTP client with gzip bodies and jittered retries."""
+
+    def __init__(self, timeout: float = 15.0, retries: int = 3, backoff_base: float = 0.5,
+                 backoff_max: float = 10.0, gzip_min_bytes: int = 1024, pool_maxsize: int = 8):
+        """
+        Args:
+            timeout: Default per-request timeout in seconds
+            retries: Retries after the first attempt
+            backoff_base: First backoff ceiling in seconds (doubles per retry)
+            backoff_max: Backoff ceiling cap
+            gzip_min_bytes: JSON bodies at least this large are gzip-compressed
+            pool_maxsize: Keep-alive connections kept per backend host
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.gzip_min_bytes = gzip_min_bytes
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'gzip_requests': 0,
+                      'bytes_raw': 0, 'bytes_sent': 0}
+
+    def _encode(self, payload: Any, headers: Dict[str, str]) -> bytes:
+        body = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+        raw = len(body)
+        if raw >= self.gzip_min_bytes:
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+        with self._lock:
+            self.stats['bytes_raw'] += raw
+            self.stats['bytes_sent'] += len(body)
+            self.stats['gzip_requests'] += 'Content-Encoding' in headers
+        return body
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter: hundreds of agents retrying after an outage spread out
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method: str, url: str, json: Any = None, headers: Dict[str, str] = None,
+                timeout: float = None, retries: int = None, **kwargs) -> requests.Response:
+        """
+        Send a request through the shared session.
+
+        Args:
+            json: JSON payload (gzip-compressed when large)
+            retries: Override the retry count for this call
+
+        Raises:
+            requests.RequestException: The last error once retries are exhausted
+        """
+        method = method.upper()
+        headers = dict(headers or {})
+        if json is not None:
+            kwargs['data'] = self._encode(json, headers)
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+
+        with self._lock:
+            self.stats['requests'] += 1
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, headers=headers, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # Only a failed connect is known not to have reached the backend
+                retriable = method in IDEMPOTENT_METHODS or _never_sent(e)
+                if attempt >= retries or not retriable:
+                    with self._lock:
+                        self.stats['failures'] += 1
+                    raise
+                delay = self._backoff(attempt)
+                logger.debug(f"{method} {url} failed ({e}); retry {attempt + 1}/{retries} in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                delay = self._backoff(attempt, response)
+                logger.debug(f"{method} {url} returned {response.status_code}; "
+                             f"retry {attempt + 1}/{retries} in {delay:.2f}s")
+                response.close()
+            with self._lock:
+                self.stats['retries'] += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PUT', url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def get_info(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats)
+
+
+# Global agent transport instance
+agent_transport = AgentTransport()
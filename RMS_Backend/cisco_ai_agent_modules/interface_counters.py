@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Interface Counter Rate Engine for Cisco AI Agent
+
+This module turns raw interface counters into rates:
+- One GETBULK walk of ifHCInOctets/ifHCOutOctets, error and discard
+  counters and ifHighSpeed per device
+- Per-interface bit rates, utilisation percent and error/discard rates
+- Counter wrap (64-bit octets, 32-bit errors) and sysUpTime reset handling
+- Samples kept in preallocated NumPy ring buffers with a fixed memory budget
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from pysnmp.hlapi import (
+        SnmpEngine, CommunityData, UdpTransportTarget, ContextData,
+        ObjectType, ObjectIdentity, getCmd, bulkCmd,
+        EndOfMibView, NoSuchObject, NoSuchInstance, Null
+    )
+    SNMP_AVAILABLE = True
+except ImportError:
+    SNMP_AVAILABLE = False
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SYS_UPTIME_OID = '1.3.6.1.2.1.1.3.0'
+
+# Counter columns walked together, in the order stored per interface
+COUNTER_COLUMNS = [
+    ('in_octets', '1.3.6.1.2.1.31.1.1.1.6'),     # ifHCInOctets (64-bit)
+    ('out_octets', '1.3.6.1.2.1.31.1.1.1.10'),   # ifHCOutOctets (64-bit)
+    ('in_errors', '1.3.6.1.2.1.2.2.1.14'),       # ifInErrors (32-bit)
+    ('out_errors', '1.3.6.1.2.1.2.2.1.20'),      # ifOutErrors (32-bit)
+    ('in_discards', '1.3.6.1.2.1.2.2.1.13'),     # ifInDiscards (32-bit)
+    ('out_discards', '1.3.6.1.2.1.2.2.1.19'),    # ifOutDiscards (32-bit)
+]
+COUNTER_BITS = [64, 64, 32, 32, 32, 32]
+
+# Non-counter columns walked alongside the counters
+INFO_COLUMNS = [
+    ('speed_mbps', '1.3.6.1.2.1.31.1.1.1.15'),   # ifHighSpeed
+    ('name', '1.3.6.1.2.1.31.1.1.1.1'),          # ifName
+]
+
+# Rates stored per sample
+RATE_METRICS = [
+    'in_bps', 'out_bps', 'in_utilization', 'out_utilization',
+    'in_errors_per_sec', 'out_errors_per_sec', 'in_discards_per_sec', 'out_discards_per_sec',
+]
+
+# A "wrapped" delta implying more than this multiple of line rate is a counter reset
+MAX_LINE_RATE_FACTOR = 2.0
+
+
+class CounterRingStore:
+    """
+    Preallocated per-interface ring buffers of counter rates.
+
+    Memory is allocated once for max_interfaces x capacity samples, so the
+    footprint does not grow with uptime or interface churn. Interfaces past
+    max_interfaces are not tracked.
+    """
+
+    def __init__(self, max_interfaces: int = 10000, capacity: int = 100):
+        """
+        Initialize the ring store.
+
+        Args:
+            max_interfaces: Interfaces tracked per agent
+            capacity: Samples kept per interface
+        """
+        self.max_interfaces = max_interfaces
+        self.capacity = capacity
+
+        self.timestamps = np.zeros((max_interfaces, capacity), dtype=np.float64)
+        self.rates = np.full((max_interfaces, capacity, len(RATE_METRICS)), np.nan, dtype=np.float32)
+        self.positions = np.zeros(max_interfaces, dtype=np.int32)
+        self.counts = np.zeros(max_interfaces, dtype=np.int32)
+
+        # Last raw counters per interface, the baseline for the next delta
+        self.last_counters = np.zeros((max_interfaces, len(COUNTER_COLUMNS)), dtype=np.uint64)
+        self.has_baseline = np.zeros(max_interfaces, dtype=bool)
+
+        # {(ip, if_index): slot}, {ip: [if_index, ...]}
+        self.slots: Dict[Tuple[str, str], int] = {}
+        self.device_interfaces: Dict[str, List[str]] = {}
+        self._free_slots = list(range(max_interfaces - 1, -1, -1))
+        self.lock = threading.Lock()
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes held by the preallocated arrays."""
+        return sum(a.nbytes for a in (self.timestamps, self.rates, self.positions, self.counts,
+                                      self.last_counters, self.has_baseline))
+
+    def slots_for(self, ip: str, if_indexes: List[str]) -> np.ndarray:
+        """Slot numbers for a device's interfaces, allocating new ones (-1 when full)."""
+        result = np.empty(len(if_indexes), dtype=np.int64)
+        for i, if_index in enumerate(if_indexes):
+            key = (ip, if_index)
+            slot = self.slots.get(key)
+            if slot is None:
+                if not self._free_slots:
+                    result[i] = -1
+                    continue
+                slot = self._free_slots.pop()
+                self.slots[key] = slot
+                self.device_interfaces.setdefault(ip, []).append(if_index)
+                self.has_baseline[slot] = False
+                self.positions[slot] = 0
+                self.counts[slot] = 0
+            result[i] = slot
+        return result
+
+    def release(self, ip: str) -> None:
+        """Free every slot of a device."""
+        with self.lock:
+            for if_index in self.device_interfaces.pop(ip, []):
+                slot = self.slots.pop((ip, if_index), None)
+                if slot is not None:
+                    self.has_baseline[slot] = False
+                    self._free_slots.append(slot)
+
+    def append(self, slots: np.ndarray, timestamp: float, rates: np.ndarray) -> None:
+        """Write one sample row (len(RATE_METRICS) rates) per slot."""
+        if not len(slots):
+            return
+        positions = self.positions[slots]
+        self.timestamps[slots, positions] = timestamp
+        self.rates[slots, positions] = rates
+        self.positions[slots] = (positions + 1) % self.capacity
+        self.counts[slots] = np.minimum(self.counts[slots] + 1, self.capacity)
+
+    def series(self, ip: str, if_index: str) -> Optional[Dict[str, np.ndarray]]:
+        """Samples of one interface in chronological order."""
+        with self.lock:
+            slot = self.slots.get((ip, if_index))
+            if slot is None:
+                return None
+            count = int(self.counts[slot])
+            order = (np.arange(self.positions[slot] - count, self.positions[slot])) % self.capacity
+            result = {'timestamps': self.timestamps[slot, order].copy()}
+            for i, metric in enumerate(RATE_METRICS):
+                result[metric] = self.rates[slot, order, i].copy()
+            return result
+
+    def get_info(self) -> Dict[str, Any]:
+        """Store occupancy and memory footprint."""
+        with self.lock:
+            return {
+                'tracked_interfaces': len(self.slots),
+                'max_interfaces': self.max_interfaces,
+                'capacity': self.capacity,
+                'memory_bytes': self.memory_bytes
+            }
+
+
+class InterfaceCounterCollector:
+    """Polls interface counters over SNMP and feeds a CounterRingStore."""
+
+    def __init__(self, community: str = 'public', port: int = 161, timeout: int = 2,
+                 retries: int = 1, max_repetitions: int = 25,
+                 max_interfaces: int = 10000, capacity: int = 100):
+        """
+        Initialize the collector.
+
+        Args:
+            community: SNMP v2c community
+            port: SNMP port
+            timeout: Per-request timeout (seconds)
+            retries: Per-request retries
+            max_repetitions: GETBULK max-repetitions
+            max_interfaces: Interfaces tracked per agent
+            capacity: Samples kept per interface
+        """
+        self.community = community
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.max_repetitions = max_repetitions
+        self.enabled = NUMPY_AVAILABLE and SNMP_AVAILABLE
+        if not self.enabled:
+            logger.warning("Interface counter collection disabled - numpy and pysnmp are required")
+            self.store = None
+        else:
+            self.store = CounterRingStore(max_interfaces, capacity)
+
+        # {ip: {'sys_uptime': int, 'polled_at': float, 'latest': {...}}}
+        self.devices: Dict[str, Dict[str, Any]] = {}
+        self._thread_state = threading.local()
+
+    def _engine(self) -> 'SnmpEngine':
+        """One SnmpEngine per worker thread."""
+        engine = getattr(self._thread_state, 'engine', None)
+        if engine is None:
+            engine = self._thread_state.engine = SnmpEngine()
+        return engine
+
+    def _walk(self, ip: str, community: str) -> Tuple[Optional[int], Dict[str, Dict[str, Any]]]:
+        """sysUpTime plus {column: {if_index: value}} for all counter/info columns."""
+        engine = self._engine()
+        auth = CommunityData(community, mpModel=1)
+        target = UdpTransportTarget((ip, self.port), timeout=self.timeout, retries=self.retries)
+        context = ContextData()
+
+        error_indication, error_status, _, var_binds = next(getCmd(
+            engine, auth, target, context, ObjectType(ObjectIdentity(SYS_UPTIME_OID))
+        ))
+        if error_indication or error_status:
+            logger.warning(f"SNMP error reading sysUpTime from {ip}: {error_indication or error_status.prettyPrint()}")
+            return None, {}
+        sys_uptime = int(var_binds[0][1])
+
+        columns = COUNTER_COLUMNS + INFO_COLUMNS
+        prefixes = [oid + '.' for _, oid in columns]
+        table = {name: {} for name, _ in columns}
+        for error_indication, error_status, _, var_binds in bulkCmd(
+            engine, auth, target, context, 0, self.max_repetitions,
+            *[ObjectType(ObjectIdentity(oid)) for _, oid in columns],
+            lexicographicMode=False
+        ):
+            if error_indication or error_status:
+                logger.warning(f"SNMP error walking counters on {ip}: {error_indication or error_status.prettyPrint()}")
+                break
+            for column, (name, val) in enumerate(var_binds):
+                if isinstance(val, (EndOfMibView, NoSuchObject, NoSuchInstance, Null)):
+                    continue
+                oid = str(name)
+                if column < len(prefixes) and oid.startswith(prefixes[column]):
+                    table[columns[column][0]][oid[len(prefixes[column]):]] = (
+                        val.prettyPrint() if columns[column][0] == 'name' else int(val)
+                    )
+        return sys_uptime, table
+
+    def poll(self, ip: str, community: str = None, max_age: float = 0) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Poll a device's counters and record rates.
+
+        Args:
+            ip: Device address
+            community: SNMP community (defaults to the collector's)
+            max_age: Return the latest sample instead of polling if it is
+                younger than this many seconds
+
+        Returns:
+            {interface_name: {counters, speed_mbps and rates}}; rates are
+            None on the first sample and after a counter discontinuity.
+        """
+        if not self.enabled:
+            return None
+
+        state = self.devices.get(ip)
+        if state and max_age and time.time() - state['polled_at'] < max_age:
+            return state['latest']
+
+        try:
+            sys_uptime, table = self._walk(ip, community or self.community)
+        except Exception as e:
+            logger.error(f"Error polling interface counters on {ip}: {str(e)}")
+            return None
+        if sys_uptime is None or not table['in_octets']:
+            return None
+
+        return self.record(ip, sys_uptime, table)
+
+    def record(self, ip: str, sys_uptime: int, table: Dict[str, Dict[str, Any]],
+               now: float = None) -> Dict[str, Dict[str, Any]]:
+        """Turn one counter walk into rates and append them to the rings."""
+        now = time.time() if now is None else now
+        if_indexes = list(table['in_octets'].keys())
+        counters = np.array(
+            [[table[name].get(if_index, 0) for name, _ in COUNTER_COLUMNS] for if_index in if_indexes],
+            dtype=np.uint64
+        ).reshape(len(if_indexes), len(COUNTER_COLUMNS))
+        speeds = np.array([table['speed_mbps'].get(if_index, 0) for if_index in if_indexes], dtype=np.float64)
+
+        with self.store.lock:
+            state = self.devices.get(ip)
+            rebooted = state is not None and sys_uptime < state['sys_uptime']
+            if state is None or rebooted:
+                interval = 0.0
+            else:
+                # Device uptime is the precise sample interval; wall clock if it did not advance
+                interval = (sys_uptime - state['sys_uptime']) / 100.0 or (now - state['polled_at'])
+            if rebooted:
+                logger.info(f"sysUpTime of {ip} went backwards - counters reset, rates restart")
+
+            slots = self.store.slots_for(ip, if_indexes)
+            tracked = slots >= 0
+            if not tracked.all():
+                logger.warning(f"Interface counter store full, {int((~tracked).sum())} interfaces of {ip} not tracked")
+
+            rates = np.full((len(if_indexes), len(RATE_METRICS)), np.nan, dtype=np.float64)
+            valid = np.zeros(len(if_indexes), dtype=bool)
+            if interval > 0 and tracked.any():
+                rows = np.nonzero(tracked)[0]
+                previous = self.store.last_counters[slots[rows]]
+
+                # Unsigned subtraction is modulo 2^64, so one 64-bit wrap is
+                # handled for free; 32-bit counters are masked to their width
+                deltas = counters[rows] - previous
+                for column, bits in enumerate(COUNTER_BITS):
+                    if bits < 64:
+                        deltas[:, column] &= np.uint64((1 << bits) - 1)
+                deltas = deltas.astype(np.float64)
+
+                line_bps = speeds[rows] * 1e6
+                in_bps = deltas[:, 0] * 8 / interval
+                out_bps = deltas[:, 1] * 8 / interval
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    in_util = np.where(line_bps > 0, in_bps / line_bps * 100, np.nan)
+                    out_util = np.where(line_bps > 0, out_bps / line_bps * 100, np.nan)
+
+                # A "wrap" far above line rate is really a counter clear
+                sane = self.store.has_baseline[slots[rows]] & ~(
+                    (line_bps > 0) & ((in_bps > line_bps * MAX_LINE_RATE_FACTOR) |
+                                      (out_bps > line_bps * MAX_LINE_RATE_FACTOR))
+                )
+                rates[rows] = np.column_stack([
+                    in_bps, out_bps, in_util, out_util,
+                    deltas[:, 2] / interval, deltas[:, 3] / interval,
+                    deltas[:, 4] / interval, deltas[:, 5] / interval,
+                ])
+                rates[rows[~sane]] = np.nan
+                valid[rows[sane]] = True
+                self.store.append(slots[rows[sane]], now, rates[rows[sane]].astype(np.float32))
+
+            tracked_slots = slots[tracked]
+            self.store.last_counters[tracked_slots] = counters[tracked]
+            self.store.has_baseline[tracked_slots] = True
+
+            latest = {}
+            for i, if_index in enumerate(if_indexes):
+                entry = {name: int(counters[i, column]) for column, (name, _) in enumerate(COUNTER_COLUMNS)}
+                entry['if_index'] = if_index
+                entry['speed_mbps'] = int(speeds[i])
+                for column, metric in enumerate(RATE_METRICS):
+                    entry[metric] = round(float(rates[i, column]), 3) if valid[i] else None
+                latest[table['name'].get(if_index) or if_index] = entry
+
+            self.devices[ip] = {'sys_uptime': sys_uptime, 'polled_at': now, 'latest': latest}
+        return latest
+
+    def history(self, ip: str, if_index: str) -> Optional[Dict[str, List[float]]]:
+        """Chronological rate history of one interface as lists."""
+        if not self.enabled:
+            return None
+        series = self.store.series(ip, if_index)
+        if series is None:
+            return None
+        return {key: values.tolist() for key, values in series.items()}
+
+    def get_info(self) -> Dict[str, Any]:
+        """Collector and store status."""
+        info = {'enabled': self.enabled, 'devices': len(self.devices)}
+        if self.store is not None:
+            info.update(self.store.get_info())
+        return info
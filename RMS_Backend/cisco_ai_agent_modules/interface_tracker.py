@@ -18,6 +18,8 @@ import json
 import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from .interface_counters import InterfaceCounterCollector
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -39,10 +41,21 @@ class InterfaceTracker:
         self.error_check_interval = self.tracking_config.get('error_check_interval', 60)  # 1 minute
         self.config_check_interval = self.tracking_config.get('config_check_interval', 1800)  # 30 minutes
         
+        # Counter collection (rates live in the collector's ring buffers)
+        self.snmp_community = self.tracking_config.get('snmp_community', 'public')
+        self.counter_collector = InterfaceCounterCollector(
+            community=self.snmp_community,
+            port=self.tracking_config.get('snmp_port', 161),
+            timeout=self.tracking_config.get('snmp_timeout', 2),
+            retries=self.tracking_config.get('snmp_retries', 1),
+            max_interfaces=self.tracking_config.get('max_tracked_interfaces', 10000),
+            capacity=self.tracking_config.get('history_samples', 100)
+        )
+        
         # Interface data storage
         self.interface_status = {}
         self.interface_configs = {}
-        self.bandwidth_history = {}
+        self.bandwidth_history = {}  # latest rates per interface; history via get_interface_history
         self.error_history = {}
         self.tracking_tasks = {}
         self.is_running = False
@@ -329,33 +342,26 @@ class InterfaceTracker:
     def _get_device_bandwidth(self, device: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Get bandwidth utilization for a device."""
         try:
-            # This would use SNMP to get bandwidth data
-            # For now, we'll simulate bandwidth data
             ip = device['ip']
             logger.debug(f"Getting bandwidth for device {ip}")
             
-            # Simulate bandwidth data
-            bandwidth_data = {
-                'GigabitEthernet0/1': {
-                    'in_octets': 1234567890,
-                    'out_octets': 987654321,
-                    'in_errors': 0,
-                    'out_errors': 0,
-                    'in_discards': 0,
-                    'out_discards': 0
-                },
-                'GigabitEthernet0/2': {
-                    'in_octets': 567890123,
-                    'out_octets': 456789012,
-                    'in_errors': 0,
-                    'out_errors': 0,
-                    'in_discards': 0,
-                    'out_discards': 0
+            counters = self.counter_collector.poll(ip, device.get('snmp_community'))
+            if not counters:
+                return None
+            
+            return {
+                interface_name: {
+                    'in_octets': data['in_octets'],
+                    'out_octets': data['out_octets'],
+                    'speed_mbps': data['speed_mbps'],
+                    'in_bps': data['in_bps'],
+                    'out_bps': data['out_bps'],
+                    'in_utilization': data['in_utilization'],
+                    'out_utilization': data['out_utilization']
                 }
+                for interface_name, data in counters.items()
             }
             
-            return bandwidth_data
-            
         except Exception as e:
             logger.error(f"Error getting bandwidth for {device.get('ip', 'unknown')}: {str(e)}")
             return None
@@ -363,31 +369,29 @@ class InterfaceTracker:
     def _get_device_errors(self, device: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Get interface error rates for a device."""
         try:
-            # This would use SNMP to get error counters
-            # For now, we'll simulate error data
             ip = device['ip']
             logger.debug(f"Getting errors for device {ip}")
             
-            # Simulate error data
-            error_data = {
-                'GigabitEthernet0/1': {
-                    'in_errors': 0,
-                    'out_errors': 0,
-                    'in_discards': 0,
-                    'out_discards': 0,
-                    'collisions': 0
-                },
-                'GigabitEthernet0/2': {
-                    'in_errors': 0,
-                    'out_errors': 0,
-                    'in_discards': 0,
-                    'out_discards': 0,
-                    'collisions': 0
+            # Reuse a counter walk the bandwidth loop just made
+            counters = self.counter_collector.poll(ip, device.get('snmp_community'),
+                                                   max_age=self.error_check_interval / 2)
+            if not counters:
+                return None
+            
+            return {
+                interface_name: {
+                    'in_errors': data['in_errors'],
+                    'out_errors': data['out_errors'],
+                    'in_discards': data['in_discards'],
+                    'out_discards': data['out_discards'],
+                    'in_errors_per_sec': data['in_errors_per_sec'],
+                    'out_errors_per_sec': data['out_errors_per_sec'],
+                    'in_discards_per_sec': data['in_discards_per_sec'],
+                    'out_discards_per_sec': data['out_discards_per_sec']
                 }
+                for interface_name, data in counters.items()
             }
             
-            return error_data
-            
         except Exception as e:
             logger.error(f"Error getting errors for {device.get('ip', 'unknown')}: {str(e)}")
             return None
@@ -461,61 +465,35 @@ class InterfaceTracker:
             logger.error(f"Error updating interface status: {str(e)}")
     
     async def _update_bandwidth_data(self, network_id: int, ip: str, bandwidth_data: Dict[str, Any]):
-        """Update bandwidth data in local storage."""
+        """Update latest bandwidth rates in local storage."""
         try:
-            if network_id not in self.bandwidth_history:
-                self.bandwidth_history[network_id] = {}
-            
-            if ip not in self.bandwidth_history[network_id]:
-                self.bandwidth_history[network_id][ip] = {}
-            
-            timestamp = datetime.utcnow().isoformat()
-            
-            for interface_name, data in bandwidth_data.items():
-                if interface_name not in self.bandwidth_history[network_id][ip]:
-                    self.bandwidth_history[network_id][ip][interface_name] = []
-                
-                # Keep last 100 data points
-                history = self.bandwidth_history[network_id][ip][interface_name]
-                history.append({
-                    'timestamp': timestamp,
-                    'data': data
-                })
-                
-                if len(history) > 100:
-                    history.pop(0)
+            self.bandwidth_history.setdefault(network_id, {})[ip] = {
+                'timestamp': datetime.utcnow().isoformat(),
+                'interfaces': bandwidth_data
+            }
             
         except Exception as e:
             logger.error(f"Error updating bandwidth data: {str(e)}")
     
     async def _update_error_data(self, network_id: int, ip: str, error_data: Dict[str, Any]):
-        """Update error data in local storage."""
+        """Update latest error rates in local storage."""
         try:
-            if network_id not in self.error_history:
-                self.error_history[network_id] = {}
-            
-            if ip not in self.error_history[network_id]:
-                self.error_history[network_id][ip] = {}
-            
-            timestamp = datetime.utcnow().isoformat()
-            
-            for interface_name, data in error_data.items():
-                if interface_name not in self.error_history[network_id][ip]:
-                    self.error_history[network_id][ip][interface_name] = []
-                
-                # Keep last 100 data points
-                history = self.error_history[network_id][ip][interface_name]
-                history.append({
-                    'timestamp': timestamp,
-                    'data': data
-                })
-                
-                if len(history) > 100:
-                    history.pop(0)
+            self.error_history.setdefault(network_id, {})[ip] = {
+                'timestamp': datetime.utcnow().isoformat(),
+                'interfaces': error_data
+            }
             
         except Exception as e:
             logger.error(f"Error updating error data: {str(e)}")
     
+    def get_interface_history(self, ip: str, if_index: str) -> Optional[Dict[str, List[float]]]:
+        """Get the rate history (bps, utilisation, errors, discards) of one interface."""
+        try:
+            return self.counter_collector.history(ip, str(if_index))
+        except Exception as e:
+            logger.error(f"Error getting interface history for {ip}:{if_index}: {str(e)}")
+            return None
+    
     async def _check_config_changes(self, network_id: int, ip: str, config_data: Dict[str, Any]):
         """Check for interface configuration changes."""
         try:
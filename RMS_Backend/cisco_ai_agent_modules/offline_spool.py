@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Offline Spool for Cisco AI Agent
+
+This module keeps results the backend could not take:
+- deliver() posts a report directly while the spool is empty; when the
+  post fails, or older reports are still spooled, the report is appended to
+  an on-disk, append-only segment log instead (so reports never overtake
+  older ones)
+- Records are length-prefixed, CRC-checked and zlib-compressed; a torn
+  record left by a crash is cut off on startup, and the replay position is
+  persisted, so a restart neither loses nor resends acknowledged reports
+- A background replayer uploads the backlog once the backend answers again:
+  records of the same endpoint and key are merged into one upload (list
+  fields concatenated, or the newest snapshot kept), one upload at a time,
+  backing off exponentially while the backend keeps failing
+- The spool is bounded: when it outgrows max_bytes the oldest segments are
+  evicted first
+- Only a payload the backend refuses (400/422) is dropped; any other failure,
+  a missing route included, keeps the report spooled
+
+Stdlib only: the agent ships as a single script plus these modules.
+"""
+
+import json
+import logging
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct('>II')   # payload length, crc32 of payload
+SEGMENT_SUFFIX = '.seg'
+CURSOR_FILE = 'cursor'
+
+# deliver() outcomes; send() returns True, False or REJECTED
+DELIVERED = 'delivered'
+SPOOLED = 'spooled'
+REJECTED = 'rejected'
+
+
+def send_result(status_code: Optional[int]):
+    """send() result for a backend response status (None: no response)."""
+    if status_code == 200:
+        return True
+    # The payload itself was refused: re-sending it would fail the same way
+    if status_code in (400, 422):
+        return REJECTED
+    # Unreachable, throttled, or no handler (yet): keep the report for replay
+    return False
+
+
+class OfflineSpool:
+    """Bounded on-disk segment log with merged, backed-off replay."""
+
+    def __init__(self, directory: str, send: Callable[[str, Dict[str, Any]], bool], max_bytes: int = 64 << 20,
+                 segment_bytes: int = 1 << 20, batch_records: int = 500, retry_initial: float = 2.0,
+                 retry_max: float = 300.0):
+        """
+        Args:
+            directory: Spool directory (created if missing)
+            send: send(path, payload) -> True once the backend accepted the upload,
+                REJECTED when it refused the payload (dropped), False otherwise
+            max_bytes: Spool size bound; the oldest segments are evicted beyond it
+            segment_bytes: Size at which the active segment is sealed
+            batch_records: Records read per replay window (merged into uploads)
+            retry_initial: First delay after a failed upload
+            retry_max: Delay cap while the backend stays unreachable
+        """
+        self.directory = directory
+        self.send = send
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.batch_records = batch_records
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._retry_delay = retry_initial
+        self._retry_at = 0.0
+        self.stats = {'sent_direct': 0, 'spooled': 0, 'replayed': 0, 'rejected': 0, 'uploads': 0,
+                      'failed_uploads': 0, 'evicted_segments': 0, 'evicted_bytes': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._segments: List[int] = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()
+        )
+        self._cursor = self._load_cursor()
+        if self._segments:
+            self._repair_tail(self._segments[-1])
+        else:
+            self._segments.append(1)
+        self._active = open(self._path(self._segments[-1]), 'ab')
+        if self.backlog():
+            # Reports left over from before a restart
+            self.start()
+
+    def deliver(self, path: str, payload: Dict[str, Any], key: Optional[str] = None,
+                extend: Sequence[str] = ()) -> str:
+        """
+        Post a report now, or spool it behind older reports.
+
+        Args:
+            path: Backend path the report is posted to
+            payload: JSON report
+            key: Reports of the same path and key are merged on replay
+                (None: always uploaded on their own)
+            extend: List fields concatenated when merging; without any, the
+                newest report of the key supersedes the older ones
+
+        Returns:
+            DELIVERED when the backend took the report now, SPOOLED when it was
+            spooled, REJECTED when the backend refused it (not spooled)
+        """
+        if not self.backlog():
+            try:
+                result = self.send(path, payload)
+                if result == REJECTED:
+                    self.stats['rejected'] += 1
+                    return REJECTED
+                if result:
+                    self.stats['sent_direct'] += 1
+                    return DELIVERED
+            except Exception as e:
+                logger.debug(f"Direct post to {path} failed: {e}")
+            # The backend just failed: the replayer waits before trying it again
+            self._retry_at = max(self._retry_at, time.monotonic() + self._retry_delay)
+        self.append(path, payload, key, extend)
+        return SPOOLED
+
+    def append(self, path: str, payload: Dict[str, Any], key: Optional[str] = None,
+               extend: Sequence[str] = ()) -> None:
+        """Append a report to the spool and wake the replayer."""
+        record = {'path': path, 'key': key, 'extend': list(extend), 'payload': payload,
+                  'spooled_at': datetime.now().isoformat()}
+        data = zlib.compress(json.dumps(record, separators=(',', ':'), default=str).encode('utf-8'))
+        with self._condition:
+            self._active.write(RECORD_HEADER.pack(len(data), zlib.crc32(data)) + data)
+            self._active.flush()
+            self.stats['spooled'] += 1
+            if self._active.tell() >= self.segment_bytes:
+                self._roll()
+            self._evict()
+            self._condition.notify_all()
+        if not self._running:
+            self.start()
+
+    def backlog(self) -> bool:
+        """Whether spooled reports are waiting for replay."""
+        with self._condition:
+            segment, offset = self._cursor
+            return segment != self._segments[-1] or offset < self._active.tell()
+
+    def size(self) -> int:
+        """Bytes on disk, replayed records of the current segments included."""
+        with self._condition:
+            return self._size()
+
+    def start(self) -> 'OfflineSpool':
+        with self._condition:
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(target=self._run, name='offline-spool', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+        with self._condition:
+            self._active.close()
+
+    def get_info(self) -> Dict[str, Any]:
+        with self._condition:
+            return {'segments': len(self._segments), 'bytes': self._size(), **self.stats}
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:012d}{SEGMENT_SUFFIX}")
+
+    def _size(self) -> int:
+        return sum(os.path.getsize(self._path(s)) for s in self._segments if os.path.exists(self._path(s)))
+
+    def _roll(self) -> None:
+        self._active.close()
+        self._segments.append(self._segments[-1] + 1)
+        self._active = open(self._path(self._segments[-1]), 'ab')
+
+    def _evict(self) -> None:
+        """Drop the oldest segments (replayed or not) while the spool is over its bound."""
+        while len(self._segments) > 1 and self._size() > self.max_bytes:
+            oldest = self._segments.pop(0)
+            evicted = os.path.getsize(self._path(oldest))
+            os.remove(self._path(oldest))
+            self.stats['evicted_segments'] += 1
+            self.stats['evicted_bytes'] += evicted
+            if self._cursor[0] <= oldest:
+                self._save_cursor((self._segments[0], 0))
+            logger.warning(f"Offline spool over {self.max_bytes >> 20} MiB: evicted oldest segment "
+                           f"({evicted} bytes of unsent reports)")
+
+    def _read(self, segment: int, offset: int) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Record at a position and the position after it; (None, offset) at the end or a torn record."""
+        try:
+            with open(self._path(segment), 'rb') as f:
+                f.seek(offset)
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return None, offset
+                length, crc = RECORD_HEADER.unpack(header)
+                data = f.read(length)
+        except FileNotFoundError:
+            return None, offset
+        if len(data) < length or zlib.crc32(data) != crc:
+            return None, offset
+        return json.loads(zlib.decompress(data)), offset + RECORD_HEADER.size + length
+
+    def _repair_tail(self, segment: int) -> None:
+        """Cut off a record torn by a crash, so new appends stay readable."""
+        offset = 0
+        while True:
+            record, end = self._read(segment, offset)
+            if record is None:
+                break
+            offset = end
+        if offset < os.path.getsize(self._path(segment)):
+            logger.warning(f"Offline spool: dropped torn record at end of segment {segment}")
+            with open(self._path(segment), 'r+b') as f:
+                f.truncate(offset)
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as f:
+                segment, offset = (int(part) for part in f.read().split())
+        except (OSError, ValueError):
+            segment, offset = (self._segments[0] if self._segments else 1), 0
+        if self._segments and segment < self._segments[0]:
+            segment, offset = self._segments[0], 0
+        return segment, offset
+
+    def _save_cursor(self, cursor: Tuple[int, int]) -> None:
+        temporary = os.path.join(self.directory, CURSOR_FILE + '.tmp')
+        with open(temporary, 'w') as f:
+            f.write(f"{cursor[0]} {cursor[1]}")
+        os.replace(temporary, os.path.join(self.directory, CURSOR_FILE))
+        self._cursor = cursor
+
+    def _window(self) -> List[Tuple[Tuple[int, int], Dict[str, Any]]]:
+        """Up to batch_records records from the cursor, each with the position after it."""
+        window = []
+        with self._condition:
+            segment, offset = self._cursor
+            segments = [s for s in self._segments if s >= segment]
+        for index, current in enumerate(segments):
+            while len(window) < self.batch_records:
+                record, end = self._read(current, offset)
+                if record is None:
+                    break
+                window.append(((current, end), record))
+                offset = end
+            if len(window) >= self.batch_records or index + 1 == len(segments):
+                break
+            offset = 0
+            # An empty tail of a sealed segment still moves the cursor on
+            window.append(((segments[index + 1], 0), None))
+        return window
+
+    @staticmethod
+    def _merge(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not records[0]['extend']:
+            return records[-1]['payload']
+        merged = dict(records[0]['payload'])
+        for field in records[0]['extend']:
+            merged[field] = [item for record in records for item in record['payload'].get(field) or []]
+        return merged
+
+    def _replay_window(self) -> bool:
+        """Upload one window; True when all of it was accepted."""
+        window = self._window()
+        if not window:
+            return True
+        groups: 'OrderedDict[Any, List[int]]' = OrderedDict()
+        for index, (_, record) in enumerate(window):
+            if record is None:
+                continue
+            key = (record['path'], record['key'], tuple(record['extend'])) if record['key'] is not None else index
+            groups.setdefault(key, []).append(index)
+
+        sent = [record is None for _, record in window]
+        ok = True
+        for indexes in groups.values():
+            records = [window[i][1] for i in indexes]
+            try:
+                result = self.send(records[0]['path'], self._merge(records))
+            except Exception as e:
+                logger.debug(f"Replay upload to {records[0]['path']} failed: {e}")
+                result = False
+            ok = bool(result)
+            self.stats['uploads' if ok else 'failed_uploads'] += 1
+            if not ok:
+                break
+            # A refused payload is consumed too: it would block the spool forever
+            self.stats['rejected' if result == REJECTED else 'replayed'] += len(indexes)
+            for i in indexes:
+                sent[i] = True
+
+        # Advance over the accepted prefix; accepted records behind a failed
+        # upload are sent again next time (at-least-once)
+        accepted = 0
+        while accepted < len(window) and sent[accepted]:
+            accepted += 1
+        if accepted:
+            with self._condition:
+                cursor = window[accepted - 1][0]
+                self._save_cursor(cursor)
+                # Fully replayed sealed segments are no longer needed
+                while len(self._segments) > 1 and self._segments[0] < cursor[0]:
+                    os.remove(self._path(self._segments.pop(0)))
+        return ok
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running and (not self.backlog() or time.monotonic() < self._retry_at):
+                    wait = self._retry_at - time.monotonic() if self.backlog() else None
+                    self._condition.wait(wait)
+                if not self._running:
+                    return
+
+            # Uploads outside the lock: deliver() and append() never wait for the backend
+            cursor = self._cursor
+            if self._replay_window():
+                if self._cursor == cursor:
+                    # Record still being written; pick it up in a moment
+                    time.sleep(0.05)
+                    continue
+                if self._retry_delay > self.retry_initial:
+                    logger.info("Backend reachable again, replaying spooled reports")
+                self._retry_delay = self.retry_initial
+                self._retry_at = 0.0
+            else:
+                # Backpressure: one upload at a time, spaced out while the backend fails
+                delay = random.uniform(self._retry_delay / 2, self._retry_delay)
+                logger.warning(f"Spooled report upload failed, retrying in {delay:.0f}s")
+                self._retry_at = time.monotonic() + delay
+                self._retry_delay = min(self._retry_delay * 2, self.retry_max)
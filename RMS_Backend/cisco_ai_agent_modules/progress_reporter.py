@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Discovery Progress Reporter for Cisco AI Agent
+
+This module coalesces discovery progress before it reaches the backend:
+- update() only records the latest state of a session and never blocks on
+  the network, so sweeps report progress per host at no cost
+- A background sender posts a session's state when it advanced by at least
+  min_step percent, or min_interval seconds after the last post when it
+  changed at all
+- Each post carries how many updates it coalesced; finish() posts the final
+  state and waits (bounded) for it to go out
+
+Stdlib only: the agent ships as a single script plus these modules.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    """Rate-limited, coalescing progress sender running on its own thread."""
+
+    def __init__(self, send: Callable[[Dict[str, Any]], bool], min_interval: float = 2.0, min_step: int = 5):
+        """
+        Args:
+            send: send(progress_data) -> bool posting one aggregated update
+            min_interval: Seconds between posts for a session whose progress
+                advanced less than min_step
+            min_step: Percent of progress that is posted without waiting
+        """
+        self.send = send
+        self.min_interval = min_interval
+        self.min_step = min_step
+
+        # session_id -> latest state plus bookkeeping
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.stats = {'updates': 0, 'posts': 0, 'failures': 0}
+
+    def start(self) -> 'ProgressReporter':
+        with self._condition:
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(target=self._run, name='progress-reporter', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Post whatever is pending, then stop the sender thread."""
+        with self._condition:
+            for session in self._sessions.values():
+                session['flush'] = True
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def update(self, session_id: str, progress: int, processed_ips: int, discovered_count: int,
+               total_ips: int = None) -> None:
+        """Record the latest progress of a session (never blocks on the network)."""
+        with self._condition:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = {
+                    'state': {}, 'pending': 0, 'last_sent': 0.0, 'last_progress': -1,
+                    'flush': False, 'sent': threading.Event()
+                }
+            session['state'] = {
+                'progress': progress,
+                'processed_ips': processed_ips,
+                'discovered_count': discovered_count,
+                'total_ips': total_ips,
+            }
+            session['pending'] += 1
+            self.stats['updates'] += 1
+            if progress - session['last_progress'] >= self.min_step:
+                self._condition.notify_all()
+        if not self._running:
+            self.start()
+
+    def finish(self, session_id: str, timeout: float = 5.0) -> bool:
+        """Post the session's final state now; True once it was handed to send()."""
+        with self._condition:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return True
+            session['flush'] = True
+            session['final'] = True
+            # The final state is posted even when nothing changed since the last post
+            session['pending'] = max(session['pending'], 1)
+            self._condition.notify_all()
+        sent = session['sent'].wait(timeout)
+        with self._condition:
+            if self._sessions.get(session_id) is session and not session['pending']:
+                del self._sessions[session_id]
+        return sent
+
+    def _due(self, session: Dict[str, Any], now: float) -> float:
+        """0 when the session should be posted now, else seconds until it is."""
+        if not session['pending']:
+            return float('inf')
+        if session['flush'] or session['state']['progress'] - session['last_progress'] >= self.min_step:
+            return 0.0
+        return max(session['last_sent'] + self.min_interval - now, 0.0)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    due = [(session_id, session) for session_id, session in self._sessions.items()
+                           if self._due(session, now) == 0.0]
+                    if due or not self._running:
+                        break
+                    wait = min((self._due(session, now) for session in self._sessions.values()),
+                               default=float('inf'))
+                    self._condition.wait(None if wait == float('inf') else wait)
+
+                batch = []
+                for session_id, session in due:
+                    payload = {
+                        'session_id': session_id,
+                        **session['state'],
+                        'coalesced_updates': session['pending'],
+                        'final': bool(session.get('final')),
+                        'timestamp': datetime.now().isoformat(),
+                    }
+                    session['pending'] = 0
+                    session['flush'] = False
+                    session['last_sent'] = now
+                    session['last_progress'] = session['state']['progress']
+                    batch.append((session, payload))
+                running = self._running
+
+            # Network I/O outside the lock: update() never waits for a post
+            for session, payload in batch:
+                try:
+                    ok = self.send(payload)
+                except Exception as e:
+                    logger.debug(f"Progress post failed: {e}")
+                    ok = False
+                self.stats['posts'] += 1
+                self.stats['failures'] += not ok
+                if payload['final']:
+                    session['sent'].set()
+
+            if not running and not batch:
+                return
+
+    def get_info(self) -> Dict[str, Any]:
+        with self._condition:
+            return {'sessions': len(self._sessions), **self.stats}
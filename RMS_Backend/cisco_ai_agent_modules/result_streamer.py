@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Discovery Result Streamer for Cisco AI Agent
+
+This module streams discovery results to the backend while a sweep runs:
+- Devices and errors are collected into batches of batch_size devices (or
+  whatever arrived within max_delay seconds)
+- Every batch carries its session and sequence number; the backend ingests
+  it once and acknowledges it, duplicates are acknowledged without being
+  ingested again
+- A background sender posts batches in order and retries an unacknowledged
+  batch with exponential backoff, so a network blip delays the stream but
+  never loses or duplicates accepted results
+- With an OfflineSpool, a batch that is not acknowledged is handed to the
+  on-disk spool instead (and later batches follow it while the spool has a
+  backlog), so an agent restart during an outage does not lose results; the
+  backend's per-sequence dedup makes the spool's replay safe
+- finish() seals the last batch (marked final, with the batch count) and
+  waits, bounded, until every batch was acknowledged or spooled
+
+Stdlib only: the agent ships as a single script plus these modules.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ResultStreamer:
+    """Sequenced, acknowledged result batches sent from a background thread."""
+
+    def __init__(self, send: Callable[[Dict[str, Any]], bool], batch_size: int = 50, max_delay: float = 5.0,
+                 retry_initial: float = 1.0, retry_max: float = 30.0, spool=None, spool_path: Optional[str] = None):
+        """
+        Args:
+            send: send(batch) -> True once the backend acknowledged the batch
+            batch_size: Devices per batch
+            max_delay: Seconds a non-empty batch waits for more devices
+            retry_initial: First retry delay for an unacknowledged batch
+            retry_max: Retry delay cap
+            spool: Optional OfflineSpool that takes over unacknowledged batches
+            spool_path: Backend path the spool replays batches to
+        """
+        self.send = send
+        self.spool = spool if spool_path else None
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+
+        # session_id -> {'open': batch being filled, 'sealed': [batches awaiting ack], ...}
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._retry_at = 0.0
+        self._retry_delay = retry_initial
+        self.stats = {'devices': 0, 'batches': 0, 'acked': 0, 'retries': 0, 'spooled': 0}
+
+    def start(self) -> 'ResultStreamer':
+        with self._condition:
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(target=self._run, name='result-streamer', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.spool:
+            # Batches still queued in memory would die with the process
+            with self._condition:
+                for session_id, session in list(self._sessions.items()):
+                    self._seal(session_id, session)
+                    batches = session['sealed']
+                    while batches:
+                        payload = {key: value for key, value in batches[0].items() if key != 'opened'}
+                        payload['timestamp'] = datetime.now().isoformat()
+                        if not self._spool(payload):
+                            break
+                        batches.pop(0)
+                        self.stats['spooled'] += 1
+                    if session['finished'] and not batches:
+                        session['done'].set()
+
+    def _session(self, session_id: str) -> Dict[str, Any]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = {
+                'next_sequence': 0, 'open': None, 'sealed': [], 'finished': False,
+                'devices': 0, 'done': threading.Event()
+            }
+        return session
+
+    def _seal(self, session_id: str, session: Dict[str, Any], final: bool = False) -> None:
+        batch = session['open']
+        if batch is None:
+            if not final:
+                return
+            batch = self._new_batch(session_id, session)
+        session['open'] = None
+        if final:
+            batch['final'] = True
+            batch['total_batches'] = batch['sequence'] + 1
+            batch['total_devices'] = session['devices']
+        session['sealed'].append(batch)
+        self.stats['batches'] += 1
+        self._condition.notify_all()
+
+    def _new_batch(self, session_id: str, session: Dict[str, Any]) -> Dict[str, Any]:
+        batch = {
+            'session_id': session_id,
+            'sequence': session['next_sequence'],
+            'discovered_devices': [],
+            'errors': [],
+            'final': False,
+            'opened': time.monotonic(),
+        }
+        session['next_sequence'] += 1
+        return batch
+
+    def add(self, session_id: str, device: Optional[Dict[str, Any]] = None, errors: List[str] = ()) -> None:
+        """Queue one host's result (never blocks on the network)."""
+        if device is None and not errors:
+            return
+        with self._condition:
+            session = self._session(session_id)
+            if session['finished']:
+                logger.warning(f"Result for finished session {session_id} dropped")
+                return
+            if session['open'] is None:
+                session['open'] = self._new_batch(session_id, session)
+            batch = session['open']
+            if device is not None:
+                batch['discovered_devices'].append(device)
+                session['devices'] += 1
+                self.stats['devices'] += 1
+            batch['errors'].extend(errors)
+            if len(batch['discovered_devices']) >= self.batch_size:
+                self._seal(session_id, session)
+            else:
+                self._condition.notify_all()
+        if not self._running:
+            self.start()
+
+    def finish(self, session_id: str, timeout: float = 60.0) -> bool:
+        """Seal the final batch and wait until all batches are acknowledged (or spooled)."""
+        with self._condition:
+            session = self._session(session_id)
+            if not session['finished']:
+                session['finished'] = True
+                self._seal(session_id, session, final=True)
+        if not self._running:
+            self.start()
+        done = session['done'].wait(timeout)
+        if not done:
+            logger.warning(f"Results of session {session_id} not fully acknowledged after {timeout}s; "
+                           f"{len(session['sealed'])} batches still queued")
+        return done
+
+    def pending(self, session_id: str) -> int:
+        """Batches of a session not yet acknowledged."""
+        with self._condition:
+            session = self._sessions.get(session_id)
+            return len(session['sealed']) + (session['open'] is not None) if session else 0
+
+    def _next_batch(self, now: float):
+        """(session_id, batch) to send now, or (None, seconds to wait)."""
+        wait = float('inf')
+        if now < self._retry_at:
+            return None, self._retry_at - now
+        for session_id, session in self._sessions.items():
+            if session['sealed']:
+                return session_id, session['sealed'][0]
+            batch = session['open']
+            if batch is not None:
+                age = now - batch['opened']
+                if age >= self.max_delay:
+                    self._seal(session_id, session)
+                    return session_id, session['sealed'][0]
+                wait = min(wait, self.max_delay - age)
+        return None, wait
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running:
+                    session_id, batch_or_wait = self._next_batch(time.monotonic())
+                    if session_id is not None:
+                        break
+                    self._condition.wait(None if batch_or_wait == float('inf') else batch_or_wait)
+                if not self._running:
+                    return
+                batch = batch_or_wait
+                payload = {key: value for key, value in batch.items() if key != 'opened'}
+                payload['timestamp'] = datetime.now().isoformat()
+
+            # Network I/O outside the lock: add() never waits for a post
+            spooled = False
+            if self.spool and self.spool.backlog():
+                # Older results are waiting on disk: queue behind them
+                acked = spooled = self._spool(payload)
+            else:
+                try:
+                    acked = self.send(payload)
+                except Exception as e:
+                    logger.debug(f"Result batch post failed: {e}")
+                    acked = False
+                if not acked and self.spool:
+                    acked = spooled = self._spool(payload)
+
+            with self._condition:
+                session = self._sessions.get(session_id)
+                if acked:
+                    self._retry_delay = self.retry_initial
+                    self._retry_at = 0.0
+                    self.stats['spooled' if spooled else 'acked'] += 1
+                    if session and session['sealed'] and session['sealed'][0] is batch:
+                        session['sealed'].pop(0)
+                    if session and session['finished'] and not session['sealed'] and session['open'] is None:
+                        session['done'].set()
+                        del self._sessions[session_id]
+                else:
+                    self.stats['retries'] += 1
+                    logger.warning(f"Result batch {batch['sequence']} of {session_id} not acknowledged, "
+                                   f"retrying in {self._retry_delay:.0f}s")
+                    self._retry_at = time.monotonic() + self._retry_delay
+                    self._retry_delay = min(self._retry_delay * 2, self.retry_max)
+
+    def _spool(self, payload: Dict[str, Any]) -> bool:
+        """Hand a batch to the offline spool; True once it is on disk."""
+        try:
+            # Batches are replayed one by one: each carries its own sequence
+            self.spool.append(self.spool_path, payload)
+        except Exception as e:
+            logger.error(f"Could not spool result batch {payload['sequence']} of {payload['session_id']}: {e}")
+            return False
+        logger.warning(f"Backend unreachable, spooled result batch {payload['sequence']} of {payload['session_id']}")
+        return True
+
+    def get_info(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'sessions': len(self._sessions),
+                'queued_batches': sum(len(s['sealed']) for s in self._sessions.values()),
+                **self.stats
+            }
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Concurrent IP Sweep Engine for Cisco AI Agent
+
+This module sweeps an address range for devices:
+- A fast liveness pre-pass (one batched ICMP sweep when available, then TCP
+  connect probes plus an SNMP probe on UDP/161 for the silent hosts) so dead
+  addresses never cost an SNMP timeout or an SSH connect
+- Identification of live hosts with a separate concurrency limit per
+  protocol (SNMP, SSH)
+- Limits that adapt to the observed timeout rate (halved when most
+  requests time out, grown again while they succeed)
+- Results handed back as each host completes, on the caller's thread
+
+Stdlib only: the agent ships as a single script plus these modules.
+"""
+
+import errno
+import logging
+import os
+import queue
+import select
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# TCP ports probed for liveness: a SYN-ACK or a RST both prove the host is up
+LIVENESS_PORTS = (22, 23, 80, 443)
+
+# Per-protocol limits: (initial, minimum, maximum, seconds after which a
+# failed attempt counts as a timeout)
+DEFAULT_LIMITS = {
+    'snmp': (32, 4, 128, 5.0),
+    'ssh': (8, 2, 32, 4.5),
+}
+
+_ALIVE_ERRNOS = {errno.ECONNREFUSED, errno.ECONNRESET}
+
+SNMP_PORT = 161
+# sysUpTime.0, BER encoded (1.3 packs into 0x2b)
+_SYS_UPTIME_OID = bytes([0x2b, 6, 1, 2, 1, 1, 3, 0])
+
+
+def _ber(tag: int, payload: bytes) -> bytes:
+    length = len(payload)
+    if length < 0x80:
+        return bytes([tag, length]) + payload
+    encoded = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([tag, 0x80 | len(encoded)]) + encoded + payload
+
+
+def _ber_int(value: int) -> bytes:
+    return _ber(0x02, value.to_bytes((value.bit_length() + 8) // 8, 'big', signed=True))
+
+
+def snmp_probe_packets(communities: Sequence[str] = ()) -> List[bytes]:
+    """
+    Requests every SNMP agent answers when it is up: an SNMPv1 and an SNMPv2c
+    GET of sysUpTime.0 per community, and an SNMPv3 engine discovery request (empty
+    user, reportable), which v3 agents answer with a Report whatever the
+    credentials.
+    """
+    request_id = _ber_int(int.from_bytes(os.urandom(3), 'big'))
+    packets = []
+    var_bind = _ber(0x30, _ber(0x30, _ber(0x06, _SYS_UPTIME_OID) + b'\x05\x00'))
+    pdu = _ber(0xa0, request_id + _ber_int(0) + _ber_int(0) + var_bind)
+    for community in communities:
+        for version in (0, 1):   # v1, v2c
+            packets.append(_ber(0x30, _ber_int(version) + _ber(0x04, community.encode()) + pdu))
+
+    global_data = _ber(0x30, request_id + _ber_int(65507) + _ber(0x04, b'\x04') + _ber_int(3))
+    usm = _ber(0x30, _ber(0x04, b'') + _ber_int(0) + _ber_int(0) + _ber(0x04, b'') * 3)
+    scoped_pdu = _ber(0x30, _ber(0x04, b'') * 2 + _ber(0xa0, request_id + _ber_int(0) + _ber_int(0) + _ber(0x30, b'')))
+    packets.append(_ber(0x30, _ber_int(3) + global_data + _ber(0x04, usm) + scoped_pdu))
+    return packets
+
+
+def _send_snmp_probe(ip: str, port: int, communities: Sequence[str]) -> Optional[socket.socket]:
+    """Send the SNMP probe requests; the socket is polled later with _snmp_answered."""
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.connect((ip, port))
+        for packet in snmp_probe_packets(communities):
+            sock.send(packet)
+        return sock
+    except OSError as e:
+        logger.debug(f"SNMP liveness probe failed for {ip}: {e}")
+        return None
+
+
+def _snmp_answered(sock: socket.socket, timeout: float) -> bool:
+    """True on any reply, or an ICMP port unreachable (the host is up either way)."""
+    try:
+        readable, _, _ = select.select([sock], [], [], max(timeout, 0))
+        if readable:
+            sock.recv(4096)
+            return True
+        return False
+    except ConnectionRefusedError:
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def snmp_probe(ip: str, communities: Sequence[str] = (), port: int = SNMP_PORT, timeout: float = 1.0) -> bool:
+    """True when the host answers an SNMP request on UDP (see snmp_probe_packets)."""
+    sock = _send_snmp_probe(ip, port, communities)
+    return bool(sock) and _snmp_answered(sock, timeout)
+
+
+def tcp_probe(ip: str, ports: Sequence[int] = LIVENESS_PORTS, timeout: float = 1.0) -> bool:
+    """True when any port answers (accepts or refuses) within timeout."""
+    sockets = []
+    try:
+        for port in ports:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            result = sock.connect_ex((ip, port))
+            if result == 0 or result in _ALIVE_ERRNOS:
+                return True
+            sockets.append(sock)
+
+        # All connects in flight at once: one timeout covers every port
+        deadline = time.monotonic() + timeout
+        pending = list(sockets)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _, writable, _ = select.select([], pending, [], remaining)
+            for sock in writable:
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if error == 0 or error in _ALIVE_ERRNOS:
+                    return True
+                pending.remove(sock)
+        return False
+    except OSError as e:
+        logger.debug(f"TCP liveness probe failed for {ip}: {e}")
+        return False
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for one protocol, adjusted from the timeout rate."""
+
+    def __init__(self, name: str, initial: int, minimum: int, maximum: int, timeout_after: float,
+                 window: int = 16, high_timeout_rate: float = 0.5, low_timeout_rate: float = 0.1):
+        """
+        Args:
+            name: Protocol name (for logging)
+            initial: Starting concurrency
+            minimum: Lowest concurrency the limit backs off to
+            maximum: Highest concurrency the limit grows to
+            timeout_after: Seconds after which a failed attempt is counted as a timeout
+            window: Attempts per adjustment
+            high_timeout_rate: Halve the limit above this timeout rate
+            low_timeout_rate: Grow the limit by a quarter below this rate
+        """
+        self.name = name
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.timeout_after = timeout_after
+        self.window = window
+        self.high_timeout_rate = high_timeout_rate
+        self.low_timeout_rate = low_timeout_rate
+
+        self.active = 0
+        self._window_attempts = 0
+        self._window_timeouts = 0
+        self._condition = threading.Condition()
+        self.stats = {'attempts': 0, 'timeouts': 0, 'decreases': 0, 'increases': 0, 'peak': 0}
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait()
+            self.active += 1
+            if self.active > self.stats['peak']:
+                self.stats['peak'] = self.active
+
+    def release(self, timed_out: bool) -> None:
+        with self._condition:
+            self.active -= 1
+            self.stats['attempts'] += 1
+            self._window_attempts += 1
+            if timed_out:
+                self.stats['timeouts'] += 1
+                self._window_timeouts += 1
+            if self._window_attempts >= self.window:
+                self._adjust()
+            self._condition.notify_all()
+
+    def _adjust(self) -> None:
+        rate = self._window_timeouts / self._window_attempts
+        previous = self.limit
+        if rate > self.high_timeout_rate:
+            self.limit = max(self.minimum, self.limit // 2)
+            self.stats['decreases'] += self.limit < previous
+        elif rate < self.low_timeout_rate:
+            self.limit = min(self.maximum, self.limit + max(1, self.limit // 4))
+            self.stats['increases'] += self.limit > previous
+        if self.limit != previous:
+            logger.info(f"{self.name} concurrency {previous} -> {self.limit} (timeout rate {rate:.0%})")
+        self._window_attempts = 0
+        self._window_timeouts = 0
+
+    def get_info(self) -> Dict[str, Any]:
+        with self._condition:
+            return {'limit': self.limit, 'active': self.active, **self.stats}
+
+
+class SweepEngine:
+    """
+    Liveness pre-pass plus per-protocol limited identification.
+
+    The identify callback runs on worker threads and reaches devices through
+    engine.call(protocol, fn, ...), which holds a slot of that protocol's
+    limiter and feeds its timeout statistics.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, int, int, float]] = None,
+                 liveness_workers: int = 128, liveness_timeout: float = 1.0,
+                 liveness_ports: Sequence[int] = LIVENESS_PORTS,
+                 snmp_port: Optional[int] = None, snmp_communities: Sequence[str] = (),
+                 ping: Optional[Callable[[str], bool]] = None,
+                 ping_sweep: Optional[Callable[[List[str]], Iterable[str]]] = None):
+        """
+        Args:
+            limits: protocol -> (initial, minimum, maximum, timeout_after);
+                merged over DEFAULT_LIMITS
+            liveness_workers: Concurrent liveness probes
+            liveness_timeout: Seconds a TCP liveness probe waits
+            liveness_ports: TCP ports probed for liveness
+            snmp_port: UDP port of an SNMP probe sent alongside the TCP probes,
+                so hosts that only speak SNMP count as alive (None: no probe)
+            snmp_communities: SNMPv1/v2c communities the probe tries (an SNMPv3
+                engine discovery request is always sent)
+            ping: Optional ping(ip) -> bool tried when no TCP port answers
+            ping_sweep: Optional ping_sweep(ips) -> answering ips, run once
+                over the whole range before any per-host probe
+        """
+        merged = dict(DEFAULT_LIMITS)
+        merged.update(limits or {})
+        self.limiters = {name: AdaptiveLimiter(name, *spec) for name, spec in merged.items()}
+        self.liveness_workers = liveness_workers
+        self.liveness_timeout = liveness_timeout
+        self.liveness_ports = tuple(liveness_ports)
+        self.snmp_port = snmp_port
+        self.snmp_communities = tuple(snmp_communities)
+        self.ping = ping
+        self.ping_sweep = ping_sweep
+        self.stats = {'hosts': 0, 'completed': 0, 'alive': 0, 'elapsed': 0.0}
+
+    def is_alive(self, ip: str) -> bool:
+        # The SNMP reply arrives while the TCP probe waits, so it adds no time
+        started = time.monotonic()
+        snmp_sock = _send_snmp_probe(ip, self.snmp_port, self.snmp_communities) if self.snmp_port else None
+        if tcp_probe(ip, self.liveness_ports, self.liveness_timeout):
+            if snmp_sock:
+                snmp_sock.close()
+            return True
+        if snmp_sock and _snmp_answered(snmp_sock, self.liveness_timeout - (time.monotonic() - started)):
+            return True
+        return bool(self.ping and self.ping(ip))
+
+    def call(self, protocol: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn under protocol's concurrency limit. A falsy result that took
+        longer than the protocol's timeout_after counts as a timeout.
+        """
+        limiter = self.limiters[protocol]
+        limiter.acquire()
+        started = time.monotonic()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            limiter.release(not result and time.monotonic() - started >= limiter.timeout_after)
+
+    def sweep(self, ips: Iterable[str], identify: Callable[[str], Any],
+              on_result: Callable[[str, bool, Any], None], liveness_check: bool = True,
+              should_stop: Callable[[], bool] = None) -> Dict[str, Any]:
+        """
+        Sweep addresses and report each host as it completes.
+
+        Args:
+            ips: Addresses to sweep
+            identify: identify(ip) -> result, run for every live host
+            on_result: on_result(ip, alive, result) called on this thread in
+                completion order; result is None for dead hosts and carries
+                the exception for a failed identify
+            liveness_check: Run the liveness pre-pass (False sends every
+                address straight to identify)
+            should_stop: Polled between results; True abandons queued hosts
+
+        Returns:
+            Sweep statistics and the final per-protocol limits
+        """
+        ips = list(ips)
+        started = time.monotonic()
+        results: "queue.Queue[Tuple[str, bool, Any]]" = queue.Queue()
+        identify_workers = sum(limiter.maximum for limiter in self.limiters.values())
+        alive_count = 0
+        delivered = 0
+
+        def run_identify(ip: str) -> None:
+            try:
+                results.put((ip, True, identify(ip)))
+            except Exception as e:
+                logger.debug(f"Identification failed for {ip}: {e}")
+                results.put((ip, True, e))
+
+        identify_pool = ThreadPoolExecutor(max_workers=identify_workers, thread_name_prefix='sweep-identify')
+        liveness_pool = None
+        try:
+            if liveness_check:
+                answered = set()
+                if self.ping_sweep:
+                    try:
+                        answered = set(self.ping_sweep(ips))
+                    except Exception as e:
+                        logger.warning(f"Ping sweep failed, probing hosts individually: {e}")
+                silent = [ip for ip in ips if ip not in answered]
+                liveness_pool = ThreadPoolExecutor(max_workers=min(self.liveness_workers, max(len(silent), 1)),
+                                                   thread_name_prefix='sweep-liveness')
+
+                def run_liveness(ip: str) -> None:
+                    try:
+                        alive = self.is_alive(ip)
+                    except Exception as e:
+                        logger.debug(f"Liveness probe failed for {ip}: {e}")
+                        alive = False
+                    if alive:
+                        # Hand over at once: identification overlaps the pre-pass
+                        identify_pool.submit(run_identify, ip)
+                    else:
+                        results.put((ip, False, None))
+
+                for ip in ips:
+                    if ip in answered:
+                        identify_pool.submit(run_identify, ip)
+                    else:
+                        liveness_pool.submit(run_liveness, ip)
+            else:
+                for ip in ips:
+                    identify_pool.submit(run_identify, ip)
+
+            while delivered < len(ips):
+                if should_stop and should_stop():
+                    logger.info(f"Sweep stopped after {delivered}/{len(ips)} hosts")
+                    break
+                try:
+                    ip, alive, result = results.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                delivered += 1
+                alive_count += alive
+                on_result(ip, alive, result)
+        finally:
+            if liveness_pool:
+                liveness_pool.shutdown(wait=False, cancel_futures=True)
+            identify_pool.shutdown(wait=False, cancel_futures=True)
+
+        self.stats = {
+            'hosts': len(ips),
+            'completed': delivered,
+            'alive': alive_count,
+            'elapsed': round(time.monotonic() - started, 2),
+            'limits': {name: limiter.get_info() for name, limiter in self.limiters.items()},
+        }
+        logger.info(f"Sweep of {len(ips)} hosts: {alive_count} alive in {self.stats['elapsed']}s")
+        return self.stats
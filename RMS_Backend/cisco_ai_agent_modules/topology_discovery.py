@@ -16,18 +16,33 @@ import ipaddress
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import json
-import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from .http_transport import agent_transport
+from .offline_spool import DELIVERED, SPOOLED
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# In-process ICMP echo sweeper (backend tree); the ping command otherwise
+try:
+    from app.utils.icmp_sweeper import icmp_sweeper
+    ICMP_SWEEPER_AVAILABLE = True
+except ImportError:
+    ICMP_SWEEPER_AVAILABLE = False
+
 class TopologyDiscovery:
     """Handles network topology discovery for the agent."""
     
-    def __init__(self, agent_config: Dict[str, Any]):
+    def __init__(self, agent_config: Dict[str, Any], spool=None):
+        """
+        Args:
+            agent_config: Agent configuration
+            spool: Optional OfflineSpool that keeps results while the backend is down
+        """
         self.agent_config = agent_config
+        self.spool = spool
         self.backend_url = agent_config.get('backend_url')
         self.agent_token = agent_config.get('agent_token')
         self.agent_id = agent_config.get('agent_id')
@@ -142,6 +157,19 @@ class TopologyDiscovery:
             
             logger.info(f"Scanning {len(ip_addresses)} IP addresses for devices")
             
+            if ICMP_SWEEPER_AVAILABLE and icmp_sweeper.available():
+                # One batched echo sweep of the range, then only live hosts are probed
+                alive = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: icmp_sweeper.alive(ip_addresses, timeout=self.ping_timeout)
+                )
+                for ip in alive:
+                    result = await self._ping_device(ip, reachable=True)
+                    if result:
+                        devices.append(result)
+                        logger.info(f"Discovered device: {result['hostname']} ({ip})")
+                logger.info(f"Device discovery completed: {len(devices)} devices found")
+                return devices
+            
             # Use ThreadPoolExecutor for concurrent scanning
             with ThreadPoolExecutor(max_workers=self.max_concurrent_discoveries) as executor:
                 # Submit ping tasks
@@ -168,11 +196,11 @@ class TopologyDiscovery:
             logger.error(f"Error during device discovery: {str(e)}")
             return devices
     
-    async def _ping_device(self, ip: str) -> Optional[Dict[str, Any]]:
-        """Ping a device and return basic information if reachable."""
+    async def _ping_device(self, ip: str, reachable: bool = False) -> Optional[Dict[str, Any]]:
+        """Ping a device and return basic information if reachable (already known when reachable=True)."""
         try:
             # Ping the device
-            if not self._is_device_reachable(ip):
+            if not reachable and not self._is_device_reachable(ip):
                 return None
             
             # Try to get device information via SNMP
@@ -203,6 +231,9 @@ class TopologyDiscovery:
     def _is_device_reachable(self, ip: str) -> bool:
         """Check if a device is reachable via ping."""
         try:
+            if ICMP_SWEEPER_AVAILABLE and icmp_sweeper.available():
+                return icmp_sweeper.ping(ip, timeout=self.ping_timeout)
+            
             # Use ping command appropriate for the OS
             if self._is_windows():
                 cmd = ['ping', '-n', '1', '-w', str(self.ping_timeout * 1000), ip]
@@ -363,7 +394,7 @@ class TopologyDiscovery:
                 'force_refresh': False
             }
             
-            response = requests.post(url, headers=headers, json=data)
+            response = agent_transport.post(url, headers=headers, json=data)
             if response.status_code == 200:
                 logger.info(f"Backend notified of discovery start for network {network_id}")
             else:
@@ -384,7 +415,7 @@ class TopologyDiscovery:
                 'error': error_message
             }
             
-            response = requests.post(url, headers=headers, json=data)
+            response = agent_transport.post(url, headers=headers, json=data)
             if response.status_code == 200:
                 logger.info(f"Backend notified of discovery failure for network {network_id}")
             else:
@@ -396,7 +427,8 @@ class TopologyDiscovery:
     async def _report_discovery_results(self, network_id: int) -> None:
         """Report discovery results to backend."""
         try:
-            url = f"{self.backend_url}/api/v1/agents/{self.agent_id}/topology/update"
+            path = f"/api/v1/agents/{self.agent_id}/topology/update"
+            url = f"{self.backend_url}{path}"
             headers = {'X-Agent-Token': self.agent_token}
             
             data = {
@@ -406,7 +438,20 @@ class TopologyDiscovery:
                 'neighbors': self.discovered_neighbors.get(network_id, [])
             }
             
-            response = requests.post(url, headers=headers, json=data)
+            # Posts (and disk appends) block: keep them off the discovery loop
+            loop = asyncio.get_running_loop()
+            if self.spool:
+                # Each update is a full snapshot: only the newest one per network is replayed
+                outcome = await loop.run_in_executor(
+                    None, lambda: self.spool.deliver(path, data, key=f"network:{network_id}")
+                )
+                if outcome == DELIVERED:
+                    logger.info(f"Discovery results reported to backend for network {network_id}")
+                elif outcome == SPOOLED:
+                    logger.warning(f"Backend did not take the report, spooled discovery results for network {network_id}")
+                return
+            
+            response = await loop.run_in_executor(None, lambda: agent_transport.post(url, headers=headers, json=data))
             if response.status_code == 200:
                 logger.info(f"Discovery results reported to backend for network {network_id}")
             else:
@@ -1,5 +1,7 @@
-from fastapi import UploadFile, File, Body, Request, WebSocket, WebSocketDisconnect, FastAPI, Depends
+from fastapi import UploadFile, File, Body, Request, FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.openapi.utils import get_openapi
 from fastapi.openapi.models import OAuthFlows as OAuthFlowsModel
 from fastapi.security import OAuth2PasswordBearer
@@ -25,6 +27,7 @@ from app.api.v1.endpoints import users, org_network, companies
 from app.api.v1.api import api_router
 from app.core.secure_config import secure_settings as settings
 from app.core.security_middleware import create_security_middleware
+from app.core.request_compression import GZipRequestMiddleware
 from app.core.secure_upload import SecureFileUpload
 from app.schemas.secure_requests import (
     SecureCommandRequest,
@@ -38,6 +41,7 @@ from app.schemas.secure_requests import (
 
 # Background monitoring imports
 from app.core.background_tasks import start_background_monitoring
+from app.core.dependencies import get_current_user
 
 # External imports
 try:
@@ -85,6 +89,11 @@ async def health_check():
 # Add security middleware
 app.add_middleware(create_security_middleware())
 
+# Agents gzip large request bodies; inflate them before the security checks,
+# and compress large responses for clients that accept it
+app.add_middleware(GZipRequestMiddleware)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Add CORS middleware with secure configuration
 app.add_middleware(
     CORSMiddleware,
@@ -344,123 +353,6 @@ async def transcribe_audio(file: UploadFile = File(...)):
 app.post("/dialogflow-webhook")(dialogflow_webhook)
 app.include_router(websocket_router)
 
-# Add agent WebSocket endpoint directly to main app
-@app.websocket("/ws/agent/{agent_token}")
-async def agent_websocket(websocket: WebSocket, agent_token: str):
-    """WebSocket endpoint for agent connections."""
-    try:
-        # Get database session directly
-        from app.core.database import SessionLocal
-        from app.models.base import Agent
-        from app.models.base import AgentTokenAuditLog
-        from datetime import datetime
-        import json
-        
-        db = SessionLocal()
-        
-        try:
-            # Validate agent token
-            agent = db.query(Agent).filter(Agent.agent_token == agent_token).first()
-            if not agent:
-                await websocket.close(code=4001, reason="Invalid agent token")
-                return
-            
-            if agent.token_status != "active":
-                await websocket.close(code=4003, reason="Agent token is not active")
-                return
-            
-            await websocket.accept()
-            
-            # Update agent status to online
-            agent.status = "online"
-            agent.last_heartbeat = datetime.utcnow()
-            agent.last_used_at = datetime.utcnow()
-            db.commit()
-            
-            # Log the connection
-            try:
-                audit = AgentTokenAuditLog(
-                    agent_id=agent.id,
-                    event_type="websocket_connected",
-                    timestamp=datetime.utcnow(),
-                    details={}
-                )
-                db.add(audit)
-                db.commit()
-            except Exception as e:
-                logger.error(f"Error logging agent event: {e}")
-            
-            try:
-                while True:
-                    data = await websocket.receive_text()
-                    try:
-                        payload = json.loads(data)
-                        message_type = payload.get("type", "")
-                        
-                        if message_type == "heartbeat":
-                            # Update heartbeat
-                            agent.last_heartbeat = datetime.utcnow()
-                            agent.last_used_at = datetime.utcnow()
-                            db.commit()
-                            
-                            # Send pong response
-                            await websocket.send_text(json.dumps({
-                                "type": "pong",
-                                "timestamp": datetime.utcnow().isoformat()
-                            }))
-                        
-                        elif message_type == "discovery_result":
-                            # Handle discovery results
-                            devices = payload.get("devices", [])
-                            subnet = payload.get("subnet", "")
-                            
-                            # Process discovered devices
-                            for device_data in devices:
-                                # You can add device processing logic here
-                                pass
-                            
-                            await websocket.send_text(json.dumps({
-                                "type": "discovery_ack",
-                                "message": f"Received {len(devices)} devices from {subnet}"
-                            }))
-                        
-                        else:
-                            # Echo back unknown message types
-                            await websocket.send_text(json.dumps({
-                                "type": "echo",
-                                "data": payload
-                            }))
-                            
-                    except json.JSONDecodeError:
-                        await websocket.send_text(json.dumps({
-                            "type": "error",
-                            "message": "Invalid JSON format"
-                        }))
-                        
-            except WebSocketDisconnect:
-                # Update agent status to offline
-                agent.status = "offline"
-                db.commit()
-                try:
-                    audit = AgentTokenAuditLog(
-                        agent_id=agent.id,
-                        event_type="websocket_disconnected",
-                        timestamp=datetime.utcnow(),
-                        details={}
-                    )
-                    db.add(audit)
-                    db.commit()
-                except Exception as e:
-                    logger.error(f"Error logging agent event: {e}")
-                
-        finally:
-            db.close()
-            
-    except Exception as e:
-        if websocket.client_state.value < 3:  # Not closed yet
-            await websocket.close(code=4000, reason=f"Internal error: {str(e)}")
-        logger.error(f"WebSocket error: {str(e)}")
-
 @app.get("/health")
 async def health_check():
     """Health check endpoint for Docker and load balancers"""
@@ -484,6 +376,19 @@ async def get_rate_limit_stats(request: Request):
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics(current_user: dict = Depends(get_current_user)):
+    """SNMP latency, PDU, retry and error metrics in Prometheus text format (platform admins only)"""
+    from app.core.snmp_metrics import snmp_metrics
+    
+    # Labels carry device IPs
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Only platform admins can view metrics")
+    return PlainTextResponse(
+        snmp_metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 @app.get("/debug/routes")
 def list_routes():
     routes = []
@@ -0,0 +1,142 @@
+"""
+Agent-to-backend HTTP transport benchmark
+
+Runs a local HTTPS backend stand-in (self-signed certificate, HTTP/1.1
+keep-alive, gzip request bodies inflated like GZipRequestMiddleware) in a
+separate process and sends the agent's typical traffic to it - small
+heartbeats and polls plus discovery result batches - once with a fresh
+requests call per message (the old agent) and once through the shared
+AgentTransport. Reports wall and agent CPU time per request, the TLS
+handshakes the backend had to do and the bytes put on the wire.
+
+Usage:
+    python -m tests.benchmarks.bench_agent_transport [--requests 200] [--devices 50]
+"""
+
+import argparse
+import datetime
+import gzip
+import json
+import multiprocessing
+import os
+import ssl
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from cisco_ai_agent_modules.http_transport import AgentTransport
+
+
+def write_certificate(directory: str):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number()).not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.DNSName('localhost')]), critical=False)
+            .sign(key, hashes.SHA256()))
+    cert_path, key_path = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    with open(cert_path, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def serve(cert_path, key_path, port_value, counters, ready):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            with counters.get_lock():
+                counters[0] += 1   # one TLS handshake per accepted connection
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with counters.get_lock():
+                counters[1] += len(body)
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            json.loads(body)
+            reply = b'{"status":"ok"}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    port_value.value = server.server_address[1]
+    ready.set()
+    server.serve_forever()
+
+
+def traffic(count: int, devices: int):
+    """Mostly heartbeats and polls, every tenth message a result batch."""
+    heartbeat = {'type': 'heartbeat', 'agent_name': 'bench-agent', 'status': 'online',
+                 'system_info': {'platform': 'linux', 'cpu_count': 8, 'memory_total': 16 << 30}}
+    batch = {'session_id': 'bench', 'sequence': 0, 'errors': [], 'discovered_devices': [
+        {'ip_address': f'10.1.{i // 250}.{i % 250}', 'hostname': f'sw-{i:04d}', 'device_type': 'Switch',
+         'description': 'Cisco IOS Software, C3750E Software (C3750E-UNIVERSALK9-M), Version 15.2(4)E10',
+         'serial_number': f'FOC{i:08d}', 'capabilities': ['snmp', 'ssh']} for i in range(devices)]}
+    return [('batch' if i % 10 == 9 else 'heartbeat', batch if i % 10 == 9 else heartbeat) for i in range(count)]
+
+
+def run(label, send, messages, counters):
+    with counters.get_lock():
+        counters[0] = counters[1] = 0
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _, payload in messages:
+        response = send(payload)
+        assert response.status_code == 200
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    n = len(messages)
+    print(f"{label:<22}{wall / n * 1000:>10.2f}{cpu / n * 1000:>10.2f}{counters[0]:>12}{counters[1] / 1024:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='messages sent per client')
+    parser.add_argument('--devices', type=int, default=50, help='devices per result batch')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path, key_path = write_certificate(directory)
+        port, counters, ready = multiprocessing.Value('i', 0), multiprocessing.Array('q', 2), multiprocessing.Event()
+        server = multiprocessing.Process(target=serve, args=(cert_path, key_path, port, counters, ready), daemon=True)
+        server.start()
+        ready.wait(10)
+        url = f"https://localhost:{port.value}/api/v1/agents/heartbeat"
+        messages = traffic(args.requests, args.devices)
+
+        print(f"{len(messages)} messages ({sum(1 for kind, _ in messages if kind == 'batch')} result batches "
+              f"of {args.devices} devices)\n")
+        print(f"{'client':<22}{'wall ms':>10}{'cpu ms':>10}{'handshakes':>12}{'KiB sent':>12}")
+        run('requests per call', lambda payload: requests.post(url, json=payload, timeout=15, verify=cert_path),
+            messages, counters)
+        transport = AgentTransport()
+        run('AgentTransport', lambda payload: transport.post(url, json=payload, verify=cert_path), messages, counters)
+        transport.close()
+        print(f"\ntransport stats: {transport.get_info()}")
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Micro-benchmark for the CLI parser registry
+
+Parses captured `show environment` outputs with the compiled registry
+templates (one pass per output) and with the two loops the monitors used
+before: a re.findall scan of the whole output per pattern, and a re.search
+per pattern per line. Prints the time per parse.
+
+Usage:
+    python -m tests.benchmarks.bench_cli_parser [iterations]
+"""
+
+import re
+import sys
+import timeit
+from app.core.cli_parser_registry import TEMPLATES, cli_parser_registry
+
+CISCO_SHOW_ENVIRONMENT_ALL = """\
+Switch 1 FAN 1 is OK
+Switch 1 FAN 2 is OK
+Switch 1 FAN 3 is OK
+FAN PS-1 is OK
+FAN PS-2 is NOT PRESENT
+Switch 1: SYSTEM TEMPERATURE is OK
+Inlet Temperature Value: 34 Degree Celsius
+Temperature State: GREEN
+Yellow Threshold : 46 Degree Celsius
+Red Threshold    : 56 Degree Celsius
+
+Hotspot Temperature Value: 49 Degree Celsius
+Temperature State: GREEN
+Yellow Threshold : 105 Degree Celsius
+Red Threshold    : 125 Degree Celsius
+SW  PID                 Serial#     Status           Sys Pwr  PoE Pwr  Watts
+--  ------------------  ----------  ---------------  -------  -------  -----
+1A  PWR-C1-715WAC       LIT17235R4W  OK              Good     Good     715
+1B  Not Present
+"""
+
+CISCO_SHOW_ENVIRONMENT_POWER_STACK = "".join(
+    f"{sw}A  PWR-C1-1100WAC      LIT2{sw:04d}XYZ  OK              Good     Good     1100\n"
+    f"{sw}B  PWR-C1-350WAC       DCB1{sw:04d}ABC  No Input Power  Bad      n/a      Unknown\n"
+    for sw in range(1, 9)
+)
+
+JUNIPER_SHOW_CHASSIS_ENVIRONMENT = """\
+Class Item                           Status     Measurement
+Temp  PEM 0                          OK         40 degrees C / 104 degrees F
+      PEM 1                          OK         45 degrees C / 113 degrees F
+      Routing Engine 0               OK         39 degrees C / 102 degrees F
+      Routing Engine 0 CPU           OK         51 degrees C / 123 degrees F
+      FPC 0 Intake                   OK         33 degrees C / 91 degrees F
+      FPC 0 Exhaust A                OK         42 degrees C / 107 degrees F
+Fans  Top Fan Tray Temperature       OK         35 degrees C / 95 degrees F
+      Top Tray Fan 1                 OK         Spinning at normal speed
+"""
+
+SAMPLES = [
+    ('cisco', 'temperature', CISCO_SHOW_ENVIRONMENT_ALL),
+    ('cisco', 'power', CISCO_SHOW_ENVIRONMENT_ALL + CISCO_SHOW_ENVIRONMENT_POWER_STACK),
+    ('juniper', 'temperature', JUNIPER_SHOW_CHASSIS_ENVIRONMENT),
+]
+
+
+def per_pattern(vendor: str, category: str, output: str) -> int:
+    """The old approach: a full re.findall scan of the output for each pattern."""
+    matches = 0
+    for spec in TEMPLATES[(vendor, category)].fields:
+        flags = re.IGNORECASE | re.MULTILINE if spec.ignore_case else re.MULTILINE
+        matches += len(re.findall(spec.pattern, output, flags))
+    return matches
+
+
+def per_line_per_pattern(vendor: str, category: str, output: str) -> int:
+    """The old per-line approach: re.search every pattern against every line."""
+    matches = 0
+    fields = TEMPLATES[(vendor, category)].fields
+    for line in output.split('\n'):
+        for spec in fields:
+            if re.search(spec.pattern, line, re.IGNORECASE if spec.ignore_case else 0):
+                matches += 1
+    return matches
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for vendor, category, output in SAMPLES:
+        lines = output.count('\n')
+        fields = len(TEMPLATES[(vendor, category)].fields)
+        legacy = timeit.timeit(lambda: per_pattern(vendor, category, output), number=iterations)
+        per_line = timeit.timeit(lambda: per_line_per_pattern(vendor, category, output), number=iterations)
+        registry = timeit.timeit(lambda: cli_parser_registry.parse(vendor, category, output), number=iterations)
+        records = len(cli_parser_registry.parse(vendor, category, output))
+
+        print(f"{vendor}/{category}: {lines} lines, {fields} patterns, {records} records")
+        print(f"  per-pattern findall : {legacy / iterations * 1e6:8.1f} us/parse")
+        print(f"  per-line re.search  : {per_line / iterations * 1e6:8.1f} us/parse")
+        print(f"  registry one pass   : {registry / iterations * 1e6:8.1f} us/parse")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+SNMP poller benchmark against the local agent simulator
+
+Starts one simulated Cisco switch, Juniper router and Arista switch (see
+snmp_simulator.py) and runs get_interfaces, get_cdp_neighbors,
+get_device_health and a discovery sweep against each of them. For every
+device and operation it reports the SNMP round trips the agent answered,
+wall time and the poller's own CPU time (process CPU minus the simulator
+threads' CPU).
+
+Usage:
+    python -m tests.benchmarks.bench_snmp_poller [--interfaces 48] \\
+        [--latency 0.002] [--loss 0.0] [--repeat 3]
+"""
+
+import argparse
+import logging
+import time
+from typing import Callable, Dict, List
+
+from app.core.snmp_poller import SNMPPoller
+from app.services.agents.snmp_discovery_service import SNMPDiscoveryService
+from tests.benchmarks.snmp_simulator import SimulatedNetwork
+
+COMMUNITY = 'public'
+
+DEVICES = {
+    'cisco_catalyst': 'cisco_catalyst',
+    'juniper_mx': 'juniper_mx',
+    'arista_eos': 'arista_eos',
+}
+
+
+def measure(network: SimulatedNetwork, name: str, operation: Callable[[], object], repeat: int) -> Dict:
+    """Run operation repeat times; per-run averages of round trips, wall and CPU."""
+    agent = network.agents[name]
+    rows: List[Dict] = []
+    result = None
+    for _ in range(repeat):
+        network.reset_stats()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        result = operation()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        agent_cpu = sum(a.cpu_seconds for a in network.agents.values())
+        rows.append({
+            'requests': agent.stats['requests'],
+            'dropped': agent.stats['dropped'],
+            'wall': wall,
+            'cpu': max(cpu - agent_cpu, 0.0),
+        })
+    return {
+        'requests': sum(r['requests'] for r in rows) / repeat,
+        'dropped': sum(r['dropped'] for r in rows) / repeat,
+        'wall_ms': sum(r['wall'] for r in rows) / repeat * 1000,
+        'cpu_ms': sum(r['cpu'] for r in rows) / repeat * 1000,
+        'result': result,
+    }
+
+
+def summarize(result: object) -> str:
+    if isinstance(result, list):
+        return f"{len(result)} rows"
+    if isinstance(result, dict):
+        if 'cpu_usage' in result:
+            return f"cpu={result.get('cpu_usage')} mem={result.get('memory_usage')} temp={result.get('temperature')}"
+        return result.get('device_type') or result.get('hostname') or f"{len(result)} keys"
+    return 'no response' if result is None else str(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--interfaces', type=int, default=48, help='interface table rows per device')
+    parser.add_argument('--latency', type=float, default=0.002, help='seconds added to every response')
+    parser.add_argument('--loss', type=float, default=0.0, help='request drop probability')
+    parser.add_argument('--repeat', type=int, default=3, help='runs averaged per operation')
+    parser.add_argument('--verbose', action='store_true', help='keep poller logging')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    with SimulatedNetwork(DEVICES, interfaces=args.interfaces, latency=args.latency,
+                          loss=args.loss, community=COMMUNITY) as network:
+        if any(network.port_of(name) != 161 for name in DEVICES):
+            raise SystemExit("Simulator could not bind 127.0.0.x:161 (needs root); the poller only targets port 161")
+
+        poller = SNMPPoller(community=COMMUNITY)
+        discovery = SNMPDiscoveryService()
+
+        def health(ip: str):
+            SNMPPoller.health_cache.invalidate(ip)
+            return poller.get_device_health(ip)
+
+        print(f"{len(DEVICES)} devices, {args.interfaces} interfaces, "
+              f"latency {args.latency * 1000:.1f} ms, loss {args.loss:.0%}, {args.repeat} runs each\n")
+        print(f"{'device':<16}{'operation':<20}{'round trips':>12}{'dropped':>9}{'wall ms':>10}{'cpu ms':>9}  result")
+
+        totals = {'requests': 0.0, 'wall_ms': 0.0, 'cpu_ms': 0.0}
+        for name in DEVICES:
+            ip = network.ip_of(name)
+            operations = [
+                ('get_interfaces', lambda: poller.get_interfaces(ip)),
+                ('get_cdp_neighbors', lambda: poller.get_cdp_neighbors(ip)),
+                ('get_device_health', lambda: health(ip)),
+                ('discovery', lambda: discovery.snmpv1v2c_get_device_info(ip, COMMUNITY, 161, 'v2c')),
+            ]
+            for label, operation in operations:
+                row = measure(network, name, operation, args.repeat)
+                for key in totals:
+                    totals[key] += row[key]
+                print(f"{name:<16}{label:<20}{row['requests']:>12.1f}{row['dropped']:>9.1f}"
+                      f"{row['wall_ms']:>10.1f}{row['cpu_ms']:>9.1f}  {summarize(row['result'])}")
+
+        ips = [network.ip_of(name) for name in DEVICES]
+        network.reset_stats()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        found = [discovery.snmpv1v2c_get_device_info(ip, COMMUNITY, 161, 'v2c') for ip in ips]
+        wall = (time.perf_counter() - wall_start) * 1000
+        cpu = (time.process_time() - cpu_start - sum(a.cpu_seconds for a in network.agents.values())) * 1000
+        requests = sum(a.stats['requests'] for a in network.agents.values())
+        print(f"\n{'sweep':<16}{'discovery':<20}{requests:>12}{'':>9}{wall:>10.1f}{cpu:>9.1f}  "
+              f"{sum(1 for f in found if f)}/{len(ips)} devices")
+        print(f"{'total':<16}{'per-device ops':<20}{totals['requests']:>12.1f}{'':>9}"
+              f"{totals['wall_ms']:>10.1f}{totals['cpu_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
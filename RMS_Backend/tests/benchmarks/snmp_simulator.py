@@ -0,0 +1,364 @@
+"""
+In-process SNMP agent simulator for the poller benchmarks
+
+Serves recorded walks (snmprec files: one ``oid|tag|value`` per line) over
+UDP on localhost and answers GET, GETNEXT and GETBULK for SNMPv1/v2c. Each
+simulated device gets its own loopback address (127.0.0.x) on port 161, so
+every poller code path that hard-codes port 161 reaches it unchanged.
+Latency, packet loss and interface table size are configurable per device.
+
+Usage:
+    with SimulatedNetwork({'cisco': 'cisco_catalyst'}, latency=0.002) as network:
+        ip = network.ip_of('cisco')
+        ...
+        print(network.agents['cisco'].get_stats())
+"""
+
+import bisect
+import heapq
+import os
+import random
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pyasn1.codec.ber import decoder, encoder
+from pysnmp.proto import api
+from pysnmp.proto.rfc1902 import (
+    Counter32, Counter64, Gauge32, Integer32, IpAddress, ObjectIdentifier, ObjectName, OctetString, TimeTicks
+)
+
+WALKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'walks')
+
+# Recorded walks shipped with the benchmarks
+DEVICE_WALKS = {
+    'cisco_catalyst': 'cisco_catalyst.snmprec',
+    'juniper_mx': 'juniper_mx.snmprec',
+    'arista_eos': 'arista_eos.snmprec',
+}
+
+# snmprec type tags (same numbering as snmpsim)
+_TAGS = {
+    '2': Integer32,
+    '4': OctetString,
+    '6': ObjectIdentifier,
+    '64': IpAddress,
+    '65': Counter32,
+    '66': Gauge32,
+    '67': TimeTicks,
+    '70': Counter64,
+}
+
+IF_NUMBER = '1.3.6.1.2.1.2.1.0'
+IF_TABLE = '1.3.6.1.2.1.2.2.1.'
+IF_X_TABLE = '1.3.6.1.2.1.31.1.1.1.'
+_IF_NAME_COLUMNS = {IF_TABLE + '2', IF_X_TABLE + '1'}   # ifDescr, ifName
+_IF_INDEX_COLUMN = IF_TABLE + '1'
+
+MAX_RESPONSE_VARBINDS = 2000
+
+
+def load_snmprec(name_or_path: str) -> Dict[str, Any]:
+    """Load a recorded walk: a DEVICE_WALKS key, a file in walks/, or a path."""
+    path = name_or_path
+    if name_or_path in DEVICE_WALKS:
+        path = os.path.join(WALKS_DIR, DEVICE_WALKS[name_or_path])
+    elif not os.path.exists(path):
+        path = os.path.join(WALKS_DIR, name_or_path)
+
+    records = {}
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            oid, tag, value = line.split('|', 2)
+            if tag == '4x':
+                records[oid] = OctetString(hexValue=value)
+            else:
+                records[oid] = _TAGS[tag](int(value) if tag not in ('4', '6', '64') else value)
+    return records
+
+
+def _split_row(oid: str) -> Optional[Tuple[str, int]]:
+    for table in (IF_TABLE, IF_X_TABLE):
+        if oid.startswith(table):
+            column, _, index = oid[len(table):].partition('.')
+            if index.isdigit():
+                return table + column, int(index)
+    return None
+
+
+def scale_interfaces(records: Dict[str, Any], count: int) -> Dict[str, Any]:
+    """
+    Grow (or trim) the ifTable/ifXTable of a recorded walk to count rows.
+
+    New rows copy the first recorded interface with fresh ifIndex values and
+    numbered names. Returns a new record dict; ifNumber is updated.
+    """
+    rows: Dict[int, Dict[str, Any]] = {}
+    other = {}
+    for oid, value in records.items():
+        split = _split_row(oid)
+        if split:
+            rows.setdefault(split[1], {})[split[0]] = value
+        else:
+            other[oid] = value
+
+    indexes = sorted(rows)
+    if not indexes:
+        return dict(records)
+    kept = indexes[:count]
+    template = rows[indexes[0]]
+    next_index = indexes[-1] + 1
+    while len(kept) < count:
+        row = {}
+        for column, value in template.items():
+            if column == _IF_INDEX_COLUMN:
+                value = Integer32(next_index)
+            elif column in _IF_NAME_COLUMNS:
+                value = OctetString(f"{value}-{next_index}")
+            row[column] = value
+        rows[next_index] = row
+        kept.append(next_index)
+        next_index += 1
+
+    scaled = dict(other)
+    for index in kept:
+        for column, value in rows[index].items():
+            scaled[f"{column}.{index}"] = value
+    if IF_NUMBER in scaled:
+        scaled[IF_NUMBER] = Integer32(count)
+    return scaled
+
+
+class SimulatedAgent:
+    """One simulated SNMP agent on a UDP socket"""
+
+    def __init__(self, records: Dict[str, Any], host: str = '127.0.0.1', port: int = 0,
+                 community: str = 'public', latency: float = 0.0, loss: float = 0.0, seed: int = None):
+        """
+        Bind the agent socket.
+
+        Args:
+            records: OID string -> pysnmp value
+            host: Bind address
+            port: UDP port (0 = any free port)
+            community: Accepted community; other requests are ignored
+            latency: Seconds added before every response
+            loss: Probability of silently dropping a request
+            seed: Random seed for reproducible loss
+        """
+        self.data = {ObjectName(oid): value for oid, value in records.items()}
+        self.keys = sorted(self.data)
+        self.community = community
+        self.latency = latency
+        self.loss = loss
+        self._random = random.Random(seed)
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.host, self.port = self.sock.getsockname()
+
+        self._outbox: List[Tuple[float, int, bytes, Tuple[str, int]]] = []
+        self._outbox_seq = 0
+        self._outbox_ready = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._serve, name=f"snmp-sim-{self.host}", daemon=True),
+            threading.Thread(target=self._send_loop, name=f"snmp-sim-send-{self.host}", daemon=True),
+        ]
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.stats = {'requests': 0, 'responses': 0, 'dropped': 0, 'varbinds': 0,
+                      'get': 0, 'getnext': 0, 'getbulk': 0}
+        self.cpu_seconds = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'cpu_seconds': round(self.cpu_seconds, 6)}
+
+    def start(self) -> 'SimulatedAgent':
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._outbox_ready:
+            self._outbox_ready.notify()
+        self.sock.close()
+
+    def _next(self, oid: ObjectName) -> Optional[ObjectName]:
+        i = bisect.bisect_right(self.keys, oid)
+        return self.keys[i] if i < len(self.keys) else None
+
+    def _serve(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                message, address = self.sock.recvfrom(65535)
+            except OSError:
+                return
+            started = time.thread_time()
+            try:
+                response = self._handle(message)
+            except Exception:
+                response = None
+            self.cpu_seconds += time.thread_time() - started
+            if response is not None:
+                self._queue(response, address)
+
+    def _handle(self, message: bytes) -> Optional[bytes]:
+        self.stats['requests'] += 1
+        if self.loss and self._random.random() < self.loss:
+            self.stats['dropped'] += 1
+            return None
+
+        version = int(api.decodeMessageVersion(message))
+        proto = api.protoModules[version]
+        request, _ = decoder.decode(message, asn1Spec=proto.Message())
+        if str(proto.apiMessage.getCommunity(request)) != self.community:
+            self.stats['dropped'] += 1
+            return None
+
+        pdu = proto.apiMessage.getPDU(request)
+        response = proto.apiMessage.getResponse(request)
+        response_pdu = proto.apiMessage.getPDU(response)
+        var_binds = proto.apiPDU.getVarBinds(pdu)
+        end_of_mib = api.v2c.EndOfMibView() if version else None
+        out = []
+
+        if pdu.isSameTypeWith(proto.GetRequestPDU()):
+            self.stats['get'] += 1
+            for oid, _ in var_binds:
+                out.append((oid, self.data.get(oid, api.v2c.NoSuchObject() if version else None)))
+        elif pdu.isSameTypeWith(proto.GetNextRequestPDU()):
+            self.stats['getnext'] += 1
+            for oid, _ in var_binds:
+                following = self._next(oid)
+                out.append((following, self.data[following]) if following else (oid, end_of_mib))
+        elif version and pdu.isSameTypeWith(proto.GetBulkRequestPDU()):
+            self.stats['getbulk'] += 1
+            non_repeaters = int(proto.apiBulkPDU.getNonRepeaters(pdu))
+            max_repetitions = int(proto.apiBulkPDU.getMaxRepetitions(pdu))
+            oids = [oid for oid, _ in var_binds]
+            for oid in oids[:non_repeaters]:
+                following = self._next(oid)
+                out.append((following, self.data[following]) if following else (oid, end_of_mib))
+            current = oids[non_repeaters:]
+            for _ in range(max_repetitions):
+                if not current or len(out) + len(current) > MAX_RESPONSE_VARBINDS:
+                    break
+                exhausted = True
+                for j, oid in enumerate(current):
+                    following = self._next(oid)
+                    if following is None:
+                        out.append((oid, end_of_mib))
+                    else:
+                        out.append((following, self.data[following]))
+                        current[j] = following
+                        exhausted = False
+                if exhausted:
+                    break
+        else:
+            return None
+
+        if not version:
+            # SNMPv1 has no exception values: report noSuchName on the first miss
+            for i, (_, value) in enumerate(out):
+                if value is None:
+                    proto.apiPDU.setErrorStatus(response_pdu, 2)
+                    proto.apiPDU.setErrorIndex(response_pdu, i + 1)
+                    out = [(oid, value) for oid, value in var_binds]
+                    break
+        proto.apiPDU.setVarBinds(response_pdu, out)
+        self.stats['varbinds'] += len(out)
+        return encoder.encode(response)
+
+    def _queue(self, response: bytes, address: Tuple[str, int]) -> None:
+        if not self.latency:
+            self._send(response, address)
+            return
+        with self._outbox_ready:
+            self._outbox_seq += 1
+            heapq.heappush(self._outbox, (time.monotonic() + self.latency, self._outbox_seq, response, address))
+            self._outbox_ready.notify()
+
+    def _send(self, response: bytes, address: Tuple[str, int]) -> None:
+        try:
+            self.sock.sendto(response, address)
+            self.stats['responses'] += 1
+        except OSError:
+            pass
+
+    def _send_loop(self) -> None:
+        while not self._stopped.is_set():
+            with self._outbox_ready:
+                while not self._outbox and not self._stopped.is_set():
+                    self._outbox_ready.wait()
+                if self._stopped.is_set():
+                    return
+                due, _, response, address = self._outbox[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._outbox_ready.wait(delay)
+                    continue
+                heapq.heappop(self._outbox)
+            self._send(response, address)
+
+
+class SimulatedNetwork:
+    """
+    A set of simulated devices, each on its own loopback address.
+
+    Port 161 on 127.0.0.x needs root (and must be free); otherwise every
+    agent binds a free port on 127.0.0.1 and callers must target port_of(name).
+    """
+
+    def __init__(self, devices: Dict[str, Union[str, Dict[str, Any]]], interfaces: int = None,
+                 latency: float = 0.0, loss: float = 0.0, community: str = 'public',
+                 port: int = 161, seed: int = 1):
+        """
+        Args:
+            devices: name -> walk (DEVICE_WALKS key, snmprec path or record dict)
+            interfaces: Scale every interface table to this many rows
+            latency: Seconds of delay per response
+            loss: Request drop probability
+            community: Community every agent accepts
+            port: Port to bind on each 127.0.0.x address
+            seed: Base seed for packet loss
+        """
+        self.agents: Dict[str, SimulatedAgent] = {}
+        for n, (name, walk) in enumerate(devices.items()):
+            records = load_snmprec(walk) if isinstance(walk, str) else dict(walk)
+            if interfaces:
+                records = scale_interfaces(records, interfaces)
+            kwargs = dict(community=community, latency=latency, loss=loss, seed=seed + n)
+            try:
+                agent = SimulatedAgent(records, host=f"127.0.0.{n + 2}", port=port, **kwargs)
+            except OSError:
+                agent = SimulatedAgent(records, host='127.0.0.1', port=0, **kwargs)
+            self.agents[name] = agent
+
+    def __enter__(self) -> 'SimulatedNetwork':
+        for agent in self.agents.values():
+            agent.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stop(self) -> None:
+        for agent in self.agents.values():
+            agent.stop()
+
+    def ip_of(self, name: str) -> str:
+        return self.agents[name].host
+
+    def port_of(self, name: str) -> int:
+        return self.agents[name].port
+
+    def reset_stats(self) -> None:
+        for agent in self.agents.values():
+            agent.reset_stats()
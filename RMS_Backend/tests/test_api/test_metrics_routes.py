@@ -0,0 +1,39 @@
+"""
+Test the SNMP metrics routes through the application
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core.dependencies import get_current_user
+from app.core.snmp_metrics import snmp_metrics
+
+
+@pytest.fixture
+def client_as():
+    def make(role):
+        app.dependency_overrides[get_current_user] = lambda: {"user_id": 1, "role": role}
+        return TestClient(app)
+    yield make
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_snmp_metrics_route_is_not_captured_by_network_topology(client_as):
+    with snmp_metrics.measure('192.0.2.10', 'get'):
+        pass
+
+    response = client_as("admin").get("/api/v1/topology/snmp-metrics", params={"host": "192.0.2.10"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "success"
+
+    assert client_as("user").get("/api/v1/topology/snmp-metrics").status_code == 403
+
+
+def test_prometheus_metrics_require_an_admin(client_as):
+    assert TestClient(app).get("/metrics").status_code == 401
+    assert client_as("user").get("/metrics").status_code == 403
+
+    response = client_as("admin").get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
@@ -0,0 +1,126 @@
+"""
+Test the durable agent job queue: push wake-ups, priorities, dedup and leases
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import AgentJob
+from app.services.agents.agent_job_dispatcher import AgentJobDispatcher, PRIORITY_BACKGROUND
+
+
+def make_dispatcher(tmp_path, **kwargs):
+    # File database: the waiter, enqueuing threads and the sweeper each use their own connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False, "timeout": 10})
+    AgentJob.__table__.create(engine)
+    return AgentJobDispatcher(sessionmaker(bind=engine), sweep_interval=0.05, **kwargs)
+
+
+def status_test(network_id, *device_ids):
+    return {"type": "status_test", "network_id": network_id, "devices": [{"id": i} for i in device_ids]}
+
+
+@pytest.mark.asyncio
+async def test_waiter_is_woken_by_enqueue_from_another_thread(tmp_path):
+    """A job enqueued from a worker thread reaches the parked waiter well below a second"""
+    dispatcher = make_dispatcher(tmp_path)
+    enqueued_at = []
+
+    def enqueue_later():
+        time.sleep(0.05)
+        enqueued_at.append(time.monotonic())
+        dispatcher.enqueue(3, {"type": "discovery", "session_id": "s1"})
+
+    threading.Thread(target=enqueue_later).start()
+    jobs = await dispatcher.wait_for_jobs(3, timeout=5)
+    latency = time.monotonic() - enqueued_at[0]
+
+    assert [job["session_id"] for job in jobs] == ["s1"]
+    assert latency < 0.5
+    assert dispatcher.ack(3, jobs[0]["job_id"])
+    assert dispatcher.pending(3) == []
+    assert await dispatcher.wait_for_jobs(3, timeout=0.05) == []
+    dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_priorities_and_status_test_dedup(tmp_path):
+    """Background tests never clobber a discovery; identical open tests merge into one job"""
+    dispatcher = make_dispatcher(tmp_path)
+    first = dispatcher.enqueue(1, status_test(5, 1, 2), priority=PRIORITY_BACKGROUND)
+    assert dispatcher.enqueue(1, status_test(5, 2, 1), priority=PRIORITY_BACKGROUND) == first
+    dispatcher.enqueue(1, {"type": "discovery", "session_id": "user"})
+    dispatcher.enqueue(1, status_test(5, 3), priority=PRIORITY_BACKGROUND)
+
+    jobs = await dispatcher.wait_for_jobs(1, timeout=0)
+    assert [job["type"] for job in jobs] == ["discovery", "status_test", "status_test"]
+    assert jobs[1]["job_id"] == first
+
+    dispatcher.ack(1, first)
+    assert dispatcher.enqueue(1, status_test(5, 1, 2)) != first
+    assert dispatcher.get_info()["deduplicated"] == 1
+    dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_unacknowledged_jobs_are_redelivered_then_failed(tmp_path):
+    dispatcher = make_dispatcher(tmp_path, visibility_timeout=0.05, max_attempts=2)
+    job_id = dispatcher.enqueue(2, {"type": "discovery", "session_id": "s"})
+
+    first = await dispatcher.wait_for_jobs(2, timeout=0)
+    assert [job["attempt"] for job in first] == [1]
+    # Leased and not yet expired: invisible
+    assert await dispatcher.wait_for_jobs(2, timeout=0) == []
+
+    # The sweep wakes the waiter once the lease expired
+    second = await dispatcher.wait_for_jobs(2, timeout=2)
+    assert [(job["job_id"], job["attempt"]) for job in second] == [(job_id, 2)]
+
+    await asyncio.sleep(0.1)
+    assert await dispatcher.wait_for_jobs(2, timeout=0) == []
+    assert dispatcher.pending(2) == []
+    assert dispatcher.get_info()["failed"] == 1
+    dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_released_jobs_return_and_cancelled_waiters_are_cleaned_up(tmp_path):
+    """A failed websocket push puts the job back; a cancelled sender leaves no waiter"""
+    dispatcher = make_dispatcher(tmp_path)
+    dispatcher.enqueue(4, {"type": "discovery", "session_id": "s"})
+    jobs = await dispatcher.wait_for_jobs(4, timeout=0)
+    dispatcher.release(4, jobs)
+    again = await dispatcher.wait_for_jobs(4, timeout=0)
+    assert [job["attempt"] for job in again] == [1]
+
+    sender = asyncio.create_task(dispatcher.wait_for_jobs(4))
+    await asyncio.sleep(0.05)
+    sender.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await sender
+    assert dispatcher.get_info()["waiting_agents"] == 0
+    dispatcher.stop()
+
+
+def test_only_accepted_acks_complete_a_job(tmp_path):
+    """Websocket and HTTP acks share one rule: any status but "accepted" fails the job"""
+    dispatcher = make_dispatcher(tmp_path)
+    accepted = dispatcher.enqueue(5, {"type": "discovery", "session_id": "s1"})
+    unexpected = dispatcher.enqueue(5, {"type": "discovery", "session_id": "s2"})
+    dispatcher.lease(5)
+
+    assert dispatcher.acknowledge(5, accepted, "accepted")
+    assert dispatcher.acknowledge(5, unexpected, "rejected", error="busy")
+    assert not dispatcher.acknowledge(5, "unknown-job")
+
+    db = dispatcher.session_factory()
+    try:
+        states = {row.job_id: (row.state, row.last_error) for row in db.query(AgentJob).all()}
+    finally:
+        db.close()
+    assert states == {accepted: ("done", None), unexpected: ("failed", "busy")}
@@ -0,0 +1,114 @@
+"""
+Test the agent HTTP transport against the backend's gzip request middleware
+"""
+
+import gzip
+import socket
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.request_compression import GZipRequestMiddleware
+from cisco_ai_agent_modules.http_transport import AgentTransport
+
+
+def test_gzip_request_bodies_are_inflated_and_capped():
+    app = FastAPI()
+    app.add_middleware(GZipRequestMiddleware, max_inflated_bytes=1 << 16)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        payload = await request.json()
+        return {"devices": len(payload["devices"]), "length": request.headers["content-length"]}
+
+    client = TestClient(app)
+    body = ('{"devices": [%s]}' % ','.join(['{"ip": "10.0.0.1"}'] * 500)).encode()
+    response = client.post("/echo", content=gzip.compress(body), headers={"Content-Encoding": "gzip"})
+    assert response.json() == {"devices": 500, "length": str(len(body))}
+
+    bomb = gzip.compress(b'{"devices": "' + b'a' * (1 << 20) + b'"}')
+    assert client.post("/echo", content=bomb, headers={"Content-Encoding": "gzip"}).status_code == 413
+    assert client.post("/echo", content=b"not gzip", headers={"Content-Encoding": "gzip"}).status_code == 400
+
+
+def test_transport_keeps_alive_compresses_and_retries():
+    seen = {'connections': 0, 'requests': []}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            seen['connections'] += 1
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            seen['requests'].append((self.headers.get('Content-Encoding'), body))
+            status = 503 if len(seen['requests']) == 1 else 200
+            self.send_response(status)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/report"
+    try:
+        transport = AgentTransport(backoff_base=0.01, gzip_min_bytes=256)
+        assert transport.post(url, json={'small': True}).status_code == 200
+        assert transport.post(url, json={'devices': ['10.0.0.1'] * 200}).status_code == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert transport.get_info()['retries'] == 1
+    assert seen['connections'] == 1
+    encoding, body = seen['requests'][-1]
+    assert encoding == 'gzip' and gzip.decompress(body).startswith(b'{"devices":')
+
+
+def test_reset_post_is_not_retried_but_refused_post_is():
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(8)
+    accepted = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            accepted.append(conn.recv(65536))
+            # Abortive close: the client sees a connection reset mid-request
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            conn.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    port = listener.getsockname()[1]
+    transport = AgentTransport(retries=2, backoff_base=0.01)
+    try:
+        with pytest.raises(requests.ConnectionError):
+            transport.post(f"http://127.0.0.1:{port}/report", json={'devices': []})
+        assert len(accepted) == 1
+        assert transport.get_info()['retries'] == 0
+
+        with pytest.raises(requests.ConnectionError):
+            transport.get(f"http://127.0.0.1:{port}/report")
+        assert len(accepted) == 4
+    finally:
+        listener.shutdown(socket.SHUT_RDWR)
+        listener.close()
+
+    # Nothing listens any more: a refused POST never reached the backend
+    with pytest.raises(requests.ConnectionError):
+        transport.post(f"http://127.0.0.1:{port}/report", json={'devices': []})
+    assert transport.get_info()['retries'] == 4
@@ -0,0 +1,63 @@
+from app.core.cli_parser_registry import cli_parser_registry
+
+CISCO_ENVIRONMENT = """\
+Switch 1: SYSTEM TEMPERATURE is OK
+Inlet Temperature Value: 34 Degree Celsius
+Temperature State: GREEN
+Yellow Threshold : 46 Degree Celsius
+Red Threshold    : 56 Degree Celsius
+
+Hotspot Temperature Value: 49 Degree Celsius
+SW  PID                 Serial#     Status           Sys Pwr  PoE Pwr  Watts
+--  ------------------  ----------  ---------------  -------  -------  -----
+1A  PWR-C1-715WAC       LIT17235R4W  OK              Good     Good     715
+1B  Not Present
+2A  PWR-C1-350WAC       DCB1844G1GN  No Input Power  Bad      n/a      Unknown
+"""
+
+
+def test_cisco_temperature_typed_records():
+    records = cli_parser_registry.parse('cisco_ios', 'temperature', CISCO_ENVIRONMENT)
+    inlet = next(r for r in records if r.field == 'inlet_temp')
+    assert inlet.value == 34 and inlet.unit == 'celsius' and inlet.line_no == 2
+
+    data = cli_parser_registry.parse_dict('cisco_ios', 'temperature', CISCO_ENVIRONMENT)
+    assert data == {
+        'system_status': 'OK', 'inlet_temp': 34, 'temp_status': 'GREEN',
+        'threshold_yellow': 46, 'threshold_red': 56, 'hotspot_temp': 49
+    }
+
+
+def test_cisco_power_table_rows():
+    data = cli_parser_registry.parse_dict('cisco', 'power', CISCO_ENVIRONMENT)
+    assert set(data) == {'psu_1A', 'psu_2A'}
+    assert data['psu_1A']['power_consumption'] == '715W'
+    assert data['psu_2A']['status'] == 'No Input Power'
+
+
+def test_fallback_fields_only_without_primary_match():
+    data = cli_parser_registry.parse_dict('cisco', 'power', "PS1 OK 12V 250W\nPS2 OK 12V 350W\n")
+    assert data == {'overall_status': 'OK', 'voltage': '12V', 'total_power': '350W'}
+
+
+def test_sections_and_line_iterables():
+    lines = iter(["Power Supply 0:", "  Model : PWR-MX480", "  Status: Online", "  Output 1200 W",
+                  "Power Supply 1:", "  Status : Empty"])
+    data = cli_parser_registry.parse_dict('juniper', 'power', lines)
+    assert data == {
+        'psu_1': {'model': 'PWR-MX480', 'status': 'Online', 'power_consumption': '1200W'},
+        'psu_2': {'status': 'Empty'}
+    }
+
+
+def test_patterns_do_not_span_lines():
+    assert cli_parser_registry.parse_dict('generic', 'power', "Total 5\nWatts") == {}
+
+
+def test_vendor_profiles_read_patterns_from_the_registry():
+    """MultiVendorSupport has no pattern list of its own anymore"""
+    from app.core.multi_vendor_support import MultiVendorSupport
+
+    patterns = MultiVendorSupport().get_parsing_patterns('cisco', 'cpu')
+    assert patterns == cli_parser_registry.get_patterns('cisco', 'cpu')
+    assert any('five seconds' in pattern for pattern in patterns)
@@ -0,0 +1,60 @@
+import json
+
+from app.utils.device_classifier import DeviceClassifier, device_classifier, parse_oid
+
+
+def test_longest_prefix_inherits_enterprise_vendor():
+    result = device_classifier.classify('1.3.6.1.4.1.9.1.516')
+    assert (result.vendor, result.family, result.model, result.device_type) == \
+        ('cisco', 'Catalyst', 'WS-C3750', 'Switch')
+
+    # Unknown Cisco product: vendor from the enterprise prefix, type from sysDescr
+    result = device_classifier.classify('.1.3.6.1.4.1.9.1.99999', 'Cisco IOS Software, ISR4331 Router')
+    assert result.vendor == 'cisco' and result.device_type == 'Router'
+    assert result.matched_prefix == '1.3.6.1.4.1.9'
+
+
+def test_ios_xe_linux_host_image_is_not_a_server():
+    """IOS-XE sysDescrs name a Linux host image; network vendors never fall back to host types"""
+    asr = device_classifier.classify(
+        '1.3.6.1.4.1.9.1.923',
+        'Cisco IOS Software [Amsterdam], ASR1000 Software (X86_64_LINUX_IOSD-UNIVERSALK9-M), Version 17.3.4a'
+    )
+    isr = device_classifier.classify(
+        '1.3.6.1.4.1.9.1.2068',
+        'Cisco IOS Software [Fuji], ISR Software (X86_64_LINUX_IOSD-UNIVERSALK9-M), Version 16.9.5'
+    )
+    assert (asr.vendor, asr.device_type) == ('cisco', 'Network Device')
+    assert (isr.vendor, isr.device_type) == ('cisco', 'Network Device')
+
+    # Host keywords still classify devices of other vendors
+    assert device_classifier.classify('', 'Linux web01 5.15.0-91-generic x86_64').device_type == 'Server'
+
+
+def test_oid_formats_and_unknowns():
+    assert parse_oid('SNMPv2-SMI::enterprises.2636.1') == (1, 3, 6, 1, 4, 1, 2636, 1)
+    assert parse_oid('not-an-oid') == ()
+    assert device_classifier.classify('1.3.6.1.4.1.424242.1').vendor == 'unknown'
+    assert device_classifier.vendor('', 'Some Linux box', default='generic') == 'generic'
+
+
+def test_lookups_are_memoised_and_invalidated_on_add():
+    classifier = DeviceClassifier()
+    classifier.classify('1.3.6.1.4.1.30065.1.3011.7048')
+    classifier.classify('1.3.6.1.4.1.30065.1.3011.7048')
+    assert classifier.get_info()['cache_hits'] == 1
+
+    classifier.add('1.3.6.1.4.1.30065.1.3011.7048', model='DCS-7048T')
+    result = classifier.classify('1.3.6.1.4.1.30065.1.3011.7048')
+    assert (result.vendor, result.model, result.device_type) == ('arista', 'DCS-7048T', 'Switch')
+
+
+def test_load_table(tmp_path):
+    path = tmp_path / 'oids.json'
+    path.write_text(json.dumps([
+        {'prefix': '1.3.6.1.4.1.55555.1.7', 'model': 'X-7', 'device_type': 'Router'},
+        {'prefix': '1.3.6.1.4.1.55555', 'vendor': 'acme'},
+    ]))
+    classifier = DeviceClassifier(table=[])
+    assert classifier.load_table(str(path)) == 2
+    assert classifier.classify('1.3.6.1.4.1.55555.1.7.2')[:4] == ('acme', 'unknown', 'X-7', 'Router')
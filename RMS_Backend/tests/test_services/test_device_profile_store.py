@@ -0,0 +1,52 @@
+"""
+Test the persistent device profile store
+"""
+
+import time
+
+from app.services.device_profile_store import DeviceProfileStore
+
+PROFILE = {'vendor': 'cisco', 'model': 'C9300', 'sys_object_id': '1.3.6.1.4.1.9.1.2494'}
+
+
+def test_profiles_survive_a_restart(tmp_path):
+    """A new store reads back what the previous one persisted"""
+    cache_file = tmp_path / 'device_profiles.json'
+    store = DeviceProfileStore(cache_file=str(cache_file))
+    store.put('10.0.0.1', dict(PROFILE), sys_uptime=5000)
+    store.update('10.0.0.1', neighbor_protocols=['cdp'])
+
+    restarted = DeviceProfileStore(cache_file=str(cache_file))
+    assert restarted.get('10.0.0.1') == dict(PROFILE, neighbor_protocols=['cdp'])
+    # The stored sysUpTime still detects a reboot after the restart
+    assert not restarted.observe('10.0.0.1', sys_uptime=100)
+    assert restarted.get('10.0.0.1') is None
+
+
+def test_expired_profiles_are_rebuilt_and_not_loaded(tmp_path, monkeypatch):
+    cache_file = tmp_path / 'device_profiles.json'
+    store = DeviceProfileStore(cache_file=str(cache_file), ttl=60)
+    store.put('10.0.0.1', dict(PROFILE))
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert store.get('10.0.0.1') is None
+    assert DeviceProfileStore(cache_file=str(cache_file), ttl=60).get_info()['total_profiles'] == 0
+
+    created = []
+    profile = store.get_or_create('10.0.0.1', lambda: created.append(1) or dict(PROFILE, model='C9400'))
+    assert created == [1]
+    assert profile['model'] == 'C9400'
+    assert store.get('10.0.0.1') == profile
+
+
+def test_facts_learned_before_identification_are_kept(tmp_path):
+    """update() on an unknown device records the fact without faking a profile"""
+    store = DeviceProfileStore(cache_file=str(tmp_path / 'device_profiles.json'))
+    assert store.update('10.0.0.2', neighbor_protocols=['lldp'])
+    assert not store.update('10.0.0.2', neighbor_protocols=['lldp'])
+    assert store.get('10.0.0.2') is None
+
+    profile = store.get_or_create('10.0.0.2', lambda: dict(PROFILE))
+    assert profile == dict(PROFILE, neighbor_protocols=['lldp'])
+    assert store.get('10.0.0.2')['vendor'] == 'cisco'
@@ -0,0 +1,93 @@
+"""
+Test bounded single-flight health cache
+"""
+
+import threading
+import time
+import pytest
+from app.services.health_cache import HealthCache
+
+
+def test_concurrent_misses_share_one_poll():
+    """Concurrent callers for the same host trigger a single poll"""
+    cache = HealthCache(ttl=30, stale_ttl=0)
+    calls = []
+
+    def poll():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"cpu_usage": "5%"}, "fast_path"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_poll("10.0.0.1", poll)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"cpu_usage": "5%"}] * 8
+    stats = cache.get_info()["stats"]
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 7
+
+
+def test_lru_eviction_and_errors_not_cached():
+    """Oldest entries are evicted and failed polls are retried"""
+    cache = HealthCache(max_entries=2)
+    for host in ("a", "b", "c"):
+        cache.get_or_poll(host, lambda: ({}, "fast_path"))
+
+    info = cache.get_info()
+    assert set(info["entries"]) == {"b", "c"}
+    assert info["stats"]["evictions"] == 1
+
+    def failing_poll():
+        raise RuntimeError("timeout")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_poll("d", failing_poll)
+    assert "d" not in cache.get_info()["entries"]
+
+
+def test_stale_entry_served_while_refreshing():
+    """Expired entries inside the stale window are returned and refreshed in the background"""
+    cache = HealthCache(ttl=0, stale_ttl=60)
+    cache.set("10.0.0.1", {"cpu_usage": "1%"}, "fast_path")
+    refreshed = threading.Event()
+
+    def refresh():
+        refreshed.set()
+        return {"cpu_usage": "2%"}, "fast_path"
+
+    assert cache.get_or_poll("10.0.0.1", refresh) == {"cpu_usage": "1%"}
+    assert refreshed.wait(2)
+    time.sleep(0.05)
+    assert cache.get_info()["stats"]["stale_hits"] == 1
+    assert cache._entries["10.0.0.1"]["data"] == {"cpu_usage": "2%"}
+
+
+def test_error_results_are_only_cached_briefly():
+    """A failed poll result is retried after error_ttl, not kept for the full TTL"""
+    cache = HealthCache(ttl=30, stale_ttl=120, error_ttl=0.1)
+    results = [({"status": "error", "error": "timeout"}, "fallback_full_discovery"),
+               ({"cpu_usage": "5%"}, "fast_path")]
+    calls = []
+
+    def poll():
+        calls.append(1)
+        return results[len(calls) - 1]
+
+    assert cache.get_or_poll("10.0.0.1", poll)["status"] == "error"
+    assert cache.get_or_poll("10.0.0.1", poll)["status"] == "error"
+    assert len(calls) == 1
+    assert cache.get_info()["entries"]["10.0.0.1"]["error"]
+
+    time.sleep(0.15)
+    # Past error_ttl the host is polled again instead of being served stale
+    assert cache.get_or_poll("10.0.0.1", poll) == {"cpu_usage": "5%"}
+    assert len(calls) == 2
+    assert cache.get_info()["stats"]["error_results"] == 1
@@ -0,0 +1,105 @@
+"""
+Test the health time-series store
+"""
+
+import time
+
+import numpy as np
+
+from app.services.health_timeseries import HealthTimeSeriesStore
+
+
+def _store(tmp_path, **kwargs):
+    return HealthTimeSeriesStore(data_dir=str(tmp_path), flush_interval=0, **kwargs)
+
+
+def test_rollups_and_automatic_resolution(tmp_path):
+    store = _store(tmp_path)
+    now = time.time()
+    start = now - now % 86400 - 3 * 86400  # three whole days back, day aligned
+
+    # One sample per minute for three days, value = minute of the hour
+    for minute in range(3 * 24 * 60):
+        store.add_sample('10.0.0.1', 'cpu', minute % 60, ts=start + minute * 60)
+
+    hourly = store.query('10.0.0.1', 'cpu', start, start + 86400 - 1, resolution='1h')
+    assert len(hourly['ts']) == 24
+    assert hourly['min'][0] == 0 and hourly['max'][0] == 59
+    assert np.isclose(hourly['avg'][0], 29.5)
+    assert hourly['count'][0] == 60
+
+    # 30 days does not fit in 1000 raw or 1-minute points: hourly rollups answer
+    month = store.query('10.0.0.1', 'cpu', now - 30 * 86400, now)
+    assert month['resolution'] == '1h'
+
+    recent = store.query('10.0.0.1', 'cpu', start + 3 * 86400 - 600, start + 3 * 86400)
+    assert recent['resolution'] == 'raw'
+
+
+def test_record_health_and_persistence(tmp_path):
+    store = _store(tmp_path)
+    health = {
+        'cpu_usage': '15%',
+        'memory_usage': '40.5%',
+        'temperature': '41°C',
+        'temperature_details': {'inlet': '41'},
+        'power_consumption': '0W',
+        'power_details': {},  # no power sensors: not recorded
+    }
+    assert store.record_health('10.0.0.1', health, ts=1000.0) == 3
+    assert not store.add_sample('10.0.0.1', 'cpu', 20, ts=999.0)  # older than head
+    store.flush()
+
+    reloaded = _store(tmp_path)
+    raw = reloaded.query('10.0.0.1', 'temperature', 0, 2000, resolution='raw')
+    assert raw['ts'].tolist() == [1000.0]
+    assert raw['value'].tolist() == [41.0]
+    assert len(reloaded.query('10.0.0.1', 'power', 0, 2000, resolution='raw')['ts']) == 0
+
+
+def test_ipv6_series_reload_under_their_own_host(tmp_path):
+    """A restart finds IPv6 series under the address, not the file name"""
+    store = _store(tmp_path)
+    now = time.time()
+    store.add_sample('2001:db8::1', 'cpu', 42.0, ts=now - 10)
+    store.flush()
+
+    restarted = _store(tmp_path)
+    result = restarted.query('2001:db8::1', 'cpu', now - 60, now, resolution='raw')
+    assert result['value'].tolist() == [42.0]
+
+
+def test_sealed_chunks_are_written_once(tmp_path, monkeypatch):
+    """Flushes rewrite only the head; full chunks get their own file a single time"""
+    store = _store(tmp_path)
+    start = time.time() - 2600 * 60
+    start -= start % 86400  # day aligned
+    # A new series allocates a few rows per resolution, not whole chunks
+    store.add_sample('10.0.0.1', 'cpu', 1.0, ts=start)
+    assert store.get_info()['memory_bytes'] < 8192
+
+    written = []
+    write = store._write
+    monkeypatch.setattr(store, '_write', lambda path, arrays: (written.append(path.name), write(path, arrays)))
+    for i in range(1, 2500):
+        store.add_sample('10.0.0.1', 'cpu', float(i % 100), ts=start + i * 60)
+    store.flush()
+    assert sorted(written) == ['10.0.0.1__cpu.1m.000000.npz', '10.0.0.1__cpu.npz',
+                               '10.0.0.1__cpu.raw.000000.npz', '10.0.0.1__cpu.raw.000001.npz']
+
+    written.clear()
+    store.add_sample('10.0.0.1', 'cpu', 5.0, ts=start + 2500 * 60)
+    store.flush()
+    assert written == ['10.0.0.1__cpu.npz']
+
+    reloaded = _store(tmp_path)
+    raw = reloaded.query('10.0.0.1', 'cpu', 0, 1e12, resolution='raw')
+    assert len(raw['ts']) == 2501 and raw['value'][-1] == 5.0
+    minutes = reloaded.query('10.0.0.1', 'cpu', 0, 1e12, resolution='1m')
+    assert len(minutes['ts']) == 2501
+
+    # Pruned chunks lose their files once the head no longer lists them
+    pruning = _store(tmp_path, retention={'raw': 600})
+    pruning.add_sample('10.0.0.1', 'cpu', 6.0)
+    pruning.flush()
+    assert sorted(p.name for p in (tmp_path / 'chunks').iterdir()) == ['10.0.0.1__cpu.1m.000000.npz']
@@ -0,0 +1,29 @@
+import pytest
+
+from app.utils.icmp_sweeper import IcmpSweeper, _checksum, _echo_request
+from cisco_ai_agent_modules.sweep_engine import SweepEngine
+
+
+def test_echo_request_checksum_verifies():
+    packet = _echo_request(0x1234, 7)
+    assert packet[0] == 8 and _checksum(packet) == 0
+
+
+def test_sweep_loopback_range_from_one_socket():
+    sweeper = IcmpSweeper(timeout=0.5, count=2)
+    if not sweeper.available():
+        pytest.skip("ICMP sockets not permitted here")
+
+    ips = [f'127.0.{i // 250}.{i % 250 + 1}' for i in range(1000)]
+    results = sweeper.sweep(ips + ['not-a-host.invalid'])
+
+    assert all(results[ip].alive and results[ip].received == 2 for ip in ips)
+    assert results['127.0.0.1'].loss == 0.0 and results['127.0.0.1'].rtt_avg is not None
+    assert results['not-a-host.invalid'].sent == 0
+    assert sweeper.get_info()['sent'] == 2000
+
+    # Answering hosts skip the per-host TCP probes of a sweep
+    engine = SweepEngine(liveness_ports=(9,), liveness_timeout=0.1, ping_sweep=sweeper.alive)
+    seen = {}
+    engine.sweep(ips[:20], lambda ip: ip, lambda ip, alive, result: seen.__setitem__(ip, alive))
+    assert len(seen) == 20 and all(seen.values())
@@ -0,0 +1,53 @@
+"""
+Test the agent's interface counter rate engine
+"""
+
+import math
+
+from cisco_ai_agent_modules.interface_counters import InterfaceCounterCollector
+
+
+def _table(in_octets, in_errors, speed=1000):
+    return {
+        'in_octets': {'1': in_octets},
+        'out_octets': {'1': 0},
+        'in_errors': {'1': in_errors},
+        'out_errors': {'1': 0},
+        'in_discards': {'1': 0},
+        'out_discards': {'1': 0},
+        'speed_mbps': {'1': speed},
+        'name': {'1': 'Gi1/0/1'},
+    }
+
+
+def test_rates_handle_counter_wrap_and_reboot():
+    collector = InterfaceCounterCollector(max_interfaces=4, capacity=3)
+
+    first = collector.record('10.0.0.1', 1000, _table(2**64 - 1000, 2**32 - 5), now=0)
+    assert first['Gi1/0/1']['in_bps'] is None
+
+    # 60 s later: 64-bit octets and 32-bit errors both wrapped
+    second = collector.record('10.0.0.1', 7000, _table(750_000_000 - 1000, 55), now=60)
+    assert second['Gi1/0/1']['in_bps'] == 100_000_000
+    assert second['Gi1/0/1']['in_utilization'] == 10.0
+    assert second['Gi1/0/1']['in_errors_per_sec'] == 1.0
+
+    # sysUpTime went backwards: no rate from the reset counters
+    rebooted = collector.record('10.0.0.1', 100, _table(10, 0), now=120)
+    assert rebooted['Gi1/0/1']['in_bps'] is None
+
+    history = collector.history('10.0.0.1', '1')
+    assert history['in_bps'] == [100_000_000]
+
+
+def test_ring_keeps_fixed_capacity():
+    collector = InterfaceCounterCollector(max_interfaces=4, capacity=3)
+    memory = collector.store.memory_bytes
+
+    for sample in range(10):
+        collector.record('10.0.0.1', 1000 + sample * 100, _table(sample * 125_000, 0), now=sample)
+
+    history = collector.history('10.0.0.1', '1')
+    assert history['timestamps'] == [7.0, 8.0, 9.0]
+    assert all(math.isclose(bps, 1_000_000) for bps in history['in_bps'])
+    assert collector.store.memory_bytes == memory
@@ -0,0 +1,175 @@
+"""
+Test the database-backed adaptive learning store
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models.learning import (
+    LearnedPatterns, DiscoveryStrategies, DeviceCapabilities,
+    DiscoveryHistory, AdaptiveLearningConfig
+)
+from app.services.adaptive_learning import AdaptiveLearningEngine
+from app.services import learning_store as learning_store_module
+from app.services.learning_store import LearningStore
+
+
+def _session_factory():
+    engine = create_engine("sqlite://")
+    for model in (LearnedPatterns, DiscoveryStrategies, DeviceCapabilities,
+                  DiscoveryHistory, AdaptiveLearningConfig):
+        model.__table__.create(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_learning_is_flushed_and_reloaded(tmp_path, monkeypatch):
+    """Write-behind flush persists the index; a new store reloads it"""
+    monkeypatch.setattr(learning_store_module, "LEGACY_DATA_DIR", tmp_path)
+    factory = _session_factory()
+    store = LearningStore(session_factory=factory, flush_interval=0)
+    engine = AdaptiveLearningEngine(store=store)
+    profile = {'vendor': 'cisco', 'model': 'C9300', 'ip_address': '10.0.0.1'}
+
+    for _ in range(3):
+        engine.learn_from_discovery(profile, 'cpu', {'cpu_sensor_1': '5%'}, 'pattern', 0.2)
+
+    assert store.get_info()['pending_writes'] > 0
+    assert store.flush() > 0
+    assert store.get_info()['pending_writes'] == 0
+
+    db = factory()
+    assert db.query(DiscoveryHistory).count() == 3
+    assert db.query(LearnedPatterns).one().discovery_count == 3
+    db.close()
+
+    reloaded = LearningStore(session_factory=factory, flush_interval=0)
+    reloaded_engine = AdaptiveLearningEngine(store=reloaded)
+    assert reloaded.get_strategy('cisco', 'pattern', 'cpu')['success_count'] == 3
+    assert reloaded_engine.predict_successful_oids(profile, 'cpu') == ['cpu_sensor_1']
+
+
+def test_history_ring_is_bounded_and_rolled_up(tmp_path, monkeypatch):
+    """History keeps ring_size attempts per device type, in memory and in the table"""
+    monkeypatch.setattr(learning_store_module, "LEGACY_DATA_DIR", tmp_path)
+    factory = _session_factory()
+    store = LearningStore(session_factory=factory, flush_interval=0, ring_size=3)
+    engine = AdaptiveLearningEngine(store=store)
+    profile = {'vendor': 'cisco', 'model': 'C9300', 'ip_address': '10.0.0.1'}
+
+    for found in ({'cpu_sensor_1': '5%'}, {}, {}, {'cpu_sensor_1': '7%'}, {'cpu_sensor_1': '9%'}):
+        engine.learn_from_discovery(profile, 'cpu', found, 'pattern', 1.0)
+    store.flush()
+
+    rollup = store.get_rollup('cisco', 'C9300', 'cpu')
+    assert rollup.attempts == 5
+    assert len(rollup.ring) == 3
+    assert rollup.success_rate == 2 / 3
+    assert rollup.ewma_latency == 1.0
+
+    db = factory()
+    assert db.query(DiscoveryHistory).count() == 3
+    db.close()
+
+    # Strategy decisions are memoised until the next result for that vendor/category
+    first = engine.get_optimized_discovery_strategy(profile, 'cpu')
+    assert ('cisco', 'C9300', 'cpu') in store.decisions
+    assert engine.get_optimized_discovery_strategy(profile, 'cpu') == first
+    engine.learn_from_discovery(profile, 'cpu', {}, 'pattern', 1.0)
+    assert ('cisco', 'C9300', 'cpu') not in store.decisions
+
+
+def test_concurrent_stores_add_counts_instead_of_overwriting(tmp_path, monkeypatch):
+    """Two workers (one that could not load) each flush their increments"""
+    monkeypatch.setattr(learning_store_module, "LEGACY_DATA_DIR", tmp_path)
+    factory = _session_factory()
+    profile = {'vendor': 'cisco', 'model': 'C9300', 'ip_address': '10.0.0.1'}
+
+    first = LearningStore(session_factory=factory, flush_interval=0)
+    AdaptiveLearningEngine(store=first).learn_from_discovery(profile, 'cpu', {'cpu_sensor_1': '5%'}, 'pattern', 0.2)
+    first.flush()
+
+    second = LearningStore(session_factory=factory, flush_interval=0)
+    second_engine = AdaptiveLearningEngine(store=second)
+    broken = LearningStore(session_factory=factory, flush_interval=0)
+    monkeypatch.setattr(broken, "_load_from_db", lambda: (_ for _ in ()).throw(RuntimeError("db down")))
+    broken_engine = AdaptiveLearningEngine(store=broken)
+
+    for _ in range(2):
+        second_engine.learn_from_discovery(profile, 'cpu', {'cpu_sensor_1': '5%'}, 'pattern', 0.2)
+        broken_engine.learn_from_discovery(profile, 'cpu', {}, 'pattern', 0.2)
+    AdaptiveLearningEngine(store=first).learn_from_discovery(profile, 'cpu', {'cpu_sensor_1': '5%'}, 'pattern', 0.2)
+    for store in (second, broken, first, second):
+        store.flush()
+
+    db = factory()
+    assert db.query(LearnedPatterns).one().discovery_count == 4
+    strategy = db.query(DiscoveryStrategies).one()
+    assert (strategy.success_count, strategy.failure_count) == (4, 2)
+    db.close()
+
+
+def test_failed_flushes_back_off_and_keep_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(learning_store_module, "LEGACY_DATA_DIR", tmp_path)
+    factory = _session_factory()
+
+    def unavailable():
+        raise RuntimeError("no database configured")
+
+    store = LearningStore(session_factory=unavailable, flush_interval=0)
+    engine = AdaptiveLearningEngine(store=store)
+    engine.learn_from_discovery({'vendor': 'cisco', 'model': 'C9300', 'ip_address': '10.0.0.1'},
+                                'cpu', {'cpu_sensor_1': '5%'}, 'pattern', 0.2)
+    assert store.flush() == 0
+    assert store.flush() == 0
+    assert store._flush_failures == 2
+
+    store._session_factory = factory
+    assert store.flush() > 0
+    assert store._flush_failures == 0
+    db = factory()
+    assert db.query(DiscoveryStrategies).one().success_count == 1
+    db.close()
+
+
+def test_pending_history_stays_bounded_while_flushes_fail(tmp_path, monkeypatch):
+    """A database outage keeps at most ring_size unwritten attempts per device type"""
+    monkeypatch.setattr(learning_store_module, "LEGACY_DATA_DIR", tmp_path)
+    factory = _session_factory()
+
+    def unavailable():
+        raise RuntimeError("database down")
+
+    store = LearningStore(session_factory=unavailable, flush_interval=0, ring_size=5)
+    for attempt in range(200):
+        for model in ('C9300', 'C3850'):
+            store.add_history({'vendor': 'cisco', 'model': model, 'data_category': 'cpu',
+                               'device_ip': f'10.0.0.{attempt}', 'success': True})
+        if attempt % 10 == 0:
+            assert store.flush() == 0
+    assert store.flush() == 0
+    assert store.get_info()['pending_writes'] == 10
+
+    store._session_factory = factory
+    assert store.flush() == 10
+    db = factory()
+    rows = db.query(DiscoveryHistory).filter(DiscoveryHistory.model == 'C9300').all()
+    assert sorted(row.device_ip for row in rows) == [f'10.0.0.{i}' for i in range(195, 200)]
+    db.close()
+
+
+def test_strategy_is_chosen_from_recent_success_and_latency(tmp_path, monkeypatch):
+    """The per-strategy rollups of a device type drive get_optimized_discovery_strategy"""
+    monkeypatch.setattr(learning_store_module, "LEGACY_DATA_DIR", tmp_path)
+    store = LearningStore(session_factory=_session_factory(), flush_interval=0, ring_size=20)
+    engine = AdaptiveLearningEngine(store=store)
+    profile = {'vendor': 'cisco', 'model': 'C9300', 'ip_address': '10.0.0.1'}
+
+    for _ in range(5):
+        engine.learn_from_discovery(profile, 'cpu', {'cpu_sensor_1': '5%'}, 'snmp_walk', 2.0)
+        engine.learn_from_discovery(profile, 'cpu', {'cpu_sensor_1': '5%'}, 'pattern', 0.3)
+    assert engine.get_optimized_discovery_strategy(profile, 'cpu')[0] == 'pattern'
+    assert store.get_rollup('cisco', 'C9300', 'cpu').to_dict()['strategies']['pattern']['ewma_latency'] == 0.3
+
+    # The fast strategy starts failing: the reliable one takes over
+    for _ in range(5):
+        engine.learn_from_discovery(profile, 'cpu', {}, 'pattern', 0.3)
+    assert engine.get_optimized_discovery_strategy(profile, 'cpu')[0] == 'snmp_walk'
@@ -0,0 +1,130 @@
+"""
+Test spooling agent reports through a backend outage
+"""
+
+import os
+import threading
+import time
+
+from cisco_ai_agent_modules.offline_spool import OfflineSpool, DELIVERED, REJECTED, SPOOLED, send_result
+
+
+class FlakyBackend:
+    """Backend stand-in that is down until brought up"""
+
+    def __init__(self):
+        self.up = False
+        self.uploads = []
+        self.lock = threading.Lock()
+
+    def send(self, path, payload):
+        with self.lock:
+            if not self.up:
+                return False
+            self.uploads.append((path, payload))
+            return True
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_outage_is_spooled_and_replayed_merged_in_order(tmp_path):
+    backend = FlakyBackend()
+    spool = OfflineSpool(str(tmp_path), backend.send, segment_bytes=2048, retry_initial=0.05, retry_max=0.1)
+
+    for i in range(30):
+        assert spool.deliver('/status', {'network_id': i % 2, 'device_statuses': [{'seq': i}]},
+                             key=f"network:{i % 2}", extend=('device_statuses',)) == SPOOLED
+        spool.deliver('/topology', {'network_id': 1, 'snapshot': i}, key='network:1')
+    assert spool.get_info()['segments'] > 1
+
+    backend.up = True
+    assert wait_until(lambda: not spool.backlog())
+    # New reports go straight through once the backlog is gone
+    assert spool.deliver('/status', {'network_id': 0, 'device_statuses': [{'seq': 30}]}, key='network:0',
+                         extend=('device_statuses',)) == DELIVERED
+    spool.close()
+
+    statuses = {}
+    for path, payload in backend.uploads:
+        if path == '/status':
+            statuses.setdefault(payload['network_id'], []).extend(s['seq'] for s in payload['device_statuses'])
+    assert statuses[0] == list(range(0, 31, 2))
+    assert statuses[1] == list(range(1, 30, 2))
+    # Topology snapshots supersede each other; the newest one always arrives
+    assert [p for path, p in backend.uploads if path == '/topology'][-1]['snapshot'] == 29
+    assert len(backend.uploads) < 20
+
+
+def test_restart_keeps_position_and_cuts_torn_record(tmp_path):
+    backend = FlakyBackend()
+    spool = OfflineSpool(str(tmp_path), backend.send, retry_initial=0.05)
+    for i in range(3):
+        spool.deliver('/results', {'seq': i})
+    spool.close()
+    # Crash mid-append: half a record at the end of the segment
+    segment = sorted(name for name in os.listdir(tmp_path) if name.endswith('.seg'))[-1]
+    with open(tmp_path / segment, 'ab') as f:
+        f.write(b'\x00\x00\x01\x00garbage')
+
+    backend.up = True
+    spool = OfflineSpool(str(tmp_path), backend.send, retry_initial=0.05)
+    spool.append('/results', {'seq': 3})
+    assert wait_until(lambda: not spool.backlog())
+    spool.close()
+    assert [p['seq'] for _, p in backend.uploads] == [0, 1, 2, 3]
+
+    # Nothing is sent twice after another restart
+    spool = OfflineSpool(str(tmp_path), backend.send)
+    assert not spool.backlog()
+    spool.close()
+
+
+def test_spool_is_bounded_evicting_oldest(tmp_path):
+    backend = FlakyBackend()
+    spool = OfflineSpool(str(tmp_path), backend.send, max_bytes=8192, segment_bytes=1024, retry_initial=0.05)
+    noise = os.urandom(300).hex()
+    for i in range(200):
+        spool.deliver('/results', {'seq': i, 'noise': noise})
+    assert spool.size() <= 8192 + 1024
+    assert spool.get_info()['evicted_segments'] > 0
+
+    backend.up = True
+    assert wait_until(lambda: not spool.backlog())
+    spool.close()
+    replayed = [p['seq'] for _, p in backend.uploads]
+    assert replayed == sorted(replayed)
+    assert replayed[-1] == 199 and replayed[0] > 0
+
+
+def test_missing_route_stays_spooled_and_refused_payloads_are_dropped(tmp_path):
+    """404/405 keep the report for replay; only 400/422 drop it, never as a success"""
+    assert [send_result(code) for code in (200, 400, 422, 404, 405, 429, 500, None)] == \
+        [True, REJECTED, REJECTED, False, False, False, False, False]
+
+    responses = [404, 405]
+    uploads = []
+
+    def send(path, payload):
+        status = 422 if payload['seq'] == 1 else responses.pop(0) if responses else 200
+        if status == 200:
+            uploads.append(payload['seq'])
+        return send_result(status)
+
+    spool = OfflineSpool(str(tmp_path), send, retry_initial=0.05, retry_max=0.1)
+    assert spool.deliver('/status', {'seq': 0}) == SPOOLED
+    spool.append('/status', {'seq': 1})
+    spool.append('/status', {'seq': 2})
+    assert wait_until(lambda: not spool.backlog())
+    spool.close()
+    assert uploads == [0, 2]
+    assert spool.stats['rejected'] == 1 and spool.stats['replayed'] == 2
+
+    spool = OfflineSpool(str(tmp_path), lambda path, payload: REJECTED)
+    assert spool.deliver('/status', {'seq': 3}) == REJECTED
+    assert not spool.backlog()
+    spool.close()
@@ -0,0 +1,60 @@
+"""
+Test compiled health poll plans
+"""
+
+from app.core.poll_plan import PollPlan
+
+
+class FakeSession:
+    """SNMPSession stand-in answering GETs from a dict"""
+
+    def __init__(self, values, max_varbinds=None):
+        self.values = values
+        self.max_varbinds = max_varbinds
+        self.pdu_count = 0
+        self.too_big_count = 0
+
+    def get_many(self, ip, oids, max_varbinds=32):
+        self.pdu_count += 1
+        if self.max_varbinds and len(oids) > self.max_varbinds:
+            self.too_big_count += 1
+        return {oid: self.values[oid] for oid in oids if oid in self.values}
+
+
+def _mappings(count):
+    return {
+        'cpu': {f'cpu_{i}': {'value': '5%', 'oid': f'1.3.6.1.4.1.9.9.109.1.1.1.1.3.{i}'} for i in range(count)},
+        'power': {'psu_1': {'value': {'psu_status': '1'},
+                            'oids': {'psu_status': '1.3.6.1.4.1.9.9.13.1.5.1.5.1'}}},
+        'fan': {'legacy_fan': {'value': '3000 RPM'}},  # no OID learned - skipped
+    }
+
+
+def test_plan_packs_learned_oids_into_one_pdu():
+    """A typical device's health OIDs fit in a single GET"""
+    plan = PollPlan.compile('10.0.0.1', _mappings(8))
+    assert len(plan.entries) == 9
+    assert len(plan.pdus) == 1
+
+    values = {entry.oid: 42 for entry in plan.entries}
+    results = plan.execute(FakeSession(values))
+    assert plan.last_round_trips == 1
+    assert results['cpu']['cpu_0'] == '42'
+    assert results['power'] == {'psu_1': {'psu_status': '42'}}
+    assert results['fan'] == {}
+
+
+def test_plan_repacks_after_too_big():
+    """tooBig shrinks the PDU budget so later runs stop tripping it"""
+    plan = PollPlan.compile('10.0.0.1', _mappings(40))
+    session = FakeSession({}, max_varbinds=12)
+    plan.execute(session)
+    plan.execute(session)
+    assert all(len(pdu) <= 12 for pdu in plan.pdus)
+
+
+def test_signature_matches_compiled_plan():
+    """The fast path can tell whether its cached plan is current without recompiling"""
+    mappings = _mappings(4)
+    assert PollPlan.signature_of(mappings) == PollPlan.compile('10.0.0.1', mappings).signature
+    assert PollPlan.signature_of({'fan': {'legacy_fan': {'value': '3000 RPM'}}}) == ()
@@ -0,0 +1,46 @@
+"""
+Test the agent's coalescing discovery progress reporter
+"""
+
+import asyncio
+import time
+
+from app.services.agents.agent_discovery_service import AgentDiscoveryService
+from cisco_ai_agent_modules.progress_reporter import ProgressReporter
+
+
+def test_per_host_updates_are_coalesced_off_the_caller_thread():
+    posts = []
+
+    def slow_send(payload):
+        time.sleep(0.05)
+        posts.append(payload)
+        return True
+
+    reporter = ProgressReporter(slow_send, min_interval=60, min_step=10)
+    started = time.monotonic()
+    for processed in range(1, 1001):
+        reporter.update('s1', processed * 100 // 1000, processed, processed // 10, total_ips=1000)
+    assert time.monotonic() - started < 0.5
+    assert reporter.finish('s1', timeout=5)
+    reporter.stop()
+
+    assert len(posts) <= 12
+    assert posts[-1]['final'] and posts[-1]['processed_ips'] == 1000
+    assert sum(post['coalesced_updates'] for post in posts) >= 1000
+    assert [post['progress'] for post in posts] == sorted(post['progress'] for post in posts)
+
+
+def test_session_progress_aggregates_agents():
+    service = AgentDiscoveryService()
+
+    async def report():
+        await service.update_discovery_progress('s2', 50, agent_id=1, processed_ips=100, total_ips=200)
+        await service.update_discovery_progress('s2', 10, agent_id=2, processed_ips=20, total_ips=200)
+        # A delayed post from agent 2 must not move the bar backwards
+        await service.update_discovery_progress('s2', 5, agent_id=2, processed_ips=10, total_ips=200)
+        return await service.get_discovery_status('s2', include_results=False)
+
+    status = asyncio.run(report())
+    assert status['progress'] == 30 and status['total_ips'] == 400
+    assert status['status'] == 'in_progress'
@@ -0,0 +1,143 @@
+"""
+Test streaming discovery results through a lossy link
+"""
+
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.base import AgentResultBatch
+from app.services.agents.agent_discovery_service import AgentDiscoveryService
+from cisco_ai_agent_modules.offline_spool import OfflineSpool
+from cisco_ai_agent_modules.result_streamer import ResultStreamer
+
+
+def make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    AgentResultBatch.__table__.create(engine)
+    return sessionmaker(bind=engine)
+
+
+def test_batches_survive_lost_acks_without_duplicates():
+    service = AgentDiscoveryService(make_session_factory())
+    loop = asyncio.new_event_loop()
+    lock = threading.Lock()
+    calls = [0]
+    acks = []
+
+    def flaky_send(batch):
+        with lock:
+            calls[0] += 1
+            attempt = calls[0]
+        if attempt % 3 == 0:
+            return False   # request lost before the backend saw it
+        ack = loop.run_until_complete(service.ingest_result_batch(
+            batch['session_id'], 7, batch['sequence'], batch['discovered_devices'], batch['errors'],
+            batch['final'], batch.get('total_batches')
+        ))
+        acks.append(ack)
+        return attempt % 4 != 0   # every fourth acknowledgement is lost on the way back
+
+    streamer = ResultStreamer(flaky_send, batch_size=10, max_delay=0.05, retry_initial=0.01, retry_max=0.02)
+    for i in range(95):
+        streamer.add('s1', {'ip_address': f'10.0.0.{i}'}, [f'err {i}'] if i % 10 == 0 else [])
+    assert streamer.finish('s1', timeout=10)
+    streamer.stop()
+    session = loop.run_until_complete(service.get_discovery_status('s1'))
+    loop.close()
+
+    ips = [device['ip_address'] for device in session['discovered_devices']]
+    assert sorted(ips) == sorted(f'10.0.0.{i}' for i in range(95))
+    assert len(session['errors']) == 10
+    assert any(ack['duplicate'] for ack in acks)
+    assert acks[-1]['complete'] and acks[-1]['received_batches'] == 10
+
+
+def test_retried_batch_on_another_worker_is_stored_once():
+    session_factory = make_session_factory()
+    worker_a, worker_b = AgentDiscoveryService(session_factory), AgentDiscoveryService(session_factory)
+    loop = asyncio.new_event_loop()
+    try:
+        first = loop.run_until_complete(worker_a.ingest_result_batch(
+            's1', 7, 0, [{'ip_address': '10.0.0.1'}], [], final=True, total_batches=1
+        ))
+        # The ack was lost; the retry lands on a fresh (or restarted) worker
+        retry = loop.run_until_complete(worker_b.ingest_result_batch(
+            's1', 7, 0, [{'ip_address': '10.0.0.1'}], [], final=True, total_batches=1
+        ))
+        # A third worker that saw no batch at all serves the stored devices
+        status = loop.run_until_complete(AgentDiscoveryService(session_factory).get_discovery_status('s1'))
+    finally:
+        loop.close()
+
+    assert not first['duplicate'] and first['complete']
+    assert retry['duplicate'] and retry['complete'] and retry['received_batches'] == 1
+    assert status['discovered_devices'] == [{'ip_address': '10.0.0.1'}]
+
+
+def test_cleanup_and_retention_delete_stored_batches():
+    session_factory = make_session_factory()
+    service = AgentDiscoveryService(session_factory)
+    loop = asyncio.new_event_loop()
+    try:
+        for session_id in ('s1', 's2'):
+            loop.run_until_complete(service.ingest_result_batch(session_id, 7, 0, [{'ip_address': '10.0.0.1'}]))
+        assert loop.run_until_complete(service.cleanup_discovery_session('s1'))
+        db = session_factory()
+        try:
+            assert [row.session_id for row in db.query(AgentResultBatch).all()] == ['s2']
+        finally:
+            db.close()
+
+        # Batches of sessions that were never cleaned up expire
+        expiring = AgentDiscoveryService(session_factory, batch_retention=timedelta(0))
+        loop.run_until_complete(expiring.ingest_result_batch('s3', 7, 0, [{'ip_address': '10.0.0.3'}]))
+        status = loop.run_until_complete(expiring.get_discovery_status('s2'))
+    finally:
+        loop.close()
+
+    assert status['discovered_devices'] == []
+
+
+def test_unacknowledged_batches_survive_an_agent_restart(tmp_path):
+    service = AgentDiscoveryService(make_session_factory())
+    loop = asyncio.new_event_loop()
+    backend_up = [False]
+
+    def post(path, batch):
+        if not backend_up[0]:
+            return False
+        ack = loop.run_until_complete(service.ingest_result_batch(
+            batch['session_id'], 7, batch['sequence'], batch['discovered_devices'], batch['errors'],
+            batch['final'], batch.get('total_batches')
+        ))
+        return ack['acked'] == batch['sequence']
+
+    path = '/api/v1/agents/7/discovery-results/batch'
+    spool = OfflineSpool(str(tmp_path), post, retry_initial=60)
+    streamer = ResultStreamer(lambda batch: post(path, batch), batch_size=10, max_delay=0.05,
+                              spool=spool, spool_path=path)
+    for i in range(25):
+        streamer.add('s1', {'ip_address': f'10.0.0.{i}'})
+    assert streamer.finish('s1', timeout=5)
+    streamer.stop()
+    spool.close()
+    assert streamer.get_info()['spooled'] == 3
+
+    # The agent restarts once the backend is back: the spool replays the stream
+    backend_up[0] = True
+    spool = OfflineSpool(str(tmp_path), post, retry_initial=0.05)
+    deadline = time.monotonic() + 5
+    while spool.backlog() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    spool.close()
+    session = loop.run_until_complete(service.get_discovery_status('s1'))
+    loop.close()
+
+    ips = [device['ip_address'] for device in session['discovered_devices']]
+    assert sorted(ips) == sorted(f'10.0.0.{i}' for i in range(25))
@@ -0,0 +1,118 @@
+"""
+Test asyncio fleet SNMP poller concurrency limits
+"""
+
+import threading
+import time
+import pytest
+from app.core import snmp_async_poller
+from app.core.snmp_async_poller import AsyncSNMPPoller
+
+
+class ConcurrencyProbe:
+    """Blocking fake SNMP call that records peak concurrency"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = {}
+        self.peak_total = 0
+        self.peak_per_device = 0
+
+    def poll(self, ip):
+        with self._lock:
+            self.active[ip] = self.active.get(ip, 0) + 1
+            self.peak_total = max(self.peak_total, sum(self.active.values()))
+            self.peak_per_device = max(self.peak_per_device, self.active[ip])
+        time.sleep(0.02)
+        with self._lock:
+            self.active[ip] -= 1
+        return {"ip": ip}
+
+
+@pytest.mark.asyncio
+async def test_poll_fleet_respects_limits():
+    """Global and per-device limits are never exceeded"""
+    poller = AsyncSNMPPoller(max_in_flight=4, per_device_limit=1, executor_workers=16)
+    probe = ConcurrencyProbe()
+    targets = [f"10.0.0.{i % 5}" for i in range(20)]
+
+    async def operation(p, target):
+        return await p.run_blocking(target["ip"], probe.poll, target["ip"])
+
+    results = [r async for r in poller.poll_fleet(targets, operation)]
+    poller.shutdown()
+
+    assert len(results) == 20
+    assert all(r["status"] == "success" for r in results)
+    assert probe.peak_total <= 4
+    assert probe.peak_per_device == 1
+
+
+@pytest.mark.asyncio
+async def test_poll_fleet_reports_errors_per_device():
+    """A failing device yields an error result without stopping the others"""
+    poller = AsyncSNMPPoller()
+
+    async def operation(p, target):
+        if target["ip"] == "10.0.0.2":
+            raise TimeoutError("No SNMP response received before timeout")
+        return target["ip"]
+
+    results = {r["ip"]: r async for r in poller.poll_fleet(["10.0.0.1", "10.0.0.2"], operation)}
+    poller.shutdown()
+
+    assert results["10.0.0.1"]["status"] == "success"
+    assert results["10.0.0.2"]["status"] == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_walk_timeouts_report_as_timeout(monkeypatch):
+    """A walk that times out is reported like a GET timeout, not as an error"""
+    def silent_bulk(*args, **kwargs):
+        yield "No SNMP response received before timeout", 0, 0, []
+
+    monkeypatch.setattr(snmp_async_poller, "bulkCmd", silent_bulk)
+    poller = AsyncSNMPPoller()
+    poller.use_native = False
+
+    async def operation(p, target):
+        return await p.walk(target["ip"], {"ifDescr": "1.3.6.1.2.1.2.2.1.2"})
+
+    results = [r async for r in poller.poll_fleet(["10.0.0.1"], operation)]
+    poller.shutdown()
+
+    assert results[0]["status"] == "timeout"
+
+
+class FakeStatus:
+    def __init__(self, status):
+        self.status = status
+
+    def __bool__(self):
+        return bool(self.status)
+
+    def prettyPrint(self):
+        return self.status
+
+
+@pytest.mark.asyncio
+async def test_walk_error_status_fails_instead_of_truncating(monkeypatch):
+    """An error status mid-walk fails the device rather than returning a partial table"""
+    def failing_bulk(*args, **kwargs):
+        yield None, FakeStatus(""), 0, [("1.3.6.1.2.1.2.2.1.2.1", "Gi0/1")]
+        yield None, FakeStatus("genErr"), 1, []
+
+    monkeypatch.setattr(snmp_async_poller, "bulkCmd", failing_bulk)
+    monkeypatch.setattr(snmp_async_poller, "convert_snmp_value", str)
+    poller = AsyncSNMPPoller()
+    poller.use_native = False
+
+    async def operation(p, target):
+        return await p.walk(target["ip"], {"ifDescr": "1.3.6.1.2.1.2.2.1.2"})
+
+    results = [r async for r in poller.poll_fleet(["10.0.0.1"], operation)]
+    poller.shutdown()
+
+    assert results[0]["status"] == "error"
+    assert results[0]["error"] == "genErr"
+    assert results[0]["data"] is None
@@ -0,0 +1,54 @@
+import socket
+
+from pysnmp.hlapi import CommunityData, ContextData, ObjectIdentity, ObjectType, SnmpEngine, UdpTransportTarget, getCmd
+
+from app.core.snmp_metrics import SNMPMetrics
+from tests.benchmarks.snmp_simulator import SimulatedAgent, load_snmprec
+
+
+def _get(metrics: SNMPMetrics, port: int):
+    engine = metrics.instrument_engine(SnmpEngine())
+    with metrics.measure('127.0.0.1', 'get') as op:
+        error_indication, error_status, _, _ = next(getCmd(
+            engine, CommunityData('public', mpModel=1),
+            UdpTransportTarget(('127.0.0.1', port), timeout=0.2, retries=1), ContextData(),
+            ObjectType(ObjectIdentity('1.3.6.1.2.1.1.1.0'))
+        ))
+        if error_indication or error_status:
+            op.fail(error_indication or error_status)
+
+
+def test_pdus_retries_and_timeouts_are_counted():
+    metrics = SNMPMetrics()
+    agent = SimulatedAgent(load_snmprec('arista_eos')).start()
+    try:
+        _get(metrics, agent.port)
+    finally:
+        agent.stop()
+
+    # Nothing listens on a port we just released: every try times out
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    dead_port = sock.getsockname()[1]
+    sock.close()
+    _get(metrics, dead_port)
+
+    summary = metrics.device_summary('127.0.0.1')['127.0.0.1']['operations']['get']
+    assert (summary['count'], summary['ok'], summary['timeout']) == (2, 1, 1)
+    assert summary['pdus'] == 3 and summary['retries'] == 1
+
+
+def test_prometheus_text_and_device_eviction():
+    metrics = SNMPMetrics(max_devices=2)
+    metrics.observe('10.0.0.1', 'bulk', 0.03, pdus=4)
+    metrics.observe('10.0.0.2', 'walk.cisco_cpu', 0.2, pdus=12, outcome='error')
+    metrics.observe('10.0.0.3', 'get', 3.0, pdus=2, outcome='timeout', retries=1)
+
+    assert set(metrics.device_summary()) == {'10.0.0.2', '10.0.0.3'}
+    text = metrics.render_prometheus()
+    assert '# TYPE rms_snmp_operation_duration_seconds histogram' in text
+    assert 'rms_snmp_operation_duration_seconds_bucket{device="10.0.0.3",operation="get",le="2.5"} 0' in text
+    assert 'rms_snmp_operation_duration_seconds_bucket{device="10.0.0.3",operation="get",le="5"} 1' in text
+    assert 'rms_snmp_operations_total{device="10.0.0.2",operation="walk.cisco_cpu",outcome="error"} 1' in text
+    assert 'rms_snmp_retries_total{device="10.0.0.3",operation="get"} 1' in text
+    assert '10.0.0.1' not in text
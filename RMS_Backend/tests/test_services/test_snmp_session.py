@@ -0,0 +1,136 @@
+"""
+Test the bulk SNMP session collectors
+"""
+
+from pysnmp.proto.rfc1902 import Integer
+
+from app.core import snmp_session
+from app.core.snmp_session import SNMPSession, CDP_CACHE_COLUMNS, LLDP_REM_COLUMNS
+
+
+class FakeWalkSession(SNMPSession):
+    """SNMPSession answering column walks from a dict"""
+
+    def __init__(self, rows):
+        super().__init__(poller=None)
+        self.rows = rows
+        self.walked = []
+
+    def walk_columns(self, ip, columns, max_repetitions=None):
+        self.walked.append(set(columns))
+        return {name: dict(self.rows.get(name, {})) for name in columns}
+
+
+ROWS = {
+    'cdpCacheDeviceId': {'3.1': 'core1.example.com', '7.2': 'edge2'},
+    'cdpCacheDevicePort': {'3.1': 'Gi1/0/1'},  # edge2 row is incomplete
+    'cdpCacheAddress': {'3.1': '0x0a000001'},
+    'cdpCachePlatform': {'3.1': 'WS-C3850'},
+    'lldpRemSysName': {'0.12.1': 'srv1'},
+    'lldpRemPortId': {'0.12.1': 'eth0'},
+}
+
+
+def test_collect_neighbors_joins_cdp_and_lldp_in_one_walk():
+    """Both tables come from a single walk and are joined by row index"""
+    session = FakeWalkSession(ROWS)
+    result = session.collect_neighbors('10.0.0.1')
+
+    assert session.walked == [set(CDP_CACHE_COLUMNS) | set(LLDP_REM_COLUMNS)]
+    assert result['protocols'] == ['cdp', 'lldp']
+    cdp, lldp = result['neighbors']
+    assert cdp['device_id'] == 'core1'
+    assert cdp['local_port'] == '3'
+    assert cdp['remote_port'] == 'Gi1/0/1'
+    assert cdp['address'] == '10.0.0.1'
+    assert lldp['device_id'] == 'srv1'
+    assert lldp['local_port'] == '12'
+    assert lldp['remote_port'] == 'eth0'
+
+
+def test_collect_neighbors_walks_only_known_protocols():
+    """A cached protocol list restricts the walk to that table"""
+    session = FakeWalkSession(ROWS)
+    result = session.collect_neighbors('10.0.0.1', ['lldp'])
+
+    assert session.walked == [set(LLDP_REM_COLUMNS)]
+    assert result['protocols'] == ['lldp']
+    assert [n['protocol'] for n in result['neighbors']] == ['lldp']
+
+
+class FakePoller:
+    """SNMPPoller stand-in providing the GET parameters"""
+
+    snmp_engine = None
+
+    def _get_auth_data(self):
+        return 'auth'
+
+    def _get_target(self, ip):
+        return ip
+
+    def _get_context_data(self):
+        return 'context'
+
+
+class FakeStatus:
+    def __init__(self, status):
+        self.status = status
+
+    def __bool__(self):
+        return bool(self.status)
+
+    def prettyPrint(self):
+        return self.status
+
+
+def test_get_many_splits_on_too_big_and_merges(monkeypatch):
+    """An agent limited to 4 varbinds answers tooBig; the request is halved until it fits"""
+    requests = []
+
+    def fake_get(engine, auth_data, target, context_data, *oids):
+        requests.append(len(oids))
+        if len(oids) > 4:
+            return iter([(None, FakeStatus('tooBig'), 0, [])])
+        return iter([(None, FakeStatus(''), 0, [(oid, Integer(int(oid.rsplit('.', 1)[1]))) for oid in oids])])
+
+    monkeypatch.setattr(snmp_session, 'getCmd', fake_get)
+    # Varbinds reach fake_get as plain OID strings
+    monkeypatch.setattr(snmp_session, 'ObjectIdentity', str)
+    monkeypatch.setattr(snmp_session, 'ObjectType', lambda identity: identity)
+    session = SNMPSession(FakePoller())
+    session._engine = object()
+    oids = [f'1.3.6.1.4.1.9.9.109.1.1.1.1.3.{i}' for i in range(12)]
+
+    results = session.get_many('10.0.0.1', oids, max_varbinds=12)
+
+    assert results == {oid: i for i, oid in enumerate(oids)}
+    assert session.too_big_count == 3
+    assert requests == [12, 6, 3, 3, 6, 3, 3]
+
+
+def test_get_many_out_of_range_error_index_falls_back_to_single_gets(monkeypatch):
+    """An error index beyond the request must not re-send the same PDU forever"""
+    requests = []
+
+    def fake_get(engine, auth_data, target, context_data, *oids):
+        requests.append(len(oids))
+        if len(requests) > 50:
+            raise AssertionError("request loop")
+        if len(oids) > 1:
+            return iter([(None, FakeStatus('noSuchName'), len(oids) + 3, [])])
+        if oids[0].endswith('.2'):
+            return iter([(None, FakeStatus('noSuchName'), 1, [])])
+        return iter([(None, FakeStatus(''), 0, [(oids[0], Integer(int(oids[0].rsplit('.', 1)[1])))])])
+
+    monkeypatch.setattr(snmp_session, 'getCmd', fake_get)
+    monkeypatch.setattr(snmp_session, 'ObjectIdentity', str)
+    monkeypatch.setattr(snmp_session, 'ObjectType', lambda identity: identity)
+    session = SNMPSession(FakePoller())
+    session._engine = object()
+    oids = [f'1.3.6.1.4.1.9.9.109.1.1.1.1.3.{i}' for i in range(4)]
+
+    results = session.get_many('10.0.0.1', oids)
+
+    assert results == {oid: i for i, oid in enumerate(oids) if i != 2}
+    assert requests == [4, 1, 1, 1, 1]
@@ -0,0 +1,22 @@
+from app.services.agents.snmp_discovery_service import SNMPDiscoveryService
+from tests.benchmarks.snmp_simulator import IF_NUMBER, SimulatedAgent, load_snmprec, scale_interfaces
+
+
+def test_scale_interfaces_rewrites_tables():
+    records = scale_interfaces(load_snmprec('cisco_catalyst'), 24)
+    assert int(records[IF_NUMBER]) == 24
+    names = [str(value) for oid, value in records.items() if oid.startswith('1.3.6.1.2.1.2.2.1.2.')]
+    assert len(names) == len(set(names)) == 24
+
+
+def test_discovery_against_simulated_agent():
+    agent = SimulatedAgent(load_snmprec('juniper_mx'), community='public').start()
+    try:
+        info = SNMPDiscoveryService().snmpv1v2c_get_device_info('127.0.0.1', 'public', agent.port, 'v2c')
+        assert info['device_type'] == 'Router'
+        assert agent.get_stats()['get'] == 1
+
+        SNMPDiscoveryService().snmpv1v2c_get_device_info('127.0.0.1', 'wrong', agent.port, 'v2c')
+        assert agent.get_stats()['responses'] == 1
+    finally:
+        agent.stop()
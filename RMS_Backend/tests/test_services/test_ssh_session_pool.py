@@ -0,0 +1,90 @@
+"""
+Test the pooled SSH sessions
+"""
+
+import threading
+
+import pytest
+
+from app.services.ssh_engine.session_pool import SSHSessionPool
+
+
+class FakeConnection:
+    """netmiko ConnectHandler stand-in"""
+
+    def __init__(self, ip):
+        self.ip = ip
+        self.alive = True
+        self.disconnected = False
+        self.commands = []
+
+    def send_command(self, command, **kwargs):
+        if not self.alive:
+            raise OSError("Socket is closed")
+        self.commands.append(command)
+        return f"{self.ip}# {command}"
+
+    def is_alive(self):
+        return self.alive
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+def _pool(**kwargs):
+    opened = []
+
+    def connect(ip, username, password):
+        opened.append(FakeConnection(ip))
+        return opened[-1]
+
+    return SSHSessionPool(connect=connect, **kwargs), opened
+
+
+def test_commands_share_one_login():
+    pool, opened = _pool()
+    for command in ('show environment power', 'show environment all', 'show power'):
+        pool.send_command('10.0.0.1', 'admin', 'secret', command)
+
+    assert len(opened) == 1
+    assert opened[0].commands == ['show environment power', 'show environment all', 'show power']
+    assert pool.get_info()['stats']['reused'] == 2
+
+
+def test_failed_and_dead_sessions_are_replaced():
+    pool, opened = _pool(health_check_interval=0)
+
+    opened_first = pool.send_command('10.0.0.1', 'admin', 'secret', 'show clock')
+    opened[0].alive = False  # dropped by the device while idle
+    pool.send_command('10.0.0.1', 'admin', 'secret', 'show clock')
+    assert len(opened) == 2 and opened[0].disconnected
+
+    # A command failing mid-channel closes that session
+    opened[1].alive = False
+    pool.health_check_interval = 3600
+    with pytest.raises(OSError):
+        pool.send_command('10.0.0.1', 'admin', 'secret', 'show clock')
+    assert opened[1].disconnected
+    assert pool.get_info()['devices'] == {}
+    assert opened_first.startswith('10.0.0.1#')
+
+
+def test_sessions_per_device_are_bounded():
+    pool, opened = _pool(max_sessions_per_device=1, checkout_timeout=5)
+    results = []
+
+    def worker():
+        results.append(pool.send_command('10.0.0.1', 'admin', 'secret', 'show version'))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 4
+    assert len(opened) == 1
+    assert pool.cleanup_idle() == 0
+    pool.idle_ttl = 0
+    assert pool.cleanup_idle() == 1
+    assert opened[0].disconnected
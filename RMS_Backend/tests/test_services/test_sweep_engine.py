@@ -0,0 +1,109 @@
+"""
+Test the agent's concurrent IP sweep engine
+"""
+
+import socket
+import threading
+import time
+
+from cisco_ai_agent_modules.sweep_engine import AdaptiveLimiter, SweepEngine, tcp_probe
+
+
+def test_limiter_backs_off_on_timeouts_and_recovers():
+    limiter = AdaptiveLimiter('snmp', 16, 2, 32, timeout_after=1.0, window=4)
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(timed_out=True)
+    assert limiter.limit == 8
+    for _ in range(8):
+        limiter.acquire()
+        limiter.release(timed_out=False)
+    assert limiter.limit == 12
+    assert limiter.get_info()['decreases'] == 1
+
+
+def test_tcp_probe_treats_refused_port_as_alive():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    closed_port = sock.getsockname()[1]
+    sock.close()
+    assert tcp_probe('127.0.0.1', (closed_port,), timeout=0.5)
+
+
+def test_sweep_reports_every_host_within_protocol_limit():
+    engine = SweepEngine(limits={'snmp': (2, 1, 2, 5.0)}, liveness_ports=(9,), liveness_timeout=0.1,
+                         ping=lambda ip: ip.endswith(('.1', '.2', '.3', '.4')))
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def probe(ip):
+        with lock:
+            active.append(ip)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(ip)
+        return {'ip': ip}
+
+    results = {}
+    stats = engine.sweep(
+        [f'192.0.2.{i}' for i in range(1, 9)],
+        lambda ip: engine.call('snmp', probe, ip),
+        lambda ip, alive, result: results.__setitem__(ip, (alive, result)),
+    )
+
+    assert stats['completed'] == 8 and stats['alive'] == 4
+    assert results['192.0.2.2'] == (True, {'ip': '192.0.2.2'})
+    assert results['192.0.2.7'] == (False, None)
+    assert max(peak) <= 2
+
+
+def test_snmp_only_host_is_alive_without_tcp_or_ping():
+    """A host whose TCP ports are filtered and that ignores ping still answers SNMP"""
+    from tests.benchmarks.snmp_simulator import SimulatedAgent, load_snmprec
+
+    agent = SimulatedAgent(load_snmprec('juniper_mx'), community='public').start()
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(('127.0.0.1', 0))
+    try:
+        answering = SweepEngine(liveness_ports=(), liveness_timeout=0.5, ping=lambda ip: False,
+                                snmp_port=agent.port, snmp_communities=('public',))
+        assert answering.is_alive('127.0.0.1')
+
+        # Same host without an SNMP agent answering: not alive
+        ignoring = SweepEngine(liveness_ports=(), liveness_timeout=0.2, ping=lambda ip: False,
+                               snmp_port=silent.getsockname()[1], snmp_communities=('public',))
+        assert not ignoring.is_alive('127.0.0.1')
+    finally:
+        agent.stop()
+        silent.close()
+
+
+def test_hosts_skipped_as_dead_keep_their_method_error(monkeypatch):
+    """snmp_only and ssh_only sweeps report the per-host failure for dead hosts"""
+    import cisco_ai_agent
+
+    class DeadSweep:
+        def __init__(self, **kwargs):
+            pass
+
+        def sweep(self, ip_list, probe, on_result, **kwargs):
+            for ip in ip_list:
+                on_result(ip, False, None)
+            return {}
+
+    monkeypatch.setattr(cisco_ai_agent, 'SweepEngine', DeadSweep)
+    agent = cisco_ai_agent.CiscoAIAgent.__new__(cisco_ai_agent.CiscoAIAgent)
+    agent.config = {}
+    agent.discovery_running = True
+    monkeypatch.setattr(agent, '_icmp_available', lambda: False)
+
+    for method, expected in (('snmp_only', 'SNMP discovery failed'), ('ssh_only', 'SSH discovery failed')):
+        recorded = []
+        agent.sweep_discovery(['192.0.2.1', '192.0.2.2'], method, {}, {},
+                              lambda ip, device, errors: recorded.append((ip, device, errors)))
+        assert [ip for ip, _, _ in recorded] == ['192.0.2.1', '192.0.2.2']
+        for ip, device, errors in recorded:
+            assert device is None
+            assert len(errors) == 1 and errors[0].startswith(f"Device at {ip} {expected}")
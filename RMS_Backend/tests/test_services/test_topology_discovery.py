@@ -0,0 +1,96 @@
+"""
+Test parallel, incremental topology discovery
+"""
+
+from app.core.snmp_poller import SNMPPoller, SYS_UPTIME_OID, TOPOLOGY_CHANGE_OIDS
+
+IF_TABLE_LAST_CHANGE_OID = TOPOLOGY_CHANGE_OIDS[1]
+
+
+class FakeDevice:
+    def __init__(self, name, ip):
+        self.name = name
+        self.ip = ip
+        self.snmp_status = True
+
+
+class FakeDB:
+    """Session stand-in whose query(...).filter(...).all() returns devices"""
+
+    def __init__(self, devices):
+        self.devices = devices
+
+    def query(self, model):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def all(self):
+        return self.devices
+
+
+class FakeMarkerSession:
+    def __init__(self, markers):
+        self.markers = markers
+
+    def get_many(self, ip, oids, **kwargs):
+        return dict(self.markers.get(ip, {}))
+
+
+class FakeTopologyPoller(SNMPPoller):
+    """Three switches in a ring, answering from class-level fakes"""
+
+    markers = {}
+    full_polls = []
+    topology_state = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = FakeMarkerSession(self.markers)
+
+    def get_basic_device_info(self, ip):
+        self.full_polls.append(ip)
+        return {"model": "C9300", "os_version": "17.3"}
+
+    def get_interfaces(self, ip):
+        return [{"ifIndex": str(i), "ifDescr": f"Gi1/0/{i}"} for i in range(1, 49)]
+
+    def get_cdp_neighbors(self, ip):
+        peer = (int(ip.rsplit('.', 1)[1]) % 3) + 1
+        return [{"device_id": f"sw{peer}", "local_port": "48", "remote_port": "Gi1/0/47"}]
+
+
+def test_discover_topology_repolls_only_changed_devices():
+    devices = [FakeDevice(f"sw{i}", f"10.0.0.{i}") for i in range(1, 4)]
+    FakeTopologyPoller.markers.update({
+        d.ip: {SYS_UPTIME_OID: 1000, IF_TABLE_LAST_CHANGE_OID: 10} for d in devices
+    })
+    poller = FakeTopologyPoller("public")
+
+    topology = poller.discover_topology(1, FakeDB(devices))
+    assert [node["id"] for node in topology["nodes"]] == ["sw1", "sw2", "sw3"]
+    assert len(topology["edges"]) == 3
+    assert topology["edges"][0]["label"] == "Gi1/0/48 - Gi1/0/47"
+    assert sorted(FakeTopologyPoller.full_polls) == [d.ip for d in devices]
+
+    # Uptime advancing alone changes nothing; an interface change or a reboot does
+    FakeTopologyPoller.full_polls.clear()
+    FakeTopologyPoller.markers["10.0.0.1"] = {SYS_UPTIME_OID: 2000, IF_TABLE_LAST_CHANGE_OID: 10}
+    FakeTopologyPoller.markers["10.0.0.2"] = {SYS_UPTIME_OID: 2000, IF_TABLE_LAST_CHANGE_OID: 1500}
+    FakeTopologyPoller.markers["10.0.0.3"] = {SYS_UPTIME_OID: 50, IF_TABLE_LAST_CHANGE_OID: 10}
+
+    topology = poller.discover_topology(1, FakeDB(devices))
+    assert len(topology["nodes"]) == 3
+    assert len(topology["edges"]) == 3
+    assert sorted(FakeTopologyPoller.full_polls) == ["10.0.0.2", "10.0.0.3"]
+
+
+def test_discover_topology_skips_unreachable_devices():
+    FakeTopologyPoller.markers.clear()
+    FakeTopologyPoller.full_polls.clear()
+    poller = FakeTopologyPoller("public")
+
+    topology = poller.discover_topology(1, FakeDB([FakeDevice("sw9", "10.0.0.9")]))
+    assert topology == {"nodes": [], "edges": []}
+    assert FakeTopologyPoller.full_polls == []